@@ -0,0 +1,136 @@
+import os
+import glob
+import logging
+import threading
+from contextlib import contextmanager
+from typing import List
+
+NODE_DIR = "/sys/devices/system/node"
+
+def isSupported() -> bool:
+    return hasattr(os, "sched_setaffinity") and hasattr(os, "sched_getaffinity")
+
+def parseCpuList(text: str) -> List[int]:
+    """Parse the kernel's cpulist format. "0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11]"""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        if "-" in part:
+            start, end = part.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+def getNumaNodes(node_dir: str = NODE_DIR) -> List[List[int]]:
+    """Returns CPUs usable by this process, grouped by NUMA node.
+
+    Falls back to a single node when the topology cannot be read.
+    """
+    allowed = os.sched_getaffinity(0)
+    nodes = []
+
+    for path in sorted(glob.glob(os.path.join(node_dir, "node[0-9]*", "cpulist"))):
+        try:
+            with open(path, "r") as f:
+                cpus = [cpu for cpu in parseCpuList(f.read()) if cpu in allowed]
+        except (OSError, ValueError) as e:
+            logging.error(f"[Affinity] Failed to read {path}. {e}")
+            continue
+        if cpus:
+            nodes.append(cpus)
+
+    if not nodes:
+        nodes = [sorted(allowed)]
+    return nodes
+
+class CorePlacement():
+    """Hands out core sets to workers, so encoder subprocesses stay on one NUMA node.
+
+    Each running worker holds a set sized to its thread count (see ThreadManager).
+    Sets are taken from the node with the most free cores and only span nodes when a single node is too small.
+
+    Usage:
+        placement.start()
+        with placement.pinned(available_threads):
+            runProcess(...)     # Pinned to the acquired cores
+        placement.stop()
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.enabled = False
+        self.free = []          # Free CPUs per node
+        self.cpu_node = {}      # CPU -> node index
+
+    def start(self, nodes: List[List[int]] | None = None):
+        """Call before starting a batch."""
+        if not isSupported():
+            logging.warning("[Affinity] CPU placement is not supported on this platform")
+            return
+
+        if nodes is None:
+            nodes = getNumaNodes()
+
+        with self.lock:
+            self.free = [list(cpus) for cpus in nodes]
+            self.cpu_node = {cpu: idx for idx, cpus in enumerate(nodes) for cpu in cpus}
+            self.enabled = True
+        logging.debug(f"[Affinity] Nodes: {nodes}")
+
+    def stop(self):
+        with self.lock:
+            self.free = []
+            self.cpu_node = {}
+            self.enabled = False
+
+    def isEnabled(self) -> bool:
+        return self.enabled
+
+    def acquire(self, count: int) -> List[int] | None:
+        """Returns up to `count` CPUs or None when placement is disabled or every core is taken."""
+        with self.lock:
+            if not self.enabled:
+                return None
+
+            cpus = []
+            for node in sorted(self.free, key=len, reverse=True):
+                taken = node[:max(1, count) - len(cpus)]
+                del node[:len(taken)]
+                cpus.extend(taken)
+                if len(cpus) >= count:
+                    break
+
+            return cpus or None
+
+    def release(self, cpus: List[int] | None):
+        if not cpus:
+            return
+
+        with self.lock:
+            if not self.enabled:
+                return
+            for cpu in cpus:
+                idx = self.cpu_node.get(cpu)
+                if idx is None or cpu in self.free[idx]:     # Placement was restarted in the meantime
+                    continue
+                self.free[idx].append(cpu)
+                self.free[idx].sort()
+
+    @contextmanager
+    def pinned(self, count: int):
+        """Pin subprocesses started by the calling thread to `count` CPUs."""
+        cpus = self.acquire(count)
+        self.local.cpus = cpus
+        try:
+            yield cpus
+        finally:
+            self.local.cpus = None
+            self.release(cpus)
+
+    def getThreadCpus(self) -> List[int] | None:
+        """CPUs assigned to the calling thread."""
+        return getattr(self.local, "cpus", None)
+
+placement = CorePlacement()
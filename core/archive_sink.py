@@ -0,0 +1,171 @@
+import os
+import queue
+import logging
+import tarfile
+import zipfile
+import threading
+from typing import Dict, List
+
+# Packs finished outputs into tar or zip archives instead of leaving loose files in the output folder.
+#
+# Workers finish as usual, then hand the final file over with submit() and move on.
+# A single writer thread appends files to the current archive and deletes them once they're in.
+# A file that fails to be archived is left where it is.
+#
+# Archives are written to the custom output folder as archive-001.tar, archive-002.tar, ...
+# Entry paths are relative to that folder, so "Keep Folder Structure" carries over.
+
+ARCHIVE_FORMATS = ("tar", "zip")
+ARCHIVE_NAME = "archive"
+TAR_BLOCK = 512
+ZIP_ENTRY_OVERHEAD = 128    # Local header + central directory record, without the name
+
+def checkArchiveParams(params: Dict) -> str | None:
+    """Returns an error message if archive output cannot be used with these params."""
+    if not params.get("archive_output", False):
+        return None
+    if params.get("archive_format") not in ARCHIVE_FORMATS:
+        return f"Unknown archive format ({params.get('archive_format')})"
+    if not params["custom_output_dir"] or not os.path.isabs(params["custom_output_dir_path"]):
+        return "Packing into an archive needs a custom output folder with an absolute path."
+    return None
+
+class ArchiveSink():
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.thread = None
+        self.root = None
+        self.format = "tar"
+        self.max_size = 0
+        self.archive = None         # tarfile.TarFile or zipfile.ZipFile
+        self.archive_file = None
+        self.archive_entries = 0
+        self.archive_paths = []
+        self.stats = {"archived": 0, "failed": 0}
+
+    def start(self, root: str, format: str = "tar", max_size: int = 0):
+        """Call before starting a batch.
+
+        Params:
+            root - output folder, archives are written there and entries are relative to it
+            format - "tar" or "zip"
+            max_size - start a new archive above this many bytes, 0 for no limit
+        """
+        self.stop()
+        with self.lock:
+            self.root = os.path.abspath(root)
+            self.format = format
+            self.max_size = max_size
+            self.archive_paths = []
+            self.stats = {"archived": 0, "failed": 0}
+            self.queue = queue.Queue()
+            self.thread = threading.Thread(target=self._run, name="ArchiveSink", daemon=True)
+            self.thread.start()
+            self.enabled = True
+
+    def stop(self) -> List[str]:
+        """Call after a batch is finished. Waits for queued files to be written. Returns the archives written."""
+        with self.lock:
+            if not self.enabled:
+                return []
+            self.enabled = False
+            thread, self.thread = self.thread, None
+
+        self.queue.put(None)
+        thread.join()
+        logging.info(f"[ArchiveSink] Archived {self.stats['archived']} files into {len(self.archive_paths)} archives, {self.stats['failed']} failed")
+        return list(self.archive_paths)
+
+    def isEnabled(self) -> bool:
+        return self.enabled
+
+    def getEntryName(self, path: str) -> str:
+        return os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+
+    def submit(self, path: str) -> bool:
+        """Queue a finished file, never blocks. Returns False if the sink isn't running, the file stays where it is then."""
+        with self.lock:
+            if not self.enabled:
+                return False
+            self.queue.put(path)
+        return True
+
+    def getStats(self) -> Dict:
+        return dict(self.stats)
+
+    # Writer thread
+    def _run(self):
+        try:
+            while (path := self.queue.get()) is not None:
+                try:
+                    self._write(path)
+                except OSError as e:
+                    logging.error(f"[ArchiveSink] Failed to archive {path}. {e}")
+                    self.stats["failed"] += 1
+                    continue
+
+                self.stats["archived"] += 1
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logging.error(f"[ArchiveSink] Failed to remove {path}. {e}")
+        finally:
+            self._close()
+
+    def _write(self, path: str):
+        size = os.path.getsize(path)
+        name = self.getEntryName(path)
+        if self.archive is not None and self.max_size and self.archive_entries and self._tell() + self._entrySize(name, size) + self._endSize() > self.max_size:
+            self._close()
+        if self.archive is None:
+            self._open()
+
+        if self.format == "zip":
+            self.archive.write(path, name)     # Stored, images are compressed already
+        else:
+            self.archive.add(path, name, recursive=False)
+        self.archive_entries += 1
+
+    def _entrySize(self, name: str, size: int) -> int:
+        if self.format == "zip":
+            return ZIP_ENTRY_OVERHEAD + 2 * len(name.encode("utf-8")) + size
+        return 3 * TAR_BLOCK + -(-size // TAR_BLOCK) * TAR_BLOCK   # Header and a PAX record for the mtime
+
+    def _endSize(self) -> int:
+        return 2 * TAR_BLOCK if self.format == "tar" else 22     # End-of-archive blocks, end of central directory
+
+    def _tell(self) -> int:
+        return self.archive_file.tell()
+
+    def _open(self):
+        n = len(self.archive_paths) + 1
+        while True:     # Archives of earlier batches are kept
+            path = os.path.join(self.root, f"{ARCHIVE_NAME}-{n:03}.{self.format}")
+            try:
+                self.archive_file = open(path, "xb")
+                break
+            except FileExistsError:
+                n += 1
+
+        if self.format == "zip":
+            self.archive = zipfile.ZipFile(self.archive_file, "w", zipfile.ZIP_STORED, allowZip64=True)
+        else:
+            self.archive = tarfile.open(fileobj=self.archive_file, mode="w", format=tarfile.PAX_FORMAT)
+        self.archive_entries = 0
+        self.archive_paths.append(path)
+        logging.debug(f"[ArchiveSink] Writing {path}")
+
+    def _close(self):
+        if self.archive is None:
+            return
+        try:
+            self.archive.close()
+            self.archive_file.close()
+        except OSError as e:
+            logging.error(f"[ArchiveSink] Failed to close {self.archive_paths[-1]}. {e}")
+        self.archive = None
+        self.archive_file = None
+
+archive_sink = ArchiveSink()    # Module-wide, shared by all workers
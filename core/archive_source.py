@@ -0,0 +1,327 @@
+import os
+import time
+import shutil
+import logging
+import tarfile
+import zipfile
+import tempfile
+import threading
+from pathlib import Path
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, Tuple
+
+from core.utils import WALK_CHUNK_SIZE
+from data.constants import ALLOWED_INPUT, ALLOWED_ARCHIVES
+
+# Converts images inside zip and tar archives without extracting them next to the archive.
+#
+# Members of an archive added as an input are listed as "<archive>/<member>", anchored at the archive.
+# Encoders only take file paths, so during a batch a readahead thread copies the members into a scratch folder,
+# in the order they're stored in the archive, and workers wait for theirs there. A compressed tar is read once, front to back.
+# The scratch folder is on /dev/shm when it's available, so members don't hit the disk.
+#
+# Readahead stays within READAHEAD_BUDGET bytes, each copy is deleted once its worker is done.
+# If a worker waits for a member that wasn't read yet (the list was sorted differently), readahead ignores the budget until it catches up.
+#
+# Outputs go where they would if the archive was a folder next to it: "photos.zip/a/1.png" -> "photos/a/1.jxl"
+
+READAHEAD_BUDGET = 256 * 1024 ** 2
+COPY_BUFFER_SIZE = 1024 * 1024
+SCRATCH_DIRS = ("/dev/shm",)
+TAR_COMPRESSIONS = ("gz", "bz2", "xz")
+
+PENDING = "pending"
+READY = "ready"
+FAILED = "failed"
+RELEASED = "released"
+
+def isArchive(path: str) -> bool:
+    """By extension only."""
+    return Path(path).suffix[1:].lower() in ALLOWED_ARCHIVES
+
+def getArchiveRoot(archive: str) -> str:
+    """Folder the outputs of an archive go to when converting to the source folder. "photos.tar.gz" -> "photos"."""
+    root, ext = os.path.splitext(archive)
+    if ext[1:].lower() in TAR_COMPRESSIONS and root.lower().endswith(".tar"):
+        root = root[:-4]
+    return root
+
+def _isSafe(name: str) -> bool:
+    """Member names that stay inside the archive's folder once they're turned into paths."""
+    parts = name.split("/")
+    return bool(name) and not name.startswith("/") and ".." not in parts and ":" not in parts[0] and "\\" not in name
+
+def _getMtimeNs(date_time: Tuple) -> int:
+    return int(time.mktime(date_time + (0, 0, -1))) * 1_000_000_000
+
+def listArchive(
+        path: str,
+        extensions: Collection[str] | None = ALLOWED_INPUT,
+        chunk_size: int = WALK_CHUNK_SIZE,
+    ) -> Iterator[List[Tuple[str, int, int]]]:
+    """Yield lists of up to `chunk_size` (member path, size, mtime_ns), in the order they're stored.
+
+    Members with other extensions, folders, links and names that point outside of the archive are skipped.
+    Raises OSError, also for damaged archives.
+    """
+    if extensions is not None:
+        extensions = frozenset(extensions)
+    path = os.path.abspath(path)
+    chunk = []
+
+    for name, size, mtime_ns in _listMembers(path):
+        if not _isSafe(name):
+            logging.error(f"[ArchiveSource] Skipping unsafe member name ({name})")
+            continue
+        if extensions is not None and os.path.splitext(name)[1][1:].lower() not in extensions:
+            continue
+
+        chunk.append((os.path.join(path, *name.split("/")), size, mtime_ns))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+
+    if chunk:
+        yield chunk
+
+def _listMembers(path: str) -> Iterator[Tuple[str, int, int]]:
+    try:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as zf:
+                for info in sorted(zf.infolist(), key=lambda i: i.header_offset):
+                    if not info.is_dir():
+                        yield (info.filename, info.file_size, _getMtimeNs(info.date_time))
+        else:
+            with tarfile.open(path, "r:*") as tar:
+                for info in tar:
+                    if info.isfile():
+                        yield (info.name, info.size, int(info.mtime) * 1_000_000_000)
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+        raise OSError(f"Cannot read {path}. {e}") from e
+
+class _Member:
+    __slots__ = ("archive", "name", "refs", "state", "path", "size", "error", "waiters")
+
+    def __init__(self, archive: str, name: str):
+        self.archive = archive
+        self.name = name
+        self.refs = 0           # Jobs that use it, the list can have duplicates
+        self.state = PENDING
+        self.path = None        # In the scratch folder
+        self.size = 0
+        self.error = None
+        self.waiters = 0        # Workers blocked in acquire()
+
+class ArchiveSource():
+    def __init__(self):
+        self.enabled = False
+        self.cond = threading.Condition()
+        self.members: Dict[str, _Member] = {}       # Member path -> _Member
+        self.archives: Dict[str, List[_Member]] = {}
+        self.roots: Dict[str, str] = {}            # Anchor -> getArchiveRoot()
+        self.scratch_dir = None
+        self.thread = None
+        self.budget = READAHEAD_BUDGET
+        self.used = 0
+        self.waiting = 0        # Workers blocked on members that weren't read yet
+        self.stopped = False
+
+    def start(self, items: Iterable[Tuple[str, Path]], budget: int = READAHEAD_BUDGET):
+        """Call before starting a batch. Does nothing unless some `items` (absolute path, anchor path) are archive members."""
+        self.stop()
+
+        anchors = {}
+        for abs_path, anchor_path in items:
+            anchor = str(anchor_path)
+            if anchor not in anchors:
+                anchors[anchor] = isArchive(anchor) and os.path.isfile(anchor)
+            if not anchors[anchor]:
+                continue
+
+            abs_path = str(abs_path)
+            if not abs_path.startswith(anchor + os.sep):
+                continue
+            member = self.members.get(abs_path)
+            if member is None:
+                member = self.members[abs_path] = _Member(anchor, abs_path[len(anchor) + 1:].replace(os.sep, "/"))
+                self.archives.setdefault(anchor, []).append(member)
+            member.refs += 1
+
+        if not self.members:
+            return
+
+        self.roots = {archive: getArchiveRoot(archive) for archive in self.archives}
+        scratch_parent = next((i for i in SCRATCH_DIRS if os.access(i, os.W_OK)), None)
+        self.scratch_dir = tempfile.mkdtemp(prefix="xl-converter-archive-", dir=scratch_parent)
+        self.budget = budget
+        self.used = 0
+        self.waiting = 0
+        self.stopped = False
+        self.enabled = True
+        self.thread = threading.Thread(target=self._run, name="ArchiveSource", daemon=True)
+        self.thread.start()
+        logging.debug(f"[ArchiveSource] Reading {len(self.members)} members of {len(self.archives)} archives into {self.scratch_dir}")
+
+    def stop(self):
+        """Call after a batch is finished or canceled. Removes the scratch folder."""
+        with self.cond:
+            self.stopped = True
+            self.enabled = False
+            self.cond.notify_all()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        if self.scratch_dir is not None:
+            shutil.rmtree(self.scratch_dir, ignore_errors=True)
+            self.scratch_dir = None
+
+        self.members = {}
+        self.archives = {}
+        self.roots = {}
+
+    def isEnabled(self) -> bool:
+        return self.enabled
+
+    def isMember(self, path: str) -> bool:
+        return path in self.members
+
+    def getSourceDirs(self, dir: str, anchor_path: Path) -> Tuple[str, Path]:
+        """Item directory and anchor of a member, with the archive replaced by getArchiveRoot(). For getOutputDir()."""
+        anchor = str(anchor_path)
+        root = self.roots[anchor]
+        return (root + dir[len(anchor):], Path(root))
+
+    def acquire(self, path: str, is_canceled: Callable[[], bool] | None = None) -> str | None:
+        """Wait until a member is in the scratch folder and return its path there. None if canceled.
+
+        Raises OSError If the member couldn't be read.
+        """
+        with self.cond:
+            member = self.members.get(path)
+            if member is None:      # Stopped
+                return None
+            if member.state == PENDING:
+                member.waiters += 1
+                self.waiting += 1
+                self.cond.notify_all()
+                while member.state == PENDING and not self.stopped:
+                    if is_canceled is not None and is_canceled():
+                        break
+                    self.cond.wait(0.5)
+                if member.state == PENDING:     # Gave up
+                    member.waiters -= 1
+                    self.waiting -= 1
+
+            if member.state == FAILED:
+                raise member.error
+            if member.state != READY:   # Stopped
+                return None
+            return member.path
+
+    def release(self, path: str):
+        """Call once per acquire(), the copy is deleted after the last job that uses it."""
+        with self.cond:
+            member = self.members.get(path)
+            if member is None:
+                return
+            member.refs -= 1
+            if member.refs > 0 or member.state != READY:
+                return
+
+            member.state = RELEASED
+            self.used -= member.size
+            self.cond.notify_all()
+
+        shutil.rmtree(os.path.dirname(member.path), ignore_errors=True)
+
+    # Readahead thread
+    def _run(self):
+        n = 0
+        for archive, members in self.archives.items():
+            try:
+                if zipfile.is_zipfile(archive):
+                    n = self._readZip(archive, members, n)
+                else:
+                    n = self._readTar(archive, members, n)
+            except (OSError, zipfile.BadZipFile, tarfile.TarError, EOFError) as e:
+                logging.error(f"[ArchiveSource] Failed to read {archive}. {e}")
+                self._fail(members, OSError(f"Failed to read the archive. {e}"))
+                continue
+
+            if self.stopped:
+                return
+            self._fail(members, FileNotFoundError("Not found in the archive"))   # Ones that weren't there
+
+    def _readZip(self, archive: str, members: List[_Member], n: int) -> int:
+        with zipfile.ZipFile(archive) as zf:
+            infos = []
+            for member in members:
+                try:
+                    infos.append((zf.getinfo(member.name), member))
+                except KeyError:
+                    pass
+
+            for info, member in sorted(infos, key=lambda i: i[0].header_offset):
+                if self.stopped:
+                    break
+                with zf.open(info) as src:
+                    self._copy(src, member, info.file_size, _getMtimeNs(info.date_time), n)
+                n += 1
+        return n
+
+    def _readTar(self, archive: str, members: List[_Member], n: int) -> int:
+        wanted = {member.name: member for member in members}
+        with tarfile.open(archive, "r|*") as tar:   # Stream, no seeking back
+            for info in tar:
+                if self.stopped or not wanted:
+                    break
+                member = wanted.pop(info.name, None)
+                if member is None or not info.isfile():
+                    continue
+                self._copy(tar.extractfile(info), member, info.size, int(info.mtime) * 1_000_000_000, n)
+                n += 1
+        return n
+
+    def _copy(self, src, member: _Member, size: int, mtime_ns: int, n: int):
+        with self.cond:
+            while not self.stopped and self.used and self.used + size > self.budget and not self.waiting:
+                self.cond.wait()
+            if self.stopped:
+                return
+            self.used += size
+
+        path = os.path.join(self.scratch_dir, str(n), os.path.basename(member.name))    # Keeps the file name for error messages
+        try:
+            os.mkdir(os.path.dirname(path))
+            with open(path, "xb") as dst:
+                shutil.copyfileobj(src, dst, COPY_BUFFER_SIZE)
+            os.utime(path, ns=(mtime_ns, mtime_ns))
+        except (OSError, zipfile.BadZipFile, tarfile.TarError, EOFError) as e:   # Also CRC errors
+            logging.error(f"[ArchiveSource] Failed to read {member.name} from {member.archive}. {e}")
+            shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+            with self.cond:
+                self.used -= size
+                member.error = e if isinstance(e, OSError) else OSError(str(e))
+                self._setState(member, FAILED)
+            return
+
+        with self.cond:
+            member.path = path
+            member.size = size
+            self._setState(member, READY)
+
+    def _fail(self, members: List[_Member], error: OSError):
+        with self.cond:
+            for member in members:
+                if member.state == PENDING:
+                    member.error = error
+                    self._setState(member, FAILED)
+
+    def _setState(self, member: _Member, state: str):
+        """Call with the lock held."""
+        member.state = state
+        self.waiting -= member.waiters
+        member.waiters = 0
+        self.cond.notify_all()
+
+archive_source = ArchiveSource()    # Module-wide, shared by all workers
@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import logging
+import tempfile
+import threading
+from statistics import mean
+from typing import Callable, Dict, List
+
+from PySide6.QtCore import(
+    QObject,
+    Signal,
+    QThread,
+)
+
+from data.constants import (
+    CONFIG_LOCATION,
+    CJXL_PATH,
+    DJXL_PATH,
+    AVIFENC_PATH,
+    IMAGE_MAGICK_PATH,
+)
+from core.process import runProcess
+from core.capabilities import getVersion, getCpuModel
+
+# Measures how well each encoder scales with its thread count on this machine.
+#
+# Profile layout (thread_profile.json):
+#   {cpu_model: {encoder: {version: {"speedup": {threads: x}, "sizes": {size: {threads: x}}}}}}
+#
+# Speedup is relative to a single thread, averaged over all sample sizes.
+
+PROFILE_PATH = os.path.join(CONFIG_LOCATION, "thread_profile.json")
+SAMPLE_SIZES = (512, 1024, 2048)
+
+ENCODERS = {
+    # name: (bin_path, input extension, output extension, args(threads))
+    "cjxl": (CJXL_PATH, "png", "jxl", lambda t: ["-e", "7", "-d", "1", f"--num_threads={t}"]),
+    "djxl": (DJXL_PATH, "jxl", "png", lambda t: [f"--num_threads={t}"]),
+    "avifenc": (AVIFENC_PATH, "png", "avif", lambda t: ["-s", "6", "-j", str(t)]),
+}
+
+# Encoder that dominates the conversion time of each format. Calibrating anything else is wasted time.
+# oxipng only runs as part of Smallest Lossless, where cjxl dominates.
+FORMAT_ENCODERS = {
+    "JPEG XL": "cjxl",
+    "Lossless JPEG Recompression": "cjxl",
+    "Smallest Lossless": "cjxl",
+    "JPEG Reconstruction": "djxl",
+    "AVIF": "avifenc",
+}
+
+def getThreadSteps(max_threads: int) -> List[int]:
+    """Thread counts worth measuring. 16 -> [1, 2, 3, 4, 6, 8, 12, 16]"""
+    steps = {max_threads}
+    step = 1
+    while step <= max_threads:
+        steps.add(step)
+        if step * 3 // 2 <= max_threads and step >= 2:
+            steps.add(step * 3 // 2)
+        step *= 2
+    return sorted(s for s in steps if s >= 1)
+
+def _getCommand(encoder: str, src: str, dst: str, threads: int) -> List[str]:
+    bin_path, _, _, args = ENCODERS[encoder]
+    if encoder == "avifenc":
+        return [bin_path, *args(threads), src, dst]
+    return [bin_path, src, dst, *args(threads)]
+
+def _measure(cmd: List[str], dst: str, repeats: int) -> float | None:
+    """Best wall time out of `repeats`. None if the encoder produced no output."""
+    best = None
+    for _ in range(repeats):
+        if os.path.isfile(dst):
+            os.remove(dst)
+
+        start = time.perf_counter()
+        runProcess(*cmd)
+        elapsed = time.perf_counter() - start
+
+        if not os.path.isfile(dst):
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def generateSamples(work_dir: str, sizes=SAMPLE_SIZES) -> Dict[int, Dict[str, str]]:
+    """Creates photo-like PNG and JPEG XL samples. Returns {size: {ext: path}}."""
+    samples = {}
+    for size in sizes:
+        png = os.path.join(work_dir, f"sample_{size}.png")
+        jxl = os.path.join(work_dir, f"sample_{size}.jxl")
+        try:
+            runProcess(IMAGE_MAGICK_PATH, "-size", f"{size}x{size}", "-seed", "1", "plasma:", png)
+            runProcess(CJXL_PATH, png, jxl, "-e", "1")
+        except OSError as e:
+            logging.error(f"[Calibration] Failed to generate samples. {e}")
+
+        samples[size] = {ext: path for ext, path in (("png", png), ("jxl", jxl)) if os.path.isfile(path)}
+    return samples
+
+def calibrate(
+        max_threads: int,
+        sizes=SAMPLE_SIZES,
+        repeats: int = 2,
+        on_progress: Callable[[str], None] | None = None,
+        is_canceled: Callable[[], bool] | None = None,
+    ) -> Dict:
+    """Encode samples with every encoder at 1..max_threads threads.
+
+    Returns:
+        {encoder: {"version": str, "speedup": {threads: x}, "sizes": {size: {threads: x}}}}
+    """
+    results = {}
+    steps = getThreadSteps(max(1, max_threads))
+
+    with tempfile.TemporaryDirectory(prefix="xl-converter-calibration-") as work_dir:
+        samples = generateSamples(work_dir, sizes)
+
+        for encoder, (bin_path, in_ext, out_ext, _) in ENCODERS.items():
+            version = getVersion(bin_path)
+            if version is None:
+                continue
+
+            curves = {}
+            for size, paths in samples.items():
+                if in_ext not in paths:
+                    continue
+                src = paths[in_ext]
+                dst = os.path.join(work_dir, f"out_{size}.{out_ext}")
+
+                times = {}
+                for threads in steps:
+                    if is_canceled is not None and is_canceled():
+                        return results
+                    if on_progress is not None:
+                        on_progress(f"{encoder} - {size}x{size} - {threads} threads")
+
+                    elapsed = _measure(_getCommand(encoder, src, dst, threads), dst, repeats)
+                    if elapsed is None:
+                        logging.error(f"[Calibration] {encoder} produced no output")
+                        break
+                    times[threads] = elapsed
+
+                if 1 in times:
+                    curves[size] = {t: round(times[1] / elapsed, 3) for t, elapsed in times.items()}
+
+            if curves:
+                results[encoder] = {
+                    "version": version,
+                    "speedup": {t: round(mean(c[t] for c in curves.values() if t in c), 3) for t in steps if any(t in c for c in curves.values())},
+                    "sizes": curves,
+                }
+                logging.info(f"[Calibration] {encoder} ({version}): {results[encoder]['speedup']}")
+
+    return results
+
+class ThreadProfile:
+    """Persisted speedup curves. Only curves for this CPU and the installed binary versions are used."""
+    def __init__(self, path: str = PROFILE_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {}
+        self.load()
+
+    def load(self):
+        data = {}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"[ThreadProfile] Failed to load {self.path}. {e}")
+        with self.lock:
+            self.data = data
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with self.lock:
+                with open(self.path, "w", encoding="utf-8") as f:
+                    json.dump(self.data, f, indent=4)
+        except OSError as e:
+            logging.error(f"[ThreadProfile] Failed to save {self.path}. {e}")
+
+    def update(self, results: Dict):
+        """Merge results of `calibrate` for this CPU."""
+        with self.lock:
+            cpu = self.data.setdefault(getCpuModel(), {})
+            for encoder, result in results.items():
+                cpu.setdefault(encoder, {})[result["version"]] = {
+                    "speedup": {str(t): x for t, x in result["speedup"].items()},
+                    "sizes": {str(s): {str(t): x for t, x in c.items()} for s, c in result["sizes"].items()},
+                }
+
+    def getCurve(self, encoder: str) -> Dict[int, float] | None:
+        with self.lock:
+            versions = self.data.get(getCpuModel(), {}).get(encoder, {})
+        if not versions:
+            return None
+
+        entry = versions.get(getVersion(ENCODERS[encoder][0]))
+        if not entry:
+            logging.info(f"[ThreadProfile] No curve for the installed {encoder}. Run the calibration again.")
+            return None
+        return {int(t): x for t, x in entry["speedup"].items()}
+
+    def getSpeedup(self, curve: Dict[int, float], threads: int) -> float:
+        """Speedup of the largest measured thread count not above `threads`."""
+        measured = [t for t in curve if t <= threads]
+        return curve[max(measured)] if measured else 1.0
+
+    def getBestThreads(self, format: str, item_count: int, cores: int) -> int | None:
+        """Threads per worker that maximize total throughput, None without a matching curve."""
+        encoder = FORMAT_ENCODERS.get(format)
+        if encoder is None or item_count <= 0 or cores <= 0:
+            return None
+
+        curve = self.getCurve(encoder)
+        if curve is None:
+            return None
+
+        best_threads, best = 1, 0
+        for threads in range(1, cores + 1):
+            throughput = min(item_count, cores // threads) * self.getSpeedup(curve, threads)
+            if throughput > best * 1.05:    # More threads only when clearly better
+                best_threads, best = threads, throughput
+        return best_threads
+
+class Worker(QObject):
+    progress = Signal(str)
+    finished = Signal(dict)
+
+    def __init__(self, max_threads: int):
+        super().__init__()
+        self.max_threads = max_threads
+
+    def run(self):
+        try:
+            results = calibrate(
+                self.max_threads,
+                on_progress=self.progress.emit,
+                is_canceled=lambda: QThread.currentThread().isInterruptionRequested(),
+            )
+        except OSError as e:
+            logging.error(f"[Calibration] {e}")
+            results = {}
+        self.finished.emit(results)
+
+class Runner(QObject):
+    """Runs calibration in a background thread, then updates the profile."""
+    progress = Signal(str)
+    finished = Signal(dict)
+
+    def __init__(self, profile: ThreadProfile, parent = None):
+        super().__init__(parent)
+        self.profile = profile
+        self.worker = None
+        self.thread = None
+
+    def run(self, max_threads: int):
+        self.worker = Worker(max_threads)
+        self.thread = QThread()
+        self.thread.started.connect(self.worker.run)
+        self.worker.progress.connect(self.progress)
+        self.worker.finished.connect(self.handleFinish)
+        self.worker.moveToThread(self.thread)
+        self.thread.start()
+
+    def isRunning(self) -> bool:
+        return self.thread is not None
+
+    def handleFinish(self, results):
+        if results:
+            self.profile.update(results)
+            self.profile.save()
+
+        if self.thread is not None:
+            self.thread.quit()
+            self.thread.wait()
+            self.thread.deleteLater()
+            self.thread = None
+
+        if self.worker is not None:
+            self.worker.deleteLater()
+            self.worker = None
+
+        self.finished.emit(results)
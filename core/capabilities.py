@@ -0,0 +1,209 @@
+import os
+import json
+import shutil
+import logging
+import platform
+import threading
+from functools import cache
+from typing import Dict, List, Tuple
+
+from core.process import runProcessOutput
+from data.constants import (
+    CONFIG_LOCATION,
+    CJXL_PATH,
+    DJXL_PATH,
+    JXLINFO_PATH,
+    CJPEGLI_PATH,
+    IMAGE_MAGICK_PATH,
+    AVIFENC_PATH,
+    AVIFDEC_PATH,
+    OXIPNG_PATH,
+    EXIFTOOL_PATH,
+)
+
+# What the installed binaries support, probed once per installation.
+#
+# Results are persisted in capabilities.json, keyed on the binary path and validated with its mtime and size.
+# Replacing a binary (e.g. an update) makes it probed again, otherwise sessions start without spawning anything.
+
+CAPABILITIES_PATH = os.path.join(CONFIG_LOCATION, "capabilities.json")
+
+PROBES = {
+    # name: (version args, help args, flags looked up in the help)
+    "cjxl": (("--version",), ("-h", "-v", "-v", "-v", "-v"), ("--streaming_input", "--streaming_output")),
+    "djxl": (("--version",), None, ()),
+    "jxlinfo": (("--version",), None, ()),
+    "cjpegli": (("--version",), None, ()),
+    "magick": (("-version",), None, ()),
+    "avifenc": (("--version",), ("--help",), ("--autotiling", "--tilerowslog2")),
+    "avifdec": (("--version",), None, ()),
+    "oxipng": (("--version",), ("--help",), ("--zopfli",)),
+    "exiftool": (("-ver",), None, ()),
+}
+
+def getExifToolPath() -> str | None:
+    """Bundled on Windows, installed by the user on Linux."""
+    if platform.system() == "Linux":
+        return shutil.which("exiftool")
+    return EXIFTOOL_PATH
+
+def getBinaries() -> Dict[str, str | None]:
+    return {
+        "cjxl": CJXL_PATH,
+        "djxl": DJXL_PATH,
+        "jxlinfo": JXLINFO_PATH,
+        "cjpegli": CJPEGLI_PATH,
+        "magick": IMAGE_MAGICK_PATH,
+        "avifenc": AVIFENC_PATH,
+        "avifdec": AVIFDEC_PATH,
+        "oxipng": OXIPNG_PATH,
+        "exiftool": getExifToolPath(),
+    }
+
+def getFingerprint(bin_path: str | None) -> List[int] | None:
+    """[mtime_ns, size] or None if the binary is missing.
+
+    Bare names (e.g. "magick" on macOS) are looked up in PATH, same as when they're run.
+    """
+    if bin_path is None:
+        return None
+    if not os.path.dirname(bin_path):
+        bin_path = shutil.which(bin_path)
+        if bin_path is None:
+            return None
+    try:
+        stat = os.stat(bin_path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+def _firstLine(text: str) -> str | None:
+    for line in text.splitlines():
+        if line.strip():
+            return line.strip()
+    return None
+
+def probe(bin_path: str, version_args=("--version",), help_args=None, flags=()) -> Dict:
+    """Spawns the binary. Returns {"version": str | None, "flags": {flag: bool}}"""
+    result = {"version": None, "flags": {flag: False for flag in flags}}
+    try:
+        stdout, stderr = runProcessOutput(bin_path, *version_args)
+        result["version"] = _firstLine(stdout) or _firstLine(stderr)
+
+        if help_args is not None and flags:
+            stdout, stderr = runProcessOutput(bin_path, *help_args)
+            usage = stdout + stderr
+            result["flags"] = {flag: flag in usage for flag in flags}
+    except OSError as e:
+        logging.error(f"[Capabilities] Cannot run {bin_path}. {e}")
+    return result
+
+class CapabilityRegistry:
+    """Usage:
+        capabilities.probeInBackground()     # At startup, only spawns for new or changed binaries
+        capabilities.getVersion(CJXL_PATH)
+        capabilities.hasFlag("cjxl", "--streaming_input")
+    """
+    def __init__(self, path: str = CAPABILITIES_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.probe_locks = {}       # bin_path -> Lock, so a binary is probed once
+        self.data = None            # bin_path -> {"fingerprint", "version", "flags"}
+
+    def _load(self):
+        if self.data is not None:
+            return
+        data = {}
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                logging.error(f"[Capabilities] Failed to load {self.path}. {e}")
+        self.data = data
+
+    def save(self):
+        with self.lock:
+            if self.data is None:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp = f"{self.path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(self.data, f, indent=4)
+                os.replace(tmp, self.path)
+            except OSError as e:
+                logging.error(f"[Capabilities] Failed to save {self.path}. {e}")
+
+    def _getProbeArgs(self, bin_path: str) -> Tuple:
+        for name, path in getBinaries().items():
+            if path == bin_path:
+                return PROBES[name]
+        return (("--version",), None, ())
+
+    def get(self, bin_path: str | None, save: bool = True) -> Dict:
+        """Capabilities of `bin_path`, probed only if it's new or was replaced."""
+        if bin_path is None:    # Not installed
+            return {"fingerprint": None, "version": None, "flags": {}}
+
+        fingerprint = getFingerprint(bin_path)
+        with self.lock:
+            self._load()
+            entry = self.data.get(bin_path)
+            if entry is not None and entry["fingerprint"] == fingerprint:
+                return entry
+            probe_lock = self.probe_locks.setdefault(bin_path, threading.Lock())
+
+        with probe_lock:
+            with self.lock:     # Probed by another thread in the meantime
+                entry = self.data.get(bin_path)
+                if entry is not None and entry["fingerprint"] == fingerprint:
+                    return entry
+
+            if fingerprint is None:
+                entry = {"fingerprint": None, "version": None, "flags": {}}
+            else:
+                entry = {"fingerprint": fingerprint, **probe(bin_path, *self._getProbeArgs(bin_path))}
+                logging.info(f"[Capabilities] {bin_path}: {entry['version']} {entry['flags']}")
+
+            with self.lock:
+                self.data[bin_path] = entry
+
+        if save:
+            self.save()
+        return entry
+
+    def getVersion(self, bin_path: str | None) -> str | None:
+        return self.get(bin_path)["version"]
+
+    def hasFlag(self, name: str, flag: str) -> bool:
+        return self.get(getBinaries()[name])["flags"].get(flag, False)
+
+    def probeAll(self):
+        for bin_path in getBinaries().values():
+            self.get(bin_path, save=False)
+        self.save()
+
+    def probeInBackground(self) -> threading.Thread:
+        thread = threading.Thread(target=self.probeAll, name="CapabilityProbe", daemon=True)
+        thread.start()
+        return thread
+
+capabilities = CapabilityRegistry()
+
+def getVersion(bin_path: str) -> str | None:
+    """First line printed by `bin_path --version`. None if the binary cannot be run."""
+    return capabilities.getVersion(bin_path)
+
+@cache
+def getCpuModel() -> str:
+    if platform.system() == "Linux":
+        try:
+            with open("/proc/cpuinfo", "r") as f:
+                for line in f:
+                    if line.startswith("model name"):
+                        return line.split(":", 1)[1].strip()
+        except OSError as e:
+            logging.error(f"[Capabilities] Cannot read /proc/cpuinfo. {e}")
+
+    return platform.processor() or platform.machine() or "Unknown"
@@ -0,0 +1,220 @@
+import os
+import json
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Callable, Dict
+
+from data.constants import (
+    CONFIG_LOCATION,
+    CJXL_PATH,
+    DJXL_PATH,
+    CJPEGLI_PATH,
+    AVIFENC_PATH,
+    AVIFDEC_PATH,
+    IMAGE_MAGICK_PATH,
+    OXIPNG_PATH,
+)
+from core.capabilities import getVersion
+from core.file_copy import copyFile
+
+# Content-addressed cache of converted images.
+#
+# Key = blake2b(input bytes) + blake2b(normalized params, settings that affect encoding, encoder versions, input extension)
+# Entries live in cache_dir/ab/abcdef...; the last access is tracked with mtime for LRU eviction.
+# Entries are private copies, so touching them never changes a user's file.
+
+CACHE_DIR = os.path.join(CONFIG_LOCATION, "conversion_cache")
+HASH_BUFFER_SIZE = 1024 * 1024
+
+# Params that only control where the output goes or what happens afterwards
+IGNORED_PARAMS = (
+    "if_file_exists",
+    "custom_output_dir",
+    "custom_output_dir_path",
+    "keep_dir_struct",
+    "delete_original",
+    "delete_original_mode",
+)
+# Settings that change encoder output
+ENCODING_SETTINGS = (
+    "jpg_encoder",
+    "disable_progressive_jpegli",
+    "jxl_lossless_jpeg",
+    "enable_custom_args",
+    "cjxl_args",
+    "avifenc_args",
+    "cjpegli_args",
+    "im_args",
+)
+ENCODERS = (CJXL_PATH, DJXL_PATH, CJPEGLI_PATH, AVIFENC_PATH, AVIFDEC_PATH, IMAGE_MAGICK_PATH, OXIPNG_PATH)
+UNSUPPORTED_FORMATS = ("Smallest Lossless",)  # Output extension is only known after encoding
+
+def hashFile(path: str) -> str:
+    """Streams the file through blake2b."""
+    digest = hashlib.blake2b(digest_size=20)
+    buffer = bytearray(HASH_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            read = f.readinto(buffer)
+            if not read:
+                break
+            digest.update(view[:read])
+    return digest.hexdigest()
+
+def normalizeParams(params: Dict) -> Dict:
+    params = {k: v for k, v in params.items() if k not in IGNORED_PARAMS}
+    if "misc" in params:
+        params["misc"] = {k: v for k, v in params["misc"].items() if k != "attributes"}     # Applied to the final file
+    if not params.get("downscaling", {}).get("enabled", False):
+        params["downscaling"] = {"enabled": False}
+    return params
+
+class ConversionCache:
+    """Size-bounded, LRU-evicted store of converted images.
+
+    Usage:
+        conversion_cache.start(max_size)
+        key = conversion_cache.getKey(src, ext, params, settings)
+        if not conversion_cache.fetch(key, dst):
+            ...     # Convert
+            conversion_cache.store(key, dst)
+        conversion_cache.stop()
+    """
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.max_size = 0
+        self.size = None            # Lazily counted
+        self.versions = None        # Encoder versions, resolved once per batch
+
+    def start(self, max_size: int):
+        """Call before a batch. `max_size` in bytes."""
+        with self.lock:
+            self.max_size = max_size
+            self.size = None
+            self.versions = None
+            self.enabled = True
+
+    def stop(self):
+        with self.lock:
+            self.enabled = False
+
+    def isEnabled(self) -> bool:
+        return self.enabled
+
+    def isSupported(self, format: str) -> bool:
+        return format not in UNSUPPORTED_FORMATS
+
+    def getKey(self, src: str, ext: str, params: Dict, settings: Dict, get_digest: Callable[[], str] | None = None) -> str:
+        """Hashes the input, unless `get_digest()` returns a hashFile(src) that's already known. Raises OSError.
+
+        On a miss the encoder reads the input again, usually from the page cache.
+        """
+        with self.lock:
+            if self.versions is None:
+                self.versions = [getVersion(path) for path in ENCODERS]
+            versions = self.versions
+
+        config = json.dumps({
+            "ext": ext,
+            "params": normalizeParams(params),
+            "settings": {k: settings.get(k) for k in ENCODING_SETTINGS},
+            "versions": versions,
+        }, sort_keys=True)
+        digest = get_digest() if get_digest is not None else hashFile(src)
+        return digest + hashlib.blake2b(config.encode("utf-8"), digest_size=12).hexdigest()
+
+    def _getEntryPath(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def fetch(self, key: str, dst: str) -> bool:
+        """Copy a cached result to `dst`. Returns False on a miss."""
+        entry = self._getEntryPath(key)
+        try:
+            copyFile(entry, dst, mode=False)
+            os.utime(entry)     # Mark as recently used
+        except FileNotFoundError:
+            return False
+        except OSError as e:
+            logging.error(f"[ConversionCache] Failed to fetch {key}. {e}")
+            return False
+
+        logging.debug(f"[ConversionCache] Hit {key}")
+        return True
+
+    def store(self, key: str, src: str):
+        """Add `src` to the cache. Reflinked when possible, see copyFile().
+
+        Never hard linked, the entry's mtime tracks LRU and `src` is still post-processed in place (ExifTool, attributes).
+        """
+        entry = self._getEntryPath(key)
+        tmp = f"{entry}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(entry), exist_ok=True)
+            copyFile(src, tmp, mode=False)
+            os.utime(tmp)
+            os.replace(tmp, entry)
+            size = os.path.getsize(entry)
+        except OSError as e:
+            logging.error(f"[ConversionCache] Failed to store {key}. {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+
+        with self.lock:
+            if self.size is None:
+                self.size = self._countSize()
+            else:
+                self.size += size
+            if self.size > self.max_size:
+                self._evict()
+
+    def clear(self):
+        with self.lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self.size = 0
+
+    def _listEntries(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for bucket in os.scandir(self.cache_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _countSize(self) -> int:
+        return sum(size for _, size, _ in self._listEntries())
+
+    def _evict(self):
+        """Remove least recently used entries down to 90% of the limit."""
+        target = int(self.max_size * 0.9)
+        entries = sorted(self._listEntries())
+        self.size = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if self.size <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError as e:
+                logging.error(f"[ConversionCache] Failed to evict {path}. {e}")
+                continue
+            self.size -= size
+        logging.debug(f"[ConversionCache] Evicted down to {self.size} bytes")
+
+conversion_cache = ConversionCache()
@@ -24,11 +24,12 @@ def convert(encoder_path, src, dst, args = [], n = None):
     if n != None:
         log(cmd, n)
 
-def optimize(bin_path, src, args = [], n = None):
-    """Run a binary targeting a source."""
-    runProcess(bin_path, *parseArgs(args), src)
+def optimize(bin_path, src, args = [], n = None, dst = None):
+    """Run a binary targeting a source. With `dst`, the source is left as is (oxipng --out)."""
+    out_args = ["--out", dst] if dst else []
+    runProcess(bin_path, *parseArgs(args), *out_args, src)
     if n != None:
-        log((bin_path, *parseArgs(args), src), n)
+        log((bin_path, *parseArgs(args), *out_args, src), n)
 
 def getExtensionJxl(src_path):
     """Assign extension based on If JPEG reconstruction data is available. Only use If src format is jxl."""
@@ -0,0 +1,229 @@
+import os
+import time
+import logging
+import threading
+from collections import Counter
+from typing import Callable, Dict, List
+
+from core.conversion_cache import hashFile
+from core.pathing import getUniqueFilePath
+from core.file_copy import copyFile
+
+# Identical inputs within a batch are converted once.
+#
+# Before dispatch items are grouped by size. Only items with a shared size are hashed, lazily by their workers.
+# Sizes can also be collected on a thread while the batch starts, register() waits for them.
+# The first worker to register a hash becomes the representative, the rest wait for its converted output
+# and take a copy (or a hard link) of it. Everything after encoding (metadata, renaming, attributes, deletion)
+# still runs per item.
+
+UNSUPPORTED_FORMATS = ("Smallest Lossless",)     # Output extension is only known after encoding
+
+def getSizes(paths) -> List[int | None]:
+    sizes = []
+    for path in paths:
+        try:
+            sizes.append(os.path.getsize(path))
+        except OSError:
+            sizes.append(None)
+    return sizes
+
+class Group:
+    def __init__(self, rep: int, size: int):
+        self.rep = rep
+        self.size = size
+        self.started = time.monotonic()
+        self.elapsed = 0                # Time it took to convert the representative
+        self.staging = None             # Copy of the converted output, None if the representative failed
+        self.released = threading.Event()
+        self.waiting = 0
+
+class Duplicates:
+    """Usage:
+        duplicates.start(getSizes(paths))          # or duplicates.startInBackground(jobs.statSizes)
+        if duplicates.register(n, path):            # A duplicate
+            duplicates.fetch(n, dst)
+        else:                                       # A representative or a unique item
+            ...     # Convert
+            duplicates.publish(n, output)
+        duplicates.release(n)                       # Always, the duplicates wait for it
+        duplicates.stop()
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.unregistered = Counter()     # Shared size -> items that weren't hashed yet
+        self.sizes = []
+        self.sizes_ready = threading.Event()
+        self.groups = {}        # hash -> Group
+        self.item_groups = {}   # n -> Group
+        self._resetStats()
+
+    def _resetStats(self):
+        self.stats = {"reused": 0, "bytes": 0, "seconds": 0.0}
+
+    def start(self, sizes: List[int | None] | None = None):
+        """`sizes` per item index, see getSizes(). Without them register() blocks, use startInBackground()."""
+        self.stop()     # Leftovers of a canceled batch
+        with self.lock:
+            self.unregistered = Counter()
+            self.sizes = []
+            self.sizes_ready = threading.Event()
+            self.groups = {}
+            self.item_groups = {}
+            self._resetStats()
+            self.enabled = True
+            if sizes is not None:
+                self._setSizes(sizes)
+
+    def startInBackground(self, get_sizes: Callable[[], List[int | None]]) -> threading.Thread:
+        """Same as start(), with `get_sizes()` called on a thread. Workers can be dispatched right away."""
+        self.start()
+        ready = self.sizes_ready
+
+        def collect():
+            sizes = get_sizes()
+            with self.lock:
+                if self.enabled and self.sizes_ready is ready:     # Not stopped or restarted meanwhile
+                    self._setSizes(sizes)
+
+        thread = threading.Thread(target=collect, name="DuplicatesSizes", daemon=True)
+        thread.start()
+        return thread
+
+    def _setSizes(self, sizes: List[int | None]):
+        """Call with the lock held."""
+        counts = Counter(size for size in sizes if size)
+        self.unregistered = Counter({size: count for size, count in counts.items() if count > 1})
+        self.sizes = sizes
+        self.sizes_ready.set()
+
+    def stop(self):
+        with self.lock:
+            self.enabled = False
+            self.sizes_ready.set()      # Unblocks register()
+            for group in self.groups.values():
+                group.released.set()
+                self._removeStaging(group)
+            self.groups = {}
+            self.item_groups = {}
+
+    def isEnabled(self) -> bool:
+        return self.enabled
+
+    def isSupported(self, format: str) -> bool:
+        return format not in UNSUPPORTED_FORMATS
+
+    def register(self, n: int, path: str, get_digest: Callable[[], str] | None = None) -> bool:
+        """Returns True if an identical item was registered before. Raises OSError.
+
+        `get_digest()` - replaces hashFile(path), to share the digest with the conversion cache
+        """
+        self.sizes_ready.wait()
+        if not self.enabled:
+            return False
+        size = self.sizes[n] if n < len(self.sizes) else None
+        if size not in self.unregistered:
+            return False
+
+        digest = get_digest() if get_digest is not None else hashFile(path)
+        with self.lock:
+            self.unregistered[size] -= 1
+            group = self.groups.get(digest)
+            if group is None:
+                group = self.groups[digest] = Group(n, size)
+                duplicate = False
+            else:
+                group.waiting += 1
+                duplicate = True
+            self.item_groups[n] = group
+
+            if self.unregistered[size] == 0:    # No more duplicates can show up
+                for other in self.groups.values():
+                    if other.size == size:
+                        self._cleanup(other)
+        return duplicate
+
+    def publish(self, n: int, output: str, link: bool = True):
+        """Share the converted output of a representative. Set `link` to False if outputs get modified in place."""
+        group = self.item_groups.get(n)
+        if group is None or group.rep != n:
+            return
+        with self.lock:
+            if group.waiting == 0 and self.unregistered[group.size] == 0:
+                return
+
+        name, ext = os.path.splitext(os.path.basename(output))
+        staging = getUniqueFilePath(os.path.dirname(output), f"{name}_dup", ext[1:], True)
+        try:
+            _linkOrCopy(output, staging, link)
+        except OSError as e:
+            logging.error(f"[Duplicates] Failed to stage {output}. {e}")
+            return
+
+        with self.lock:
+            group.staging = staging
+            group.elapsed = time.monotonic() - group.started
+
+    def release(self, n: int):
+        """Representative is done (converted, skipped or failed)."""
+        group = self.item_groups.get(n)
+        if group is not None and group.rep == n:
+            group.released.set()
+            with self.lock:
+                self._cleanup(group)
+
+    def fetch(self, n: int, dst: str, link: bool = True, is_canceled: Callable[[], bool] | None = None) -> bool:
+        """Wait for the representative. Returns False if its output is not available, convert the item then."""
+        group = self.item_groups.get(n)
+        if group is None:
+            return False
+        while not group.released.wait(0.1):
+            if is_canceled is not None and is_canceled():
+                self._leave(group)
+                return False
+
+        fetched = False
+        if group.staging is not None:
+            try:
+                _linkOrCopy(group.staging, dst, link)
+                fetched = True
+            except OSError as e:
+                logging.error(f"[Duplicates] Failed to fetch {group.staging}. {e}")
+
+        with self.lock:
+            if fetched:
+                self.stats["reused"] += 1
+                self.stats["bytes"] += self.sizes[n] or 0
+                self.stats["seconds"] += group.elapsed
+        self._leave(group)
+        return fetched
+
+    def _leave(self, group: Group):
+        with self.lock:
+            group.waiting -= 1
+            self._cleanup(group)
+
+    def _cleanup(self, group: Group):
+        """Remove the staged output once nothing can use it anymore."""
+        if group.released.is_set() and group.waiting == 0 and self.unregistered[group.size] == 0:
+            self._removeStaging(group)
+
+    def _removeStaging(self, group: Group):
+        if group.staging is None:
+            return
+        try:
+            os.remove(group.staging)
+        except OSError as e:
+            logging.error(f"[Duplicates] Failed to remove {group.staging}. {e}")
+        group.staging = None
+
+    def getStats(self) -> Dict:
+        """{"reused": outputs, "bytes": input bytes not encoded, "seconds": encoding time saved (estimated)}"""
+        with self.lock:
+            return dict(self.stats)
+
+def _linkOrCopy(src: str, dst: str, link: bool):
+    copyFile(src, dst, link=link, mode=False)
+
+duplicates = Duplicates()
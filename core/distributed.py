@@ -0,0 +1,442 @@
+import os
+import hmac
+import json
+import queue
+import socket
+import logging
+import threading
+import ipaddress
+import socketserver
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from core.runner import runItem, unitState
+from core.path_locks import PathLocks
+from core.exceptions import GenericException
+import core.priority as priority
+
+# Protocol
+#   One JSON object per line, UTF-8. Shared storage is assumed, so only paths are sent.
+#
+#   coordinator -> daemon
+#       {"type": "job", "token": str, "unit": int, "items": [[n, abs_path, anchor_path], ...], "params": {...}, "settings": {...}}
+#   daemon -> coordinator
+#       {"type": "heartbeat", "unit": int}      every HEARTBEAT_INTERVAL seconds while a unit is running
+#       {"type": "result", "unit": int, "results": [{"n": int, "status": str, "exceptions": [...]}, ...]}
+#       {"type": "error", "unit": int, "msg": str}     the message was rejected, the connection is closed after it
+#
+# Addresses are "host:port" (TCP) or "unix:/path/to/socket". The host defaults to loopback.
+#
+# A daemon converts, overwrites and deletes whatever the params it receives say, so every message must carry the daemon's token.
+# Listening on anything but loopback or a unix socket requires one. Unix sockets are only accessible to the owner.
+#
+# Daemons share nothing but the storage. Options that act on the whole batch (see checkSettings()) are not supported.
+
+HEARTBEAT_INTERVAL = 5
+RECONNECT_DELAY = 1     # Doubled after every failed attempt
+TOKEN_ENV = "XL_CONVERTER_TOKEN"
+
+def parseAddress(address: str) -> Tuple[int, str | Tuple[str, int]]:
+    """Returns (socket family, address)."""
+    if address.startswith("unix:"):
+        return (socket.AF_UNIX, address[5:])
+
+    host, sep, port = address.rpartition(":")
+    if not sep or not port.isdigit():
+        raise GenericException("DS0", f"Invalid address ({address}). Use host:port or unix:/path")
+    return (socket.AF_INET, (host or "127.0.0.1", int(port)))
+
+def isLoopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:  # Host name
+        return False
+
+def formatAddress(family: int, address) -> str:
+    if family == socket.AF_UNIX:
+        return f"unix:{address}"
+    return f"{address[0]}:{address[1]}"
+
+def checkSettings(params: Dict, settings: Dict) -> str | None:
+    """Returns an error message if the batch uses an option that remote workers can't honor."""
+    if params.get("archive_output", False):
+        return "Packing into an archive is not supported with remote workers."
+    if settings.get("execution_class", priority.NORMAL) != priority.NORMAL:
+        return "Process priority is not supported with remote workers. Start the worker daemons with --priority instead."
+    if settings.get("cpu_placement", False):
+        return "Pinning encoders to CPU cores is not supported with remote workers."
+    if settings.get("conversion_cache", False):
+        return "The conversion cache is not supported with remote workers."
+    if settings.get("deduplicate", False):
+        return "Converting identical images once is not supported with remote workers."
+    return None
+
+def sendMessage(wfile, msg: Dict, lock=None):
+    data = (json.dumps(msg) + "\n").encode("utf-8")
+    if lock is None:
+        wfile.write(data)
+        wfile.flush()
+    else:
+        with lock:
+            wfile.write(data)
+            wfile.flush()
+
+def readMessage(rfile) -> Dict | None:
+    """Returns None when the connection was closed."""
+    line = rfile.readline()
+    if not line:
+        return None
+    return json.loads(line.decode("utf-8"))
+
+# ------------------------------------------------------------
+#                         Worker daemon
+# ------------------------------------------------------------
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.worker_daemon
+        write_lock = threading.Lock()
+
+        while True:
+            try:
+                msg = readMessage(self.rfile)
+            except (OSError, ValueError) as e:
+                logging.error(f"[WorkerDaemon] Failed to read a message. {e}")
+                return
+
+            if msg is None:
+                return
+            if not daemon.isAuthorized(msg):
+                logging.error(f"[WorkerDaemon] Rejected a message with a wrong token from {self.client_address}")
+                try:
+                    sendMessage(self.wfile, {"type": "error", "unit": msg.get("unit"), "msg": "Invalid token."}, write_lock)
+                except OSError:
+                    pass
+                return
+            if msg.get("type") != "job":
+                logging.error(f"[WorkerDaemon] Unknown message type ({msg.get('type')})")
+                continue
+
+            unit = msg["unit"]
+            stop_heartbeat = threading.Event()
+
+            def heartbeat():
+                while not stop_heartbeat.wait(daemon.heartbeat_interval):
+                    try:
+                        sendMessage(self.wfile, {"type": "heartbeat", "unit": unit}, write_lock)
+                    except OSError:
+                        return
+
+            heartbeat_thread = threading.Thread(target=heartbeat, daemon=True)
+            heartbeat_thread.start()
+            try:
+                results = daemon.runUnit(msg["items"], msg["params"], msg["settings"])
+            finally:
+                stop_heartbeat.set()
+                heartbeat_thread.join()
+
+            try:
+                sendMessage(self.wfile, {"type": "result", "unit": unit, "results": results}, write_lock)
+            except OSError as e:
+                logging.error(f"[WorkerDaemon] Failed to send results of unit #{unit}. {e}")
+                return
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _UnixServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+class WorkerDaemon():
+    """Accepts work units from a Coordinator and runs them through the regular Worker pipeline.
+
+    Usage:
+        daemon = WorkerDaemon("127.0.0.1:7878", threads=16)
+        daemon.serveForever()
+
+    Raises GenericException If a non-loopback address is given without a token.
+    """
+    def __init__(self, address: str, threads: int | None = None, heartbeat_interval: float = HEARTBEAT_INTERVAL, token: str | None = None):
+        self.threads = max(1, threads or os.cpu_count() or 1)
+        self.heartbeat_interval = heartbeat_interval
+        self.path_locks = PathLocks()
+        self.token = token or None
+
+        family, addr = parseAddress(address)
+        if family != socket.AF_UNIX and not isLoopback(addr[0]) and self.token is None:
+            raise GenericException("DS3", f"Listening on {address} needs a token (--token or {TOKEN_ENV}). The daemon runs whatever it's sent.")
+        if family == socket.AF_UNIX:
+            if os.path.exists(addr):
+                os.remove(addr)     # Stale socket
+            self.server = _UnixServer(addr, _DaemonHandler, bind_and_activate=False)
+            try:
+                self.server.server_bind()
+                os.chmod(addr, 0o600)   # Before listening, there's no token
+                self.server.server_activate()
+            except OSError:
+                self.server.server_close()
+                raise
+        else:
+            self.server = _TCPServer(addr, _DaemonHandler)
+        self.server.worker_daemon = self
+        self.family = family
+        self.thread = None
+
+    def getAddress(self) -> str:
+        return formatAddress(self.family, self.server.server_address)
+
+    def isAuthorized(self, msg: Dict) -> bool:
+        if self.token is None:  # Loopback or unix socket
+            return True
+        token = msg.get("token")
+        return isinstance(token, str) and hmac.compare_digest(token.encode("utf-8"), self.token.encode("utf-8"))
+
+    def runUnit(self, items: List, params: Dict, settings: Dict) -> List[Dict]:
+        """Runs a unit on this machine. Items are [[n, abs_path, anchor_path], ...]."""
+        workers = min(len(items), self.threads)
+        threads_per_item = max(1, self.threads // max(1, workers))
+
+        with unitState(), ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = [
+                executor.submit(self._runItem, n, abs_path, anchor_path, params, settings, threads_per_item)
+                for n, abs_path, anchor_path in items
+            ]
+            return [f.result() for f in futures]
+
+    def _runItem(self, n, abs_path, anchor_path, params, settings, threads) -> Dict:
+        try:
+            return runItem(n, Path(abs_path), Path(anchor_path), params, settings, threads, self.path_locks)
+        except Exception as e:
+            logging.error(f"[WorkerDaemon] Item #{n} failed. {e}")
+            return {"n": n, "status": "completed", "exceptions": [["DS1", str(e), Path(abs_path).name]]}
+
+    def serveForever(self):
+        logging.info(f"[WorkerDaemon] Listening on {self.getAddress()}")
+        self.server.serve_forever()
+
+    def start(self):
+        """Serve in a background thread."""
+        self.thread = threading.Thread(target=self.serveForever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        if self.family == socket.AF_UNIX:
+            try:
+                os.remove(self.server.server_address)
+            except OSError:
+                pass
+        if self.thread is not None:
+            self.thread.join()
+
+# ------------------------------------------------------------
+#                         Coordinator
+# ------------------------------------------------------------
+
+class _Unit():
+    __slots__ = ("id", "items", "attempts")
+
+    def __init__(self, _id: int, items: List):
+        self.id = _id
+        self.items = items
+        self.attempts = 0
+
+class Coordinator():
+    """Splits a batch into work units and dispatches them to WorkerDaemons.
+
+    A daemon that disconnects or misses heartbeats for `heartbeat_timeout` seconds is reconnected up to `max_reconnects` times,
+    waiting `reconnect_delay` seconds, doubled after every attempt. Its unit is sent again after reconnecting.
+    After that the daemon is dropped and its unit goes back to the queue.
+    A unit is retried `max_retries` times before its items are reported as failed.
+
+    Items are grouped by folder, so one output folder is usually handled by a single machine.
+    """
+    def __init__(
+            self,
+            addresses: List[str],
+            unit_size: int = 64,
+            heartbeat_timeout: float = HEARTBEAT_INTERVAL * 6,
+            max_retries: int = 3,
+            token: str | None = None,
+            max_reconnects: int = 3,
+            reconnect_delay: float = RECONNECT_DELAY,
+        ):
+        self.addresses = addresses
+        self.token = token or ""
+        self.unit_size = max(1, unit_size)
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_retries = max_retries
+        self.max_reconnects = max_reconnects
+        self.reconnect_delay = reconnect_delay
+
+        self.units = queue.Queue()
+        self.results = {}
+        self.pending_units = 0
+        self.alive_daemons = 0
+        self.on_result = None
+        self.cond = threading.Condition()
+
+    def splitUnits(self, items: List[Tuple[Path, Path]]) -> List[_Unit]:
+        indexed = [(n, str(abs_path), str(anchor_path)) for n, (abs_path, anchor_path) in enumerate(items)]
+        indexed.sort(key=lambda i: (os.path.dirname(i[1]), i[0]))
+
+        units = []
+        for i in range(0, len(indexed), self.unit_size):
+            units.append(_Unit(len(units), [list(item) for item in indexed[i:i + self.unit_size]]))
+        return units
+
+    def run(
+            self,
+            items: List[Tuple[Path, Path]],
+            params: Dict,
+            settings: Dict,
+            on_result: Callable[[Dict], None] | None = None,
+        ) -> List[Dict]:
+        """Blocks until every item has a result. Results are sorted by item index.
+
+        Raises GenericException if the batch uses options remote workers don't support, see checkSettings().
+        """
+        error = checkSettings(params, settings)
+        if error:
+            raise GenericException("DS5", error)
+
+        units = self.splitUnits(items)
+        self.results = {}
+        self.pending_units = len(units)
+        self.alive_daemons = len(self.addresses)
+        self.on_result = on_result
+        for unit in units:
+            self.units.put(unit)
+
+        threads = [
+            threading.Thread(target=self._serveDaemon, args=(address, params, settings), daemon=True)
+            for address in self.addresses
+        ]
+        for t in threads:
+            t.start()
+
+        with self.cond:
+            while self.pending_units > 0 and self.alive_daemons > 0:
+                self.cond.wait()
+
+        # Every daemon is gone, report leftovers as failed
+        while not self.units.empty():
+            self._failUnit(self.units.get_nowait(), "No worker daemons available.")
+
+        for t in threads:
+            t.join(self.heartbeat_timeout)
+
+        return [self.results[n] for n in sorted(self.results)]
+
+    def _addResults(self, results: List[Dict]):
+        with self.cond:
+            for result in results:
+                self.results[result["n"]] = result
+        if self.on_result is not None:
+            for result in results:
+                self.on_result(result)
+
+    def _finishUnit(self):
+        with self.cond:
+            self.pending_units -= 1
+            self.cond.notify_all()
+
+    def _failUnit(self, unit: _Unit, msg: str):
+        logging.error(f"[Coordinator] Unit #{unit.id} failed. {msg}")
+        self._addResults([
+            {"n": n, "status": "completed", "exceptions": [["DS2", msg, Path(abs_path).name]]}
+            for n, abs_path, _ in unit.items
+        ])
+        self._finishUnit()
+
+    def _requeueUnit(self, unit: _Unit, reason: str):
+        unit.attempts += 1
+        if unit.attempts > self.max_retries:
+            self._failUnit(unit, f"Gave up after {self.max_retries} retries. {reason}")
+        else:
+            logging.warning(f"[Coordinator] Retrying unit #{unit.id} ({unit.attempts}/{self.max_retries}). {reason}")
+            self.units.put(unit)
+
+    def _isDone(self) -> bool:
+        with self.cond:
+            return self.pending_units <= 0
+
+    def _waitBackoff(self, attempt: int) -> bool:
+        """Returns False if the batch finished in the meantime."""
+        with self.cond:
+            return not self.cond.wait_for(lambda: self.pending_units <= 0, self.reconnect_delay * 2 ** attempt)
+
+    def _serveDaemon(self, address: str, params: Dict, settings: Dict):
+        unit = None         # In flight, sent again after reconnecting
+        reconnects = 0
+        while True:
+            try:
+                family, addr = parseAddress(address)
+                with socket.socket(family, socket.SOCK_STREAM) as sock:
+                    sock.settimeout(self.heartbeat_timeout)
+                    sock.connect(addr)
+                    rfile = sock.makefile("rb")
+                    wfile = sock.makefile("wb")
+
+                    while not self._isDone():
+                        if unit is None:
+                            try:
+                                unit = self.units.get(timeout=0.1)
+                            except queue.Empty:
+                                continue
+
+                        results = self._runUnit(rfile, wfile, unit, params, settings)
+                        reconnects = 0      # Healthy again
+                        self._addResults(results)
+                        self._finishUnit()
+                        unit = None
+                return
+            except GenericException as e:   # Rejected, reconnecting won't help
+                logging.error(f"[Coordinator] {address} rejected the job. {e.msg}")
+                reason = e.msg
+                break
+            except (OSError, ValueError) as e:
+                logging.error(f"[Coordinator] Lost {address}. {e}")
+                reason = str(e)
+
+            if reconnects >= self.max_reconnects or not self._waitBackoff(reconnects):
+                break
+            reconnects += 1
+            logging.warning(f"[Coordinator] Reconnecting to {address} ({reconnects}/{self.max_reconnects})")
+
+        if unit is not None:
+            self._requeueUnit(unit, f"{address}: {reason}")
+        self._daemonLost()
+
+    def _runUnit(self, rfile, wfile, unit: _Unit, params: Dict, settings: Dict) -> List[Dict]:
+        """Send a unit and wait for its results. Raises OSError, ValueError, GenericException if it was rejected."""
+        sendMessage(wfile, {
+            "type": "job",
+            "token": self.token,
+            "unit": unit.id,
+            "items": unit.items,
+            "params": params,
+            "settings": settings,
+        })
+
+        while True:
+            msg = readMessage(rfile)    # Raises socket.timeout when heartbeats stop
+            if msg is None:
+                raise ConnectionError("Connection closed by the daemon.")
+            if msg.get("type") == "error":
+                raise GenericException("DS4", msg.get("msg"))
+            if msg.get("unit") != unit.id:
+                continue
+            if msg["type"] == "result":
+                return msg["results"]
+
+    def _daemonLost(self):
+        with self.cond:
+            self.alive_daemons -= 1
+            self.cond.notify_all()
@@ -0,0 +1,100 @@
+import os
+import sys
+import errno
+import shutil
+import logging
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+
+# Copies without moving the data through Python when the filesystem allows it. Tried in order:
+#   reflink (FICLONE) - Btrfs, XFS, bcachefs. Shares extents copy-on-write, nothing is read
+#   hard link - only if the caller allows it, both names then refer to the same file
+#   os.copy_file_range - copied in the kernel, server-side on NFS 4.2 and SMB
+#   shutil.copyfile - uses sendfile() on Linux
+
+FICLONE = 0x40049409    # _IOW(0x94, 9, int) from linux/fs.h
+
+def copyFile(src: str, dst: str, link: bool = False, mode: bool = True) -> str:
+    """Copy `src` to `dst`, replacing it. Returns the method that worked ("reflink", "link", "copy_file_range" or "copy").
+
+    Params:
+        link - allow a hard link. Only when neither file is modified in place later (e.g. by shutil.copystat or ExifTool)
+        mode - copy permission bits, same as shutil.copy()
+
+    Raises OSError
+    """
+    with open(src, "rb") as fsrc:
+        with os.fdopen(os.open(dst, os.O_WRONLY | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o666), "wb") as fdst:  # Not truncated until it's known to be a different file
+            src_stat = os.fstat(fsrc.fileno())
+            if os.path.samestat(src_stat, os.fstat(fdst.fileno())):
+                raise shutil.SameFileError(f"{src} and {dst} are the same file")
+            os.ftruncate(fdst.fileno(), 0)
+
+            if _reflink(fsrc.fileno(), fdst.fileno()):
+                method = "reflink"
+            elif link and _link(src, dst):
+                method = "link"
+            elif _copyFileRange(fsrc.fileno(), fdst.fileno(), src_stat.st_size):
+                method = "copy_file_range"
+            else:
+                method = None
+
+    if method is None:
+        shutil.copyfile(src, dst)
+        method = "copy"
+    if mode and method != "link":
+        shutil.copymode(src, dst)
+
+    logging.debug(f"[FileCopy] {method}: {src} -> {dst}")
+    return method
+
+def _reflink(src_fd: int, dst_fd: int) -> bool:
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+    except OSError:     # Not supported, different filesystems
+        return False
+    return True
+
+def _link(src: str, dst: str) -> bool:
+    """Replaces the empty `dst` that copyFile() opened."""
+    tmp = f"{dst}.{os.getpid()}.lnk"
+    try:
+        os.link(src, tmp)
+    except OSError:     # Not supported, different filesystems
+        return False
+    try:
+        os.replace(tmp, dst)
+    except OSError:
+        os.remove(tmp)
+        return False
+    return True
+
+def _copyFileRange(src_fd: int, dst_fd: int, size: int) -> bool:
+    if not hasattr(os, "copy_file_range"):
+        return False
+
+    copied = 0
+    try:
+        while copied < size:
+            n = os.copy_file_range(src_fd, dst_fd, size - copied)
+            if n == 0:
+                break
+            copied += n
+    except OSError as e:
+        if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EOPNOTSUPP, errno.EINVAL, errno.EPERM):
+            raise
+        copied = -1
+
+    if copied == size:
+        return True
+
+    # Unsupported or short, start over with a plain copy
+    os.ftruncate(dst_fd, 0)
+    os.lseek(src_fd, 0, os.SEEK_SET)
+    os.lseek(dst_fd, 0, os.SEEK_SET)
+    return False
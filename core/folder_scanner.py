@@ -0,0 +1,146 @@
+import os
+import logging
+from pathlib import Path
+from typing import List, Tuple
+
+from PySide6.QtCore import (
+    QObject,
+    Signal,
+    QThread,
+)
+
+from core.scan_index import scan_index
+from core.manifest import readManifest
+from core.archive_source import isArchive, listArchive
+from data.constants import ALLOWED_INPUT
+
+# Lists dropped or added folders off the GUI thread. Paths are delivered in chunks as they're found.
+# Jobs that point to a file are path lists (see core.manifest), their anchors come from the list.
+# Archives (see core.archive_source) are listed without extracting anything, the archive is the anchor.
+
+class Worker(QObject):
+    found = Signal(list, object)    # Absolute paths, anchor path
+    finished = Signal()
+
+    def __init__(self, jobs: List[Tuple[str, Path]]):
+        super().__init__()
+        self.jobs = jobs
+
+    def isCanceled(self) -> bool:
+        return QThread.currentThread().isInterruptionRequested()
+
+    def run(self):
+        for path, anchor_path in self.jobs:
+            if self.isCanceled():
+                break
+
+            if os.path.isfile(path):
+                if isArchive(path):
+                    self.runArchive(path)
+                else:
+                    self.runManifest(path)
+                continue
+
+            try:
+                chunks = scan_index.walk(path, ALLOWED_INPUT)
+            except FileNotFoundError as e:
+                logging.error(f"[FolderScanner] Directory not found. {e}")
+                continue
+
+            for chunk in chunks:
+                if self.isCanceled():
+                    chunks.close()
+                    break
+                self.found.emit(chunk, anchor_path)
+        self.finished.emit()
+
+    def runManifest(self, path: str):
+        try:
+            chunks = readManifest(path)
+        except OSError as e:
+            logging.error(f"[FolderScanner] Cannot read the list. {e}")
+            return
+
+        for chunk in chunks:
+            if self.isCanceled():
+                chunks.close()
+                break
+
+            start = 0   # Runs of the same anchor, lists are usually grouped
+            for n in range(1, len(chunk) + 1):
+                if n == len(chunk) or chunk[n][1] is not chunk[start][1]:
+                    self.found.emit([item[0] for item in chunk[start:n]], chunk[start][1])
+                    start = n
+
+    def runArchive(self, path: str):
+        anchor_path = Path(path)
+        chunks = listArchive(path)
+        try:
+            for chunk in chunks:
+                if self.isCanceled():
+                    break
+                self.found.emit([item[0] for item in chunk], anchor_path)
+        except OSError as e:
+            logging.error(f"[FolderScanner] Cannot read the archive. {e}")
+        finally:
+            chunks.close()
+
+class Runner(QObject):
+    """Scans folders in a background thread. Folders added while scanning are queued."""
+    found = Signal(list, object)
+    finished = Signal()
+
+    def __init__(self, parent = None):
+        super().__init__(parent)
+        self.worker = None
+        self.thread = None
+        self.queued = []
+        self.canceled = False
+
+    def run(self, jobs: List[Tuple[str, Path]]):
+        """`jobs` as [(folder, anchor path), ...] or [(path list or archive, None), ...]"""
+        if self.isRunning():
+            self.queued.extend(jobs)
+            return
+
+        self.canceled = False
+        self.worker = Worker(jobs)
+        self.thread = QThread()
+        self.thread.started.connect(self.worker.run)
+        self.worker.found.connect(self.handleFound)
+        self.worker.finished.connect(self.handleFinish)
+        self.worker.moveToThread(self.thread)
+        self.thread.start()
+
+    def isRunning(self) -> bool:
+        return self.thread is not None
+
+    def cancel(self, wait: bool = False):
+        self.queued = []
+        if self.thread is not None:
+            self.canceled = True
+            self.thread.requestInterruption()
+            if wait:
+                self.thread.quit()
+                self.thread.wait()
+
+    def handleFound(self, paths, anchor_path):
+        if not self.canceled:   # Chunks emitted before the worker noticed
+            self.found.emit(paths, anchor_path)
+
+    def handleFinish(self):
+        if self.thread is not None:
+            self.thread.quit()
+            self.thread.wait()
+            self.thread.deleteLater()
+            self.thread = None
+
+        if self.worker is not None:
+            self.worker.deleteLater()
+            self.worker = None
+
+        if self.queued:
+            jobs, self.queued = self.queued, []
+            self.run(jobs)
+        else:
+            self.finished.emit()
@@ -0,0 +1,165 @@
+import os
+import time
+import shutil
+import threading
+from stat import S_ISREG
+from collections import Counter
+
+from core.utils import getFreeSpaceLeft
+from core.file_copy import copyFile
+
+# Filesystem calls of a single Worker go through StatCache, so each path is stat'ed at most once per job.
+# On network shares every call is a round trip, for small images that's most of the time spent outside the encoder.
+#
+# Operations done through the cache keep it up to date (rename moves the entry, remove marks the path missing).
+# Files changed behind its back (encoders, ExifTool) need forget().
+
+FREE_SPACE_TTL = 2.0     # Seconds a disk_usage() result is reused for the same directory
+
+class DirCache():
+    """Output directories created and free space measured during a batch, shared by all workers."""
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.created = set()
+        self.free_space = {}    # dir: (bytes, monotonic time)
+
+    def start(self):
+        """Call before starting a batch."""
+        with self.lock:
+            self.created = set()
+            self.free_space = {}
+            self.enabled = True
+
+    def stop(self):
+        """Call after a batch is finished."""
+        with self.lock:
+            self.created = set()
+            self.free_space = {}
+            self.enabled = False
+
+    def isEnabled(self) -> bool:
+        return self.enabled
+
+    def isCreated(self, path: str) -> bool:
+        return self.enabled and path in self.created
+
+    def addCreated(self, path: str):
+        if self.enabled:
+            with self.lock:
+                self.created.add(path)
+
+    def getFreeSpace(self, path: str) -> int | None:
+        """Cached free space, None if it needs to be measured."""
+        if not self.enabled:
+            return None
+        entry = self.free_space.get(path)
+        if entry is None or time.monotonic() - entry[1] > FREE_SPACE_TTL:
+            return None
+        return entry[0]
+
+    def setFreeSpace(self, path: str, free: int):
+        if self.enabled and free != -1:
+            with self.lock:
+                self.free_space[path] = (free, time.monotonic())
+
+dir_cache = DirCache()  # Module-wide, shared by all workers
+
+class StatCache():
+    """Per-job stat cache. Counts the filesystem calls made through it."""
+    def __init__(self):
+        self.stats = {}         # path: os.stat_result, None if missing
+        self.calls = Counter()  # operation: count
+
+    def getCallCount(self) -> int:
+        return sum(self.calls.values())
+
+    # Metadata
+    def stat(self, path: str) -> os.stat_result | None:
+        """None if the path doesn't exist."""
+        if path in self.stats:
+            return self.stats[path]
+
+        self.calls["stat"] += 1
+        try:
+            result = os.stat(path)
+        except OSError:
+            result = None
+        self.stats[path] = result
+        return result
+
+    def isfile(self, path: str) -> bool:
+        result = self.stat(path)
+        return result is not None and S_ISREG(result.st_mode)
+
+    def getsize(self, path: str) -> int:
+        """Raises FileNotFoundError, same as os.path.getsize()."""
+        result = self.stat(path)
+        if result is None:
+            raise FileNotFoundError(f"File not found: '{path}'")
+        return result.st_size
+
+    def samefile(self, path_1: str, path_2: str) -> bool:
+        """Raises FileNotFoundError, same as os.path.samefile()."""
+        stat_1, stat_2 = self.stat(path_1), self.stat(path_2)
+        if stat_1 is None or stat_2 is None:
+            raise FileNotFoundError(f"File not found: '{path_1 if stat_1 is None else path_2}'")
+        return os.path.samestat(stat_1, stat_2)
+
+    def forget(self, path: str):
+        """The file was changed outside of the cache."""
+        self.stats.pop(path, None)
+
+    # Operations
+    def makedirs(self, path: str):
+        if dir_cache.isCreated(path):
+            return
+        self.calls["makedirs"] += 1
+        os.makedirs(path, exist_ok=True)
+        dir_cache.addCreated(path)
+
+    def getFreeSpace(self, path: str) -> int:
+        """Bytes, -1 if it cannot be determined."""
+        free = dir_cache.getFreeSpace(path)
+        if free is None:
+            self.calls["disk_usage"] += 1
+            free = getFreeSpaceLeft(path)
+            dir_cache.setFreeSpace(path, free)
+        return free
+
+    def remove(self, path: str):
+        self.calls["remove"] += 1
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            self.stats[path] = None
+            raise
+        except OSError:
+            self.forget(path)
+            raise
+        self.stats[path] = None
+
+    def rename(self, src: str, dst: str):
+        self.calls["rename"] += 1
+        try:
+            os.rename(src, dst)
+        except OSError:
+            self.forget(src)
+            self.forget(dst)
+            raise
+        if self.stats.get(src) is not None:    # Size and type don't change
+            self.stats[dst] = self.stats[src]
+        else:
+            self.forget(dst)
+        self.stats[src] = None
+
+    def copy(self, src: str, dst: str):
+        """See core.file_copy.copyFile(), never hard linked."""
+        self.calls["copy"] += 1
+        self.forget(dst)
+        copyFile(src, dst)
+
+    def copystat(self, src: str, dst: str):
+        """Size stays the same, the cached entry is kept."""
+        self.calls["copystat"] += 1
+        shutil.copystat(src, dst)
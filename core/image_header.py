@@ -0,0 +1,85 @@
+import struct
+import logging
+
+# Reads image resolution from the file header without decoding. Supports PNG, JPEG, GIF, BMP and WebP.
+
+JPEG_SCAN_LIMIT = 1024 * 1024   # SOF usually comes after EXIF and thumbnails
+
+def _readPNG(f, head: bytes):
+    if head[12:16] == b"IHDR":
+        return struct.unpack(">II", head[16:24])
+
+def _readGIF(f, head: bytes):
+    return struct.unpack("<HH", head[6:10])
+
+def _readBMP(f, head: bytes):
+    width, height = struct.unpack("<ii", head[18:26])
+    return (abs(width), abs(height))
+
+def _readWebP(f, head: bytes):
+    chunk = head[12:16]
+    if chunk == b"VP8 ":
+        width, height = struct.unpack("<HH", head[26:30])
+        return (width & 0x3FFF, height & 0x3FFF)
+    elif chunk == b"VP8L":
+        b = head[21:25]
+        width = 1 + (((b[1] & 0x3F) << 8) | b[0])
+        height = 1 + (((b[3] & 0xF) << 10) | (b[2] << 2) | ((b[1] & 0xC0) >> 6))
+        return (width, height)
+    elif chunk == b"VP8X":
+        width = 1 + int.from_bytes(head[24:27], "little")
+        height = 1 + int.from_bytes(head[27:30], "little")
+        return (width, height)
+
+def _readJPEG(f, head: bytes):
+    f.seek(2)
+    while f.tell() < JPEG_SCAN_LIMIT:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        while marker[1] == 0xFF:    # Padding
+            marker = marker[1:] + f.read(1)
+
+        code = marker[1]
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:    # Markers without a length
+            continue
+
+        length = struct.unpack(">H", f.read(2))[0]
+        if code in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF):
+            height, width = struct.unpack(">xHH", f.read(5))
+            return (width, height)
+        f.seek(length - 2, 1)
+
+def getResolution(path: str) -> tuple | None:
+    """Returns (width, height) or None if the format is not supported or the header is damaged."""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(32)
+
+            if head.startswith(b"\x89PNG\r\n\x1a\n"):
+                reader = _readPNG
+            elif head.startswith(b"\xff\xd8"):
+                reader = _readJPEG
+            elif head[:6] in (b"GIF87a", b"GIF89a"):
+                reader = _readGIF
+            elif head.startswith(b"BM"):
+                reader = _readBMP
+            elif head.startswith(b"RIFF") and head[8:12] == b"WEBP":
+                reader = _readWebP
+            else:
+                return None
+
+            resolution = reader(f, head)
+    except (OSError, struct.error, IndexError) as e:
+        logging.debug(f"[ImageHeader] Failed to read {path}. {e}")
+        return None
+
+    if resolution is None or 0 in resolution:
+        return None
+    return tuple(resolution)
+
+def getMegapixels(path: str) -> float | None:
+    resolution = getResolution(path)
+    if resolution is None:
+        return None
+    return resolution[0] * resolution[1] / 1_000_000
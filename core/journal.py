@@ -0,0 +1,220 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from data.constants import CONFIG_LOCATION
+
+# Append-only record of the last batches, used to resume after a crash or cancellation.
+#
+# batches   - the plan: params and settings as JSON
+# items     - one row per item, updated as workers report back
+#
+# Each update is its own transaction. WAL with synchronous=NORMAL keeps commits cheap, at worst
+# the last few updates are lost on power failure and those items get converted again.
+
+JOURNAL_PATH = os.path.join(CONFIG_LOCATION, "journal.db")
+KEEP_BATCHES = 5
+
+PENDING = 0
+STARTED = 1
+COMPLETED = 2
+FAILED = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    created REAL NOT NULL,
+    params TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    finished INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS items (
+    batch_id INTEGER NOT NULL,
+    n INTEGER NOT NULL,
+    abs_path TEXT NOT NULL,
+    anchor_path TEXT NOT NULL,
+    status INTEGER NOT NULL DEFAULT 0,
+    output TEXT,
+    tmp TEXT,
+    PRIMARY KEY (batch_id, n)
+) WITHOUT ROWID;
+"""
+
+class Journal:
+    """Usage:
+        job_journal.begin(items, params, settings)      # or job_journal.resume()
+        job_journal.markStarted(n, tmp_paths)           # from workers
+        job_journal.markCompleted(n, output)
+        job_journal.finish()                            # all items reported
+        job_journal.stop()                              # canceled, stays resumable
+    """
+    def __init__(self, path: str = JOURNAL_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+        self.enabled = False
+        self.batch_id = None
+        self.plan = []      # Dispatch index -> n in the journal
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+        return self.conn
+
+    def isEnabled(self) -> bool:
+        return self.enabled
+
+    def begin(self, items: List[Tuple[Path, Path]], params: Dict, settings: Dict):
+        """Record the plan of a new batch."""
+        with self.lock:
+            try:
+                conn = self._connect()
+                conn.execute("BEGIN")
+                conn.execute("UPDATE batches SET finished = 1 WHERE finished = 0")     # Superseded
+                self.batch_id = conn.execute(
+                    "INSERT INTO batches (created, params, settings) VALUES (?, ?, ?)",
+                    (time.time(), json.dumps(params), json.dumps(settings)),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO items (batch_id, n, abs_path, anchor_path) VALUES (?, ?, ?, ?)",
+                    ((self.batch_id, n, str(abs_path), str(anchor_path)) for n, (abs_path, anchor_path) in enumerate(items)),
+                )
+                self._prune(conn)
+                conn.execute("COMMIT")
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"[Journal] Failed to record the batch. {e}")
+                self._rollback()
+                self.enabled = False
+                return
+
+            self.plan = list(range(len(items)))
+            self.enabled = True
+
+    def getLastBatch(self) -> Dict | None:
+        """Last unfinished batch: {"id", "created", "total", "left"}, or None."""
+        with self.lock:
+            try:
+                conn = self._connect()
+                row = conn.execute("SELECT id, created FROM batches WHERE finished = 0 ORDER BY id DESC LIMIT 1").fetchone()
+                if row is None:
+                    return None
+                total, left = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(status != ?), 0) FROM items WHERE batch_id = ?",
+                    (COMPLETED, row[0]),
+                ).fetchone()
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"[Journal] Failed to read the last batch. {e}")
+                return None
+
+        return {"id": row[0], "created": row[1], "total": total, "left": left}
+
+    def resume(self) -> Tuple[List[Tuple[Path, Path]], Dict, Dict] | None:
+        """Continue the last unfinished batch. Removes temp files of interrupted items.
+
+        Returns:
+            (items left, params, settings) or None
+        """
+        last = self.getLastBatch()
+        if last is None:
+            return None
+
+        with self.lock:
+            try:
+                conn = self._connect()
+                params, settings = conn.execute("SELECT params, settings FROM batches WHERE id = ?", (last["id"],)).fetchone()
+                rows = conn.execute(
+                    "SELECT n, abs_path, anchor_path, tmp FROM items WHERE batch_id = ? AND status != ? ORDER BY n",
+                    (last["id"], COMPLETED),
+                ).fetchall()
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"[Journal] Failed to load the last batch. {e}")
+                return None
+
+            items = []
+            self.plan = []
+            for n, abs_path, anchor_path, tmp in rows:
+                for path in json.loads(tmp) if tmp else ():
+                    self._removeTmp(path)
+                items.append((Path(abs_path), Path(anchor_path)))
+                self.plan.append(n)
+
+            self.batch_id = last["id"]
+            self.enabled = True
+
+        logging.info(f"[Journal] Resuming batch {self.batch_id}, {len(items)} out of {last['total']} items left")
+        return (items, json.loads(params), json.loads(settings))
+
+    def _removeTmp(self, path: str):
+        try:
+            os.remove(path)
+            logging.info(f"[Journal] Removed leftover {path}")
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"[Journal] Failed to remove leftover {path}. {e}")
+
+    def markStarted(self, n: int, tmp_paths: List[str]):
+        """`tmp_paths` are removed if the item is interrupted."""
+        self._update(n, "status = ?, tmp = ?", (STARTED, json.dumps(tmp_paths)))
+
+    def markCompleted(self, n: int, output: str | None):
+        self._update(n, "status = ?, output = ?, tmp = NULL", (COMPLETED, output))
+
+    def markFailed(self, n: int):
+        self._update(n, "status = ?", (FAILED,))
+
+    def _update(self, n: int, assignments: str, values: tuple):
+        with self.lock:
+            if not self.enabled or n >= len(self.plan):
+                return
+            try:
+                self.conn.execute(
+                    f"UPDATE items SET {assignments} WHERE batch_id = ? AND n = ?",
+                    (*values, self.batch_id, self.plan[n]),
+                )
+            except sqlite3.Error as e:
+                logging.error(f"[Journal] Failed to update item {n}. {e}")
+
+    def finish(self):
+        """Call after every item was reported. Batches with failed items are closed as well."""
+        with self.lock:
+            if self.enabled:
+                try:
+                    self.conn.execute("UPDATE batches SET finished = 1 WHERE id = ?", (self.batch_id,))
+                except sqlite3.Error as e:
+                    logging.error(f"[Journal] Failed to close batch {self.batch_id}. {e}")
+            self.enabled = False
+
+    def stop(self):
+        with self.lock:
+            self.enabled = False
+
+    def close(self):
+        with self.lock:
+            self.enabled = False
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def _prune(self, conn):
+        """Keep the last few batches only."""
+        conn.execute("DELETE FROM items WHERE batch_id <= ?", (self.batch_id - KEEP_BATCHES,))
+        conn.execute("DELETE FROM batches WHERE id <= ?", (self.batch_id - KEEP_BATCHES,))
+
+    def _rollback(self):
+        try:
+            if self.conn is not None and self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+
+job_journal = Journal()
@@ -0,0 +1,110 @@
+import os
+import csv
+import logging
+from pathlib import Path
+from typing import Collection, Iterator, List, TextIO, Tuple
+
+from core.utils import WALK_CHUNK_SIZE
+from data.constants import ALLOWED_INPUT
+
+# Path lists exported by other tools, read as a stream so a 300k line list never sits in memory whole.
+#
+# Formats:
+#   one path per line
+#   NUL-separated (find -print0), detected from the first block
+#   .csv - a path column and an optional anchor column, with or without a header
+#
+# Relative paths are resolved against the list's folder. Without an anchor, a file is anchored to its own folder, same as "Add Files".
+
+READ_BLOCK_SIZE = 1024 * 1024
+PATH_HEADERS = ("path", "file", "filename", "abs_path")
+ANCHOR_HEADERS = ("anchor", "anchor_path")
+
+def readManifest(
+        path: str,
+        extensions: Collection[str] | None = ALLOWED_INPUT,
+        chunk_size: int = WALK_CHUNK_SIZE,
+    ) -> Iterator[List[Tuple[str, Path]]]:
+    """Yield lists of up to `chunk_size` (absolute path, anchor path). Entries with other extensions are skipped.
+
+    Raises OSError If the list cannot be opened, before anything is read.
+    """
+    f = open(path, "r", encoding="utf-8-sig", errors="surrogateescape", newline="")
+    if extensions is not None:
+        extensions = frozenset(extensions)
+    return _read(f, getFormat(path, f), os.path.dirname(os.path.abspath(path)), extensions, max(chunk_size, 1))
+
+def getFormat(path: str, f: TextIO) -> str:
+    """"csv", "nul" or "lines". Rewinds `f`."""
+    if path.lower().endswith(".csv"):
+        return "csv"
+    head = f.read(READ_BLOCK_SIZE)
+    f.seek(0)
+    return "nul" if "\0" in head else "lines"
+
+def _entries(f: TextIO, fmt: str) -> Iterator[Tuple[str, str | None]]:
+    """(path, anchor or None) as written in the list."""
+    match fmt:
+        case "lines":
+            for line in f:
+                line = line.rstrip("\r\n")
+                if line:
+                    yield (line, None)
+        case "nul":
+            rest = ""
+            while block := f.read(READ_BLOCK_SIZE):
+                *paths, rest = (rest + block).split("\0")
+                for path in paths:
+                    if path:
+                        yield (path.strip("\r\n"), None)
+            if rest.strip("\r\n"):
+                yield (rest.strip("\r\n"), None)
+        case "csv":
+            reader = csv.reader(f)
+            first = next(reader, None)
+            if first is None:
+                return
+
+            header = [cell.strip().lower() for cell in first]
+            path_col, anchor_col = 0, 1
+            if any(cell in PATH_HEADERS for cell in header):
+                path_col = next(n for n, cell in enumerate(header) if cell in PATH_HEADERS)
+                anchor_col = next((n for n, cell in enumerate(header) if cell in ANCHOR_HEADERS), None)
+                first = None
+
+            for row in (reader if first is None else _prepend(first, reader)):
+                if len(row) <= path_col or not row[path_col]:
+                    continue
+                anchor = row[anchor_col] if anchor_col is not None and len(row) > anchor_col and row[anchor_col] else None
+                yield (row[path_col], anchor)
+
+def _prepend(row, reader):
+    yield row
+    yield from reader
+
+def _read(f, fmt, base_dir, extensions, chunk_size) -> Iterator[List[Tuple[str, Path]]]:
+    anchors = {}    # Each distinct anchor becomes one Path
+    chunk = []
+    skipped = 0
+    try:
+        for path, anchor in _entries(f, fmt):
+            if extensions is not None and os.path.splitext(path)[1][1:].lower() not in extensions:
+                skipped += 1
+                continue
+
+            path = os.path.normpath(os.path.join(base_dir, path))
+            anchor = os.path.normpath(os.path.join(base_dir, anchor)) if anchor else os.path.dirname(path)
+            anchor_path = anchors.get(anchor)
+            if anchor_path is None:
+                anchor_path = anchors[anchor] = Path(anchor)
+
+            chunk.append((path, anchor_path))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        f.close()
+        if skipped:
+            logging.warning(f"[Manifest] Skipped {skipped} entries with unsupported extensions")
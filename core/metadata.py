@@ -10,7 +10,8 @@ from data.constants import (
     AVIFENC_PATH,
     OXIPNG_PATH
 )
-from core.process import runProcess, runProcessOutput
+from core.process import runProcess
+from core.capabilities import capabilities, getExifToolPath
 from core.exceptions import GenericException, FileException
 
 class Data:
@@ -83,12 +84,12 @@ def isExifToolAvailable() -> (bool, str):
 
     match platform.system():
         case "Linux":
-            Data.exiftool_available = not "not found" in runProcessOutput("bash", "-c", "type exiftool")[1]
+            Data.exiftool_available = getExifToolPath() is not None
             if Data.exiftool_available == False:
                 Data.exiftool_err_msg = "ExifTool not found. Please install ExifTool on your system and restart the program."
         case "Windows":
-            proc_output = runProcessOutput(EXIFTOOL_PATH, "-ver")
-            if proc_output[0].strip() == "" or "assertion failed" in proc_output[1]:
+            version = capabilities.getVersion(EXIFTOOL_PATH)    # Fails with "assertion failed" when installed under a non-ASCII path
+            if not version or not version[0].isdigit():
                 Data.exiftool_available = False
                 Data.exiftool_err_msg = "Please reinstall this program in a location without special characters to use ExifTool."
             else:
@@ -0,0 +1,70 @@
+import os
+import time
+from contextlib import contextmanager
+
+from PySide6.QtCore import QMutex
+
+class _Stripe():
+    def __init__(self):
+        self.mutex = QMutex()
+
+        # Instrumentation - only modified while holding the mutex
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_time = 0.0
+        self.hold_time = 0.0
+
+class PathLocks():
+    """Striped locks for output directories.
+
+    Workers writing to different directories rarely share a lock, so they don't queue on each other.
+    The number of stripes is fixed, which keeps memory bounded regardless of how many folders a batch touches.
+
+    Usage:
+        with path_locks.locked(output_dir):
+            path = getUniqueFilePath(output_dir, name, ext)
+    """
+    def __init__(self, stripes: int = 64):
+        self.stripes = [_Stripe() for _ in range(max(1, stripes))]
+
+    def _getStripe(self, path: str) -> _Stripe:
+        key = os.path.normcase(os.path.abspath(path))
+        return self.stripes[hash(key) % len(self.stripes)]
+
+    @contextmanager
+    def locked(self, path: str):
+        """Lock the directory for the duration of the block."""
+        stripe = self._getStripe(path)
+
+        wait_start = None
+        if not stripe.mutex.tryLock():
+            wait_start = time.perf_counter()
+            stripe.mutex.lock()
+
+        hold_start = time.perf_counter()
+        stripe.acquisitions += 1
+        if wait_start is not None:
+            stripe.contended += 1
+            stripe.wait_time += hold_start - wait_start
+
+        try:
+            yield
+        finally:
+            stripe.hold_time += time.perf_counter() - hold_start
+            stripe.mutex.unlock()
+
+    def getStats(self) -> dict:
+        """Returns contention statistics summed over all stripes. Reading them is not synchronized."""
+        return {
+            "acquisitions": sum(s.acquisitions for s in self.stripes),
+            "contended": sum(s.contended for s in self.stripes),
+            "wait_time": sum(s.wait_time for s in self.stripes),
+            "hold_time": sum(s.hold_time for s in self.stripes),
+        }
+
+    def resetStats(self):
+        for s in self.stripes:
+            s.acquisitions = 0
+            s.contended = 0
+            s.wait_time = 0.0
+            s.hold_time = 0.0
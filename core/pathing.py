@@ -1,11 +1,104 @@
 import re
 import random
 import os
+import threading
 from pathlib import Path
 import logging
 
 from core.exceptions import GenericException
 
+class _IndexedDir():
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.seeded = False
+        self.names = set()      # normcase(name)
+        self.counters = {}      # (prefix, suffix): next number to try
+
+class NameIndex():
+    """In-memory index of file names taken in output directories. Used by getUniqueFilePath during a batch.
+
+    Each directory is listed once with os.scandir. Names handed out afterwards are recorded,
+    so repeated calls for the same name continue from the last assigned number instead of probing every suffix.
+    A single disk probe per handed-out name catches files created outside of the batch.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.dirs = {}
+        self.lock = threading.Lock()
+
+    def start(self):
+        """Call before starting a batch. Clears the index."""
+        with self.lock:
+            self.dirs = {}
+            self.enabled = True
+
+    def stop(self):
+        """Call after a batch is finished. Frees the index."""
+        with self.lock:
+            self.dirs = {}
+            self.enabled = False
+
+    def isEnabled(self) -> bool:
+        return self.enabled
+
+    def _getDir(self, output_dir: str) -> _IndexedDir:
+        key = os.path.normcase(os.path.abspath(output_dir))
+        with self.lock:
+            indexed_dir = self.dirs.get(key)
+            if indexed_dir is None:
+                indexed_dir = _IndexedDir()
+                self.dirs[key] = indexed_dir
+        return indexed_dir
+
+    def _seed(self, output_dir: str, indexed_dir: _IndexedDir):
+        """Call while holding indexed_dir.lock."""
+        try:
+            with os.scandir(output_dir) as entries:
+                for entry in entries:
+                    indexed_dir.names.add(os.path.normcase(entry.name))
+        except OSError:
+            pass    # Directory doesn't exist yet
+        indexed_dir.seeded = True
+
+    def _isTaken(self, output_dir: str, indexed_dir: _IndexedDir, name: str) -> bool:
+        key = os.path.normcase(name)
+        if key in indexed_dir.names:
+            return True
+        if os.path.isfile(os.path.join(output_dir, name)):   # Created outside of the batch
+            indexed_dir.names.add(key)
+            return True
+        return False
+
+    def reserve(self, output_dir: str, first_name: str, prefix: str, suffix: str, n: int) -> str:
+        """Reserve and return the first free name. Tries `first_name`, then `{prefix}({n}){suffix}`, `{prefix}({n + 1}){suffix}` and so on."""
+        indexed_dir = self._getDir(output_dir)
+        with indexed_dir.lock:
+            if not indexed_dir.seeded:
+                self._seed(output_dir, indexed_dir)
+
+            name = first_name
+            if self._isTaken(output_dir, indexed_dir, name):
+                n = max(n, indexed_dir.counters.get((prefix, suffix), n))
+                name = f"{prefix}({n}){suffix}"
+                while self._isTaken(output_dir, indexed_dir, name):
+                    n += 1
+                    name = f"{prefix}({n}){suffix}"
+                indexed_dir.counters[(prefix, suffix)] = n + 1
+
+            indexed_dir.names.add(os.path.normcase(name))
+        return os.path.join(output_dir, name)
+
+    def release(self, path: str):
+        """Forget a reserved name, e.g. after deleting the file."""
+        if not self.enabled:
+            return
+
+        indexed_dir = self._getDir(os.path.dirname(path))
+        with indexed_dir.lock:
+            indexed_dir.names.discard(os.path.normcase(os.path.basename(path)))
+
+name_index = NameIndex()    # Module-wide, shared by all workers
+
 def getUniqueFilePath(output_dir: str, file_name: str, file_ext: str, add_rnd = False):
     """
     Get a unique file name within a directory.
@@ -27,6 +120,9 @@ def getUniqueFilePath(output_dir: str, file_name: str, file_ext: str, add_rnd =
     spacing = "" if strip_p else " "											# Add spacing to files without parenthesis
     new_file_name = file_name[:-len(prev.group(0))] if strip_p else file_name	# Strip parenthesis
 
+    if name_index.isEnabled():
+        return name_index.reserve(output_dir, f"{file_name}{rnd_str}.{file_ext}", f"{new_file_name}{spacing}", f"{rnd_str}.{file_ext}", n)
+
     while os.path.isfile(path):
         path = os.path.join(output_dir,f"{new_file_name}{spacing}({n}){rnd_str}.{file_ext}")
         n += 1
@@ -0,0 +1,88 @@
+import os
+import ctypes
+import logging
+import platform
+import subprocess
+
+# Execution classes, as shown in the settings
+NORMAL = "Normal"
+BACKGROUND = "Background"
+BACKGROUND_IDLE = "Background (Idle Scheduler)"
+EXECUTION_CLASSES = (NORMAL, BACKGROUND, BACKGROUND_IDLE)
+
+BACKGROUND_NICE = 10
+BACKGROUND_IDLE_NICE = 19
+
+# linux/ioprio.h
+IOPRIO_WHO_PROCESS = 1
+IOPRIO_CLASS_IDLE = 3
+IOPRIO_CLASS_SHIFT = 13
+_IOPRIO_SET_SYSCALLS = {
+    "x86_64": 251,
+    "i386": 289,
+    "i686": 289,
+    "aarch64": 30,
+    "riscv64": 30,
+    "armv7l": 314,
+    "ppc64le": 273,
+}
+
+class Data:
+    execution_class = NORMAL
+    syscall = None      # Resolved once, not per child
+    syscall_nr = None
+
+def setExecutionClass(execution_class: str):
+    """Applies to every child started by runProcess from now on."""
+    if execution_class not in EXECUTION_CLASSES:
+        logging.error(f"[Priority] Execution class not recognized ({execution_class})")
+        execution_class = NORMAL
+
+    if execution_class != NORMAL and platform.system() == "Linux" and Data.syscall is None:
+        try:
+            Data.syscall = ctypes.CDLL(None, use_errno=True).syscall
+            Data.syscall_nr = _IOPRIO_SET_SYSCALLS.get(platform.machine())
+        except (OSError, AttributeError) as e:
+            logging.error(f"[Priority] Cannot set I/O priority. {e}")
+
+    Data.execution_class = execution_class
+
+def getExecutionClass() -> str:
+    return Data.execution_class
+
+def isBackground() -> bool:
+    return Data.execution_class != NORMAL
+
+def getCreationFlags() -> int:
+    """Priority class for Windows children."""
+    if os.name != "nt":
+        return 0
+
+    if Data.execution_class == BACKGROUND:
+        return subprocess.BELOW_NORMAL_PRIORITY_CLASS
+    elif Data.execution_class == BACKGROUND_IDLE:
+        return subprocess.IDLE_PRIORITY_CLASS
+    return 0
+
+def lowerPriority():
+    """Lower CPU and I/O priority of the calling thread, children started from it inherit them. See core.process.
+
+    Errors are ignored, a child with normal priority is better than a failed conversion.
+    """
+    if os.name == "nt":
+        return
+
+    idle = Data.execution_class == BACKGROUND_IDLE
+    try:
+        os.nice(BACKGROUND_IDLE_NICE if idle else BACKGROUND_NICE)
+    except OSError:
+        pass
+
+    if Data.syscall is not None and Data.syscall_nr is not None:
+        Data.syscall(Data.syscall_nr, IOPRIO_WHO_PROCESS, 0, IOPRIO_CLASS_IDLE << IOPRIO_CLASS_SHIFT)
+
+    if idle and hasattr(os, "SCHED_IDLE"):
+        try:
+            os.sched_setscheduler(0, os.SCHED_IDLE, os.sched_param(0))
+        except OSError:
+            pass
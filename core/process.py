@@ -1,6 +1,10 @@
 import subprocess
 import os
 import logging
+import threading
+
+from core.affinity import placement
+import core.priority as priority
 
 def _getStartupInfo():
     """Get startup info for Windows. Prevents console window from showing."""
@@ -11,11 +15,58 @@ def _getStartupInfo():
         startupinfo.wShowWindow = subprocess.SW_HIDE
     return startupinfo
 
+def _spawn(cmd, cwd=None) -> subprocess.Popen:
+    """Start a child pinned to the CPUs assigned to the calling worker (see CorePlacement), with the execution class applied.
+
+    On Linux affinity and priority are per thread and inherited at fork. They're set on a short-lived thread that starts the child,
+    so every thread of the child gets them and the worker thread stays untouched (a lowered priority cannot be raised back).
+    Not a preexec_fn, running Python between fork and exec can deadlock in a threaded process and rules out the vfork / posix_spawn fast path.
+    """
+    cpus = placement.getThreadCpus()        # Thread-local, read on the worker
+    lower_priority = priority.isBackground() and os.name != "nt"
+
+    def popen():
+        return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=_getStartupInfo(), creationflags=priority.getCreationFlags(), cwd=cwd)
+
+    if cpus is None and not lower_priority:
+        return popen()
+
+    result = {}
+    def spawn():
+        if cpus is not None:
+            try:
+                os.sched_setaffinity(0, cpus)
+            except OSError as e:
+                logging.error(f"[runProcess] Failed to set CPU affinity. {e}")
+        if lower_priority:
+            priority.lowerPriority()
+        try:
+            result["process"] = popen()
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=spawn, name="Spawner", daemon=True)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["process"]
+
+def _run(cmd, cwd=None) -> subprocess.CompletedProcess:
+    """subprocess.run() through _spawn()."""
+    with _spawn(cmd, cwd) as process:
+        try:
+            stdout, stderr = process.communicate()
+        except BaseException:
+            process.kill()
+            raise
+    return subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
+
 def runProcess(*cmd, cwd=None):
     """Run process."""
     logging.info(f"[runProcess] {cmd}")
 
-    process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=_getStartupInfo(), cwd=cwd)
+    process = _run(cmd, cwd=cwd)
     
     try:
         if process.stdout:
@@ -32,7 +83,7 @@ def runProcessOutput(*cmd, cwd=None) -> (str, str):
     """
     logging.info(f"[runProcessOutput] {cmd}")
 
-    process = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=_getStartupInfo(), cwd=cwd)
+    process = _run(cmd, cwd=cwd)
 
     try:
         stdout, stderr = "", ""
@@ -1,11 +1,6 @@
 import os
 import logging
 
-from PySide6.QtCore import (
-    QMutexLocker,
-    QMutex,
-)
-
 from data.constants import (
     ALLOWED_INPUT_CJXL,
     ALLOWED_INPUT_CJPEGLI,
@@ -13,6 +8,7 @@ from data.constants import (
     ALLOWED_INPUT_IMAGE_MAGICK,
 )
 from core.pathing import getUniqueFilePath
+from core.path_locks import PathLocks
 from core.convert import convert, getDecoder
 from core.exceptions import FileException
 
@@ -58,9 +54,9 @@ class Proxy():
         
         return True
 
-    def generate(self, src: str, src_ext: str, dst_dir: str, file_name: str, n: int, mutex: QMutex) -> str:
+    def generate(self, src: str, src_ext: str, dst_dir: str, file_name: str, n: int, path_locks: PathLocks) -> str:
         """Generate a proxy image."""
-        with QMutexLocker(mutex):
+        with path_locks.locked(dst_dir):
             self.proxy_path = getUniqueFilePath(dst_dir, file_name, "png", True)
     
         convert(getDecoder(src_ext), src, self.proxy_path, [], n)
@@ -0,0 +1,208 @@
+import os
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from PySide6.QtCore import Qt, QThreadPool
+
+from core.worker import Worker
+from core.path_locks import PathLocks
+from core.pathing import name_index
+from core.fs_cache import dir_cache
+from core.archive_sink import archive_sink
+from core.archive_source import archive_source, listArchive
+from core.affinity import placement
+from core.conversion_cache import conversion_cache
+from core.dedup import duplicates, getSizes
+import core.priority as priority
+from core.utils import walkDir
+from data.constants import ALLOWED_INPUT, ALLOWED_ARCHIVES
+from data.job_table import Job
+from data.thread_manager import ThreadManager
+from core.calibration import ThreadProfile
+import data.task_status as task_status
+
+# Runs the Worker pipeline without the GUI. Used by the headless entry point and the distributed worker daemon.
+
+def collectItems(paths: List[str], scan_filter = None) -> List[Tuple]:
+    """Turn files, folders and archives into (abs_path, anchor_path) items. Mirrors FileView.dropEvent.
+    Archive members are (abs_path, anchor_path, size, mtime_ns), they can't be stat'ed.
+
+    scan_filter - core.scan_filter.ScanFilter, applied while walking
+    """
+    items = []
+    preserve_parent = len(paths) > 1
+
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            anchor_path = Path(path).parent if preserve_parent else Path(path)
+            try:
+                chunks = walkDir(path, ALLOWED_INPUT, scan_filter=scan_filter)
+            except FileNotFoundError as e:
+                logging.error(f"[Runner] Directory not found. {e}")
+                continue
+
+            for chunk in chunks:
+                items.extend((Path(file), anchor_path) for file in chunk)
+        elif os.path.isfile(path):
+            ext = Path(path).suffix[1:].lower()
+            if ext in ALLOWED_INPUT:
+                if scan_filter is None or scan_filter.matches(path):
+                    items.append((Path(path), Path(path).parent))
+            elif ext in ALLOWED_ARCHIVES:
+                items.extend(collectArchive(path, scan_filter))
+        else:
+            logging.error(f"[Runner] Path not found ({path})")
+
+    return items
+
+def collectArchive(path: str, scan_filter = None) -> List[Tuple[Path, Path, int, int]]:
+    """Members of an archive as items, see collectItems()."""
+    items = []
+    anchor_path = Path(path)
+    try:
+        for chunk in listArchive(path):
+            for member, size, mtime_ns in chunk:
+                if scan_filter is None or (scan_filter.matchesPath(member) and (not scan_filter.needsStat() or scan_filter.matchesStat(size, mtime_ns))):
+                    items.append((Path(member), anchor_path, size, mtime_ns))
+    except OSError as e:
+        logging.error(f"[Runner] {e}")
+    return items
+
+def runItem(
+        n: int,
+        abs_path: Path,
+        anchor_path: Path,
+        params: Dict,
+        settings: Dict,
+        available_threads: int,
+        path_locks: PathLocks
+    ) -> Dict:
+    """Convert a single item in the calling thread.
+
+    Returns:
+        {"n": int, "status": "completed" | "canceled", "exceptions": [[id, msg, file_name], ...]}
+    """
+    result = {"n": n, "status": None, "exceptions": []}
+
+    worker = Worker(n, Job.fromPath(abs_path, Path(anchor_path)), params, settings, available_threads, path_locks)
+    worker.setAutoDelete(False)
+    worker.signals.completed.connect(lambda _: result.update(status="completed"), Qt.DirectConnection)
+    worker.signals.canceled.connect(lambda _: result.update(status="canceled"), Qt.DirectConnection)
+    worker.signals.exception.connect(lambda *exc: result["exceptions"].append(list(exc)), Qt.DirectConnection)
+    worker.run()
+
+    return result
+
+_units_lock = threading.Lock()
+_running_units = 0
+
+@contextmanager
+def unitState():
+    """Name index and directory cache, shared by the units (or items) running at the same time.
+
+    Reset once none are running, so long-lived callers (worker daemons, the watcher) don't keep stale state.
+    """
+    global _running_units
+    with _units_lock:
+        if _running_units == 0:
+            name_index.start()
+            dir_cache.start()
+        _running_units += 1
+    try:
+        yield
+    finally:
+        with _units_lock:
+            _running_units -= 1
+            if _running_units == 0:
+                name_index.stop()
+                dir_cache.stop()    # Folders removed between runs get created again
+
+@contextmanager
+def batchState(settings: Dict, items: List[Tuple[Path, Path]] = (), params: Dict | None = None, unit_scoped: bool = False):
+    """Module-level state shared by the workers of a batch. Mirrors MainWindow.convert().
+
+    `items` - the whole batch, needed to find duplicates
+    `params` - needed for archive output
+    `unit_scoped` - the caller wraps each item in unitState() instead of keeping it for the whole batch
+    """
+    task_status.reset()
+    priority.setExecutionClass(settings.get("execution_class", priority.NORMAL))
+    if settings.get("cpu_placement", False):
+        placement.start()
+    if settings.get("conversion_cache", False):
+        conversion_cache.start(settings["conversion_cache_size"])
+    if settings.get("deduplicate", False) and items:
+        duplicates.start(getSizes(abs_path for abs_path, _ in items))
+    if items:
+        archive_source.start(items)
+    if params is not None and params.get("archive_output", False):
+        archive_sink.start(params["custom_output_dir_path"], params["archive_format"], params["archive_max_size"] * 1024 ** 2)
+
+    try:
+        with nullcontext() if unit_scoped else unitState():
+            yield
+    finally:
+        stopBatchState()
+
+def stopBatchState():
+    """Stop everything batchState() and MainWindow._startConversion() start. Call once the last worker is done, also after a cancel.
+
+    Removes staged duplicates and the archive scratch folder, closes the output archive.
+    """
+    name_index.stop()
+    dir_cache.stop()
+    placement.stop()
+    conversion_cache.stop()
+    duplicates.stop()
+    archive_sink.stop()     # After the workers, waits for the writer
+    archive_source.stop()
+
+def runItems(
+        items: List[Tuple[Path, Path]],
+        params: Dict,
+        settings: Dict,
+        threads: int,
+        on_result: Callable[[Dict], None] | None = None,
+    ) -> List[Dict]:
+    """Convert items with a pool of `threads` workers. Blocks until finished."""
+    if not items:
+        return []
+
+    thread_manager = ThreadManager(QThreadPool(), ThreadProfile())
+    thread_manager.configure(params["format"], len(items), threads, settings.get("multithreading_mode", "Performance"))
+    max_workers = thread_manager.threadpool.maxThreadCount()
+    path_locks = PathLocks()
+
+    results = []
+    def collect(futures):
+        for future in futures:
+            result = future.result()
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+
+    with batchState(settings, items, params), ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+        for n, (abs_path, anchor_path) in enumerate(items):
+            if len(pending) >= max_workers * 2:     # Same bound as JobFeeder
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+
+            pending.add(executor.submit(
+                runItem,
+                n,
+                abs_path,
+                anchor_path,
+                params,
+                settings,
+                thread_manager.getAvailableThreads(n),
+                path_locks,
+            ))
+        collect(wait(pending).done)
+
+    return results
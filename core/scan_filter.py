@@ -0,0 +1,170 @@
+import os
+import re
+import time
+import logging
+from fnmatch import fnmatchcase
+from datetime import datetime
+from typing import Dict, List
+
+from core.pathing import getExtension, getOutputDir
+from core.exceptions import GenericException
+from data.job_table import Job, JobTable
+
+# Narrows a batch down before anything is queued: globs, size and modification time ranges,
+# and "only if the source is newer than its output".
+#
+# Globs are matched against the whole path with "/" separators, "*" also matches "/".
+#   "*/thumbs/*" - anything under a thumbs folder
+#   "*.png" - PNG files anywhere
+#
+# Directories that an exclude glob fully covers are not listed at all.
+
+SIZE_UNITS = {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def parseSize(value: str | int) -> int:
+    """Bytes from "500", "500K", "2M" or "1G". Raises ValueError."""
+    if isinstance(value, int):
+        return value
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmg]?)i?b?\s*", value.lower())
+    if match is None:
+        raise ValueError(f"Invalid size ({value})")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+def parseTime(value: str | float, now: float | None = None) -> float:
+    """Timestamp from an ISO date ("2024-05-01", "2024-05-01T12:00") or an age ("7d", "12h", "30m"). Raises ValueError."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"\s*(\d+)\s*([smhdw])\s*", value.lower())
+    if match is not None:
+        return (time.time() if now is None else now) - int(match.group(1)) * AGE_UNITS[match.group(2)]
+    return datetime.fromisoformat(value.strip()).timestamp()
+
+def _normalize(path: str) -> str:
+    return os.path.normcase(path).replace("\\", "/")
+
+class ScanFilter:
+    def __init__(
+            self,
+            include: List[str] = (),
+            exclude: List[str] = (),
+            min_size: int | None = None,
+            max_size: int | None = None,
+            modified_after: float | None = None,
+            modified_before: float | None = None,
+            newer_than_output: bool = False,
+        ):
+        self.include = [_normalize(pattern) for pattern in include]
+        self.exclude = [_normalize(pattern) for pattern in exclude]
+        self.min_size = min_size
+        self.max_size = max_size
+        self.modified_after = modified_after
+        self.modified_before = modified_before
+        self.newer_than_output = newer_than_output
+
+    @classmethod
+    def fromDict(cls, data: Dict | None) -> "ScanFilter":
+        """Preset format, e.g. {"exclude": ["*/thumbs/*"], "min_size": "500K", "modified_after": "7d", "newer_than_output": true}"""
+        data = data or {}
+        return cls(
+            include=data.get("include", ()),
+            exclude=data.get("exclude", ()),
+            min_size=parseSize(data["min_size"]) if data.get("min_size") is not None else None,
+            max_size=parseSize(data["max_size"]) if data.get("max_size") is not None else None,
+            modified_after=parseTime(data["modified_after"]) if data.get("modified_after") is not None else None,
+            modified_before=parseTime(data["modified_before"]) if data.get("modified_before") is not None else None,
+            newer_than_output=data.get("newer_than_output", False),
+        )
+
+    def isActive(self) -> bool:
+        return bool(self.include or self.exclude or self.needsStat() or self.newer_than_output)
+
+    def needsStat(self) -> bool:
+        return any(value is not None for value in (self.min_size, self.max_size, self.modified_after, self.modified_before))
+
+    # Walk
+    def excludesDir(self, dir_path: str) -> bool:
+        """True if every path under `dir_path` is excluded, so it doesn't need to be listed."""
+        dir_path = _normalize(dir_path).rstrip("/") + "/"
+        return any(pattern.endswith("*") and fnmatchcase(dir_path, pattern) for pattern in self.exclude)
+
+    def matchesPath(self, path: str) -> bool:
+        path = _normalize(path)
+        if self.include and not any(fnmatchcase(path, pattern) for pattern in self.include):
+            return False
+        return not any(fnmatchcase(path, pattern) for pattern in self.exclude)
+
+    def matchesStat(self, size: int, mtime_ns: int) -> bool:
+        if self.min_size is not None and size < self.min_size:
+            return False
+        if self.max_size is not None and size > self.max_size:
+            return False
+        mtime = mtime_ns / 1e9
+        if self.modified_after is not None and mtime < self.modified_after:
+            return False
+        if self.modified_before is not None and mtime >= self.modified_before:
+            return False
+        return True
+
+    def matches(self, path: str) -> bool:
+        """Globs first, a stat only if size or date ranges are set."""
+        if not self.matchesPath(path):
+            return False
+        if not self.needsStat():
+            return True
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return self.matchesStat(stat.st_size, stat.st_mtime_ns)
+
+    # Jobs
+    def isNewerThanOutput(self, job: Job, params: Dict) -> bool:
+        """True if the output doesn't exist yet or is older than the source. One stat for the output, the source was stat'd with the job."""
+        output = getExpectedOutput(job, params)
+        if output is None or job.mtime_ns < 0:
+            return True
+        try:
+            return os.stat(output).st_mtime_ns < job.mtime_ns
+        except OSError:
+            return True
+
+    def matchesJob(self, job: Job, params: Dict | None = None) -> bool:
+        if not self.matchesPath(job.abs_path):
+            return False
+        if self.needsStat() and (job.size < 0 or not self.matchesStat(job.size, job.mtime_ns)):
+            return False
+        if self.newer_than_output and params is not None and not self.isNewerThanOutput(job, params):
+            return False
+        return True
+
+    def apply(self, jobs: JobTable, params: Dict | None = None) -> JobTable:
+        """Jobs that pass, in the same table (interned directories and anchors are kept)."""
+        if not self.isActive():
+            return jobs
+        total = len(jobs)
+        jobs.jobs = [job for job in jobs if self.matchesJob(job, params)]
+        logging.info(f"[ScanFilter] Kept {len(jobs)} out of {total} items")
+        return jobs
+
+def getExpectedOutput(job: Job, params: Dict) -> str | None:
+    """Where the Worker would write the output if nothing was in the way. None if it depends on the file's contents."""
+    match params["format"]:
+        case "Lossless JPEG Recompression":
+            ext = "jxl"
+        case "JPEG Reconstruction" | "Smallest Lossless":
+            return None
+        case _:
+            try:
+                ext = getExtension(params["format"])
+            except GenericException:
+                return None
+
+    output_dir = getOutputDir(
+        job.dir,
+        job.anchor_path,
+        params["custom_output_dir"],
+        params["custom_output_dir_path"],
+        params["keep_dir_struct"],
+    )
+    return os.path.join(output_dir, f"{job.name}.{ext}")
@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Collection, Dict, Iterator, List, Tuple
+
+from core.utils import WALK_CHUNK_SIZE, listDir, walkDir
+from data.constants import CONFIG_LOCATION
+
+# Remembers directory listings, so re-adding a big tree only lists directories that changed.
+#
+# A directory's mtime changes whenever an entry is added, removed or renamed in it. Unchanged directories
+# are served from the index, which costs one stat per directory instead of a listing plus a stat per file.
+
+SCAN_INDEX_PATH = os.path.join(CONFIG_LOCATION, "scan_index.db")
+RACY_WINDOW_NS = 2 * 1_000_000_000     # Coarse timestamps (FAT, SMB) can hide changes made right after listing
+
+class ScanIndex:
+    def __init__(self, path: str = SCAN_INDEX_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = None
+        self.stats = {"listed": 0, "cached": 0}
+
+    def _connect(self):
+        if self.conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.conn = sqlite3.connect(self.path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER, files TEXT, subdirs TEXT)")
+        return self.conn
+
+    def _listDir(self, path: str) -> Tuple[List[str], List[str]]:
+        return listDir(path)
+
+    def scan(self, path: str) -> List[str]:
+        """Recursively list files. Drop-in for scanDir, raises FileNotFoundError If the directory was not found."""
+        return [file for chunk in self.walk(path) for file in chunk]
+
+    def walk(self, path: str, extensions: Collection[str] | None = None, chunk_size: int = WALK_CHUNK_SIZE, scan_filter = None) -> Iterator[List[str]]:
+        """Same as walkDir, with unchanged directories served from the index."""
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+
+        root = os.path.abspath(path)
+        cached = self._load(root)
+        stats = {"listed": 0, "cached": 0}
+        updates = []
+        removed = []
+        stats_lock = threading.Lock()
+
+        def listDirCached(dir_path):    # Runs on walkDir's threads for network paths
+            mtime_ns = os.stat(dir_path).st_mtime_ns
+            row = cached.get(dir_path)
+            if row is not None and row[0] == mtime_ns:
+                with stats_lock:
+                    stats["cached"] += 1
+                return (json.loads(row[1]), json.loads(row[2]))
+
+            names, subdirs = self._listDir(dir_path)
+            racy = time.time_ns() - mtime_ns < RACY_WINDOW_NS
+            with stats_lock:
+                stats["listed"] += 1
+                updates.append((dir_path, -1 if racy else mtime_ns, json.dumps(names), json.dumps(subdirs)))
+                if row is not None:
+                    removed.extend(os.path.join(dir_path, name) for name in set(json.loads(row[2])) - set(subdirs))
+            return (names, subdirs)
+
+        chunks = walkDir(root, extensions, chunk_size, list_dir=listDirCached, scan_filter=scan_filter)
+        self.stats = stats
+        return self._walk(path, chunks, stats, updates, removed)
+
+    def _walk(self, path, chunks, stats, updates, removed) -> Iterator[List[str]]:
+        count = 0
+        try:
+            for chunk in chunks:
+                count += len(chunk)
+                yield chunk
+        finally:    # Also when abandoned, what was listed so far is still valid
+            chunks.close()
+            with self.lock:
+                conn = self._getConnection()
+                if conn is not None:
+                    self._save(conn, updates, removed)
+            logging.debug(f"[ScanIndex] {path}: {count} files, listed {stats['listed']} directories, {stats['cached']} from the index")
+
+    def _getConnection(self):
+        try:
+            return self._connect()
+        except (sqlite3.Error, OSError) as e:
+            logging.error(f"[ScanIndex] Index unavailable, listing everything. {e}")
+            return None
+
+    def _load(self, root: str) -> Dict[str, Tuple]:
+        """Cached rows of `root` and everything below it, in one query."""
+        prefix = root.rstrip(os.sep) + os.sep
+        upper = prefix[:-1] + chr(ord(os.sep) + 1)
+        with self.lock:
+            conn = self._getConnection()
+            if conn is None:
+                return {}
+            try:
+                rows = conn.execute(
+                    "SELECT path, mtime_ns, files, subdirs FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                    (root, prefix, upper),
+                ).fetchall()
+            except sqlite3.Error as e:
+                logging.error(f"[ScanIndex] Failed to read the index. {e}")
+                return {}
+        return {row[0]: row[1:] for row in rows}
+
+    def _save(self, conn, updates, removed):
+        try:
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?)", updates)
+                for dir_path in removed:    # Forget removed subtrees
+                    prefix = dir_path.rstrip(os.sep) + os.sep
+                    conn.execute("DELETE FROM dirs WHERE path = ? OR substr(path, 1, ?) = ?", (dir_path, len(prefix), prefix))
+        except sqlite3.Error as e:
+            logging.error(f"[ScanIndex] Failed to update the index. {e}")
+
+    def clear(self):
+        with self.lock:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM dirs")
+            except (sqlite3.Error, OSError) as e:
+                logging.error(f"[ScanIndex] Failed to clear the index. {e}")
+
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+scan_index = ScanIndex()
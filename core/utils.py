@@ -1,23 +1,145 @@
 import shutil
 import os
 import logging
+import platform
 from pathlib import Path
-from typing import List, Any
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Collection, Iterator, List, Tuple, Any
+
+WALK_CHUNK_SIZE = 512
+NETWORK_WALK_THREADS = 8    # Listing is latency bound on network shares
+NETWORK_FS = ("nfs", "nfs4", "cifs", "smb3", "smbfs", "9p", "afs", "ceph", "glusterfs", "fuse.sshfs", "fuse.rclone")
 
 def scanDir(path: str) -> list:
     """Recursively scan a directory for files. Returns paths or raises FileNotFoundError If a directory was not found."""
+    return [file for chunk in walkDir(path) for file in chunk]
+
+def listDir(path: str) -> Tuple[List[str], List[str]]:
+    """Returns (file names, subdirectory names). Symlinked dirs are neither followed nor listed. Raises OSError.
+
+    Entry types come from the listing itself (d_type), so there's no stat per entry on most filesystems.
+    """
+    files, subdirs = [], []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif not entry.is_dir():
+                    files.append(entry.name)
+            except OSError:
+                continue
+    return (files, subdirs)
+
+def isNetworkPath(path: str) -> bool:
+    """Best effort, True for UNC paths and network mounts."""
+    path = os.path.abspath(path)
+    if platform.system() == "Windows":
+        return path.startswith("\\\\")
+
+    try:
+        with open("/proc/mounts", "r") as f:
+            mounts = [line.split() for line in f]
+    except OSError:
+        return False
+
+    # Longest mount point containing the path
+    best, best_fs = "", None
+    for fields in mounts:
+        if len(fields) < 3:
+            continue
+        mount_point = fields[1].replace("\\040", " ")
+        if os.path.commonpath([path, mount_point]) == mount_point and len(mount_point) > len(best):
+            best, best_fs = mount_point, fields[2]
+    return best_fs in NETWORK_FS
+
+def walkDir(
+        path: str,
+        extensions: Collection[str] | None = None,
+        chunk_size: int = WALK_CHUNK_SIZE,
+        threads: int | None = None,
+        list_dir: Callable[[str], Tuple[List[str], List[str]]] = listDir,
+        scan_filter = None,
+    ) -> Iterator[List[str]]:
+    """Recursively list files, yielding lists of up to `chunk_size` absolute paths.
+
+    Params:
+        extensions - only keep files with these (lowercase) extensions, e.g. ALLOWED_INPUT
+        threads - subdirectories listed concurrently, by default more than one only on network filesystems
+        list_dir - returns (file names, subdirectory names), see listDir()
+        scan_filter - core.scan_filter.ScanFilter, excluded subdirectories aren't listed
+
+    Raises FileNotFoundError If the directory was not found, before anything is listed.
+    """
     if not os.path.exists(path):
         raise FileNotFoundError(path)
+    if threads is None:
+        threads = NETWORK_WALK_THREADS if isNetworkPath(path) else 1
+    if extensions is not None:
+        extensions = frozenset(extensions)
+
+    if scan_filter is not None and not scan_filter.isActive():
+        scan_filter = None
+
+    return _walk(os.path.abspath(path), extensions, max(chunk_size, 1), threads, list_dir, scan_filter)
+
+def _walk(root, extensions, chunk_size, threads, list_dir, scan_filter) -> Iterator[List[str]]:
+    def safeListDir(dir_path):
+        try:
+            return list_dir(dir_path)
+        except OSError as e:
+            logging.error(f"[walkDir] Cannot list {dir_path}. {e}")
+            return ([], [])
+
+    executor = ThreadPoolExecutor(threads, thread_name_prefix="walkDir") if threads > 1 else None
+    def enqueue(dir_path):
+        pending.append((dir_path, executor.submit(safeListDir, dir_path) if executor else None))
+
+    pending = deque()   # Breadth-first, listings run ahead on the executor
+    chunk = []
+    try:
+        enqueue(root)
+        while pending:
+            dir_path, future = pending.popleft()
+            names, subdirs = future.result() if future else safeListDir(dir_path)
+
+            for name in subdirs:
+                subdir_path = os.path.join(dir_path, name)
+                if scan_filter is None or not scan_filter.excludesDir(subdir_path):
+                    enqueue(subdir_path)
 
-    files = []
-    for i in Path(path).rglob("*"):
-        if os.path.isdir(i) == False:
-            files.append(os.path.abspath(i))    # Convert POSIX path to str
-    return files
+            for name in names:
+                if extensions is not None and os.path.splitext(name)[1][1:].lower() not in extensions:
+                    continue
+                file_path = os.path.join(dir_path, name)
+                if scan_filter is not None and not scan_filter.matches(file_path):
+                    continue
+                chunk.append(file_path)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+        if chunk:
+            yield chunk
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
 def removeDuplicates(data: List[Any]):
+    """Keeps the first occurrence. Unhashable values (e.g. lists) are compared one by one."""
     new_data = []
-    [new_data.append(n) for n in data if n not in new_data]
+    seen = set()
+    unhashable = []
+    for n in data:
+        try:
+            if n in seen:
+                continue
+            seen.add(n)
+        except TypeError:
+            if n in unhashable:
+                continue
+            unhashable.append(n)
+        new_data.append(n)
     return new_data
 
 def listToFilter(title: str, ext: List[str]):
@@ -0,0 +1,318 @@
+import os
+import time
+import errno
+import select
+import ctypes
+import ctypes.util
+import sqlite3
+import struct
+import logging
+import platform
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+
+from PySide6.QtCore import QThreadPool
+
+from core.runner import runItem, batchState, unitState
+from core.path_locks import PathLocks
+from core.utils import walkDir
+from data.constants import ALLOWED_INPUT, CONFIG_LOCATION
+from data.thread_manager import ThreadManager
+from core.calibration import ThreadProfile
+
+# Hot folder mode. New files in the watched trees are converted with a preset as soon as they're fully written.
+#
+# Files are picked up from inotify events (IN_CLOSE_WRITE, IN_MOVED_TO), then held back until they stay unchanged
+# for a while. Converted inputs are remembered (path, size, mtime), so a restart only converts what's new.
+
+STATE_PATH = os.path.join(CONFIG_LOCATION, "watch_state.db")
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct("iIII")    # wd, mask, cookie, len
+
+class Inotify:
+    """Recursive inotify watch. Linux only, raises OSError elsewhere."""
+    def __init__(self):
+        if platform.system() != "Linux":
+            raise OSError(errno.ENOSYS, "Watching folders requires inotify (Linux)")
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+        self.poller = select.poll()
+        self.poller.register(self.fd, select.POLLIN)
+        self.dirs = {}      # wd -> dir
+
+    def addWatch(self, path: str) -> List[str]:
+        """Watch `path` and its subdirectories. Returns the directories that were added."""
+        added = []
+        for root, dirs, _ in os.walk(path):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if err == errno.ENOSPC:
+                    logging.error(f"[Inotify] Watch limit reached at {root}. Raise fs.inotify.max_user_watches")
+                else:
+                    logging.error(f"[Inotify] Cannot watch {root}. {os.strerror(err)}")
+                dirs.clear()
+                continue
+            self.dirs[wd] = root
+            added.append(root)
+        return added
+
+    def read(self, timeout: float) -> List[Tuple[str, int]]:
+        """Wait up to `timeout` seconds. Returns [(path, mask), ...]"""
+        if not self.poller.poll(timeout * 1000):
+            return []
+
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                events.append(("", mask))
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+
+            parent = self.dirs.get(wd)
+            if parent is None:
+                continue
+            events.append((os.path.join(parent, os.fsdecode(name)) if name else parent, mask))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+class Debouncer:
+    """Holds paths back until they stop changing for `settle` seconds."""
+    def __init__(self, settle: float, clock: Callable[[], float] = time.monotonic):
+        self.settle = settle
+        self.clock = clock
+        self.pending = {}   # path -> (last event, size)
+
+    def touch(self, path: str):
+        self.pending[path] = (self.clock(), self._getSize(path))
+
+    def popReady(self) -> List[str]:
+        now = self.clock()
+        ready = []
+        for path, (last, size) in list(self.pending.items()):
+            if now - last < self.settle:
+                continue
+
+            current = self._getSize(path)
+            if current is None:             # Deleted or renamed (temp files)
+                del self.pending[path]
+            elif current != size:           # Still being written without closing the file
+                self.pending[path] = (now, current)
+            else:
+                del self.pending[path]
+                ready.append(path)
+        return ready
+
+    def _getSize(self, path: str) -> int | None:
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return None
+
+    def __len__(self):
+        return len(self.pending)
+
+def getStat(path: str) -> Tuple[int, int] | None:
+    """(size, mtime_ns) or None if the file is gone."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+class WatchState:
+    """Inputs that were already converted, keyed by path. A changed size or mtime makes a file new again."""
+    def __init__(self, path: str = STATE_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS processed (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER)")
+
+    def isProcessed(self, path: str) -> bool:
+        stat = getStat(path)
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime_ns FROM processed WHERE path = ?", (path,)).fetchone()
+        return row is not None and tuple(row) == stat
+
+    def markProcessed(self, path: str, stat: Tuple[int, int] | None):
+        """`stat` as (size, mtime_ns) from before the conversion, the original may be gone by now."""
+        if stat is None:
+            return
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO processed VALUES (?, ?, ?)", (path, *stat))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+def checkOutputOutsideRoots(params: Dict, roots: List[str]) -> str | None:
+    """Outputs written into a watched tree would be picked up again. Returns an error message or None."""
+    if not params.get("custom_output_dir") or not os.path.isabs(params.get("custom_output_dir_path", "")):
+        return "Watch mode requires an absolute custom output folder (custom_output_dir_path) in the preset"
+
+    output_dir = os.path.realpath(params["custom_output_dir_path"])
+    for root in roots:
+        root = os.path.realpath(root)
+        if os.path.commonpath([output_dir, root]) in (output_dir, root):
+            return f"The output folder overlaps with a watched folder ({root})"
+    return None
+
+class Watcher:
+    """Converts files as they appear in `roots`. Blocks in run() until stop() is called.
+
+    Backpressure: at most `threads * 2` items are queued, further events wait in the inotify queue.
+    """
+    def __init__(
+            self,
+            roots: List[str],
+            params: Dict,
+            settings: Dict,
+            threads: int,
+            on_result: Callable[[Dict], None] | None = None,
+            state: WatchState | None = None,
+            settle: float = 2.0,
+        ):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.params = params
+        self.settings = settings
+        self.threads = threads
+        self.on_result = on_result
+        self.state = state if state is not None else WatchState()
+        self.debouncer = Debouncer(settle)
+        self.stopped = threading.Event()
+        self.in_flight = set()
+        self.n = 0
+
+    def stop(self):
+        self.stopped.set()
+
+    def getAnchor(self, path: str) -> Path:
+        """Watched root that contains `path`, used for keep_dir_struct."""
+        for root in self.roots:
+            if os.path.commonpath([path, root]) == root:
+                return Path(root)
+        return Path(path).parent
+
+    def isCandidate(self, path: str) -> bool:
+        return (
+            Path(path).suffix[1:].lower() in ALLOWED_INPUT and
+            path not in self.in_flight and
+            not self.state.isProcessed(path)
+        )
+
+    def reconcile(self, path: str):
+        """Queue files that exist already, e.g. written while the watcher was down."""
+        try:
+            chunks = walkDir(path, ALLOWED_INPUT)
+        except FileNotFoundError:
+            return
+        for chunk in chunks:
+            for file in chunk:
+                self.debouncer.touch(file)
+
+    def _runItem(self, *args) -> Dict:
+        """runItem() with the name index and the directory cache scoped to the items in flight, see unitState().
+        A long-running watcher would otherwise never see output folders that were removed downstream.
+        """
+        with unitState():
+            return runItem(*args)
+
+    def run(self):
+        inotify = Inotify()
+        thread_manager = ThreadManager(QThreadPool(), ThreadProfile())
+        thread_manager.configure(self.params["format"], self.threads, self.threads, self.settings.get("multithreading_mode", "Performance"))
+        max_workers = thread_manager.threadpool.maxThreadCount()
+        slots = threading.BoundedSemaphore(max_workers * 2)     # Same bound as JobFeeder
+        path_locks = PathLocks()
+
+        # Watch first, then scan, so nothing falls in between
+        for root in self.roots:
+            inotify.addWatch(root)
+        for root in self.roots:
+            self.reconcile(root)
+        logging.info(f"[Watcher] Watching {len(inotify.dirs)} folders, {len(self.debouncer)} files to check")
+
+        def onDone(path, stat, future):
+            result = future.result()
+            if result["status"] == "completed" and not result["exceptions"]:    # Failed ones are retried after a restart or a change
+                self.state.markProcessed(path, stat)
+            self.in_flight.discard(path)
+            slots.release()
+            if self.on_result is not None:
+                self.on_result(result)
+
+        try:
+            with batchState(self.settings, params=self.params, unit_scoped=True), ThreadPoolExecutor(max_workers=max_workers) as executor:
+                while not self.stopped.is_set():
+                    for path, mask in inotify.read(timeout=0.5):
+                        if mask & IN_Q_OVERFLOW:
+                            logging.warning("[Watcher] Event queue overflowed, rescanning")
+                            for root in self.roots:
+                                self.reconcile(root)
+                        elif mask & IN_ISDIR:
+                            if mask & (IN_CREATE | IN_MOVED_TO):
+                                for added in inotify.addWatch(path):
+                                    self.reconcile(added)
+                        elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                            self.debouncer.touch(path)
+
+                    for path in self.debouncer.popReady():
+                        if not self.isCandidate(path):
+                            continue
+                        while not slots.acquire(timeout=0.5):   # Backpressure
+                            if self.stopped.is_set():
+                                return
+
+                        stat = getStat(path)
+                        self.in_flight.add(path)
+                        future = executor.submit(
+                            self._runItem,
+                            self.n,
+                            Path(path),
+                            self.getAnchor(path),
+                            self.params,
+                            self.settings,
+                            thread_manager.getAvailableThreads(self.n),
+                            path_locks,
+                        )
+                        future.add_done_callback(lambda f, path=path, stat=stat: onDone(path, stat, f))
+                        self.n += 1
+        finally:
+            inotify.close()
@@ -1,6 +1,6 @@
 import os
-import shutil
 import copy
+import logging
 from pathlib import Path
 from typing import Dict
 import platform
@@ -10,8 +10,6 @@ from PySide6.QtCore import (
     QObject,
     Signal,
     Slot,
-    QMutexLocker,
-    QMutex,
 )
 from send2trash import send2trash
 
@@ -26,14 +24,23 @@ from data.constants import (
 )
 
 from core.proxy import Proxy
-from core.pathing import getUniqueFilePath, getExtension, getOutputDir
+from core.path_locks import PathLocks
+from core.affinity import placement
+from core.conversion_cache import conversion_cache, hashFile
+from core.journal import job_journal
+from core.dedup import duplicates
+from core.pathing import getUniqueFilePath, getExtension, getOutputDir, name_index
 from core.convert import convert, getDecoder, getDecoderArgs, getExtensionJxl, optimize
 from core.downscale import downscale, decodeAndDownscale
 import core.metadata as metadata
 import data.task_status as task_status
 from core.exceptions import CancellationException, GenericException, FileException
 import core.conflicts as conflicts
-from core.utils import getFreeSpaceLeft
+from core.fs_cache import StatCache
+from core.archive_sink import archive_sink
+from core.archive_source import archive_source
+from data.job_table import Job
+from data.concurrency_controller import getWorkUnits
 
 class Signals(QObject):
     started = Signal(int)
@@ -44,12 +51,12 @@ class Signals(QObject):
 class Worker(QRunnable):
     def __init__(self,
             n: int,
-            abs_path: Path,
-            anchor_path: Path,
+            job: Job,
             params: Dict,
             settings: Dict,
             available_threads: int,
-            mutex: QMutex
+            path_locks: PathLocks,
+            measure_units: bool = False,
         ):
         super().__init__()
         self.signals = Signals()
@@ -58,35 +65,49 @@ class Worker(QRunnable):
 
         # Convert modules
         self.proxy = Proxy()
+        self.fs = StatCache()       # Filesystem calls of this job
 
         # Threading
         self.n = n  # Thread number
         self.available_threads = available_threads
-        self.mutex = mutex
+        self.path_locks = path_locks
         
         # Item info - always points to the original file
-        self.org_item_abs_path = str(abs_path)         # path -> str cast is done for legacy reasons
+        self.job = job      # Shared with the batch, read-only
+        self.org_item_abs_path = job.abs_path
         
         # Item info - can be (carefully) reassigned
-        self.item_name = abs_path.stem
-        self.item_ext = abs_path.suffix[1:].lower()
-        self.item_dir = str(abs_path.parent)
-        self.item_abs_path = str(abs_path)
+        self.item_name = job.name
+        self.item_ext = job.ext.lower()
+        self.item_dir = job.dir
+        self.item_abs_path = self.org_item_abs_path
 
         # Destination
         self.output = None          # tmp, gets renamed to final_output
+        self.tmp_paths = []         # Other temp files, see addTmpPaths()
         self.output_dir = None
         self.output_ext = None
         self.final_output = None 
 
         # Flags
         self.skip = False
+        self.cache_key = None
+        self.input_digest = None    # See getInputDigest()
+        self.cache_hit = False
+        self.duplicate_hit = False
         self.jpg_to_jxl_lossless = False
         self.jpeg_rec_data_found = False      # Reconstruction data found
 
+        # ConcurrencyController
+        self.measure_units = measure_units
+        self.work_units = 0         # Read once completed, see getWorkUnits()
+
         # Misc.
         self.scl_params = None
-        self.anchor_path = anchor_path        # keep_dir_struct
+        self.anchor_path = job.anchor_path    # keep_dir_struct
+        self.member = archive_source.isMember(self.org_item_abs_path)     # Inside of an archive, read from the scratch folder
+        if self.member:
+            self.item_dir, self.anchor_path = archive_source.getSourceDirs(job.dir, job.anchor_path)
     
     def logException(self, id: str, msg: str):
         self.signals.exception.emit(id, msg, str(Path(self.item_abs_path).name))
@@ -99,47 +120,100 @@ class Worker(QRunnable):
         else:
             self.signals.started.emit(self.n)
 
-        try:
-            self.runChecks()
-            self.setupConversion()
+        if self.measure_units:
+            self.work_units = getWorkUnits(self.org_item_abs_path, self.job.size)   # Measured now, the original may be deleted by the time it's completed
 
-            if self.skip:
-                self.signals.completed.emit(self.n)
-                return
+        with placement.pinned(self.available_threads):     # No-op unless CPU placement is enabled
+            try:
+                self.openSource()
+                self.runChecks()
+                self.setupConversion()
+
+                if self.skip:
+                    job_journal.markCompleted(self.n, self.final_output)
+                    self.signals.completed.emit(self.n)
+                    return
+                job_journal.markStarted(self.n, self.getTmpPaths())
             
-            match self.params["format"]:
-                case "Lossless JPEG Recompression":
-                    self.losslesslyRecompressJPEG()
-                case "JPEG Reconstruction":
-                    self.reconstructJPEG()
-                case "Smallest Lossless":
-                    self.smallestLossless()
-                case _:
-                    self.convert()
+                if not (self.cache_hit or self.duplicate_hit):
+                    match self.params["format"]:
+                        case "Lossless JPEG Recompression":
+                            self.losslesslyRecompressJPEG()
+                        case "JPEG Reconstruction":
+                            self.reconstructJPEG()
+                        case "Smallest Lossless":
+                            self.smallestLossless()
+                        case _:
+                            self.convert()
             
-            self.finishConversion()
-            self.postConversionRoutines()
-        except CancellationException:
-            self.signals.canceled.emit(self.n)
-            return
-        except (GenericException, FileException) as err:
-            self.logException(err.id, err.msg)
+                self.finishConversion()
+                self.postConversionRoutines()
+            except CancellationException:
+                self.signals.canceled.emit(self.n)
+                return
+            except (GenericException, FileException) as err:
+                self.logException(err.id, err.msg)
+                job_journal.markFailed(self.n)
+                self.signals.completed.emit(self.n)
+                return
+            except OSError as err:
+                self.logException("OSError", str(err))
+                job_journal.markFailed(self.n)
+                self.signals.completed.emit(self.n)
+                return
+            except Exception as err:
+                self.logException("Exception", str(err))
+                job_journal.markFailed(self.n)
+                self.signals.completed.emit(self.n)
+                return
+            finally:
+                duplicates.release(self.n)     # Identical items wait for it
+                if self.member:
+                    archive_source.release(self.job.abs_path)
+                logging.debug(f"[Worker] {self.org_item_abs_path}: {self.fs.getCallCount()} filesystem calls {dict(self.fs.calls)}")
+
+            job_journal.markCompleted(self.n, self.final_output)
             self.signals.completed.emit(self.n)
+    
+    def getInputDigest(self) -> str:
+        """hashFile() of the input, shared by deduplication and the conversion cache so it's read once. Raises OSError."""
+        if self.input_digest is None:
+            self.input_digest = hashFile(self.org_item_abs_path)
+        return self.input_digest
+
+    def getTmpPaths(self):
+        """Files that are left behind if the conversion is interrupted."""
+        paths = [self.output, *self.tmp_paths]
+        if self.proxy.proxyExists():
+            paths.append(self.proxy.getPath())
+        return paths
+
+    def addTmpPaths(self, *paths: str):
+        """Record temp files created after the job was started in the journal. Call before they're written."""
+        self.tmp_paths.extend(paths)
+        if job_journal.isEnabled():
+            job_journal.markStarted(self.n, self.getTmpPaths())
+
+    def openSource(self):
+        """Archive members are copied to the scratch folder by the readahead, wait for this one."""
+        if not self.member:
             return
+
+        try:
+            path = archive_source.acquire(self.job.abs_path, task_status.wasCanceled)
+        except FileNotFoundError:
+            raise FileException("C0", "File not found")
         except OSError as err:
-            self.logException("OSError", str(err))
-            self.signals.completed.emit(self.n)
-            return
-        except Exception as err:
-            self.logException("Exception", str(err))
-            self.signals.completed.emit(self.n)
-            return
+            raise FileException("A0", f"Failed to read from the archive. {err}")
+        if path is None:
+            raise CancellationException()
+
+        self.org_item_abs_path = path
+        self.item_abs_path = path
 
-        self.signals.completed.emit(self.n)
-    
     def runChecks(self):
         # Input was moved / deleted
-        if os.path.isfile(self.org_item_abs_path) == False:
+        if self.fs.isfile(self.org_item_abs_path) == False:
             raise FileException("C0", "File not found")
 
         # Compatibility
@@ -164,18 +238,18 @@ class Worker(QRunnable):
         )
 
         try:
-            os.makedirs(self.output_dir, exist_ok=True)
+            self.fs.makedirs(self.output_dir)
         except OSError as err:
             raise FileException("S0", f"Failed to create output directory. {err}")
 
         # Check available space left
         try:
-            input_size = os.path.getsize(self.org_item_abs_path)
+            input_size = self.fs.getsize(self.org_item_abs_path)
         except OSError as e:
             raise FileException("S1", f"Geting file size failed. {e}")
 
         buffer_space = 10 * 1024 ** 2
-        free_space_left = getFreeSpaceLeft(self.output_dir)
+        free_space_left = self.fs.getFreeSpace(self.output_dir)
         if free_space_left <= input_size * 2 + buffer_space and free_space_left != -1:
             raise FileException("S2", "No space left on device.")
 
@@ -196,17 +270,42 @@ class Worker(QRunnable):
             self.output_ext = getExtension(self.params["format"])
         
         # Assign output path
-        with QMutexLocker(self.mutex):
+        with self.path_locks.locked(self.output_dir):
             self.output = getUniqueFilePath(self.output_dir, self.item_name, self.output_ext, True)
         
         self.final_output = os.path.join(self.output_dir, f"{self.item_name}.{self.output_ext}")
 
         # Skip If needed
         if self.params["if_file_exists"] == "Skip":
-            if os.path.isfile(self.final_output) and self.params["format"] != "Smallest Lossless":
+            if self.params["format"] != "Smallest Lossless" and self.fs.isfile(self.final_output):
                 self.skip = True
                 return
 
+        # Reuse the output of an identical item
+        if duplicates.isEnabled() and duplicates.isSupported(self.params["format"]):
+            try:
+                is_duplicate = duplicates.register(self.n, self.org_item_abs_path, self.getInputDigest)
+            except OSError as err:
+                raise FileException("S6", f"Failed to read input. {err}")
+
+            if is_duplicate:
+                if duplicates.fetch(self.n, self.output, not self.params["misc"]["attributes"], task_status.wasCanceled):
+                    self.duplicate_hit = True
+                    return
+                if task_status.wasCanceled():
+                    raise CancellationException()
+
+        # Reuse a cached result
+        if conversion_cache.isEnabled() and conversion_cache.isSupported(self.params["format"]):
+            try:
+                self.cache_key = conversion_cache.getKey(self.org_item_abs_path, self.item_ext, self.params, self.settings, self.getInputDigest)
+            except OSError as err:
+                raise FileException("S6", f"Failed to read input. {err}")
+
+            if conversion_cache.fetch(self.cache_key, self.output):
+                self.cache_hit = True
+                return
+
         # Create Proxy
         if self.proxy.isProxyNeeded(
             self.params["format"],
@@ -214,7 +313,7 @@ class Worker(QRunnable):
             self.settings["jpg_encoder"] == "JPEGLI",
             self.params["downscaling"]["enabled"]
         ):
-            self.item_abs_path = self.proxy.generate(self.item_abs_path, self.item_ext, self.output_dir, self.item_name, self.n, self.mutex)    # Redirect the source
+            self.item_abs_path = self.proxy.generate(self.item_abs_path, self.item_ext, self.output_dir, self.item_name, self.n, self.path_locks)    # Redirect the source
 
         # Setup downscaling params
         if self.params["downscaling"]["enabled"]:
@@ -346,16 +445,17 @@ class Worker(QRunnable):
                 downscale(self.scl_params)
         else:   # No downscaling
             if format == "JPEG XL" and self.params["intelligent_effort"]:
-                with QMutexLocker(self.mutex):
+                with self.path_locks.locked(self.output_dir):
                     path_e7 = getUniqueFilePath(self.output_dir, self.item_name, "jxl", True)
                     path_e9 = getUniqueFilePath(self.output_dir, self.item_name, "jxl", True)
+                self.addTmpPaths(path_e7, path_e9)
                 
                 args[1] = "-e 7"
                 convert(encoder, self.item_abs_path, path_e7, args, self.n)
 
                 if task_status.wasCanceled():
                     try:
-                        os.remove(path_e7)
+                        self.fs.remove(path_e7)
                     except OSError as err:
                         raise FileException("C1", err)
                     
@@ -365,12 +465,12 @@ class Worker(QRunnable):
                 convert(encoder, self.item_abs_path, path_e9, args, self.n)
 
                 try:
-                    if os.path.getsize(path_e9) < os.path.getsize(path_e7):
-                        os.remove(path_e7)
-                        os.rename(path_e9, self.output)
+                    if self.fs.getsize(path_e9) < self.fs.getsize(path_e7):
+                        self.fs.remove(path_e7)
+                        self.fs.rename(path_e9, self.output)
                     else:
-                        os.remove(path_e9)
-                        os.rename(path_e7, self.output)
+                        self.fs.remove(path_e9)
+                        self.fs.rename(path_e7, self.output)
                 except OSError as err:
                     raise FileException("C2", err)
             else:   # Regular conversion
@@ -397,6 +497,7 @@ class Worker(QRunnable):
                             self.output,
                             et_args,
                         )
+                        self.fs.forget(self.output)     # Size changed
                 except KeyError as e:
                     self.logException("E2", f"ExifTool mode not mapped. {e}")
 
@@ -410,83 +511,101 @@ class Worker(QRunnable):
         
         try:
             # Checks
-            if not os.path.isfile(self.output):
+            if not self.fs.isfile(self.output):
                 raise FileException("F2", "Conversion failed (output not found).")
-            if os.path.getsize(self.output) == 0:
+            if self.fs.getsize(self.output) == 0:
                 raise FileException("F3", "Conversion failed (output is empty).")
+
+            # Cache before metadata is applied, ExifTool arguments are not part of the key
+            if self.cache_key is not None and not self.cache_hit:
+                conversion_cache.store(self.cache_key, self.output)
+            if not self.duplicate_hit:
+                duplicates.publish(self.n, self.output, link=not self.params["misc"]["attributes"])
             
             # Apply metadata
             self.runExifTool()  # before getsize()
 
             # Rename / remove
-            with QMutexLocker(self.mutex):
+            copy_original = False
+            with self.path_locks.locked(self.output_dir):
                 mode = self.params["if_file_exists"]
                 
                 if self.params["format"] == "Smallest Lossless" and mode == "Skip":
-                    if os.path.isfile(self.final_output):
-                        os.remove(self.output)
+                    if self.fs.isfile(self.final_output):
+                        self.fs.remove(self.output)
                     else:
-                        os.rename(self.output, self.final_output)
+                        self.fs.rename(self.output, self.final_output)
                 else:
                     if mode == "Replace":
                         if (
                             (self.settings["keep_if_larger"] or self.settings["copy_if_larger"]) and
-                            os.path.getsize(self.org_item_abs_path) < os.path.getsize(self.output) and
-                            os.path.samefile(self.org_item_abs_path, self.final_output)
+                            self.fs.getsize(self.org_item_abs_path) < self.fs.getsize(self.output) and
+                            self.fs.samefile(self.org_item_abs_path, self.final_output)
                         ):
                             self.final_output = getUniqueFilePath(self.output_dir, self.item_name, self.output_ext, False)
                         else:
-                            if os.path.isfile(self.final_output):
-                                os.remove(self.final_output)
+                            if self.fs.isfile(self.final_output):
+                                self.fs.remove(self.final_output)
                     elif mode == "Rename" or mode == "Skip":
                         self.final_output = getUniqueFilePath(self.output_dir, self.item_name, self.output_ext, False)
                     
-                    os.rename(self.output, self.final_output)
+                    self.fs.rename(self.output, self.final_output)
 
                 # Copy original
                 if (
                     self.settings["copy_if_larger"] and
-                    os.path.getsize(self.org_item_abs_path) < os.path.getsize(self.final_output) and
+                    self.fs.getsize(self.org_item_abs_path) < self.fs.getsize(self.final_output) and
                     self.params["format"] not in ("Lossless JPEG Recompression", "JPEG Reconstruction")
                 ):
-                    os.remove(self.final_output)
+                    self.fs.remove(self.final_output)
+                    name_index.release(self.final_output)
                     self.final_output = getUniqueFilePath(self.output_dir, self.item_name, self.item_ext, False)
-                    shutil.copy(self.org_item_abs_path, self.final_output)
+                    open(self.final_output, "xb").close()   # Reserve the name, copying is done outside of the lock
+                    copy_original = True
+
+            if copy_original:
+                self.addTmpPaths(self.final_output)     # Partial copy if interrupted
+                self.fs.copy(self.org_item_abs_path, self.final_output)
         except OSError as err:
             raise FileException("F1", f"Conversion could not finish. {err}")
 
     def postConversionRoutines(self):
-        if not os.path.isfile(self.final_output):    # Checking if renaming was successful
+        if not self.fs.isfile(self.final_output):    # Checking if renaming was successful
             raise FileException("P2", "Output not found.")
 
         # Apply attributes
         try:
             if self.params["misc"]["attributes"]:
-                shutil.copystat(self.org_item_abs_path, self.final_output)
+                self.fs.copystat(self.org_item_abs_path, self.final_output)
         except OSError as err:
             raise FileException("P0", f"Failed to apply attributes. {err}")
 
         # Delete original
-        if not self.settings["keep_if_larger"] or os.path.getsize(self.org_item_abs_path) > os.path.getsize(self.final_output):
+        if not self.settings["keep_if_larger"] or self.fs.getsize(self.org_item_abs_path) > self.fs.getsize(self.final_output):
             try:
-                if self.params["delete_original"]:
+                if self.params["delete_original"] and not self.member:    # Archives are left as they are
                     if self.params["delete_original_mode"] == "To Trash":
                         send2trash(self.org_item_abs_path)
                     elif self.params["delete_original_mode"] == "Permanently":
-                        os.remove(self.org_item_abs_path)
+                        self.fs.remove(self.org_item_abs_path)
             except OSError as err:
                 raise FileException("P1", f"Failed to delete original file. {err}")
 
+        # Pack into an archive, the loose file is removed once it's written
+        if archive_sink.isEnabled():
+            archive_sink.submit(self.final_output)
+
     def smallestLossless(self):
         # Populate path pool
         path_pool = {}
-        with QMutexLocker(self.mutex):
+        with self.path_locks.locked(self.output_dir):
             for key in self.params["smallest_format_pool"]:
                 if self.params["smallest_format_pool"][key]:
                     path_pool[key] = getUniqueFilePath(self.output_dir, self.item_name, key, True)
 
         if len(path_pool) == 0:
             raise GenericException("SL0", "No formats selected.")
+        self.addTmpPaths(*path_pool.values())
 
         # Set arguments
         args = {
@@ -519,11 +638,12 @@ class Worker(QRunnable):
         for key in path_pool:
             match key:
                 case "png":
-                    try:
-                        shutil.copy(self.item_abs_path, path_pool["png"])
-                    except OSError as err:
-                        raise FileException("SL1", f"Failed to copy file. {err}")
-                    optimize(OXIPNG_PATH, path_pool["png"], args["png"], self.n)
+                    optimize(OXIPNG_PATH, self.item_abs_path, args["png"], self.n, path_pool["png"])    # Writes straight to the candidate
+                    if not self.fs.isfile(path_pool["png"]):    # Nothing written, e.g. already optimal
+                        try:
+                            self.fs.copy(self.item_abs_path, path_pool["png"])
+                        except OSError as err:
+                            raise FileException("SL1", f"Failed to copy file. {err}")
                 case "webp":
                     convert(IMAGE_MAGICK_PATH, self.item_abs_path, path_pool["webp"], args["webp"], self.n)
                 case "jxl":
@@ -537,12 +657,12 @@ class Worker(QRunnable):
         file_sizes = {}
         try:
             for key in path_pool:
-                file_sizes[key] = os.path.getsize(path_pool[key])
+                file_sizes[key] = self.fs.getsize(path_pool[key])
         except OSError as err:
             # Clean-up and exit
             try:
                 for key in path_pool:
-                    os.remove(path_pool[key])
+                    self.fs.remove(path_pool[key])
             except OSError as err:
                 raise FileException("SL3", f"Failed to delete tmp files. {err}")
             
@@ -555,7 +675,7 @@ class Worker(QRunnable):
         for key in path_pool:
             if key != sm_f_key:
                 try:
-                    os.remove(path_pool[key])
+                    self.fs.remove(path_pool[key])
                 except OSError as err:
                     raise FileException("SL4", f"Failed to delete tmp files. {err}")
 
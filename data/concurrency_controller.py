@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+from typing import Callable
+
+from core.image_header import getMegapixels
+
+def getWorkUnits(path: str, size: int = -1) -> float:
+    """Megapixels of an image. Falls back to file size in MB for formats that cannot be sniffed.
+
+    `size` - known file size, saves a stat
+    """
+    megapixels = getMegapixels(path)
+    if megapixels is not None:
+        return megapixels
+
+    if size >= 0:
+        return size / 1_000_000
+    try:
+        return os.path.getsize(path) / 1_000_000
+    except OSError:
+        return 0
+
+class ConcurrencyController:
+    """Tunes the worker count from measured throughput (hill climbing with multiplicative decrease).
+
+    Completed work is summed over sliding windows. At the end of each window throughput is compared to the previous one:
+        better    - take another step in the same direction
+        worse     - after a step up: back off multiplicatively, after a step down: turn around
+        same      - hold
+
+    The thread budget (threads slider) is split between workers, so fewer workers get more encoder threads each.
+
+    Usage:
+        controller.start(thread_budget)
+        threadpool.setMaxThreadCount(controller.getWorkerCount())
+        ...
+        if controller.addCompleted(getWorkUnits(path)):
+            threadpool.setMaxThreadCount(controller.getWorkerCount())
+    """
+    WINDOW_MIN_ITEMS = 4    # Per worker: a window lasts at least 2 completions per worker
+    WINDOW_MIN_TIME = 2     # Seconds
+    TOLERANCE = 0.05        # Relative throughput change treated as noise
+    DECREASE_FACTOR = 0.75
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.thread_budget = 1
+        self.workers = 1
+        self.direction = 1
+        self.prev_throughput = None
+        self._resetWindow()
+
+    def start(self, thread_budget: int):
+        """Call before a batch. Starts in the middle and climbs from there."""
+        self.thread_budget = max(1, thread_budget)
+        self.workers = max(1, self.thread_budget // 2)
+        self.direction = 1
+        self.prev_throughput = None
+        self._resetWindow()
+        logging.info(f"[ConcurrencyController] Starting with {self.workers} workers x {self.getThreadsPerWorker()} threads (budget: {self.thread_budget})")
+
+    def getWorkerCount(self) -> int:
+        return self.workers
+
+    def getThreadsPerWorker(self) -> int:
+        return max(1, self.thread_budget // self.workers)
+
+    def addCompleted(self, units: float) -> bool:
+        """Report a finished item. Returns True when the worker count changed."""
+        self.window_units += units
+        self.window_items += 1
+
+        elapsed = self.clock() - self.window_start
+        if self.window_items < max(self.WINDOW_MIN_ITEMS, self.workers * 2) or elapsed < self.WINDOW_MIN_TIME:
+            return False
+
+        throughput = self.window_units / elapsed
+        prev_workers = self.workers
+        decision = self._decide(throughput)
+        self.prev_throughput = throughput
+        self._resetWindow()
+
+        logging.info(
+            f"[ConcurrencyController] {throughput:.2f} MP/s with {prev_workers} workers, {decision} "
+            f"-> {self.workers} workers x {self.getThreadsPerWorker()} threads"
+        )
+        return self.workers != prev_workers
+
+    def _decide(self, throughput: float) -> str:
+        if self.prev_throughput is None:
+            decision = "probing"
+        elif throughput > self.prev_throughput * (1 + self.TOLERANCE):
+            decision = "improved"
+        elif throughput < self.prev_throughput * (1 - self.TOLERANCE):
+            if self.direction > 0:
+                self.workers = max(1, int(self.workers * self.DECREASE_FACTOR))
+                return "degraded, backing off"
+            self.direction = 1
+            decision = "degraded, turning around"
+        else:
+            return "holding"
+
+        if not 1 <= self.workers + self.direction <= self.thread_budget:
+            self.direction = -self.direction
+        self.workers = max(1, min(self.thread_budget, self.workers + self.direction))
+        return decision
+
+    def _resetWindow(self):
+        self.window_start = self.clock()
+        self.window_units = 0
+        self.window_items = 0
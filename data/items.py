@@ -1,19 +1,31 @@
+import os
 from pathlib import Path
 import logging
 
 from data.constants import ALLOWED_INPUT
+from data.job_table import Job, JobTable
 
 class Items():
     def __init__(self):
-        self.items = []
+        self.jobs = JobTable()
         self.item_count = 0
         self.completed_item_count = 0
 
-    def parseData(self, *items):
-        """Populate the structure with proper data."""
-        for abs_path, anchor_path in items:
-            abs_path = Path(abs_path)
-            ext = abs_path.suffix[1:]
+    @property
+    def items(self):
+        """[(absolute path, anchor path), ...]"""
+        return self.jobs.getItems()
+
+    def parseData(self, *items, scan_filter = None, params = None, stat = True):
+        """Populate the structure with proper data.
+
+        scan_filter - core.scan_filter.ScanFilter, "newer than output" also needs conversion `params`
+        items - (absolute path, anchor path), archive members also carry (size, mtime_ns), see core.runner.collectItems()
+        stat - stat every file now, disable on the GUI thread. See JobTable.statSizes()
+        """
+        for abs_path, anchor_path, *known in items:
+            abs_path = str(abs_path)
+            ext = os.path.splitext(abs_path)[1][1:]
     
             if ext.lower() not in ALLOWED_INPUT:
                 logging.error(f"[Items] Extension not allowed ({ext})")
@@ -23,17 +35,26 @@ class Items():
                 logging.error(f"[Items] anchor_path is not a Path object ({type(anchor_path)})")
                 continue
 
-            self.items.append(
-                (
-                    abs_path,
-                    anchor_path,
-                )
-            )
+            job = self.jobs.add(abs_path, anchor_path, stat=stat and not known)
+            if known:
+                job.size, job.mtime_ns = known
+
+        if scan_filter is not None:
+            self.jobs = scan_filter.apply(self.jobs, params)
         
-        self.item_count = len(self.items)
+        self.item_count = len(self.jobs)
+
+    def setJobs(self, jobs: JobTable):
+        """Use a table that was already validated, e.g. from the file list."""
+        self.jobs = jobs
+        self.item_count = len(self.jobs)
 
     def getItem(self, n) -> Path:
-        return self.items[n]
+        job = self.jobs[n]
+        return (Path(job.abs_path), job.anchor_path)
+
+    def getJob(self, n) -> Job:
+        return self.jobs[n]
 
     def getItemCount(self) -> int:
         return self.item_count
@@ -45,6 +66,6 @@ class Items():
         self.completed_item_count += 1
 
     def clear(self):
-        self.items = []
+        self.jobs = JobTable()
         self.completed_item_count = 0
-        self.item_count = 0
\ No newline at end of file
+        self.item_count = 0
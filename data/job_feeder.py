@@ -0,0 +1,69 @@
+from typing import Callable
+
+from PySide6.QtCore import QObject, QThreadPool, QRunnable, Signal
+
+import data.task_status as task_status
+
+class JobFeeder(QObject):
+    """Creates workers lazily and keeps a bounded number of them queued in the thread pool.
+
+    Usage:
+        feeder = JobFeeder(threadpool, createWorker)
+        feeder.start(item_count)
+
+    `create_worker(index)` must return a Worker. The feeder listens to its completed and canceled signals
+    and submits the next one, so at most `IN_FLIGHT_FACTOR * maxThreadCount()` workers exist at a time.
+
+    `finished` is emitted once the last in-flight worker is done, also after a cancel.
+    """
+    IN_FLIGHT_FACTOR = 2
+    finished = Signal()
+
+    def __init__(self, threadpool: QThreadPool, create_worker: Callable[[int], QRunnable]):
+        super().__init__()
+        self.threadpool = threadpool
+        self.create_worker = create_worker
+
+        self.job_count = 0
+        self.next_job = 0
+        self.in_flight = 0
+
+    # Public methods
+    def start(self, job_count: int):
+        """Call after configuring the thread pool."""
+        self.job_count = job_count
+        self.next_job = 0
+        self.in_flight = 0
+        self._feed()
+
+    def getInFlightLimit(self) -> int:
+        return max(1, self.threadpool.maxThreadCount()) * self.IN_FLIGHT_FACTOR
+
+    def getInFlightCount(self) -> int:
+        return self.in_flight
+
+    def isFinished(self) -> bool:
+        return self.in_flight == 0 and (self.next_job >= self.job_count or task_status.wasCanceled())
+
+    # Private methods
+    def _feed(self):
+        """Submit workers until the in-flight limit is reached."""
+        limit = self.getInFlightLimit()
+
+        while self.in_flight < limit and self.next_job < self.job_count:
+            if task_status.wasCanceled():
+                return
+
+            worker = self.create_worker(self.next_job)
+            worker.signals.completed.connect(self._onJobDone)
+            worker.signals.canceled.connect(self._onJobDone)
+
+            self.next_job += 1
+            self.in_flight += 1
+            self.threadpool.start(worker)
+
+    def _onJobDone(self, n: int):
+        self.in_flight = max(0, self.in_flight - 1)
+        self._feed()
+        if self.isFinished():
+            self.finished.emit()
@@ -0,0 +1,90 @@
+import os
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+# Inputs of a batch, built once when a conversion starts and shared read-only with the workers.
+#
+# Paths are split into directory, file name and extension here, so workers don't parse them again.
+# Directories and anchors are interned, thousands of jobs share the same few strings and Path objects.
+
+class Job:
+    __slots__ = ("dir", "file_name", "ext", "anchor_path", "size", "mtime_ns")
+
+    def __init__(self, dir: str, file_name: str, anchor_path: Path, size: int = -1, mtime_ns: int = -1):
+        self.dir = dir
+        self.file_name = file_name
+        self.ext = os.path.splitext(file_name)[1][1:]    # Original case
+        self.anchor_path = anchor_path
+        self.size = size                # -1 if unknown
+        self.mtime_ns = mtime_ns
+
+    @classmethod
+    def fromPath(cls, abs_path: Path | str, anchor_path: Path, stat: bool = False) -> "Job":
+        dir, file_name = os.path.split(str(abs_path))
+        job = cls(dir, file_name, anchor_path)
+        if stat:
+            job.stat()
+        return job
+
+    @property
+    def name(self) -> str:
+        """File name without the extension."""
+        return self.file_name[:-len(self.ext) - 1] if self.ext else self.file_name
+
+    @property
+    def abs_path(self) -> str:
+        return os.path.join(self.dir, self.file_name)
+
+    def stat(self):
+        try:
+            stat = os.stat(self.abs_path)
+        except OSError:
+            return
+        self.size = stat.st_size
+        self.mtime_ns = stat.st_mtime_ns
+
+    def __repr__(self):
+        return f"Job({self.abs_path!r}, {self.anchor_path!r}, size={self.size})"
+
+class JobTable:
+    def __init__(self):
+        self.jobs: List[Job] = []
+        self.dirs: Dict[str, str] = {}
+        self.anchors: Dict[Path, Path] = {}
+
+    def add(self, abs_path: Path | str, anchor_path: Path, stat: bool = True) -> Job:
+        """Doesn't validate, see Items.parseData()."""
+        dir, file_name = os.path.split(str(abs_path))
+        return self.addSplit(dir, file_name, anchor_path, stat)
+
+    def addSplit(self, dir: str, file_name: str, anchor_path: Path, stat: bool = True) -> Job:
+        """Same as add() for paths that are already split."""
+        job = Job(self.dirs.setdefault(dir, dir), file_name, self.anchors.setdefault(anchor_path, anchor_path))
+        if stat:
+            job.stat()
+        self.jobs.append(job)
+        return job
+
+    def getItems(self) -> List[Tuple[str, Path]]:
+        """[(absolute path, anchor path), ...], for the job journal and the headless runner."""
+        return [(job.abs_path, job.anchor_path) for job in self.jobs]
+
+    def getSizes(self) -> List[int | None]:
+        """Sizes per job, see core.dedup.getSizes()."""
+        return [job.size if job.size >= 0 else None for job in self.jobs]
+
+    def statSizes(self) -> List[int | None]:
+        """getSizes(), stat'ing the jobs that weren't stat'ed yet. One syscall per file, keep it off the GUI thread."""
+        for job in self.jobs:
+            if job.size < 0:
+                job.stat()
+        return self.getSizes()
+
+    def __getitem__(self, n: int) -> Job:
+        return self.jobs[n]
+
+    def __len__(self) -> int:
+        return len(self.jobs)
+
+    def __iter__(self) -> Iterator[Job]:
+        return iter(self.jobs)
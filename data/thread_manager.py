@@ -3,21 +3,39 @@ import logging
 from PySide6.QtCore import QThreadPool
 
 class ThreadManager:
-    def __init__(self, threadpool: QThreadPool) -> None:
+    def __init__(self, threadpool: QThreadPool, profile=None) -> None:
+        """`profile` - optional ThreadProfile with measured encoder scaling (see core.calibration)"""
         self.threadpool = threadpool
+        self.profile = profile
     
         self.threads_per_worker = 1
         self.burst_threadpool = []
+        self.split_threadpool = []  # Threads per worker of a profiled split, cycled through by job index
     
     def configure(self, format: str, item_count: int, used_thread_count: int, mode="Performance") -> None:
         if mode == "Performance":
-            self.burst_threadpool = self._getBurstThreadPool(
-                item_count,
-                used_thread_count,
-            )
-            self.threadpool.setMaxThreadCount(used_thread_count)  
+            profiled_threads = None
+            if self.profile is not None:
+                profiled_threads = self.profile.getBestThreads(format, item_count, used_thread_count)
+
+            if profiled_threads is not None:
+                workers = max(1, used_thread_count // profiled_threads)
+                self.burst_threadpool = []
+                self.threads_per_worker = profiled_threads
+                self.split_threadpool = self._getBurstThreadPool(workers, used_thread_count)    # The remainder goes to the first workers
+                self.threadpool.setMaxThreadCount(workers)
+                logging.info(f"[ThreadManager] Profiled split for {format}: {workers} workers x {profiled_threads} threads, +{used_thread_count - workers * profiled_threads} spread over the first ones")
+            else:
+                self.threads_per_worker = 1
+                self.split_threadpool = []
+                self.burst_threadpool = self._getBurstThreadPool(
+                    item_count,
+                    used_thread_count,
+                )
+                self.threadpool.setMaxThreadCount(used_thread_count)  
         elif mode == "Low RAM":
             self.burst_threadpool = []
+            self.split_threadpool = []
             self.threads_per_worker = used_thread_count
             self.threadpool.setMaxThreadCount(1)
         else:
@@ -30,6 +48,8 @@ class ThreadManager:
             except IndexError:
                 logging.error("[ThreadManager] getAvailableThreads - IndexError")
                 available_threads = self.threads_per_worker
+        elif self.split_threadpool:
+            available_threads = self.split_threadpool[index % len(self.split_threadpool)]
         else:
             available_threads = self.threads_per_worker
         
@@ -2,9 +2,12 @@ TOOLTIPS = {
     # Output tab
     "duplicates": "What to do when an output image of the same name already exists.",
     "threads": "How many CPU threads to use for conversion.\n\nHigher means faster, but leaves less resources for other processes.\n\nLeave at least one unused or more if you're actively using your computer.",
+    "threads_auto": "Adjusts how many images are converted at once and how many threads each encoder gets, based on the measured speed.\n\nThreads set above become the upper limit.\n\nDecisions are written to the log.",
     "output_src": "Save the resulting image next to the one you are converting from.",
     "output_ct": """Save the resulting image in the specified location. There are 2 types of paths:\n\n1. Absolute path (e.g. C:/Images/Converted)\n\n2. Relative path (e.g. Converted). Choosing it will save output to a folder located next to the source image.""",
     "keep_dir_struct": "Preserves folder hierarchy when saving images.",
+    "archive": "Packs converted images into tar or zip archives in the custom output folder instead of leaving loose files.\n\nImages are stored without extra compression. Requires an absolute output path.",
+    "archive_max_size": "Starts a new archive (archive-002, archive-003, ...) once the current one would grow past this size.",
     "delete_original": "Delete the input image after conversion.",
     "clear_after_conv": "Clear the file list (in the input tab) after conversion.",
     "format": "Which format are you converting to.\n\nHow should the image be processed.",
@@ -54,4 +57,9 @@ TOOLTIPS = {
     "exiftool_args": "Arguments used for handling metadata, correspond to the options is the modify tab.\n\nSupported variables:\n\n$src - source image path.\n\n$dst - destination image path.\n\nRemember to add \"-overwrite_original\" to avoid leftover files.",
     "encoder_args": "Additional arguments for the encoders.\n\nMake sure all arguments you add are valid; otherwise, the encoder will stop working.",
     "multithreading": "Controls how encoders are run.\n\nPerformance - maximizes speed but requires a lot of RAM. Runs encoders in parallel.\n\nLow RAM - slower but uses less RAM. Useful for large images and devices with low RAM. Runs encoders sequentially.",
+    "execution_class": "Priority of the encoders.\n\nNormal - the fastest.\n\nBackground - encoders yield CPU and disk to other programs, so you can keep using your computer during a large conversion.\n\nBackground (Idle Scheduler) - encoders only run when the CPU would otherwise be idle. The slowest when the computer is busy.",
+    "calibrate_threads": "Measures how well each encoder scales with more threads on this computer. It takes a few minutes.\n\nThe result is used to decide how many images are converted at once and how many threads each one gets.\n\nRun it again after updating XL Converter or changing hardware.",
+    "conversion_cache": "Keeps converted images, so converting the same image with the same settings again only copies the result.\n\nThe oldest images are removed when the cache grows above the set size.",
+    "deduplicate": "Images with identical content are converted once per batch. The other copies get the same result, then their metadata, attributes and deletion are handled as usual.\n\nReads images that share a file size to compare their content.",
+    "cpu_placement": "Linux only. Pins each encoder to its own set of CPU cores.\n\nCores are taken from a single NUMA node whenever possible. Speeds up conversion on multi-socket machines.",
 }
\ No newline at end of file
@@ -0,0 +1,247 @@
+#!/usr/bin/python3
+
+import sys
+import os
+import json
+import logging
+import argparse
+
+from core.runner import collectItems, runItems
+from core.distributed import WorkerDaemon, Coordinator, TOKEN_ENV, checkSettings
+from core.calibration import ThreadProfile, calibrate
+from core.journal import job_journal
+from core.watcher import Watcher, checkOutputOutsideRoots
+from core.dedup import duplicates
+from core.scan_filter import ScanFilter
+from core.archive_sink import checkArchiveParams
+from core.archive_source import isArchive
+from core.manifest import readManifest
+from core.exceptions import GenericException
+from data import Items
+from data.logging_manager import LoggingManager
+import core.priority as priority
+
+PRIORITIES = {
+    "normal": priority.NORMAL,
+    "background": priority.BACKGROUND,
+    "idle": priority.BACKGROUND_IDLE,
+}
+
+class ArgsParser:
+    def __init__(self) -> None:
+        self.parser = argparse.ArgumentParser(
+            description="Run XL Converter without the GUI.",
+            epilog="""
+Presets are JSON files with the same keys the GUI passes to workers:
+    {"params": {...}, "settings": {...}}
+
+Filters can be stored in the preset too, flags override them:
+    "settings": {"scan_filters": {"exclude": ["*/thumbs/*"], "min_size": "500K", "modified_after": "7d", "newer_than_output": true}}
+
+Example Usage:
+    python headless.py convert -p preset.json ~/Pictures
+    python headless.py convert -p preset.json --priority background ~/Pictures
+    python headless.py convert -p preset.json --exclude "*/thumbs/*" --min-size 500K --modified-after 7d ~/Pictures
+    python headless.py convert -p preset.json --from-list export.csv
+    python headless.py resume
+    python headless.py watch -p preset.json /srv/hot-folder
+    python headless.py worker -l 127.0.0.1:7878
+    python headless.py worker -l unix:/run/xl-converter/worker.sock
+    python headless.py coordinator -p preset.json -w host1:7878 host2:7878 -- /mnt/shared/archive
+
+Worker daemons run whatever params they receive, including deleting originals and overwriting outputs.
+They listen on loopback unless told otherwise. Listening on any other address needs a shared token:
+set the same """ + TOKEN_ENV + """ (or --token) for the worker and the coordinator.
+""",
+            formatter_class=argparse.RawTextHelpFormatter
+        )
+        self._populateArgs()
+
+    def _populateArgs(self) -> None:
+        self.parser.add_argument("-v", "--verbose", action="store_true", help="Log debug messages.")
+        subparsers = self.parser.add_subparsers(dest="mode", required=True)
+
+        convert = subparsers.add_parser("convert", help="Convert files on this machine.")
+        convert.add_argument("-p", "--preset", required=True, help="Preset file.")
+        convert.add_argument("-t", "--threads", type=int, default=os.cpu_count(), help="Thread count.")
+        convert.add_argument("--priority", choices=PRIORITIES, help="Encoder priority. Overrides the preset.")
+        convert.add_argument("-l", "--from-list", action="append", default=[], metavar="FILE", help="Path list: one per line, NUL-separated, or .csv with path and anchor columns. Repeatable.")
+        self._addFilterArgs(convert)
+        convert.add_argument("paths", nargs="*", help="Files, folders or archives (zip, tar). Archives are read without extracting them.")
+
+        resume = subparsers.add_parser("resume", help="Convert what's left of the last interrupted batch.")
+        resume.add_argument("-t", "--threads", type=int, default=os.cpu_count(), help="Thread count.")
+
+        watch = subparsers.add_parser("watch", help="Convert files as they're added to folders. Runs until interrupted.")
+        watch.add_argument("-p", "--preset", required=True, help="Preset file. Must set a custom output folder outside of the watched ones.")
+        watch.add_argument("-t", "--threads", type=int, default=os.cpu_count(), help="Thread count.")
+        watch.add_argument("-s", "--settle", type=float, default=2.0, help="Seconds a file must stay unchanged before it's converted.")
+        watch.add_argument("--priority", choices=PRIORITIES, help="Encoder priority. Overrides the preset.")
+        watch.add_argument("paths", nargs="+", help="Folders to watch.")
+
+        worker = subparsers.add_parser("worker", help="Run a worker daemon that accepts work from a coordinator.")
+        worker.add_argument("-l", "--listen", required=True, help="host:port or unix:/path/to/socket. The host defaults to 127.0.0.1, other addresses need --token.")
+        worker.add_argument("--token", default=os.environ.get(TOKEN_ENV), help=f"Shared secret every message must carry. Defaults to ${TOKEN_ENV}.")
+        worker.add_argument("-t", "--threads", type=int, default=os.cpu_count(), help="Thread count.")
+        worker.add_argument("--priority", choices=PRIORITIES, default="normal", help="Encoder priority.")
+
+        calibrate = subparsers.add_parser("calibrate", help="Measure encoder thread scaling and update the machine profile.")
+        calibrate.add_argument("-t", "--threads", type=int, default=os.cpu_count(), help="Highest thread count to measure.")
+
+        coordinator = subparsers.add_parser("coordinator", help="Split a batch and dispatch it to worker daemons.")
+        coordinator.add_argument("-p", "--preset", required=True, help="Preset file.")
+        coordinator.add_argument("-w", "--workers", nargs="+", required=True, help="Worker daemon addresses.")
+        coordinator.add_argument("-u", "--unit-size", type=int, default=64, help="Items per work unit.")
+        coordinator.add_argument("-r", "--retries", type=int, default=3, help="Retries per work unit.")
+        coordinator.add_argument("--token", default=os.environ.get(TOKEN_ENV), help=f"Shared secret of the worker daemons. Defaults to ${TOKEN_ENV}.")
+        coordinator.add_argument("-l", "--from-list", action="append", default=[], metavar="FILE", help="Path list, same as in convert. Repeatable.")
+        self._addFilterArgs(coordinator)
+        coordinator.add_argument("paths", nargs="*", help="Files or folders. Must be reachable from every worker at the same path.")
+
+    def _addFilterArgs(self, parser) -> None:
+        filters = parser.add_argument_group("filters", "Applied while listing folders. Override \"scan_filters\" from the preset.")
+        filters.add_argument("--include", action="append", metavar="GLOB", help="Only paths matching this glob. Repeatable.")
+        filters.add_argument("--exclude", action="append", metavar="GLOB", help="Skip paths matching this glob, e.g. \"*/thumbs/*\". Repeatable.")
+        filters.add_argument("--min-size", metavar="SIZE", help="Skip files smaller than this, e.g. 500K.")
+        filters.add_argument("--max-size", metavar="SIZE", help="Skip files larger than this, e.g. 20M.")
+        filters.add_argument("--modified-after", metavar="TIME", help="Skip files modified before this. ISO date or age, e.g. 2024-05-01 or 7d.")
+        filters.add_argument("--modified-before", metavar="TIME", help="Skip files modified after this. ISO date or age.")
+        filters.add_argument("--newer-than-output", action="store_true", default=None, help="Skip files whose output exists and is newer.")
+
+    def parseArgs(self, argv=None):
+        args = self.parser.parse_args(argv)
+        if args.mode in ("convert", "coordinator") and not args.paths and not args.from_list:
+            self.parser.error(f"{args.mode}: expected paths or --from-list")
+        return args
+
+def loadPreset(path: str) -> (dict, dict):
+    """Returns (params, settings)."""
+    with open(path, "r", encoding="utf-8") as f:
+        preset = json.load(f)
+    return (preset["params"], preset["settings"])
+
+def getScanFilter(args, settings: dict) -> ScanFilter:
+    """Preset filters with flags on top. Raises ValueError."""
+    filters = dict(settings.get("scan_filters") or {})
+    for key in ("include", "exclude", "min_size", "max_size", "modified_after", "modified_before", "newer_than_output"):
+        value = getattr(args, key, None)
+        if value is not None:
+            filters[key] = value
+    return ScanFilter.fromDict(filters)
+
+def readLists(lists):
+    """(absolute path, anchor path) from path lists, streamed. Raises OSError."""
+    for path in lists:
+        for chunk in readManifest(path):
+            yield from chunk
+
+def getItems(paths, scan_filter: ScanFilter | None = None, params: dict | None = None, lists=()) -> Items:
+    """Raises OSError If a path list cannot be opened."""
+    items = Items()
+    items.parseData(*collectItems(paths, scan_filter), *readLists(lists), scan_filter=scan_filter, params=params)
+    return items
+
+def printResult(result):
+    for _id, msg, file_name in result["exceptions"]:
+        print(f"[{_id}] {file_name}: {msg}", file=sys.stderr)
+
+def main(argv=None) -> int:
+    args = ArgsParser().parseArgs(argv)
+    LoggingManager().setLevel("DEBUG" if args.verbose else "WARNING")
+
+    match args.mode:
+        case "worker":
+            priority.setExecutionClass(PRIORITIES[args.priority])
+            try:
+                daemon = WorkerDaemon(args.listen, args.threads, token=args.token)
+            except (GenericException, OSError) as e:
+                print(getattr(e, "msg", e), file=sys.stderr)
+                return 1
+            daemon.serveForever()
+            return 0
+        case "calibrate":
+            profile = ThreadProfile()
+            results = calibrate(args.threads, on_progress=print)
+            profile.update(results)
+            profile.save()
+            for encoder, result in results.items():
+                print(f"{encoder} ({result['version']}): {result['speedup']}")
+            return 0 if results else 1
+        case "convert":
+            params, settings = loadPreset(args.preset)
+            if args.priority:
+                settings["execution_class"] = PRIORITIES[args.priority]
+            error = checkArchiveParams(params)
+            if error:
+                print(error, file=sys.stderr)
+                return 1
+            try:
+                scan_filter = getScanFilter(args, settings)
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 1
+            try:
+                items = getItems(args.paths, scan_filter, params, args.from_list)
+            except OSError as e:
+                print(e, file=sys.stderr)
+                return 1
+            job_journal.begin(items.items, params, settings)
+            results = runItems(items.items, params, settings, args.threads, printResult)
+            job_journal.finish()
+        case "resume":
+            batch = job_journal.resume()
+            if batch is None:
+                print("Nothing to resume", file=sys.stderr)
+                return 1
+            items, params, settings = batch
+            results = runItems(items, params, settings, args.threads, printResult)
+            job_journal.finish()
+        case "watch":
+            params, settings = loadPreset(args.preset)
+            if args.priority:
+                settings["execution_class"] = PRIORITIES[args.priority]
+            error = checkArchiveParams(params) or checkOutputOutsideRoots(params, args.paths)
+            if error:
+                print(error, file=sys.stderr)
+                return 1
+
+            watcher = Watcher(args.paths, params, settings, args.threads, printResult, settle=args.settle)
+            try:
+                watcher.run()
+            except KeyboardInterrupt:
+                watcher.stop()
+            except OSError as e:
+                print(e, file=sys.stderr)
+                return 1
+            return 0
+        case "coordinator":
+            params, settings = loadPreset(args.preset)
+            error = checkSettings(params, settings)
+            if error:
+                print(error, file=sys.stderr)
+                return 1
+            if any(isArchive(path) and os.path.isfile(path) for path in args.paths):
+                print("Archives cannot be used as inputs with remote workers.", file=sys.stderr)
+                return 1
+            try:
+                scan_filter = getScanFilter(args, settings)
+            except ValueError as e:
+                print(e, file=sys.stderr)
+                return 1
+            try:
+                items = getItems(args.paths, scan_filter, params, args.from_list)
+            except OSError as e:
+                print(e, file=sys.stderr)
+                return 1
+            coordinator = Coordinator(args.workers, args.unit_size, max_retries=args.retries, token=args.token)
+            results = coordinator.run(items.items, params, settings, printResult)
+
+    failed = sum(1 for r in results if r["exceptions"])
+    print(f"Converted {len(results) - failed} out of {len(results)} images")
+    stats = duplicates.getStats()
+    if stats["reused"]:
+        print(f"Reused {stats['reused']} outputs of identical images, skipped encoding {stats['bytes'] / 1024 ** 2:.1f} MiB (~{stats['seconds']:.0f} s)")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
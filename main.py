@@ -13,7 +13,6 @@ from PySide6.QtWidgets import (
 )
 from PySide6.QtCore import (
     QThreadPool,
-    QMutex,
     QUrl
 )
 from PySide6.QtGui import (
@@ -36,10 +35,25 @@ from ui import (
     ExceptionView,
 )
 from core.worker import Worker
+from core.runner import stopBatchState
+from core.path_locks import PathLocks
+from core.pathing import name_index
+from core.fs_cache import dir_cache
+from core.archive_sink import archive_sink, checkArchiveParams
+from core.archive_source import archive_source
+from core.affinity import placement
+from core.conversion_cache import conversion_cache
+from core.journal import job_journal
+from core.dedup import duplicates
+from core.capabilities import capabilities
+import core.priority as priority
 from core.utils import clip
 from data import Items, fonts
 import data.task_status as task_status
 from data.thread_manager import ThreadManager
+from core.calibration import ThreadProfile
+from data.job_feeder import JobFeeder
+from data.concurrency_controller import ConcurrencyController
 from data.time_left import TimeLeft
 from data.sounds import finished_sound
 from data.logging_manager import LoggingManager
@@ -53,11 +67,21 @@ class MainWindow(QMainWindow):
 
         # Components
         LoggingManager()    # init singleton
+        capabilities.probeInBackground()    # Spawns only on first launch or after binaries change
         self.items = Items()
         self.time_left = TimeLeft()
         self.n = Notifications(self)
         self.threadpool = QThreadPool.globalInstance()
-        self.thread_manager = ThreadManager(self.threadpool)
+        self.thread_profile = ThreadProfile()
+        self.thread_manager = ThreadManager(self.threadpool, self.thread_profile)
+        self.job_feeder = JobFeeder(self.threadpool, self.createWorker)
+        self.job_feeder.finished.connect(self.drained)
+        self.concurrency = ConcurrencyController()
+        self.auto_threads = False
+        self.measuring_workers = {}     # In-flight workers measuring work units for ConcurrencyController
+        self.conv_params = None
+        self.conv_settings = None
+        self.path_locks = PathLocks()
         
         self.progress_dialog = ProgressDialog(parent=self, title="Converting...", cancelable=True)
         self.progress_dialog.canceled.connect(task_status.cancel)
@@ -74,6 +98,7 @@ class MainWindow(QMainWindow):
         self.about_tab = AboutTab()
 
         self.input_tab.convert.connect(self.convert)
+        self.input_tab.resume.connect(self.resume)
         self.output_tab.convert.connect(self.convert)
         self.modify_tab.convert.connect(self.convert)
         self.settings_tab.signals.disable_sorting.connect(self.input_tab.disableSorting)
@@ -81,9 +106,11 @@ class MainWindow(QMainWindow):
         self.settings_tab.signals.custom_resampling.connect(self.modify_tab.toggleCustomResampling)
         self.settings_tab.signals.enable_quality_prec_snap.connect(self.output_tab.enableQualityPrecisionSnapping)
         self.settings_tab.signals.change_jpg_encoder.connect(self.output_tab.onJPGEncoderChanged)
+        self.settings_tab.signals.thread_profile_changed.connect(self.thread_profile.load)
 
         # Components
         self.exception_view = ExceptionView(settings, parent=self)
+        self.refreshResumable()
 
         # Size Policy
         self.resize(700, 352)
@@ -121,16 +148,16 @@ class MainWindow(QMainWindow):
         logging.debug(f"[Worker #{n}] Finished")
 
         if self.progress_dialog.wasCanceled():
-            self.setUIEnabled(True)
-            self.progress_dialog.finished()
-            self.time_left.stopCounting()
-            return
+            return  # Cleaned up in drained()
 
         self.items.addCompletedItem()
         self.time_left.addCompletedItem()
         self.progress_dialog.setLabelTextLine1(f"Converted {self.items.getCompletedItemCount()} out of {self.items.getItemCount()} images")
         self.progress_dialog.setValue(self.items.getCompletedItemCount())
 
+        if self.auto_threads and self.concurrency.addCompleted(self.measuring_workers.pop(n).work_units):
+            self.threadpool.setMaxThreadCount(self.concurrency.getWorkerCount())
+
         logging.debug(f"Active Threads: {self.threadpool.activeThreadCount()}")
 
         # Finished
@@ -140,6 +167,13 @@ class MainWindow(QMainWindow):
             self.setUIEnabled(True)
             self.progress_dialog.finished()
             self.time_left.stopCounting()
+            logging.debug(f"[PathLocks] Contention: {self.path_locks.getStats()}")
+            stopBatchState()
+            stats = duplicates.getStats()
+            if stats["reused"]:
+                logging.info(f"[Duplicates] Reused {stats['reused']} outputs, skipped encoding {stats['bytes'] / 1024 ** 2:.1f} MiB (~{stats['seconds']:.0f} s)")
+            job_journal.finish()
+            self.refreshResumable()
             if settings["play_sound_on_finish"]:
                 finished_sound.play(volume=settings["play_sound_on_finish_vol"])
 
@@ -152,10 +186,22 @@ class MainWindow(QMainWindow):
 
     def cancel(self, n):
         logging.debug(f"[Worker #{n}] Canceled")
+
+    def drained(self):
+        """Called by JobFeeder once the last in-flight worker is done."""
+        if not task_status.wasCanceled():
+            return  # Cleaned up in complete()
+
+        # Workers still running after the cancel use these until they're done
         self.setUIEnabled(True)
+        self.progress_dialog.finished()
+        self.time_left.stopCounting()
+        stopBatchState()        # Files finished so far stay archived, staged duplicates are removed
+        job_journal.stop()      # Workers that finished after the cancel are recorded too
+        self.refreshResumable()
 
     def _safetyChecks(self, params):
-        if self.input_tab.file_view.topLevelItemCount() == 0:
+        if self.input_tab.file_view.itemCount() == 0:
             self.n.notify("Empty List", "File list is empty.\nDrag and drop images (or folders) onto the program to add them.")
             return False
 
@@ -173,6 +219,11 @@ class MainWindow(QMainWindow):
                     self.n.notify("Path Conflict", "A relative path cannot be combined with \"Keep Folder Structure\".\nEnter an absolute path (or choose one by clicking on the button with 3 dots).")
                     return False
 
+        # Check Archive Output
+        if error := checkArchiveParams(params):
+            self.n.notify("Archive Output", error)
+            return False
+
         # Check If Format Pool Empty
         if params["format"] == "Smallest Lossless" and self.output_tab.smIsFormatPoolEmpty():
             self.n.notify("Format Error", "Select at least one format.")
@@ -197,17 +248,47 @@ class MainWindow(QMainWindow):
         if not self._safetyChecks(params):
             return
 
-        # Reset and Parse data
+        # Parse data
+        self.items.clear()
+        self.items.setJobs(self.input_tab.getJobs())
+        if self.items.getItemCount() == 0:
+            return
+
+        job_journal.begin(self.items.items, params, settings)
+        self._startConversion(params, settings)
+
+    def resume(self):
+        """Convert what's left of the last interrupted batch, with its original params and settings."""
+        batch = job_journal.resume()
+        if batch is None:
+            self.refreshResumable()
+            return
+        items, params, settings = batch
+
+        self.items.clear()
+        self.items.parseData(*items, stat=False)     # Stat'ed in the background like the file list, see _startConversion()
+        if self.items.getItemCount() == 0:
+            job_journal.finish()
+            self.refreshResumable()
+            return
+
+        # Keys added since the batch was recorded
+        params = {**self.output_tab.getSettings(), **self.modify_tab.getSettings(), **params}
+        settings = {**self.settings_tab.getSettings(), **settings}
+        self._startConversion(params, settings)
+
+    def refreshResumable(self):
+        last = job_journal.getLastBatch()
+        self.input_tab.setResumable(last["left"] if last else 0)
+
+    def _startConversion(self, params, settings):
+        # Reset
         self.exception_view.close()
         self.exception_view.clear()
         self.exception_view.updateReportHeader(
             self.output_tab.getReportData(),
             self.modify_tab.getReportData(),
         )
-        self.items.clear()
-        self.items.parseData(*self.input_tab.getItems())
-        if self.items.getItemCount() == 0:
-            return
         
         # Set progress dialog
         self.progress_dialog.setRange(0, self.items.getItemCount())
@@ -224,28 +305,56 @@ class MainWindow(QMainWindow):
             self.output_tab.getUsedThreadCount(),
             settings["multithreading_mode"],
         )
+        self.auto_threads = self.output_tab.isAutoThreadsChecked() and settings["multithreading_mode"] == "Performance"
+        self.measuring_workers = {}
+        if self.auto_threads:
+            self.concurrency.start(self.output_tab.getUsedThreadCount())
+            self.threadpool.setMaxThreadCount(self.concurrency.getWorkerCount())
 
         # Start workers
         task_status.reset()
         self.setUIEnabled(False)
-        mutex = QMutex()
-
-        for i in range(self.items.getItemCount()):
-            abs_path, anchor_path = self.items.getItem(i)
-            worker = Worker(
-                i,
-                abs_path,
-                anchor_path,
-                params,
-                settings,
-                self.thread_manager.getAvailableThreads(i),
-                mutex
-            )
-            worker.signals.started.connect(self.start)
-            worker.signals.completed.connect(self.complete)
-            worker.signals.canceled.connect(self.cancel)
-            worker.signals.exception.connect(self.exception_view.addItem)
-            self.threadpool.start(worker)
+        self.conv_params = params
+        self.conv_settings = settings
+        self.path_locks.resetStats()
+        name_index.start()
+        dir_cache.start()
+        if params.get("archive_output", False):
+            archive_sink.start(params["custom_output_dir_path"], params["archive_format"], params["archive_max_size"] * 1024 ** 2)
+        archive_source.start(self.items.items)    # Only if the batch has archive members
+        priority.setExecutionClass(settings["execution_class"])
+        if settings["cpu_placement"]:
+            placement.start()
+        if settings["conversion_cache"]:
+            conversion_cache.start(settings["conversion_cache_size"])
+        if settings["deduplicate"]:
+            duplicates.startInBackground(self.items.jobs.statSizes)     # The file list isn't stat'ed, too slow for the GUI thread
+        self.job_feeder.start(self.items.getItemCount())
+
+    def createWorker(self, i):
+        """Used by JobFeeder. Workers are created lazily, right before they're queued."""
+        job = self.items.getJob(i)
+        if self.auto_threads:
+            available_threads = self.concurrency.getThreadsPerWorker()
+        else:
+            available_threads = self.thread_manager.getAvailableThreads(i)
+
+        worker = Worker(
+            i,
+            job,
+            self.conv_params,
+            self.conv_settings,
+            available_threads,
+            self.path_locks,
+            measure_units=self.auto_threads,    # Image headers are read in the pool, not on the GUI thread
+        )
+        if self.auto_threads:
+            self.measuring_workers[i] = worker
+        worker.signals.started.connect(self.start)
+        worker.signals.completed.connect(self.complete)
+        worker.signals.canceled.connect(self.cancel)
+        worker.signals.exception.connect(self.exception_view.addItem)
+        return worker
 
     def setUIEnabled(self, n):
         self.tabs.setEnabled(n)
@@ -255,9 +364,12 @@ class MainWindow(QMainWindow):
         self.output_tab.saveState()
         self.modify_tab.wm.saveState()
         self.exception_view.close()
+        self.input_tab.file_view.scanner.cancel(wait=True)
 
-        if self.threadpool.activeThreadCount() > 0:
-            return -1
+        if self.threadpool.activeThreadCount() > 0:     # Closed mid-batch
+            task_status.cancel()
+            self.threadpool.waitForDone()
+            self.drained()      # The feeder's signal isn't delivered anymore
     
     def dragEnterEvent(self, e):
         if e.mimeData().hasUrls():
@@ -141,7 +141,7 @@ class Interact:
     """Translation layer between unit tests and the application."""
     def __init__(self, main_window):
         self.main_window = main_window
-        self.root = self.main_window.input_tab.file_view.invisibleRootItem()
+        self.file_view = self.main_window.input_tab.file_view
 
     def add_item(self, path):
         path = Path(path)
@@ -164,10 +164,10 @@ class Interact:
         self.main_window.input_tab._addItems(tmp)
 
     def get_items(self):
-        return [self.root.child(i).text(2) for i in range(self.root.childCount())]
+        return [path for path, _ in self.file_view.getItems()]
 
     def get_item_count(self):
-        return self.main_window.input_tab.file_view.invisibleRootItem().childCount()
+        return self.file_view.itemCount()
 
     def clear_list(self):
         self.main_window.input_tab.clearInput()
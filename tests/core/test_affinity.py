@@ -0,0 +1,129 @@
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from core.affinity import (
+    CorePlacement,
+    parseCpuList,
+    getNumaNodes,
+)
+from core.process import _spawn, runProcessOutput
+
+@pytest.mark.parametrize("text, expected", [
+    ("0", [0]),
+    ("0-3", [0, 1, 2, 3]),
+    ("0-1,8,10-11\n", [0, 1, 8, 10, 11]),
+    ("", []),
+])
+def test_parseCpuList(text, expected):
+    assert parseCpuList(text) == expected
+
+def test_getNumaNodes(tmp_path):
+    for idx, cpulist in enumerate(("0-3,8-11", "4-7,12-15")):
+        (tmp_path / f"node{idx}").mkdir()
+        (tmp_path / f"node{idx}" / "cpulist").write_text(cpulist)
+    (tmp_path / "possible").write_text("0-1")
+
+    with patch("core.affinity.os.sched_getaffinity", return_value=set(range(14)), create=True):
+        nodes = getNumaNodes(str(tmp_path))
+
+    assert nodes == [[0, 1, 2, 3, 8, 9, 10, 11], [4, 5, 6, 7, 12, 13]]
+
+def test_getNumaNodes_fallback(tmp_path):
+    with patch("core.affinity.os.sched_getaffinity", return_value={0, 1, 2}, create=True):
+        assert getNumaNodes(str(tmp_path)) == [[0, 1, 2]]
+
+@pytest.fixture
+def placement():
+    placement = CorePlacement()
+    with patch("core.affinity.isSupported", return_value=True):
+        placement.start([[0, 1, 2, 3], [4, 5, 6, 7]])
+    return placement
+
+def test_acquire_single_node(placement):
+    first = placement.acquire(2)
+    second = placement.acquire(2)
+    third = placement.acquire(2)
+
+    assert first == [0, 1]
+    assert second == [4, 5]     # Node with the most free cores
+    assert third == [2, 3]
+
+def test_acquire_spans_nodes(placement):
+    assert placement.acquire(6) == [0, 1, 2, 3, 4, 5]
+
+def test_acquire_exhausted(placement):
+    placement.acquire(8)
+    assert placement.acquire(1) is None
+
+def test_release(placement):
+    cpus = placement.acquire(4)
+    placement.release(cpus)
+    placement.release(cpus)     # Ignored
+
+    assert placement.free == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+def test_disabled():
+    placement = CorePlacement()
+    with placement.pinned(4) as cpus:
+        assert cpus is None
+        assert placement.getThreadCpus() is None
+
+def test_pinned_thread_local(placement):
+    seen = {}
+    def worker():
+        seen["worker"] = placement.getThreadCpus()
+
+    with placement.pinned(2) as cpus:
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        assert placement.getThreadCpus() == cpus
+
+    assert seen["worker"] is None
+    assert placement.getThreadCpus() is None
+    assert placement.free == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+def test_spawn_worker_untouched(placement):
+    before = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else None
+    with patch("core.process.placement", placement), \
+        patch("core.process.os.sched_setaffinity", create=True) as mock_setaffinity, \
+        patch("core.process.subprocess.Popen") as mock_popen:
+        _spawn(("echo",))
+        mock_setaffinity.assert_not_called()
+
+        with placement.pinned(2):
+            _spawn(("echo",))
+
+    mock_setaffinity.assert_called_once_with(0, [0, 1])     # On the spawner thread
+    assert mock_popen.call_count == 2
+    if before is not None:
+        assert os.sched_getaffinity(0) == before
+
+# Starts a thread right away, then lists Cpus_allowed_list of every thread
+CHILD_THREADS = """
+import os, threading, time
+threading.Thread(target=time.sleep, args=(0.5,), daemon=True).start()
+tasks = os.listdir("/proc/self/task")
+masks = set()
+for task in tasks:
+    with open(f"/proc/self/task/{task}/status") as f:
+        masks.update(line.split()[1] for line in f if line.startswith("Cpus_allowed_list:"))
+print(len(tasks), " ".join(sorted(masks)))
+"""
+
+@pytest.mark.skipif(not hasattr(os, "sched_getaffinity") or not os.path.isdir("/proc/self/task"), reason="Linux only")
+def test_child_threads_pinned():
+    cpu = min(os.sched_getaffinity(0))
+    placement = CorePlacement()
+    placement.start([[cpu]])
+
+    with patch("core.process.placement", placement), placement.pinned(1):
+        stdout, _ = runProcessOutput(sys.executable, "-c", CHILD_THREADS)
+
+    threads, *masks = stdout.split()
+    assert int(threads) >= 2
+    assert masks == [str(cpu)]
@@ -0,0 +1,100 @@
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from core.archive_sink import ArchiveSink, checkArchiveParams
+
+@pytest.fixture
+def sink():
+    sink = ArchiveSink()
+    yield sink
+    sink.stop()
+
+def makeOutput(root, name, size=1000):
+    path = root / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(os.urandom(size))
+    return str(path)
+
+def test_tar(sink, tmp_path):
+    sink.start(str(tmp_path), "tar")
+    data = {}
+    for name in ("a.jxl", "sub/b.jxl"):
+        path = makeOutput(tmp_path, name)
+        data[name] = open(path, "rb").read()
+        assert sink.submit(path)
+    paths = sink.stop()
+
+    assert paths == [str(tmp_path / "archive-001.tar")]
+    with tarfile.open(paths[0]) as tar:
+        assert sorted(tar.getnames()) == ["a.jxl", "sub/b.jxl"]
+        assert tar.extractfile("sub/b.jxl").read() == data["sub/b.jxl"]
+    assert not (tmp_path / "a.jxl").exists()     # Loose files removed
+    assert not (tmp_path / "sub" / "b.jxl").exists()
+    assert sink.getStats() == {"archived": 2, "failed": 0}
+
+def test_zip_stored(sink, tmp_path):
+    sink.start(str(tmp_path), "zip")
+    sink.submit(makeOutput(tmp_path, "a.avif"))
+    paths = sink.stop()
+
+    with zipfile.ZipFile(paths[0]) as zf:
+        info = zf.getinfo("a.avif")
+        assert info.compress_type == zipfile.ZIP_STORED
+        assert info.file_size == 1000
+
+@pytest.mark.parametrize("format", ("tar", "zip"))
+def test_rollover(sink, tmp_path, format):
+    sink.start(str(tmp_path), format, max_size=60_000)
+    for i in range(6):
+        sink.submit(makeOutput(tmp_path, f"{i}.webp", 20_000))
+    paths = sink.stop()
+
+    assert [os.path.basename(p) for p in paths] == [f"archive-00{i}.{format}" for i in range(1, 4)]
+    for path in paths:
+        assert os.path.getsize(path) <= 60_000
+    assert sink.getStats()["archived"] == 6
+
+def test_oversized_entry_gets_own_archive(sink, tmp_path):
+    sink.start(str(tmp_path), "tar", max_size=1000)
+    sink.submit(makeOutput(tmp_path, "big.png", 5000))
+    sink.submit(makeOutput(tmp_path, "small.png", 10))
+    assert len(sink.stop()) == 2
+
+def test_existing_archives_kept(sink, tmp_path):
+    (tmp_path / "archive-001.tar").write_bytes(b"previous batch")
+    sink.start(str(tmp_path), "tar")
+    sink.submit(makeOutput(tmp_path, "a.png"))
+
+    assert sink.stop() == [str(tmp_path / "archive-002.tar")]
+    assert (tmp_path / "archive-001.tar").read_bytes() == b"previous batch"
+
+def test_missing_file_left_alone(sink, tmp_path, caplog):
+    sink.start(str(tmp_path), "tar")
+    sink.submit(str(tmp_path / "missing.png"))
+    sink.submit(makeOutput(tmp_path, "a.png"))
+    sink.stop()
+
+    assert sink.getStats() == {"archived": 1, "failed": 1}
+    assert "[ArchiveSink] Failed to archive" in caplog.text
+
+def test_submit_when_stopped(sink, tmp_path):
+    path = makeOutput(tmp_path, "a.png")
+    assert not sink.submit(path)
+    assert os.path.isfile(path)
+    assert sink.stop() == []
+
+def test_no_archive_without_files(sink, tmp_path):
+    sink.start(str(tmp_path), "zip")
+    assert sink.stop() == []
+    assert os.listdir(tmp_path) == []
+
+def test_checkArchiveParams(tmp_path):
+    params = {"archive_output": True, "archive_format": "tar", "custom_output_dir": True, "custom_output_dir_path": str(tmp_path)}
+    assert checkArchiveParams(params) is None
+    assert checkArchiveParams({**params, "archive_format": "7z"}) is not None
+    assert checkArchiveParams({**params, "custom_output_dir_path": "Converted"}) is not None
+    assert checkArchiveParams({**params, "custom_output_dir": False}) is not None
+    assert checkArchiveParams({"custom_output_dir": False}) is None
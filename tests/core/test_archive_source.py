@@ -0,0 +1,162 @@
+import io
+import os
+import time
+import tarfile
+import zipfile
+
+import pytest
+
+from core.archive_source import ArchiveSource, _Member, listArchive, getArchiveRoot, isArchive
+
+@pytest.fixture
+def source():
+    source = ArchiveSource()
+    yield source
+    source.stop()
+
+def makeZip(path, members):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(zipfile.ZipInfo(name, date_time=(2024, 5, 1, 12, 0, 0)), data)
+    return str(path)
+
+def makeTar(path, members, mode="w:gz"):
+    with tarfile.open(path, mode) as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1_700_000_000
+            tar.addfile(info, io.BytesIO(data))
+    return str(path)
+
+def listAll(path, **kwargs):
+    return [item for chunk in listArchive(path, **kwargs) for item in chunk]
+
+def test_isArchive():
+    assert isArchive("/a/photos.ZIP")
+    assert isArchive("/a/photos.tar.gz")
+    assert not isArchive("/a/photos.png")
+
+def test_getArchiveRoot():
+    assert getArchiveRoot("/a/photos.zip") == "/a/photos"
+    assert getArchiveRoot("/a/photos.tar.gz") == "/a/photos"
+    assert getArchiveRoot("/a/photos.tgz") == "/a/photos"
+
+def test_listArchive_zip(tmp_path):
+    path = makeZip(tmp_path / "a.zip", {"b.png": b"00", "sub/a.jpg": b"0", "notes.txt": b"", "sub/": b""})
+    assert listAll(path) == [
+        (str(tmp_path / "a.zip" / "b.png"), 2, int(time.mktime((2024, 5, 1, 12, 0, 0, 0, 0, -1))) * 1_000_000_000),
+        (os.path.join(tmp_path, "a.zip", "sub", "a.jpg"), 1, int(time.mktime((2024, 5, 1, 12, 0, 0, 0, 0, -1))) * 1_000_000_000),
+    ]
+
+def test_listArchive_tar(tmp_path):
+    path = makeTar(tmp_path / "a.tar.gz", {"z.png": b"0", "a.png": b"00"})
+    assert listAll(path) == [   # Stored order
+        (str(tmp_path / "a.tar.gz" / "z.png"), 1, 1_700_000_000_000_000_000),
+        (str(tmp_path / "a.tar.gz" / "a.png"), 2, 1_700_000_000_000_000_000),
+    ]
+
+def test_listArchive_chunks(tmp_path):
+    path = makeZip(tmp_path / "a.zip", {f"{i}.png": b"0" for i in range(5)})
+    assert [len(chunk) for chunk in listArchive(path, chunk_size=2)] == [2, 2, 1]
+
+def test_listArchive_unsafe_names(tmp_path, caplog):
+    path = makeTar(tmp_path / "a.tar", {"../evil.png": b"0", "/etc/evil.png": b"0", "ok.png": b"0"}, "w")
+    assert [os.path.basename(p) for p, _, _ in listAll(path)] == ["ok.png"]
+    assert "Skipping unsafe member name" in caplog.text
+
+def test_listArchive_damaged(tmp_path):
+    path = tmp_path / "a.tar.gz"
+    path.write_bytes(b"not an archive")
+    with pytest.raises(OSError):
+        listAll(str(path))
+
+def test_start_without_members(source, tmp_path):
+    source.start([(str(tmp_path / "a.png"), tmp_path)])
+    assert not source.isEnabled()
+    assert source.scratch_dir is None
+
+@pytest.mark.parametrize("make", (makeZip, makeTar))
+def test_acquire(source, tmp_path, make):
+    path = make(tmp_path / ("a.zip" if make is makeZip else "a.tar.gz"), {"sub/a.png": b"a" * 100, "b.png": b"b"})
+    items = [(p, tmp_path / os.path.basename(path)) for p, _, _ in listAll(path)]
+    source.start(items)
+
+    scratch = source.acquire(os.path.join(path, "sub", "a.png"))
+    assert open(scratch, "rb").read() == b"a" * 100
+    assert os.path.basename(scratch) == "a.png"
+    assert source.isMember(os.path.join(path, "b.png"))
+
+    source.release(os.path.join(path, "sub", "a.png"))
+    assert not os.path.exists(scratch)
+
+def test_mtime(source, tmp_path):
+    path = makeTar(tmp_path / "a.tar", {"a.png": b"0"}, "w")
+    source.start([(os.path.join(path, "a.png"), tmp_path / "a.tar")])
+    assert os.stat(source.acquire(os.path.join(path, "a.png"))).st_mtime == 1_700_000_000
+
+def test_getSourceDirs(source, tmp_path):
+    path = makeZip(tmp_path / "photos.zip", {"sub/a.png": b"0"})
+    source.start([(os.path.join(path, "sub", "a.png"), tmp_path / "photos.zip")])
+    assert source.getSourceDirs(os.path.join(path, "sub"), tmp_path / "photos.zip") == (str(tmp_path / "photos" / "sub"), tmp_path / "photos")
+
+def test_missing_member(source, tmp_path):
+    path = makeZip(tmp_path / "a.zip", {"a.png": b"0"})
+    source.start([(os.path.join(path, "gone.png"), tmp_path / "a.zip")])
+    with pytest.raises(FileNotFoundError):
+        source.acquire(os.path.join(path, "gone.png"))
+
+def test_damaged_archive(source, tmp_path):
+    path = tmp_path / "a.tar.gz"
+    path.write_bytes(b"not an archive")
+    source.start([(os.path.join(path, "a.png"), path)])
+    with pytest.raises(OSError):
+        source.acquire(os.path.join(path, "a.png"))
+
+def test_readahead_budget(source, tmp_path):
+    path = makeZip(tmp_path / "a.zip", {f"{i}.png": b"0" * 100 for i in range(4)})
+    members = [p for p, _, _ in listAll(path)]
+    source.start([(p, tmp_path / "a.zip") for p in members], budget=250)
+
+    source.acquire(members[0])
+    time.sleep(0.1)
+    assert source.used == 200       # Waits for a release before reading the third
+
+    source.release(members[0])
+    source.acquire(members[2])
+    assert source.used <= 250
+
+def test_out_of_order_doesnt_block(source, tmp_path):
+    path = makeZip(tmp_path / "a.zip", {f"{i}.png": b"0" * 100 for i in range(4)})
+    members = [p for p, _, _ in listAll(path)]
+    source.start([(p, tmp_path / "a.zip") for p in members], budget=100)
+
+    assert source.acquire(members[3]) is not None    # Read past the budget, nobody releases the first ones
+
+def test_duplicate_items_released_last(source, tmp_path):
+    path = makeZip(tmp_path / "a.zip", {"a.png": b"0"})
+    member = os.path.join(path, "a.png")
+    source.start([(member, tmp_path / "a.zip")] * 2)
+
+    scratch = source.acquire(member)
+    source.release(member)
+    assert os.path.isfile(scratch)
+    source.acquire(member)
+    source.release(member)
+    assert not os.path.exists(scratch)
+
+def test_acquire_canceled(source):
+    source.members["/a.zip/a.png"] = _Member("/a.zip", "a.png")     # Never read, no readahead running
+    assert source.acquire("/a.zip/a.png", lambda: True) is None
+    assert source.waiting == 0
+
+def test_stop_removes_scratch(source, tmp_path):
+    path = makeZip(tmp_path / "a.zip", {"a.png": b"0"})
+    source.start([(os.path.join(path, "a.png"), tmp_path / "a.zip")])
+    scratch_dir = source.scratch_dir
+    source.acquire(os.path.join(path, "a.png"))
+    source.stop()
+
+    assert not os.path.exists(scratch_dir)
+    assert not source.isEnabled()
+    assert not source.isMember(os.path.join(path, "a.png"))
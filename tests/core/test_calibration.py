@@ -0,0 +1,105 @@
+from unittest.mock import patch
+
+import pytest
+
+from core.calibration import (
+    ENCODERS,
+    FORMAT_ENCODERS,
+    ThreadProfile,
+    calibrate,
+    getThreadSteps,
+)
+
+@pytest.mark.parametrize("max_threads, expected", [
+    (1, [1]),
+    (2, [1, 2]),
+    (6, [1, 2, 3, 4, 6]),
+    (16, [1, 2, 3, 4, 6, 8, 12, 16]),
+    (20, [1, 2, 3, 4, 6, 8, 12, 16, 20]),
+])
+def test_getThreadSteps(max_threads, expected):
+    assert getThreadSteps(max_threads) == expected
+
+# cjxl plateaus at 4 threads
+CJXL_RESULTS = {
+    "cjxl": {
+        "version": "cjxl v0.10.2",
+        "speedup": {1: 1.0, 2: 1.9, 4: 3.2, 8: 3.3},
+        "sizes": {1024: {1: 1.0, 2: 1.9, 4: 3.2, 8: 3.3}},
+    }
+}
+
+@pytest.fixture
+def machine():
+    with patch("core.calibration.getCpuModel", return_value="Test CPU"), \
+        patch("core.calibration.getVersion", return_value="cjxl v0.10.2") as mock_getVersion:
+        yield mock_getVersion
+
+@pytest.fixture
+def profile(tmp_path, machine):
+    profile = ThreadProfile(str(tmp_path / "thread_profile.json"))
+    profile.update(CJXL_RESULTS)
+    return profile
+
+def test_save_load(tmp_path, profile):
+    profile.save()
+    loaded = ThreadProfile(profile.path)
+
+    assert loaded.getCurve("cjxl") == {1: 1.0, 2: 1.9, 4: 3.2, 8: 3.3}
+
+def test_load_corrupted(tmp_path, caplog):
+    path = tmp_path / "thread_profile.json"
+    path.write_text("{")
+
+    assert ThreadProfile(str(path)).data == {}
+    assert "[ThreadProfile] Failed to load" in caplog.text
+
+def test_getCurve_other_version(profile, machine):
+    machine.return_value = "cjxl v0.11.0"
+    assert profile.getCurve("cjxl") is None
+
+def test_getCurve_other_cpu(profile):
+    with patch("core.calibration.getCpuModel", return_value="Other CPU"):
+        assert profile.getCurve("cjxl") is None
+
+def test_getCurve_empty_skips_version_check(tmp_path, machine):
+    assert ThreadProfile(str(tmp_path / "missing.json")).getCurve("cjxl") is None
+    machine.assert_not_called()
+
+@pytest.mark.parametrize("format, item_count, cores, expected", [
+    ("JPEG XL", 100, 16, 1),    # Plenty of items, 1 thread each scales best
+    ("JPEG XL", 2, 16, 4),      # Few items, stop at the plateau
+    ("JPEG XL", 1, 16, 4),
+    ("JPEG XL", 4, 8, 2),
+    ("WebP", 2, 16, None),      # Not profiled
+    ("AVIF", 2, 16, None),      # No curve
+])
+def test_getBestThreads(profile, format, item_count, cores, expected):
+    assert profile.getBestThreads(format, item_count, cores) == expected
+
+def test_every_encoder_mapped():
+    assert set(ENCODERS) == set(FORMAT_ENCODERS.values())
+
+def test_calibrate(tmp_path):
+    times = {1: 8.0, 2: 4.0, 3: 4.0, 4: 2.0}
+
+    def measure(cmd, dst, repeats):
+        threads = int(cmd[-1].split("=")[1])
+        return times[threads]
+
+    with patch("core.calibration.generateSamples", return_value={512: {"png": "a.png"}, 1024: {"png": "b.png"}}), \
+        patch("core.calibration.getVersion", side_effect=lambda path: "v1" if "cjxl" in path else None), \
+        patch("core.calibration._measure", side_effect=measure):
+        results = calibrate(4)
+
+    assert list(results) == ["cjxl"]
+    assert results["cjxl"]["version"] == "v1"
+    assert results["cjxl"]["speedup"] == {1: 1.0, 2: 2.0, 3: 2.0, 4: 4.0}
+    assert set(results["cjxl"]["sizes"]) == {512, 1024}
+
+def test_calibrate_canceled():
+    with patch("core.calibration.generateSamples", return_value={512: {"png": "a.png"}}), \
+        patch("core.calibration.getVersion", return_value="v1"), \
+        patch("core.calibration._measure", return_value=1.0) as mock_measure:
+        assert calibrate(4, is_canceled=lambda: True) == {}
+    mock_measure.assert_not_called()
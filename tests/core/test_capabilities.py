@@ -0,0 +1,105 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from core.capabilities import CapabilityRegistry, getFingerprint, probe
+
+def makeBinary(path, data=b"binary"):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+@pytest.fixture
+def binary(tmp_path):
+    return makeBinary(tmp_path / "cjxl")
+
+@pytest.fixture
+def registry_path(tmp_path):
+    return str(tmp_path / "capabilities.json")
+
+def test_getFingerprint(binary, tmp_path):
+    assert getFingerprint(binary) == [os.stat(binary).st_mtime_ns, 6]
+    assert getFingerprint(str(tmp_path / "missing")) is None
+    assert getFingerprint(None) is None
+
+def test_getFingerprint_bare_name(binary, tmp_path, monkeypatch):
+    os.chmod(binary, 0o755)
+    monkeypatch.setenv("PATH", str(tmp_path))
+    assert getFingerprint("cjxl") == [os.stat(binary).st_mtime_ns, 6]
+    assert getFingerprint("missing") is None
+
+def test_probe_version_and_flags():
+    outputs = [("cjxl v0.10.2 [AVX2]\n", ""), ("", "  --streaming_input\n  --other\n")]
+    with patch("core.capabilities.runProcessOutput", side_effect=outputs):
+        result = probe("cjxl", ("--version",), ("-h",), ("--streaming_input", "--streaming_output"))
+
+    assert result["version"] == "cjxl v0.10.2 [AVX2]"
+    assert result["flags"] == {"--streaming_input": True, "--streaming_output": False}
+
+def test_probe_version_from_stderr():
+    with patch("core.capabilities.runProcessOutput", return_value=("", "\nmagick 7.1\n")):
+        assert probe("magick")["version"] == "magick 7.1"
+
+def test_probe_not_runnable():
+    with patch("core.capabilities.runProcessOutput", side_effect=OSError("Exec format error")):
+        assert probe("cjxl", flags=("--streaming_input",)) == {"version": None, "flags": {"--streaming_input": False}}
+
+def test_get_persisted(binary, registry_path):
+    with patch("core.capabilities.runProcessOutput", return_value=("v1", "")) as mock_run:
+        assert CapabilityRegistry(registry_path).getVersion(binary) == "v1"
+        assert mock_run.call_count == 1
+
+    with patch("core.capabilities.runProcessOutput") as mock_run:
+        registry = CapabilityRegistry(registry_path)     # Next session
+        assert registry.getVersion(binary) == "v1"
+        assert registry.getVersion(binary) == "v1"
+    mock_run.assert_not_called()
+
+def test_get_reprobes_replaced_binary(binary, registry_path):
+    with patch("core.capabilities.runProcessOutput", return_value=("v1", "")):
+        CapabilityRegistry(registry_path).getVersion(binary)
+
+    makeBinary(binary, b"updated binary")
+    with patch("core.capabilities.runProcessOutput", return_value=("v2", "")) as mock_run:
+        assert CapabilityRegistry(registry_path).getVersion(binary) == "v2"
+    mock_run.assert_called_once()
+
+def test_get_missing_binary(tmp_path, registry_path):
+    with patch("core.capabilities.runProcessOutput") as mock_run:
+        assert CapabilityRegistry(registry_path).getVersion(str(tmp_path / "missing")) is None
+    mock_run.assert_not_called()
+
+def test_hasFlag(binary, registry_path):
+    outputs = [("cjxl v0.10.2", ""), ("--streaming_input --streaming_output", "")]
+    with (
+        patch("core.capabilities.CJXL_PATH", binary),
+        patch("core.capabilities.runProcessOutput", side_effect=outputs),
+    ):
+        registry = CapabilityRegistry(registry_path)
+        assert registry.hasFlag("cjxl", "--streaming_input")
+        assert not registry.hasFlag("cjxl", "--unknown")
+
+def test_probeAll(tmp_path, registry_path):
+    binaries = {name: makeBinary(tmp_path / name) for name in ("cjxl", "avifenc")}
+    binaries["exiftool"] = None
+    with (
+        patch("core.capabilities.getBinaries", return_value=binaries),
+        patch("core.capabilities.runProcessOutput", return_value=("v1", "")),
+    ):
+        CapabilityRegistry(registry_path).probeInBackground().join(5)
+
+    with (
+        patch("core.capabilities.getBinaries", return_value=binaries),
+        patch("core.capabilities.runProcessOutput") as mock_run,
+    ):
+        registry = CapabilityRegistry(registry_path)
+        for path in binaries.values():
+            registry.get(path)
+    mock_run.assert_not_called()
+
+def test_corrupted_file(binary, registry_path):
+    with open(registry_path, "w") as f:
+        f.write("{")
+    with patch("core.capabilities.runProcessOutput", return_value=("v1", "")):
+        assert CapabilityRegistry(registry_path).getVersion(binary) == "v1"
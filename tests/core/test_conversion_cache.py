@@ -0,0 +1,148 @@
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from core.conversion_cache import ConversionCache, hashFile, normalizeParams
+
+PARAMS = {
+    "format": "JPEG XL",
+    "quality": 80,
+    "effort": 7,
+    "if_file_exists": "Replace",
+    "custom_output_dir": False,
+    "custom_output_dir_path": "",
+    "keep_dir_struct": False,
+    "delete_original": False,
+    "delete_original_mode": "To Trash",
+    "downscaling": {"enabled": False, "mode": "Percent", "percent": 80},
+    "misc": {"keep_metadata": "Encoder - Wipe", "attributes": False},
+}
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = ConversionCache(str(tmp_path / "cache"))
+    cache.start(1024 * 1024)
+    with patch("core.conversion_cache.getVersion", return_value="v1"):
+        yield cache
+    cache.stop()
+
+@pytest.fixture
+def src(tmp_path):
+    path = tmp_path / "img.png"
+    path.write_bytes(b"image data")
+    return str(path)
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+def test_hashFile(tmp_path):
+    a = write(tmp_path / "a", b"abc")
+    b = write(tmp_path / "b", b"abc")
+    c = write(tmp_path / "c", b"abd")
+    assert hashFile(a) == hashFile(b)
+    assert hashFile(a) != hashFile(c)
+
+def test_normalizeParams_ignores_output_options():
+    other = {**PARAMS, "if_file_exists": "Skip", "custom_output_dir": True, "misc": {**PARAMS["misc"], "attributes": True}}
+    assert normalizeParams(PARAMS) == normalizeParams(other)
+
+def test_normalizeParams_disabled_downscaling():
+    other = {**PARAMS, "downscaling": {"enabled": False, "mode": "Resolution", "percent": 50}}
+    assert normalizeParams(PARAMS) == normalizeParams(other)
+
+def test_getKey_stable(cache, src):
+    assert cache.getKey(src, "png", PARAMS, {}) == cache.getKey(src, "png", dict(PARAMS), {})
+
+def test_getKey_params_change(cache, src):
+    assert cache.getKey(src, "png", PARAMS, {}) != cache.getKey(src, "png", {**PARAMS, "quality": 90}, {})
+
+def test_getKey_settings_change(cache, src):
+    assert cache.getKey(src, "png", PARAMS, {}) != cache.getKey(src, "png", PARAMS, {"jpg_encoder": "JPEGLI from libjxl"})
+
+def test_getKey_version_change(tmp_path, src):
+    cache = ConversionCache(str(tmp_path / "cache"))
+    cache.start(1024)
+    with patch("core.conversion_cache.getVersion", return_value="v1"):
+        key = cache.getKey(src, "png", PARAMS, {})
+    cache.start(1024)
+    with patch("core.conversion_cache.getVersion", return_value="v2"):
+        assert cache.getKey(src, "png", PARAMS, {}) != key
+
+def test_getKey_versions_resolved_once(cache, src):
+    with patch("core.conversion_cache.getVersion", return_value="v1") as mock_getVersion:
+        cache.getKey(src, "png", PARAMS, {})
+        calls = mock_getVersion.call_count
+        cache.getKey(src, "png", PARAMS, {})
+    assert mock_getVersion.call_count == calls
+
+def test_getKey_known_digest(cache, src):
+    key = cache.getKey(src, "png", PARAMS, {})
+    with patch("core.conversion_cache.hashFile") as mock_hashFile:
+        assert cache.getKey(src, "png", PARAMS, {}, lambda: hashFile(src)) == key
+    mock_hashFile.assert_not_called()
+
+def test_getKey_missing_input(cache, tmp_path):
+    with pytest.raises(OSError):
+        cache.getKey(str(tmp_path / "missing.png"), "png", PARAMS, {})
+
+def test_fetch_miss(cache, tmp_path):
+    assert not cache.fetch("ab" * 16, str(tmp_path / "out.jxl"))
+
+def test_store_fetch(cache, tmp_path):
+    out = write(tmp_path / "out.jxl", b"converted")
+    cache.store("ab" * 16, out)
+
+    dst = str(tmp_path / "fetched.jxl")
+    assert cache.fetch("ab" * 16, dst)
+    with open(dst, "rb") as f:
+        assert f.read() == b"converted"
+
+def test_store_never_links(cache, tmp_path):
+    out = write(tmp_path / "out.jxl", b"converted")
+    cache.store("ab" * 16, out)
+    assert not os.path.samefile(out, cache._getEntryPath("ab" * 16))
+
+def test_store_output_modified_in_place(cache, tmp_path):
+    out = write(tmp_path / "out.jxl", b"converted")
+    cache.store("ab" * 16, out)
+    with open(out, "r+b") as f:     # ExifTool -overwrite_original_in_place
+        f.write(b"metadata")
+
+    dst = str(tmp_path / "fetched.jxl")
+    assert cache.fetch("ab" * 16, dst)
+    with open(dst, "rb") as f:
+        assert f.read() == b"converted"
+
+def test_fetch_keeps_output_mtime(cache, tmp_path):
+    out = write(tmp_path / "out.jxl", b"converted")
+    cache.store("ab" * 16, out)
+    os.utime(out, (1000000000, 1000000000))     # Keep date/time
+
+    assert cache.fetch("ab" * 16, str(tmp_path / "fetched.jxl"))
+    assert os.path.getmtime(out) == 1000000000
+
+def test_store_evicts_lru(cache, tmp_path):
+    cache.start(250)
+    keys = [f"{i:02d}" * 16 for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.store(key, write(tmp_path / f"out_{i}", b"x" * 100))
+        entry = cache._getEntryPath(key)
+        os.utime(entry, (time.time() - 100 + i, time.time() - 100 + i))
+
+    assert not os.path.isfile(cache._getEntryPath(keys[0]))
+    assert os.path.isfile(cache._getEntryPath(keys[2]))
+    assert cache.size <= 250
+
+def test_clear(cache, tmp_path):
+    cache.store("ab" * 16, write(tmp_path / "out.jxl", b"converted"))
+    cache.clear()
+    assert not os.path.isdir(cache.cache_dir)
+    assert cache.size == 0
+
+def test_isSupported(cache):
+    assert cache.isSupported("JPEG XL")
+    assert not cache.isSupported("Smallest Lossless")
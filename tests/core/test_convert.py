@@ -21,6 +21,11 @@ def test_optimize():
         convert.optimize("path/to/optimizer", "target.png", ["-o 4"])
         mock_runProcess.assert_called_once_with("path/to/optimizer", "-o", "4", "target.png")
 
+def test_optimize_out():
+    with patch("core.convert.runProcess") as mock_runProcess:
+        convert.optimize("path/to/optimizer", "src.png", ["-o 4"], dst="dst.png")
+        mock_runProcess.assert_called_once_with("path/to/optimizer", "-o", "4", "--out", "dst.png", "src.png")
+
 def test_getExtensionJxl_jpg():
     with patch("core.convert.runProcessOutput", return_value=("JPEG bitstream reconstruction data available", "")):
         assert convert.getExtensionJxl("src.jxl") == "jpg"
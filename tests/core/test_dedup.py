@@ -0,0 +1,192 @@
+import os
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from core.dedup import Duplicates, getSizes
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+@pytest.fixture
+def dups():
+    dups = Duplicates()
+    yield dups
+    dups.stop()
+
+@pytest.fixture
+def files(tmp_path):
+    return [
+        write(tmp_path / "a.png", b"same"),
+        write(tmp_path / "b.png", b"same"),
+        write(tmp_path / "c.png", b"diff"),     # Same size, different content
+        write(tmp_path / "d.png", b"unique size"),
+    ]
+
+def test_getSizes(tmp_path, files):
+    assert getSizes(files + [str(tmp_path / "missing.png")]) == [4, 4, 4, 11, None]
+
+def test_unique_size_not_hashed(dups, files):
+    dups.start(getSizes(files))
+    with patch("core.dedup.hashFile") as mock_hashFile:
+        assert not dups.register(3, files[3])
+    mock_hashFile.assert_not_called()
+
+def test_register(dups, files):
+    dups.start(getSizes(files))
+    assert not dups.register(0, files[0])
+    assert dups.register(1, files[1])
+    assert not dups.register(2, files[2])
+
+def test_register_known_digest(dups, files):
+    dups.start(getSizes(files))
+    with patch("core.dedup.hashFile") as mock_hashFile:
+        assert not dups.register(0, files[0], lambda: "digest")
+        assert dups.register(1, files[1], lambda: "digest")
+    mock_hashFile.assert_not_called()
+
+def test_fetch(dups, files, tmp_path):
+    dups.start(getSizes(files))
+    dups.register(0, files[0])
+    dups.register(1, files[1])
+
+    output = write(tmp_path / "a_tmp.jxl", b"converted")
+    dups.publish(0, output)
+    dups.release(0)
+
+    dst = str(tmp_path / "b_tmp.jxl")
+    assert dups.fetch(1, dst)
+    with open(dst, "rb") as f:
+        assert f.read() == b"converted"
+
+    stats = dups.getStats()
+    assert stats["reused"] == 1
+    assert stats["bytes"] == 4
+
+def test_fetch_copy(dups, files, tmp_path):
+    dups.start(getSizes(files))
+    dups.register(0, files[0])
+    dups.register(1, files[1])
+    output = write(tmp_path / "a_tmp.jxl", b"converted")
+    dups.publish(0, output, link=False)
+    dups.release(0)
+
+    dst = str(tmp_path / "b_tmp.jxl")
+    assert dups.fetch(1, dst, link=False)
+    assert not os.path.samefile(output, dst)
+
+def test_fetch_representative_failed(dups, files, tmp_path):
+    dups.start(getSizes(files))
+    dups.register(0, files[0])
+    dups.register(1, files[1])
+    dups.release(0)
+
+    assert not dups.fetch(1, str(tmp_path / "b_tmp.jxl"))
+    assert dups.getStats()["reused"] == 0
+
+def test_fetch_waits_for_representative(dups, files, tmp_path):
+    dups.start(getSizes(files))
+    dups.register(0, files[0])
+    dups.register(1, files[1])
+    fetched = []
+
+    thread = threading.Thread(target=lambda: fetched.append(dups.fetch(1, str(tmp_path / "b_tmp.jxl"))))
+    thread.start()
+    thread.join(0.3)
+    assert thread.is_alive()
+
+    dups.publish(0, write(tmp_path / "a_tmp.jxl", b"converted"))
+    dups.release(0)
+    thread.join(5)
+    assert fetched == [True]
+
+def test_fetch_canceled(dups, files, tmp_path):
+    dups.start(getSizes(files))
+    dups.register(0, files[0])
+    dups.register(1, files[1])
+
+    assert not dups.fetch(1, str(tmp_path / "b_tmp.jxl"), is_canceled=lambda: True)
+
+def test_staging_removed(dups, files, tmp_path):
+    dups.start(getSizes(files))
+    dups.register(0, files[0])
+    dups.register(1, files[1])
+    dups.register(2, files[2])
+    dups.publish(0, write(tmp_path / "a_tmp.jxl", b"converted"))
+    staging = dups.item_groups[0].staging
+    assert os.path.isfile(staging)
+
+    dups.release(0)
+    assert os.path.isfile(staging)
+    dups.fetch(1, str(tmp_path / "b_tmp.jxl"))
+    assert not os.path.isfile(staging)
+
+def test_staging_kept_for_late_duplicates(dups, files, tmp_path):
+    dups.start(getSizes(files))
+    dups.register(0, files[0])
+    dups.publish(0, write(tmp_path / "a_tmp.jxl", b"converted"))
+    dups.release(0)
+
+    assert dups.register(1, files[1])   # Registered after the representative finished
+    assert dups.fetch(1, str(tmp_path / "b_tmp.jxl"))
+
+def test_no_staging_without_duplicates(dups, files, tmp_path):
+    dups.start(getSizes(files))
+    dups.register(0, files[0])
+    dups.register(1, files[1])
+    dups.register(2, files[2])
+
+    dups.publish(2, write(tmp_path / "c_tmp.jxl", b"converted"))
+    assert dups.item_groups[2].staging is None
+
+def test_stop_removes_staging(dups, files, tmp_path):
+    dups.start(getSizes(files))
+    dups.register(0, files[0])
+    dups.publish(0, write(tmp_path / "a_tmp.jxl", b"converted"))
+    staging = dups.item_groups[0].staging
+
+    dups.stop()
+    assert not os.path.isfile(staging)
+
+def test_startInBackground(dups, files):
+    collecting = threading.Event()
+    def getSizesLater():
+        collecting.wait(5)
+        return getSizes(files)
+
+    dups.startInBackground(getSizesLater)
+    registered = []
+    thread = threading.Thread(target=lambda: registered.append(dups.register(0, files[0])))
+    thread.start()
+    thread.join(0.3)
+    assert thread.is_alive()    # Waits for the sizes
+
+    collecting.set()
+    thread.join(5)
+    assert registered == [False]
+    assert dups.register(1, files[1])
+
+def test_stop_unblocks_register(dups, files):
+    dups.start()
+    registered = []
+    thread = threading.Thread(target=lambda: registered.append(dups.register(0, files[0])))
+    thread.start()
+
+    dups.stop()
+    thread.join(5)
+    assert registered == [False]
+
+def test_stale_sizes_ignored(dups, files):
+    collecting = threading.Event()
+    def getStaleSizes():
+        collecting.wait(5)
+        return [4] * len(files)
+
+    thread = dups.startInBackground(getStaleSizes)
+    dups.start([11] * len(files))   # Next batch, before the first one got its sizes
+    collecting.set()
+    thread.join(5)
+    assert dups.sizes == [11] * len(files)
@@ -0,0 +1,298 @@
+import os
+import socket
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from core.distributed import (
+    WorkerDaemon,
+    Coordinator,
+    parseAddress,
+    readMessage,
+    sendMessage,
+    isLoopback,
+)
+from core.exceptions import GenericException
+from core.pathing import name_index
+from core.fs_cache import StatCache, dir_cache
+
+def fakeRunItem(n, abs_path, anchor_path, params, settings, threads, path_locks):
+    return {"n": n, "status": "completed", "exceptions": [], "host": threading.current_thread().name}
+
+@pytest.fixture
+def daemons():
+    started = []
+    with patch("core.distributed.runItem", side_effect=fakeRunItem) as mock_runItem:
+        def start(count, **kwargs):
+            for _ in range(count):
+                daemon = WorkerDaemon("127.0.0.1:0", threads=2, **kwargs)
+                daemon.start()
+                started.append(daemon)
+            return started
+        start.mock_runItem = mock_runItem
+        yield start
+
+    for daemon in started:
+        daemon.stop()
+
+def getItems(count, dirs=4):
+    return [(Path(f"/shared/dir_{i % dirs}/image_{i}.png"), Path("/shared")) for i in range(count)]
+
+class DyingDaemon():
+    """Accepts a single job, then drops the connection."""
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.jobs = 0
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def getAddress(self):
+        return f"127.0.0.1:{self.sock.getsockname()[1]}"
+
+    def _serve(self):
+        conn, _ = self.sock.accept()
+        with conn:
+            if readMessage(conn.makefile("rb")) is not None:
+                self.jobs += 1
+        self.sock.close()
+
+class FlakyDaemon():
+    """Drops the first connection after receiving a job, then completes everything it's sent."""
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.jobs = []
+        self.thread = threading.Thread(target=self._serve, daemon=True)
+        self.thread.start()
+
+    def getAddress(self):
+        return f"127.0.0.1:{self.sock.getsockname()[1]}"
+
+    def _serve(self):
+        conn, _ = self.sock.accept()
+        with conn:
+            self.jobs.append(readMessage(conn.makefile("rb"))["unit"])
+
+        conn, _ = self.sock.accept()
+        with conn:
+            rfile, wfile = conn.makefile("rb"), conn.makefile("wb")
+            while (msg := readMessage(rfile)) is not None:
+                self.jobs.append(msg["unit"])
+                results = [{"n": n, "status": "completed", "exceptions": []} for n, _, _ in msg["items"]]
+                sendMessage(wfile, {"type": "result", "unit": msg["unit"], "results": results})
+        self.sock.close()
+
+@pytest.mark.parametrize("address, expected", [
+    ("127.0.0.1:7878", (socket.AF_INET, ("127.0.0.1", 7878))),
+    (":7878", (socket.AF_INET, ("127.0.0.1", 7878))),
+    ("unix:/tmp/xl.sock", (socket.AF_UNIX, "/tmp/xl.sock")),
+])
+def test_parseAddress(address, expected):
+    assert parseAddress(address) == expected
+
+def test_parseAddress_invalid():
+    with pytest.raises(GenericException):
+        parseAddress("localhost")
+
+def test_splitUnits_groups_by_folder():
+    coordinator = Coordinator([], unit_size=5)
+    units = coordinator.splitUnits(getItems(20, dirs=4))
+
+    assert len(units) == 4
+    for unit in units:
+        assert len({str(Path(abs_path).parent) for _, abs_path, _ in unit.items}) == 1
+
+def test_run_multiple_daemons(daemons):
+    started = daemons(3)
+    coordinator = Coordinator([d.getAddress() for d in started], unit_size=4)
+    items = getItems(50)
+
+    results = coordinator.run(items, {"format": "PNG"}, {})
+
+    assert [r["n"] for r in results] == list(range(50))
+    assert all(r["status"] == "completed" for r in results)
+    assert daemons.mock_runItem.call_count == 50
+
+def test_run_on_result(daemons):
+    started = daemons(1)
+    received = []
+    coordinator = Coordinator([started[0].getAddress()], unit_size=3)
+
+    coordinator.run(getItems(7), {}, {}, received.append)
+
+    assert sorted(r["n"] for r in received) == list(range(7))
+
+def test_run_unix_socket(tmp_path):
+    with patch("core.distributed.runItem", side_effect=fakeRunItem):
+        daemon = WorkerDaemon(f"unix:{tmp_path / 'worker.sock'}", threads=2)
+        daemon.start()
+        try:
+            results = Coordinator([daemon.getAddress()]).run(getItems(5), {}, {})
+        finally:
+            daemon.stop()
+
+    assert len(results) == 5
+
+def test_run_retries_on_lost_daemon(daemons):
+    dying = DyingDaemon()
+    started = daemons(1)
+    coordinator = Coordinator([dying.getAddress(), started[0].getAddress()], unit_size=2, reconnect_delay=0.01)
+
+    results = coordinator.run(getItems(10), {}, {})
+
+    assert dying.jobs == 1
+    assert [r["n"] for r in results] == list(range(10))
+    assert all(not r["exceptions"] for r in results)
+
+def test_run_heartbeat_timeout():
+    silent = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    silent.bind(("127.0.0.1", 0))
+    silent.listen()
+    try:
+        coordinator = Coordinator([f"127.0.0.1:{silent.getsockname()[1]}"], heartbeat_timeout=0.2, max_retries=0, reconnect_delay=0.01)
+        results = coordinator.run(getItems(3), {}, {})
+    finally:
+        silent.close()
+
+    assert len(results) == 3
+    assert all(r["exceptions"][0][0] == "DS2" for r in results)
+
+def test_run_heartbeats_keep_unit_alive(daemons):
+    def slowRunItem(*args):
+        threading.Event().wait(0.5)
+        return fakeRunItem(*args)
+
+    started = daemons(1, heartbeat_interval=0.1)
+    daemons.mock_runItem.side_effect = slowRunItem
+    coordinator = Coordinator([started[0].getAddress()], heartbeat_timeout=0.3, max_retries=0)
+
+    results = coordinator.run(getItems(2), {}, {})
+
+    assert all(not r["exceptions"] for r in results)
+
+def test_run_reconnects_lost_daemon():
+    flaky = FlakyDaemon()
+    coordinator = Coordinator([flaky.getAddress()], unit_size=2, max_retries=0, reconnect_delay=0.01)
+
+    results = coordinator.run(getItems(4, dirs=1), {}, {})
+
+    assert flaky.jobs == [0, 0, 1]     # The unit in flight is sent again after reconnecting
+    assert all(not r["exceptions"] for r in results)
+
+def test_run_no_daemons_available():
+    coordinator = Coordinator(["127.0.0.1:1"], max_retries=0, reconnect_delay=0.01)
+    results = coordinator.run(getItems(2), {}, {})
+
+    assert [r["exceptions"][0][0] for r in results] == ["DS2", "DS2"]
+
+@pytest.mark.parametrize("params, settings", [
+    ({"archive_output": True}, {}),
+    ({}, {"execution_class": "Background"}),
+    ({}, {"cpu_placement": True}),
+    ({}, {"conversion_cache": True}),
+    ({}, {"deduplicate": True}),
+])
+def test_run_unsupported_settings(params, settings):
+    with pytest.raises(GenericException) as exc:
+        Coordinator(["127.0.0.1:1"]).run(getItems(1), params, settings)
+    assert exc.value.id == "DS5"
+
+def test_unix_socket_owner_only(tmp_path):
+    daemon = WorkerDaemon(f"unix:{tmp_path / 'worker.sock'}")
+    daemon.start()
+    try:
+        assert os.stat(tmp_path / "worker.sock").st_mode & 0o777 == 0o600
+    finally:
+        daemon.stop()
+
+@pytest.mark.parametrize("host, expected", [
+    ("127.0.0.1", True),
+    ("::1", True),
+    ("localhost", True),
+    ("0.0.0.0", False),
+    ("192.168.1.10", False),
+    ("worker.lan", False),
+])
+def test_isLoopback(host, expected):
+    assert isLoopback(host) == expected
+
+def test_daemon_needs_token_outside_loopback():
+    with pytest.raises(GenericException) as exc:
+        WorkerDaemon("0.0.0.0:0")
+    assert exc.value.id == "DS3"
+
+def test_run_token(daemons):
+    started = daemons(1, token="secret")
+    results = Coordinator([started[0].getAddress()], token="secret").run(getItems(3), {}, {})
+
+    assert all(not r["exceptions"] for r in results)
+    assert daemons.mock_runItem.call_count == 3
+
+def test_run_wrong_token_rejected(daemons):
+    started = daemons(1, token="secret")
+    results = Coordinator([started[0].getAddress()], token="guess", max_retries=0).run(getItems(3), {}, {})
+
+    assert all(r["exceptions"][0][0] == "DS2" for r in results)
+    daemons.mock_runItem.assert_not_called()
+
+def test_run_missing_token_rejected(daemons):
+    started = daemons(1, token="secret")
+    results = Coordinator([started[0].getAddress()], max_retries=0).run(getItems(1), {}, {})
+
+    assert results[0]["exceptions"][0][0] == "DS2"
+    daemons.mock_runItem.assert_not_called()
+
+def test_name_index_per_unit(daemons):
+    enabled = []
+    def runItem(*args):
+        enabled.append(name_index.isEnabled())
+        return fakeRunItem(*args)
+
+    started = daemons(2)
+    daemons.mock_runItem.side_effect = runItem
+    assert not name_index.isEnabled()
+
+    Coordinator([started[0].getAddress()]).run(getItems(2), {}, {})
+    assert enabled == [True, True]
+    assert not name_index.isEnabled()   # Names of this run don't carry over to the next one
+
+def test_name_index_outlives_other_daemons(daemons):
+    started = daemons(2)
+    release = threading.Event()
+    enabled = []
+    def runItem(*args):
+        release.wait(5)
+        enabled.append(name_index.isEnabled())
+        return fakeRunItem(*args)
+    daemons.mock_runItem.side_effect = runItem
+
+    thread = threading.Thread(target=Coordinator([started[0].getAddress()]).run, args=(getItems(1), {}, {}))
+    thread.start()
+    threading.Event().wait(0.2)
+    started.pop(1).stop()   # Doesn't disable the index of the unit that's still running
+    release.set()
+    thread.join()
+
+    assert enabled == [True]
+
+def test_dir_cache_per_unit(daemons, tmp_path):
+    out = tmp_path / "out"
+    def runItem(*args):
+        StatCache().makedirs(str(out))
+        return fakeRunItem(*args)
+
+    started = daemons(1)
+    daemons.mock_runItem.side_effect = runItem
+    coordinator = Coordinator([started[0].getAddress()])
+
+    coordinator.run(getItems(1), {}, {})
+    out.rmdir()     # Removed between runs
+    coordinator.run(getItems(1), {}, {})
+
+    assert out.is_dir()
+    assert not dir_cache.isCreated(str(out))
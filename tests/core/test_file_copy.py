@@ -0,0 +1,80 @@
+import os
+import sys
+import errno
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from core.file_copy import copyFile
+
+@pytest.fixture
+def src(tmp_path):
+    path = tmp_path / "src.png"
+    path.write_bytes(os.urandom(200_000))
+    return path
+
+def test_copy(src, tmp_path):
+    dst = tmp_path / "dst.png"
+    method = copyFile(str(src), str(dst))
+
+    assert method in ("reflink", "copy_file_range", "copy")
+    assert dst.read_bytes() == src.read_bytes()
+    assert not os.path.samefile(src, dst)
+
+def test_replaces_existing(src, tmp_path):
+    dst = tmp_path / "dst.png"
+    dst.write_bytes(b"0" * 500_000)
+    copyFile(str(src), str(dst))
+    assert dst.read_bytes() == src.read_bytes()
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permission bits")
+def test_mode(src, tmp_path):
+    os.chmod(src, 0o640)
+    dst = tmp_path / "dst.png"
+    copyFile(str(src), str(dst))
+    assert os.stat(dst).st_mode & 0o777 == 0o640
+
+@patch("core.file_copy._reflink", return_value=False)
+@patch("core.file_copy._copyFileRange", return_value=False)
+def test_link(mock_copyFileRange, mock_reflink, src, tmp_path):
+    dst = tmp_path / "dst.png"
+    dst.write_bytes(b"0")   # Reserved name
+
+    assert copyFile(str(src), str(dst), link=True) == "link"
+    assert os.path.samefile(src, dst)
+    assert sorted(os.listdir(tmp_path)) == ["dst.png", "src.png"]     # No temporary link left
+    mock_copyFileRange.assert_not_called()
+
+@patch("core.file_copy._reflink", return_value=False)
+@patch("core.file_copy.os.link", side_effect=OSError)
+def test_link_not_supported(mock_link, mock_reflink, src, tmp_path):
+    dst = tmp_path / "dst.png"
+    assert copyFile(str(src), str(dst), link=True) != "link"
+    assert dst.read_bytes() == src.read_bytes()
+
+@pytest.mark.skipif(not hasattr(os, "copy_file_range"), reason="Linux only")
+@patch("core.file_copy._reflink", return_value=False)
+@patch("core.file_copy.os.copy_file_range", side_effect=OSError(errno.EXDEV, "Cross-device link"))
+def test_copy_file_range_fallback(mock_copy_file_range, mock_reflink, src, tmp_path):
+    dst = tmp_path / "dst.png"
+    assert copyFile(str(src), str(dst)) == "copy"
+    assert dst.read_bytes() == src.read_bytes()
+
+@pytest.mark.skipif(not hasattr(os, "copy_file_range"), reason="Linux only")
+@patch("core.file_copy._reflink", return_value=False)
+def test_copy_file_range_short(mock_reflink, src, tmp_path):
+    dst = tmp_path / "dst.png"
+    with patch("core.file_copy.os.copy_file_range", side_effect=[1000, 0]):
+        assert copyFile(str(src), str(dst)) == "copy"
+    assert dst.read_bytes() == src.read_bytes()
+
+def test_same_file(src):
+    with pytest.raises(shutil.SameFileError):
+        copyFile(str(src), str(src))
+    assert os.path.getsize(src) == 200_000
+
+def test_missing_source(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        copyFile(str(tmp_path / "missing.png"), str(tmp_path / "dst.png"))
+    assert not (tmp_path / "dst.png").exists()
@@ -0,0 +1,101 @@
+from unittest.mock import patch
+
+import pytest
+
+from core.fs_cache import StatCache, DirCache, dir_cache
+
+@pytest.fixture
+def fs():
+    return StatCache()
+
+@pytest.fixture
+def batch():
+    dir_cache.start()
+    yield
+    dir_cache.stop()
+
+def test_stat_once(fs, tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(b"0" * 10)
+
+    assert fs.isfile(str(path))
+    assert fs.getsize(str(path)) == 10
+    assert fs.calls["stat"] == 1
+
+def test_missing(fs, tmp_path):
+    path = str(tmp_path / "missing.png")
+    assert not fs.isfile(path)
+    with pytest.raises(FileNotFoundError):
+        fs.getsize(path)
+    assert fs.calls["stat"] == 1
+
+def test_directory_is_not_a_file(fs, tmp_path):
+    assert not fs.isfile(str(tmp_path))
+
+def test_rename_moves_entry(fs, tmp_path):
+    src, dst = str(tmp_path / "a.tmp"), str(tmp_path / "a.png")
+    (tmp_path / "a.tmp").write_bytes(b"0" * 10)
+    fs.getsize(src)
+    fs.rename(src, dst)
+
+    assert fs.getsize(dst) == 10
+    assert not fs.isfile(src)
+    assert fs.calls == {"stat": 1, "rename": 1}
+
+def test_remove(fs, tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(b"0")
+    fs.isfile(str(path))
+    fs.remove(str(path))
+
+    assert not path.exists()
+    assert not fs.isfile(str(path))
+    assert fs.calls["stat"] == 1
+
+def test_forget(fs, tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(b"0")
+    fs.getsize(str(path))
+    path.write_bytes(b"00")
+    fs.forget(str(path))
+    assert fs.getsize(str(path)) == 2
+
+def test_samefile(fs, tmp_path):
+    path = tmp_path / "a.png"
+    path.write_bytes(b"0")
+    assert fs.samefile(str(path), f"{tmp_path}/./a.png")
+    assert fs.calls["stat"] == 2
+
+def test_makedirs_once_per_batch(fs, tmp_path, batch):
+    path = str(tmp_path / "out")
+    fs.makedirs(path)
+    StatCache().makedirs(path)
+    fs.makedirs(path)
+    assert fs.calls["makedirs"] == 1
+
+def test_makedirs_outside_of_batch(fs, tmp_path):
+    path = str(tmp_path / "out")
+    fs.makedirs(path)
+    fs.makedirs(path)
+    assert fs.calls["makedirs"] == 2
+
+@patch("core.fs_cache.getFreeSpaceLeft", return_value=1000)
+def test_free_space_reused(mock_getFreeSpaceLeft, fs, batch):
+    assert fs.getFreeSpace("/out") == 1000
+    assert StatCache().getFreeSpace("/out") == 1000
+    mock_getFreeSpaceLeft.assert_called_once()
+
+@patch("core.fs_cache.getFreeSpaceLeft", return_value=1000)
+@patch("core.fs_cache.FREE_SPACE_TTL", 0)
+def test_free_space_expires(mock_getFreeSpaceLeft, fs, batch):
+    fs.getFreeSpace("/out")
+    fs.getFreeSpace("/out")
+    assert mock_getFreeSpaceLeft.call_count == 2
+
+def test_dir_cache_cleared():
+    cache = DirCache()
+    cache.start()
+    cache.addCreated("/out")
+    cache.stop()
+    cache.start()
+    assert not cache.isCreated("/out")
@@ -0,0 +1,62 @@
+import struct
+
+import pytest
+
+from core.image_header import getResolution, getMegapixels
+
+def png(width, height):
+    return b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" + struct.pack(">II", width, height) + b"\x08\x02\x00\x00\x00"
+
+def jpeg(width, height, app_size=2000):
+    app1 = b"\xff\xe1" + struct.pack(">H", app_size + 2) + b"\x00" * app_size
+    sof0 = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + b"\x01\x11\x00"
+    return b"\xff\xd8" + app1 + b"\xff\xff" + sof0 + b"\xff\xd9"
+
+def gif(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00" * 22
+
+def bmp(width, height):
+    return b"BM" + b"\x00" * 16 + struct.pack("<ii", width, -height) + b"\x00" * 10
+
+def webp_vp8x(width, height):
+    return b"RIFF\x00\x00\x00\x00WEBPVP8X" + b"\x0a\x00\x00\x00" + b"\x00" * 4 + (width - 1).to_bytes(3, "little") + (height - 1).to_bytes(3, "little")
+
+def webp_vp8l(width, height):
+    bits = (width - 1) | ((height - 1) << 14)
+    return b"RIFF\x00\x00\x00\x00WEBPVP8L" + b"\x00" * 4 + b"\x2f" + bits.to_bytes(4, "little") + b"\x00" * 3
+
+def webp_vp8(width, height):
+    return b"RIFF\x00\x00\x00\x00WEBPVP8 " + b"\x00" * 4 + b"\x00" * 3 + b"\x9d\x01\x2a" + struct.pack("<HH", width, height) + b"\x00" * 2
+
+@pytest.mark.parametrize("data", [
+    png(1920, 1080),
+    jpeg(1920, 1080),
+    jpeg(1920, 1080, app_size=60000),
+    gif(1920, 1080),
+    bmp(1920, 1080),
+    webp_vp8x(1920, 1080),
+    webp_vp8l(1920, 1080),
+    webp_vp8(1920, 1080),
+])
+def test_getResolution(tmp_path, data):
+    path = tmp_path / "image"
+    path.write_bytes(data)
+    assert getResolution(str(path)) == (1920, 1080)
+
+@pytest.mark.parametrize("data", [
+    b"",
+    b"not an image at all, just text",
+    b"\xff\xd8\xff\xe1\x00",    # Truncated JPEG
+])
+def test_getResolution_unsupported(tmp_path, data):
+    path = tmp_path / "image"
+    path.write_bytes(data)
+    assert getResolution(str(path)) is None
+
+def test_getResolution_missing(tmp_path):
+    assert getResolution(str(tmp_path / "missing.png")) is None
+
+def test_getMegapixels(tmp_path):
+    path = tmp_path / "image.png"
+    path.write_bytes(png(2000, 1500))
+    assert getMegapixels(str(path)) == 3.0
@@ -0,0 +1,121 @@
+from pathlib import Path
+
+import pytest
+
+from core.journal import Journal
+
+PARAMS = {"format": "JPEG XL", "quality": 80}
+SETTINGS = {"jpg_encoder": "JPEGLI"}
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = Journal(str(tmp_path / "journal.db"))
+    yield journal
+    journal.close()
+
+@pytest.fixture
+def items(tmp_path):
+    return [(tmp_path / f"img_{i}.png", tmp_path) for i in range(4)]
+
+def test_no_batch(journal):
+    assert journal.getLastBatch() is None
+    assert journal.resume() is None
+
+def test_begin(journal, items):
+    journal.begin(items, PARAMS, SETTINGS)
+
+    assert journal.isEnabled()
+    last = journal.getLastBatch()
+    assert last["total"] == 4
+    assert last["left"] == 4
+
+def test_resume_unfinished(journal, items):
+    journal.begin(items, PARAMS, SETTINGS)
+    journal.markCompleted(0, "out_0.jxl")
+    journal.markStarted(1, [])
+    journal.markFailed(2)
+    journal.stop()
+
+    resumed, params, settings = journal.resume()
+
+    assert resumed == [(Path(p), Path(a)) for p, a in items[1:]]
+    assert params == PARAMS
+    assert settings == SETTINGS
+    assert journal.getLastBatch()["left"] == 3
+
+def test_resume_maps_indices(journal, items):
+    journal.begin(items, PARAMS, SETTINGS)
+    journal.markCompleted(0, "out_0.jxl")
+    journal.markCompleted(2, "out_2.jxl")
+    journal.stop()
+
+    resumed, _, _ = journal.resume()
+    assert resumed == [(Path(p), Path(a)) for p, a in (items[1], items[3])]
+
+    journal.markCompleted(1, "out_3.jxl")     # Dispatch index 1 is item 3
+    journal.stop()
+
+    resumed, _, _ = journal.resume()
+    assert resumed == [(Path(items[1][0]), Path(items[1][1]))]
+
+def test_resume_removes_tmp(journal, items, tmp_path):
+    tmp = tmp_path / "img_1_abc.jxl"
+    tmp.write_bytes(b"partial")
+
+    journal.begin(items, PARAMS, SETTINGS)
+    journal.markStarted(1, [str(tmp), str(tmp_path / "missing.png")])
+    journal.stop()
+
+    journal.resume()
+    assert not tmp.exists()
+
+def test_completed_keeps_output(journal, items, tmp_path):
+    out = tmp_path / "img_0.jxl"
+    out.write_bytes(b"done")
+
+    journal.begin(items, PARAMS, SETTINGS)
+    journal.markStarted(0, [str(out)])
+    journal.markCompleted(0, str(out))
+    journal.stop()
+
+    journal.resume()
+    assert out.exists()
+
+def test_finish(journal, items):
+    journal.begin(items, PARAMS, SETTINGS)
+    journal.finish()
+
+    assert not journal.isEnabled()
+    assert journal.getLastBatch() is None
+
+def test_begin_supersedes(journal, items):
+    journal.begin(items, PARAMS, SETTINGS)
+    journal.stop()
+    journal.begin(items[:1], PARAMS, SETTINGS)
+    journal.finish()
+
+    assert journal.getLastBatch() is None
+
+def test_updates_ignored_when_stopped(journal, items):
+    journal.begin(items, PARAMS, SETTINGS)
+    journal.stop()
+    journal.markCompleted(0, "out_0.jxl")
+
+    assert journal.getLastBatch()["left"] == 4
+
+def test_persists(tmp_path, items):
+    path = str(tmp_path / "journal.db")
+    journal = Journal(path)
+    journal.begin(items, PARAMS, SETTINGS)
+    journal.markCompleted(0, "out_0.jxl")
+    journal.close()
+
+    journal = Journal(path)
+    assert journal.getLastBatch()["left"] == 3
+    journal.close()
+
+def test_prune(journal, items):
+    for _ in range(8):
+        journal.begin(items, PARAMS, SETTINGS)
+    batches = journal.conn.execute("SELECT COUNT(*) FROM batches").fetchone()[0]
+    assert batches <= 5
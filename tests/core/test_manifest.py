@@ -0,0 +1,55 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from core.manifest import readManifest
+
+def read(path, **kwargs):
+    return [item for chunk in readManifest(str(path), **kwargs) for item in chunk]
+
+def test_lines(tmp_path):
+    manifest = tmp_path / "list.txt"
+    manifest.write_text("/images/a.png\r\n\n/images/b.JPG\n/images/notes.txt\n")
+    assert read(manifest) == [
+        (os.path.normpath("/images/a.png"), Path(os.path.normpath("/images"))),
+        (os.path.normpath("/images/b.JPG"), Path(os.path.normpath("/images"))),
+    ]
+
+def test_relative_to_list(tmp_path):
+    manifest = tmp_path / "list.txt"
+    manifest.write_text("sub/a.png\n")
+    assert read(manifest) == [(str(tmp_path / "sub" / "a.png"), tmp_path / "sub")]
+
+def test_nul_separated(tmp_path):
+    manifest = tmp_path / "list.lst"
+    manifest.write_bytes(b"/images/line\nbreak.png\0/images/b.webp\0")
+    assert [path for path, _ in read(manifest)] == [os.path.normpath("/images/line\nbreak.png"), os.path.normpath("/images/b.webp")]
+
+def test_csv_header(tmp_path):
+    manifest = tmp_path / "export.csv"
+    manifest.write_text('id,Path,Anchor\n1,/images/x/a.png,/images\n2,"/images/y/b,c.png",\n')
+    assert read(manifest) == [
+        (os.path.normpath("/images/x/a.png"), Path(os.path.normpath("/images"))),
+        (os.path.normpath("/images/y/b,c.png"), Path(os.path.normpath("/images/y"))),
+    ]
+
+def test_csv_no_header(tmp_path):
+    manifest = tmp_path / "export.csv"
+    manifest.write_text("/images/x/a.png,/images\n/images/x/b.png\n")
+    assert [anchor for _, anchor in read(manifest)] == [Path(os.path.normpath("/images")), Path(os.path.normpath("/images/x"))]
+
+def test_anchors_shared(tmp_path):
+    manifest = tmp_path / "list.txt"
+    manifest.write_text("/images/a.png\n/images/b.png\n")
+    items = read(manifest)
+    assert items[0][1] is items[1][1]
+
+def test_chunks(tmp_path):
+    manifest = tmp_path / "list.txt"
+    manifest.write_text("".join(f"/images/{n}.png\n" for n in range(5)))
+    assert [len(chunk) for chunk in readManifest(str(manifest), chunk_size=2)] == [2, 2, 1]
+
+def test_missing(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        readManifest(str(tmp_path / "missing.txt"))
@@ -94,18 +94,19 @@ def reset_data():
     metadata.Data.exiftool_available = None
     metadata.Data.exiftool_err_msg = ""
 
-@pytest.mark.parametrize("system, output, expected", [
-    ("Linux", ("", "exiftool is /usr/bin/exiftool"), (True, "")),
-    ("Linux", ("", "bash: type: exiftool: not found"), (False, "ExifTool not found.")),
-    ("Windows", ("12.40",""), (True, "")),
-    ("Windows", ("",""), (False, "Please reinstall this program")),
-    ("Windows", ("","assertion failed"), (False, "Please reinstall this program")),
-    ("Darwin", ("", ""), (True, "")),
+@pytest.mark.parametrize("system, exiftool_path, version, expected", [
+    ("Linux", "/usr/bin/exiftool", None, (True, "")),
+    ("Linux", None, None, (False, "ExifTool not found.")),
+    ("Windows", None, "12.40", (True, "")),
+    ("Windows", None, None, (False, "Please reinstall this program")),
+    ("Windows", None, "assertion failed", (False, "Please reinstall this program")),
+    ("Darwin", None, None, (True, "")),
 ])
-def test_isExifToolAvailable(reset_data, system, output, expected):
+def test_isExifToolAvailable(reset_data, system, exiftool_path, version, expected):
     with (
         patch("platform.system", return_value=system),
-        patch("core.metadata.runProcessOutput", return_value=output)
+        patch("core.metadata.getExifToolPath", return_value=exiftool_path),
+        patch("core.metadata.capabilities.getVersion", return_value=version),
     ):
         is_available, err_msg = metadata.isExifToolAvailable()
         assert is_available == expected[0]
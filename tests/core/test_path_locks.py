@@ -0,0 +1,62 @@
+import threading
+import time
+
+import pytest
+
+from core.path_locks import PathLocks
+
+@pytest.fixture
+def path_locks():
+    return PathLocks(stripes=8)
+
+def test_same_dir_same_stripe(path_locks):
+    assert path_locks._getStripe("/output/dir") is path_locks._getStripe("/output/dir")
+
+def test_locked_counts_acquisitions(path_locks):
+    with path_locks.locked("/output/a"):
+        pass
+    with path_locks.locked("/output/b"):
+        pass
+
+    stats = path_locks.getStats()
+    assert stats["acquisitions"] == 2
+    assert stats["contended"] == 0
+
+def test_locked_releases_on_exception(path_locks):
+    with pytest.raises(ValueError):
+        with path_locks.locked("/output/a"):
+            raise ValueError()
+
+    assert path_locks._getStripe("/output/a").mutex.tryLock()
+    path_locks._getStripe("/output/a").mutex.unlock()
+
+def test_locked_contention(path_locks):
+    holding = threading.Event()
+
+    def hold():
+        with path_locks.locked("/output/a"):
+            holding.set()
+            time.sleep(0.1)
+
+    def wait():
+        with path_locks.locked("/output/a"):
+            pass
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    holding.wait(5)
+    waiter = threading.Thread(target=wait)
+    waiter.start()
+    holder.join(5)
+    waiter.join(5)
+
+    stats = path_locks.getStats()
+    assert stats["acquisitions"] == 2
+    assert stats["contended"] == 1
+    assert stats["wait_time"] > 0
+
+def test_resetStats(path_locks):
+    with path_locks.locked("/output/a"):
+        pass
+    path_locks.resetStats()
+    assert path_locks.getStats()["acquisitions"] == 0
@@ -8,6 +8,7 @@ from core.pathing import (
     getExtension,
     getOutputDir,
     isANSICompatible,
+    NameIndex,
 )
 from core.exceptions import GenericException
 
@@ -73,4 +74,56 @@ def test_isANSICompatible_compatible():
     assert isANSICompatible("C:\\Users\\User\\Pictures")
 
 def test_isANSICompatible_not_compatible():
-    assert not isANSICompatible("D:\\画像")
\ No newline at end of file
+    assert not isANSICompatible("D:\\画像")
+
+@pytest.fixture
+def index():
+    name_index = NameIndex()
+    name_index.start()
+    with patch("core.pathing.name_index", name_index):
+        yield name_index
+
+def test_getUniqueFilePath_index_seeded(tmp_path, index):
+    (tmp_path / "image.jxl").write_text("")
+    (tmp_path / "image (1).jxl").write_text("")
+
+    assert getUniqueFilePath(str(tmp_path), "image", "jxl") == str(tmp_path / "image (2).jxl")
+
+def test_getUniqueFilePath_index_reserves(tmp_path, index):
+    paths = [getUniqueFilePath(str(tmp_path), "image", "jxl") for _ in range(4)]
+
+    assert paths == [
+        str(tmp_path / "image.jxl"),
+        str(tmp_path / "image (1).jxl"),
+        str(tmp_path / "image (2).jxl"),
+        str(tmp_path / "image (3).jxl"),
+    ]
+
+def test_getUniqueFilePath_index_no_repeated_probes(tmp_path, index):
+    for _ in range(50):
+        getUniqueFilePath(str(tmp_path), "image", "jxl")
+
+    with patch("core.pathing.os.path.isfile", return_value=False) as mock_isfile:
+        assert getUniqueFilePath(str(tmp_path), "image", "jxl") == str(tmp_path / "image (50).jxl")
+    assert mock_isfile.call_count == 1
+
+def test_getUniqueFilePath_index_external_file(tmp_path, index):
+    getUniqueFilePath(str(tmp_path), "image", "jxl")
+    (tmp_path / "image (1).jxl").write_text("")     # Created after seeding
+
+    assert getUniqueFilePath(str(tmp_path), "image", "jxl") == str(tmp_path / "image (2).jxl")
+
+def test_getUniqueFilePath_index_numbered_name(tmp_path, index):
+    (tmp_path / "image (10).jxl").write_text("")
+    assert getUniqueFilePath(str(tmp_path), "image (10)", "jxl") == str(tmp_path / "image (11).jxl")
+
+def test_getUniqueFilePath_index_release(tmp_path, index):
+    path = getUniqueFilePath(str(tmp_path), "image", "jxl")
+    index.release(path)
+    assert getUniqueFilePath(str(tmp_path), "image", "jxl") == path
+
+def test_nameIndex_stop(tmp_path, index):
+    getUniqueFilePath(str(tmp_path), "image", "jxl")
+    index.stop()
+    assert not index.isEnabled()
+    assert index.dirs == {}
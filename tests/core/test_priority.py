@@ -0,0 +1,69 @@
+import os
+import sys
+import platform
+import subprocess
+from unittest.mock import patch, MagicMock
+
+import pytest
+
+import core.priority as priority
+from core.process import runProcessOutput
+
+@pytest.fixture(autouse=True)
+def reset():
+    yield
+    priority.setExecutionClass(priority.NORMAL)
+
+# Checked from a thread of the child, priority is per thread on Linux
+CHILD_PRIORITY = "import os, threading; t = threading.Thread(target=lambda: print(os.nice(0), os.sched_getscheduler(0) == os.SCHED_IDLE)); t.start(); t.join()"
+
+def test_setExecutionClass_invalid(caplog):
+    priority.setExecutionClass("Realtime")
+    assert priority.getExecutionClass() == priority.NORMAL
+    assert "[Priority] Execution class not recognized" in caplog.text
+
+@pytest.mark.skipif(platform.system() != "Linux", reason="Linux only")
+@pytest.mark.parametrize("execution_class, expected", [
+    (priority.NORMAL, "0 False"),
+    (priority.BACKGROUND, f"{priority.BACKGROUND_NICE} False"),
+    (priority.BACKGROUND_IDLE, f"{priority.BACKGROUND_IDLE_NICE} True"),
+])
+def test_child_priority(execution_class, expected):
+    if os.nice(0) != 0:
+        pytest.skip("Test process is already niced")
+
+    priority.setExecutionClass(execution_class)
+    stdout, _ = runProcessOutput(sys.executable, "-c", CHILD_PRIORITY)
+
+    assert stdout.strip() == expected
+    assert os.nice(0) == 0      # Parent is untouched
+    assert os.sched_getscheduler(0) != os.SCHED_IDLE
+
+def test_lowerPriority_ioprio():
+    with patch("core.priority.os.nice"), \
+        patch.object(priority.Data, "syscall", MagicMock()) as mock_syscall, \
+        patch.object(priority.Data, "syscall_nr", 251):
+        priority.Data.execution_class = priority.BACKGROUND
+        priority.lowerPriority()
+
+    if os.name != "nt":
+        mock_syscall.assert_called_once_with(251, priority.IOPRIO_WHO_PROCESS, 0, priority.IOPRIO_CLASS_IDLE << priority.IOPRIO_CLASS_SHIFT)
+
+def test_lowerPriority_ignores_errors():
+    with patch("core.priority.os.nice", side_effect=OSError), \
+        patch("core.priority.os.sched_setscheduler", side_effect=OSError, create=True), \
+        patch.object(priority.Data, "syscall", None):
+        priority.Data.execution_class = priority.BACKGROUND_IDLE
+        priority.lowerPriority()
+
+@pytest.mark.parametrize("execution_class, flag", [
+    (priority.NORMAL, None),
+    (priority.BACKGROUND, "BELOW_NORMAL_PRIORITY_CLASS"),
+    (priority.BACKGROUND_IDLE, "IDLE_PRIORITY_CLASS"),
+])
+def test_getCreationFlags(execution_class, flag):
+    priority.setExecutionClass(execution_class)
+    if os.name != "nt":
+        assert priority.getCreationFlags() == 0
+    else:
+        assert priority.getCreationFlags() == (getattr(subprocess, flag) if flag else 0)
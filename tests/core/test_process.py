@@ -1,5 +1,6 @@
 from unittest.mock import patch, MagicMock, ANY
 import subprocess
+import sys
 import os
 
 import pytest
@@ -24,36 +25,43 @@ def test___getStartupInfo_windows():
     else:
         assert _getStartupInfo() is None
 
-# subprocess.run mock
-class MockCompletedProcess:
-    def __init__(self, stdout, stdin):
-        self.stdout = stdout
-        self.stdin = stdin
-
 @pytest.mark.parametrize(
     "cmd,expected_stdout", [
         (("echo", "Hello World"), b"Hello World\n"),
     ]
 )
 def test_runProcess(cmd, expected_stdout):
-    with patch("core.process.subprocess.run") as mock_run, \
+    with patch("core.process.subprocess.Popen") as mock_popen, \
         patch("core.process.logging") as mock_logging:
     
-        mock_run.return_value = MockCompletedProcess(stdout=expected_stdout, stdin=b"")
+        mock_popen.return_value.__enter__.return_value.communicate.return_value = (expected_stdout, b"")
         runProcess(*cmd)
 
-        mock_run.assert_called_with(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=ANY, cwd=None)
+        mock_popen.assert_called_with(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=ANY, creationflags=0, cwd=None)
         assert cmd[1] in mock_logging.debug.call_args[0][0]
         assert str(cmd) in mock_logging.info.call_args[0][0]
 
 def test_runProcessOutput():
     with (
-        patch("core.process.subprocess.run") as mock_run,
+        patch("core.process.subprocess.Popen") as mock_popen,
         patch("core.process.logging") as mock_logging,
     ):
-        mock_run.return_value = subprocess.CompletedProcess(args=["echo", "test"], stdout=b"test", stderr=b"err", returncode=0)
+        mock_popen.return_value.__enter__.return_value.communicate.return_value = (b"test", b"err")
 
         out, err = runProcessOutput(["echo", "test"])
 
         assert out == "test"
-        assert err == "err"
\ No newline at end of file
+        assert err == "err"
+
+def test_runProcessOutput_real():
+    out, _ = runProcessOutput(sys.executable, "-c", "print('test')")
+    assert out.strip() == "test"
+
+def test_runProcess_kills_on_interrupt():
+    with patch("core.process.subprocess.Popen") as mock_popen:
+        process = mock_popen.return_value.__enter__.return_value
+        process.communicate.side_effect = KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            runProcess("echo")
+    process.kill.assert_called_once()
\ No newline at end of file
@@ -1,9 +1,9 @@
 from unittest.mock import MagicMock, patch
 
 import pytest
-from PySide6.QtCore import QMutex
 
 from core.proxy import Proxy
+from core.path_locks import PathLocks
 from core.exceptions import FileException
 
 @pytest.fixture
@@ -45,7 +45,7 @@ def generate_patches():
         yield mock_isfile, mock_convert, mock_getUniqueFilePath
 
 def test_generate_proxy_success(generate_patches, proxy):
-    proxy.generate("/path/to/src.avif", "avif", "/proxy/dst", "src", 0, QMutex())
+    proxy.generate("/path/to/src.avif", "avif", "/proxy/dst", "src", 0, PathLocks())
     assert proxy.proxy_path == "/proxy/dst/proxy.png"
 
 def test_generate_proxy_failure(generate_patches, proxy):
@@ -53,7 +53,7 @@ def test_generate_proxy_failure(generate_patches, proxy):
     mock_isfile.return_value = False
 
     with pytest.raises(FileException):
-        proxy.generate("/path/to/src.avif", "avif", "/proxy/dst", "src", 0, QMutex())
+        proxy.generate("/path/to/src.avif", "avif", "/proxy/dst", "src", 0, PathLocks())
 
 def test_getPath_empty(proxy):
     assert not proxy.proxyExists()
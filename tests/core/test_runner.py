@@ -0,0 +1,111 @@
+import os
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from core.runner import collectItems, runItem, runItems, batchState, stopBatchState
+from core.path_locks import PathLocks
+from core.archive_sink import archive_sink
+from core.dedup import duplicates
+from core.pathing import name_index
+from core.fs_cache import dir_cache
+from core.conversion_cache import conversion_cache
+from core.scan_filter import ScanFilter
+
+@pytest.fixture
+def images(tmp_path):
+    (tmp_path / "a").mkdir()
+    (tmp_path / "a" / "image.png").write_text("")
+    (tmp_path / "a" / "notes.txt").write_text("")
+    (tmp_path / "b").mkdir()
+    (tmp_path / "b" / "photo.JPG").write_text("")
+    return tmp_path
+
+def test_collectItems_single_dir(images):
+    items = collectItems([str(images / "a")])
+    assert items == [(images / "a" / "image.png", images / "a")]
+
+def test_collectItems_multiple_paths(images):
+    items = sorted(collectItems([str(images / "a"), str(images / "b" / "photo.JPG")]))
+    assert items == [
+        (images / "a" / "image.png", images),
+        (images / "b" / "photo.JPG", images / "b"),
+    ]
+
+def test_collectItems_missing(images, caplog):
+    assert collectItems([str(images / "missing")]) == []
+    assert "[Runner] Path not found" in caplog.text
+
+def test_collectItems_archive(images):
+    with zipfile.ZipFile(images / "delivery.zip", "w") as zf:
+        zf.writestr("sub/image.png", b"0" * 10)
+        zf.writestr("big.png", b"0" * 1000)
+        zf.writestr("notes.txt", b"")
+
+    items = collectItems([str(images / "delivery.zip")], ScanFilter(max_size=100))
+    assert [item[:3] for item in items] == [(images / "delivery.zip" / "sub" / "image.png", images / "delivery.zip", 10)]
+
+def test_runItem_collects_signals():
+    def run(self):
+        self.signals.exception.emit("F1", "Not found", "image.png")
+        self.signals.completed.emit(self.n)
+
+    with patch("core.runner.Worker.run", run):
+        result = runItem(3, Path("/images/image.png"), Path("/images"), {}, {}, 1, PathLocks())
+
+    assert result == {"n": 3, "status": "completed", "exceptions": [["F1", "Not found", "image.png"]]}
+
+def test_runItems():
+    items = [(Path(f"/images/image_{i}.png"), Path("/images")) for i in range(20)]
+    received = []
+
+    with patch("core.runner.runItem", side_effect=lambda n, *_: {"n": n, "status": "completed", "exceptions": []}) as mock_runItem:
+        results = runItems(items, {"format": "PNG"}, {}, 4, received.append)
+
+    assert mock_runItem.call_count == 20
+    assert sorted(r["n"] for r in results) == list(range(20))
+    assert len(received) == 20
+
+def test_runItems_archive_output(tmp_path):
+    def run(n, abs_path, *_):
+        path = tmp_path / f"{abs_path.stem}.jxl"
+        path.write_bytes(b"0" * 100)
+        archive_sink.submit(str(path))
+        return {"n": n, "status": "completed", "exceptions": []}
+
+    items = [(Path(f"/images/image_{i}.png"), Path("/images")) for i in range(3)]
+    params = {"format": "JPEG XL", "archive_output": True, "archive_format": "tar", "archive_max_size": 0, "custom_output_dir_path": str(tmp_path)}
+    with patch("core.runner.runItem", side_effect=run):
+        runItems(items, params, {}, 2)
+
+    assert os.listdir(tmp_path) == ["archive-001.tar"]
+    assert not archive_sink.isEnabled()
+
+def test_stopBatchState_removes_staged_duplicates(tmp_path):
+    files = []
+    for name in ("a.png", "b.png"):
+        (tmp_path / name).write_bytes(b"same")
+        files.append(str(tmp_path / name))
+    output = tmp_path / "a.jxl"
+    output.write_bytes(b"converted")
+
+    duplicates.start([4, 4])
+    duplicates.register(0, files[0])
+    duplicates.register(1, files[1])
+    duplicates.publish(0, str(output))
+    staging = duplicates.item_groups[0].staging
+    assert os.path.isfile(staging)
+
+    stopBatchState()    # Canceled before the duplicate was fetched
+    assert not os.path.exists(staging)
+    assert not duplicates.isEnabled()
+
+def test_batchState_stops_everything(tmp_path):
+    settings = {"conversion_cache": True, "conversion_cache_size": 1024 ** 2, "deduplicate": True}
+    with batchState(settings, [(str(tmp_path / "a.png"), tmp_path)]):
+        assert name_index.isEnabled() and dir_cache.isEnabled()
+        assert conversion_cache.isEnabled() and duplicates.isEnabled()
+
+    assert not any(state.isEnabled() for state in (name_index, dir_cache, conversion_cache, duplicates))
@@ -0,0 +1,149 @@
+import os
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from core.scan_filter import ScanFilter, parseSize, parseTime, getExpectedOutput
+from core.utils import walkDir, listDir
+from data.job_table import Job, JobTable
+from data import Items
+
+def getParams(**overrides):
+    params = {
+        "format": "WebP",
+        "custom_output_dir": False,
+        "custom_output_dir_path": "",
+        "keep_dir_struct": False,
+    }
+    params.update(overrides)
+    return params
+
+def setMtime(path, mtime):
+    os.utime(path, (mtime, mtime))
+
+@pytest.fixture
+def tree(tmp_path):
+    (tmp_path / "thumbs").mkdir()
+    (tmp_path / "photos").mkdir()
+    (tmp_path / "photos" / "big.png").write_bytes(b"0" * 2048)
+    (tmp_path / "photos" / "small.png").write_bytes(b"0" * 10)
+    (tmp_path / "photos" / "old.jpg").write_bytes(b"0" * 2048)
+    (tmp_path / "thumbs" / "big.png").write_bytes(b"0" * 2048)
+    setMtime(tmp_path / "photos" / "old.jpg", time.time() - 30 * 86400)
+    return tmp_path
+
+def walk(path, scan_filter):
+    return sorted(os.path.relpath(file, path).replace("\\", "/") for chunk in walkDir(path, scan_filter=scan_filter) for file in chunk)
+
+@pytest.mark.parametrize("value, expected", [
+    ("500", 500),
+    ("500K", 500 * 1024),
+    ("2m", 2 * 1024 ** 2),
+    ("1.5MB", int(1.5 * 1024 ** 2)),
+    (42, 42),
+])
+def test_parseSize(value, expected):
+    assert parseSize(value) == expected
+
+def test_parseSize_invalid():
+    with pytest.raises(ValueError):
+        parseSize("big")
+
+def test_parseTime():
+    assert parseTime("7d", now=1_000_000) == 1_000_000 - 7 * 86400
+    assert parseTime("12h", now=1_000_000) == 1_000_000 - 12 * 3600
+    assert parseTime("2024-05-01") > 0
+    with pytest.raises(ValueError):
+        parseTime("last week")
+
+def test_inactive():
+    assert not ScanFilter().isActive()
+    assert not ScanFilter.fromDict(None).isActive()
+
+def test_globs():
+    scan_filter = ScanFilter(include=["*.png", "*.jpg"], exclude=["*/thumbs/*"])
+    assert scan_filter.matchesPath("/a/b.png")
+    assert not scan_filter.matchesPath("/a/b.webp")
+    assert not scan_filter.matchesPath("/a/thumbs/deep/b.png")
+
+def test_excludesDir():
+    scan_filter = ScanFilter(exclude=["*/thumbs/*", "*/raw/*.png"])
+    assert scan_filter.excludesDir("/a/thumbs")
+    assert not scan_filter.excludesDir("/a/raw")     # Other files in there still match
+    assert not scan_filter.excludesDir("/a/thumbsup")
+
+def test_walk_exclude(tree):
+    assert walk(tree, ScanFilter(exclude=["*/thumbs/*"])) == ["photos/big.png", "photos/old.jpg", "photos/small.png"]
+
+def test_walk_excluded_dir_not_listed(tree):
+    listed = []
+    def listDirLogged(path):
+        listed.append(os.path.basename(path))
+        return listDir(path)
+
+    files = [file for chunk in walkDir(tree, list_dir=listDirLogged, scan_filter=ScanFilter(exclude=["*/thumbs/*"])) for file in chunk]
+    assert len(files) == 3
+    assert "thumbs" not in listed
+
+def test_walk_size(tree):
+    assert walk(tree, ScanFilter(min_size=1024, exclude=["*/thumbs/*"])) == ["photos/big.png", "photos/old.jpg"]
+    assert walk(tree, ScanFilter(max_size=1024)) == ["photos/small.png"]
+
+def test_walk_modified(tree):
+    after = parseTime("7d")
+    assert walk(tree / "photos", ScanFilter(modified_after=after)) == ["big.png", "small.png"]
+    assert walk(tree / "photos", ScanFilter(modified_before=after)) == ["old.jpg"]
+
+def test_walk_no_stat_without_ranges(tree):
+    chunks = walkDir(tree, scan_filter=ScanFilter(exclude=["*/thumbs/*"]))
+    with patch("core.scan_filter.os.stat") as stat:
+        list(chunks)
+    stat.assert_not_called()
+
+def test_getExpectedOutput():
+    job = Job.fromPath("/src/a/photo.png", Path("/src"))
+    assert getExpectedOutput(job, getParams()) == os.path.join("/src/a", "photo.webp")
+    assert getExpectedOutput(job, getParams(format="Lossless JPEG Recompression")) == os.path.join("/src/a", "photo.jxl")
+    assert getExpectedOutput(job, getParams(format="Smallest Lossless")) is None
+
+def test_newer_than_output(tree):
+    source = tree / "photos" / "big.png"
+    output = tree / "photos" / "big.webp"
+    scan_filter = ScanFilter(newer_than_output=True)
+    job = Job.fromPath(source, tree, stat=True)
+
+    assert scan_filter.matchesJob(job, getParams())     # No output yet
+
+    output.write_bytes(b"0")
+    setMtime(source, time.time() - 60)
+    job.stat()
+    assert not scan_filter.matchesJob(job, getParams())
+
+    setMtime(output, time.time() - 120)
+    assert scan_filter.matchesJob(job, getParams())
+
+def test_newer_than_output_single_stat(tree):
+    job = Job.fromPath(tree / "photos" / "big.png", tree, stat=True)
+    with patch("core.scan_filter.os.stat", wraps=os.stat) as stat:
+        ScanFilter(newer_than_output=True).matchesJob(job, getParams())
+    stat.assert_called_once()
+
+def test_apply_keeps_interned_values(tree):
+    jobs = JobTable()
+    for path in ("photos/big.png", "photos/small.png"):
+        jobs.add(tree / path, tree)
+    filtered = ScanFilter(min_size=1024).apply(jobs)
+    assert [job.file_name for job in filtered] == ["big.png"]
+    assert filtered[0].anchor_path is jobs.anchors[tree]
+
+def test_parseData(tree):
+    items = Items()
+    items.parseData(
+        (tree / "photos" / "big.png", tree),
+        (tree / "photos" / "small.png", tree),
+        scan_filter=ScanFilter(min_size=1024),
+    )
+    assert items.getItemCount() == 1
+    assert items.getItem(0)[0] == tree / "photos" / "big.png"
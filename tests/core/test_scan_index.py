@@ -0,0 +1,95 @@
+import os
+from unittest.mock import patch
+
+import pytest
+
+from core.scan_index import ScanIndex
+from core.utils import scanDir
+
+@pytest.fixture
+def index(tmp_path):
+    index = ScanIndex(str(tmp_path / "scan_index.db"))
+    yield index
+    index.close()
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "tree"
+    (root / "a" / "nested").mkdir(parents=True)
+    (root / "b").mkdir()
+    (root / "top.png").write_text("")
+    (root / "a" / "image.jpg").write_text("")
+    (root / "a" / "nested" / "deep.webp").write_text("")
+    (root / "b" / "notes.txt").write_text("")
+    return root
+
+def age(*dirs):
+    """Push directory mtimes out of the racy window."""
+    for d in dirs:
+        os.utime(d, ns=(os.stat(d).st_atime_ns, os.stat(d).st_mtime_ns - 10 * 1_000_000_000))
+
+def allDirs(root):
+    return [root] + [os.path.join(r, d) for r, dirs, _ in os.walk(root) for d in dirs]
+
+def test_scan_matches_scanDir(index, tree):
+    assert sorted(index.scan(str(tree))) == sorted(scanDir(str(tree)))
+
+def test_scan_non_existent(index, tmp_path):
+    with pytest.raises(FileNotFoundError):
+        index.scan(str(tmp_path / "missing"))
+
+def test_unchanged_served_from_index(index, tree):
+    age(*allDirs(tree))
+    first = index.scan(str(tree))
+    assert index.stats == {"listed": 4, "cached": 0}
+
+    with patch.object(index, "_listDir") as mock_listDir:
+        assert sorted(index.scan(str(tree))) == sorted(first)
+    mock_listDir.assert_not_called()
+    assert index.stats == {"listed": 0, "cached": 4}
+
+def test_changed_directory_relisted(index, tree):
+    age(*allDirs(tree))
+    index.scan(str(tree))
+
+    (tree / "a" / "new.png").write_text("")
+    age(tree / "a")
+    files = index.scan(str(tree))
+
+    assert str(tree / "a" / "new.png") in files
+    assert index.stats == {"listed": 1, "cached": 3}
+
+def test_racy_directory_relisted(index, tree):
+    index.scan(str(tree))      # Just created, mtimes are within the racy window
+    index.scan(str(tree))
+    assert index.stats["cached"] == 0
+
+def test_removed_subtree_forgotten(index, tree):
+    age(*allDirs(tree))
+    index.scan(str(tree))
+
+    os.remove(tree / "a" / "nested" / "deep.webp")
+    os.rmdir(tree / "a" / "nested")
+    age(tree / "a")
+    files = index.scan(str(tree))
+
+    assert str(tree / "a" / "nested" / "deep.webp") not in files
+    paths = [row[0] for row in index.conn.execute("SELECT path FROM dirs")]
+    assert str(tree / "a" / "nested") not in paths
+
+def test_symlinked_dir_not_followed(index, tree):
+    os.symlink(tree / "a", tree / "link")
+    assert sorted(index.scan(str(tree))) == sorted(scanDir(str(tree)))
+
+def test_walk_filters_extensions(index, tree):
+    files = [file for chunk in index.walk(str(tree), ["png", "jpg", "webp"]) for file in chunk]
+    assert sorted(files) == sorted([str(tree / "top.png"), str(tree / "a" / "image.jpg"), str(tree / "a" / "nested" / "deep.webp")])
+
+def test_abandoned_walk_saves_listed(index, tree):
+    age(*allDirs(tree))
+    chunks = index.walk(str(tree), chunk_size=1)
+    next(chunks)
+    chunks.close()
+
+    paths = [row[0] for row in index.conn.execute("SELECT path FROM dirs")]
+    assert str(tree) in paths
@@ -1,10 +1,13 @@
 from pathlib import Path
 import os
+from unittest.mock import patch, mock_open
 
 import pytest
 
 from core.utils import (
     scanDir,
+    walkDir,
+    isNetworkPath,
     removeDuplicates,
     listToFilter,
     dictToList,
@@ -35,6 +38,65 @@ def test_scanDir_non_existent():
     with pytest.raises(FileNotFoundError):
         scanDir("non_existent_dir")
 
+@pytest.fixture
+def image_tree(tmp_path):
+    (tmp_path / "a" / "b").mkdir(parents=True)
+    for n in range(5):
+        (tmp_path / f"{n}.png").write_text("")
+    (tmp_path / "a" / "photo.JPG").write_text("")
+    (tmp_path / "a" / "b" / "deep.webp").write_text("")
+    (tmp_path / "a" / "notes.txt").write_text("")
+    return tmp_path
+
+def test_walkDir_matches_scanDir(image_tree):
+    files = [file for chunk in walkDir(image_tree) for file in chunk]
+    assert sorted(files) == sorted(scanDir(image_tree))
+    assert len(files) == 8
+
+def test_walkDir_filters_extensions(image_tree):
+    files = [file for chunk in walkDir(image_tree, ["png", "jpg", "webp"]) for file in chunk]
+    assert len(files) == 7
+    assert not any(file.endswith(".txt") for file in files)
+
+def test_walkDir_chunks(image_tree):
+    chunks = list(walkDir(image_tree, chunk_size=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 2]
+
+def test_walkDir_threaded(image_tree):
+    files = [file for chunk in walkDir(image_tree, threads=4) for file in chunk]
+    assert sorted(files) == sorted(scanDir(image_tree))
+
+def test_walkDir_non_existent():
+    with pytest.raises(FileNotFoundError):
+        walkDir("non_existent_dir")     # Raised before iterating
+
+def test_walkDir_symlinked_dir_not_followed(image_tree, tmp_path_factory):
+    outside = tmp_path_factory.mktemp("outside")
+    (outside / "linked.png").write_text("")
+    os.symlink(outside, image_tree / "link", target_is_directory=True)
+
+    files = [file for chunk in walkDir(image_tree) for file in chunk]
+    assert str(image_tree / "link") not in files
+    assert not any(file.endswith("linked.png") for file in files)
+
+def test_walkDir_unreadable_dir_skipped(image_tree):
+    def listDir(path):
+        if path.endswith("a"):
+            raise PermissionError(path)
+        return ([], ["a"]) if path == str(image_tree) else ([], [])
+
+    assert list(walkDir(image_tree, list_dir=listDir)) == []
+
+@pytest.mark.parametrize("path, expected", [
+    ("/mnt/share/photos", True),
+    ("/home/user/photos", False),
+    ("/mnt/shared", False),
+])
+def test_isNetworkPath(path, expected):
+    mounts = "/dev/sda1 / ext4 rw 0 0\nserver:/export /mnt/share nfs4 rw 0 0\n"
+    with patch("core.utils.platform.system", return_value="Linux"), patch("builtins.open", mock_open(read_data=mounts)):
+        assert isNetworkPath(path) == expected
+
 def test_removeDuplicates_empty():
     assert removeDuplicates([]) == []
 
@@ -0,0 +1,260 @@
+import os
+import shutil
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from core.fs_cache import StatCache, dir_cache
+from core.watcher import (
+    Debouncer,
+    Inotify,
+    Watcher,
+    WatchState,
+    checkOutputOutsideRoots,
+    IN_CLOSE_WRITE,
+    IN_CREATE,
+    IN_ISDIR,
+)
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def write(path, data=b"data"):
+    with open(path, "wb") as f:
+        f.write(data)
+    return str(path)
+
+@pytest.fixture
+def state(tmp_path):
+    state = WatchState(str(tmp_path / "state.db"))
+    yield state
+    state.close()
+
+def test_debouncer_waits_for_settle(tmp_path):
+    clock = Clock()
+    debouncer = Debouncer(2, clock)
+    path = write(tmp_path / "a.png")
+
+    debouncer.touch(path)
+    clock.now = 1
+    assert debouncer.popReady() == []
+    clock.now = 2
+    assert debouncer.popReady() == [path]
+    assert len(debouncer) == 0
+
+def test_debouncer_touch_rearms(tmp_path):
+    clock = Clock()
+    debouncer = Debouncer(2, clock)
+    path = write(tmp_path / "a.png")
+
+    debouncer.touch(path)
+    clock.now = 1.5
+    debouncer.touch(path)
+    clock.now = 2.5
+    assert debouncer.popReady() == []
+    clock.now = 3.5
+    assert debouncer.popReady() == [path]
+
+def test_debouncer_size_changed(tmp_path):
+    clock = Clock()
+    debouncer = Debouncer(2, clock)
+    path = write(tmp_path / "a.png")
+
+    debouncer.touch(path)
+    write(path, b"more data")
+    clock.now = 2
+    assert debouncer.popReady() == []
+    clock.now = 4
+    assert debouncer.popReady() == [path]
+
+def test_debouncer_drops_deleted(tmp_path):
+    clock = Clock()
+    debouncer = Debouncer(2, clock)
+    path = write(tmp_path / "a.png")
+
+    debouncer.touch(path)
+    os.remove(path)
+    clock.now = 2
+    assert debouncer.popReady() == []
+    assert len(debouncer) == 0
+
+def test_state_processed(state, tmp_path):
+    path = write(tmp_path / "a.png")
+    assert not state.isProcessed(path)
+
+    state.markProcessed(path, (os.path.getsize(path), os.stat(path).st_mtime_ns))
+    assert state.isProcessed(path)
+
+def test_state_modified(state, tmp_path):
+    path = write(tmp_path / "a.png")
+    state.markProcessed(path, (os.path.getsize(path), os.stat(path).st_mtime_ns))
+
+    write(path, b"replaced")
+    assert not state.isProcessed(path)
+
+@pytest.mark.parametrize("params, error", [
+    ({"custom_output_dir": False, "custom_output_dir_path": ""}, True),
+    ({"custom_output_dir": True, "custom_output_dir_path": "relative"}, True),
+    ({"custom_output_dir": True, "custom_output_dir_path": "/srv/hot/out"}, True),
+    ({"custom_output_dir": True, "custom_output_dir_path": "/srv"}, True),
+    ({"custom_output_dir": True, "custom_output_dir_path": "/srv/out"}, False),
+])
+def test_checkOutputOutsideRoots(params, error):
+    assert (checkOutputOutsideRoots(params, ["/srv/hot"]) is not None) == error
+
+@pytest.mark.skipif(not hasattr(os, "O_CLOEXEC") or os.uname().sysname != "Linux", reason="inotify")
+def test_inotify_events(tmp_path):
+    inotify = Inotify()
+    try:
+        assert inotify.addWatch(str(tmp_path)) == [str(tmp_path)]
+
+        path = write(tmp_path / "a.png")
+        os.mkdir(tmp_path / "sub")
+
+        events = []
+        for _ in range(10):
+            events += inotify.read(timeout=0.1)
+            if len(events) >= 2:
+                break
+    finally:
+        inotify.close()
+
+    assert any(p == path and m & IN_CLOSE_WRITE for p, m in events)
+    assert any(p == str(tmp_path / "sub") and m & IN_CREATE and m & IN_ISDIR for p, m in events)
+
+@pytest.mark.skipif(not hasattr(os, "O_CLOEXEC") or os.uname().sysname != "Linux", reason="inotify")
+def test_watcher(tmp_path, state):
+    hot = tmp_path / "hot"
+    os.makedirs(hot / "sub")
+    existing = write(hot / "existing.png")
+    converted = []
+    done = threading.Event()
+
+    def runItem(n, abs_path, anchor_path, *args):
+        converted.append((str(abs_path), anchor_path))
+        return {"n": n, "status": "completed", "exceptions": []}
+
+    def onResult(result):
+        if len(converted) == 3:
+            done.set()
+
+    watcher = Watcher([str(hot)], {"format": "JPEG XL"}, {}, 2, onResult, state=state, settle=0.1)
+    with patch("core.watcher.runItem", side_effect=runItem):
+        thread = threading.Thread(target=watcher.run)
+        thread.start()
+        try:
+            write(hot / "new.jpg")
+            os.mkdir(hot / "later")
+            write(hot / "later" / "nested.png")
+            write(hot / "notes.txt")
+            assert done.wait(10)
+        finally:
+            watcher.stop()
+            thread.join()
+
+    assert sorted(p for p, _ in converted) == sorted([existing, str(hot / "new.jpg"), str(hot / "later" / "nested.png")])
+    assert all(anchor == Path(hot) for _, anchor in converted)
+    assert state.isProcessed(existing)
+
+@pytest.mark.skipif(not hasattr(os, "O_CLOEXEC") or os.uname().sysname != "Linux", reason="inotify")
+def test_watcher_skips_processed(tmp_path, state):
+    hot = tmp_path / "hot"
+    os.makedirs(hot)
+    existing = write(hot / "existing.png")
+    state.markProcessed(existing, (os.path.getsize(existing), os.stat(existing).st_mtime_ns))
+    converted = []
+    done = threading.Event()
+
+    def runItem(n, abs_path, *args):
+        converted.append(str(abs_path))
+        return {"n": n, "status": "completed", "exceptions": []}
+
+    watcher = Watcher([str(hot)], {"format": "JPEG XL"}, {}, 2, lambda r: done.set(), state=state, settle=0.1)
+    with patch("core.watcher.runItem", side_effect=runItem):
+        thread = threading.Thread(target=watcher.run)
+        thread.start()
+        try:
+            write(hot / "new.png")
+            assert done.wait(10)
+        finally:
+            watcher.stop()
+            thread.join()
+
+    assert converted == [str(hot / "new.png")]
+
+@pytest.mark.skipif(not hasattr(os, "O_CLOEXEC") or os.uname().sysname != "Linux", reason="inotify")
+def test_watcher_failed_not_processed(tmp_path, state):
+    hot = tmp_path / "hot"
+    os.makedirs(hot)
+    failed = write(hot / "failed.png")
+    canceled = write(hot / "canceled.png")
+    done = threading.Event()
+    results = []
+
+    def runItem(n, abs_path, *args):
+        if str(abs_path) == failed:
+            return {"n": n, "status": "completed", "exceptions": [["C0", "File not found", "failed.png"]]}
+        return {"n": n, "status": "canceled", "exceptions": []}
+
+    def onResult(result):
+        results.append(result)
+        if len(results) == 2:
+            done.set()
+
+    watcher = Watcher([str(hot)], {"format": "JPEG XL"}, {}, 2, onResult, state=state, settle=0.1)
+    with patch("core.watcher.runItem", side_effect=runItem):
+        thread = threading.Thread(target=watcher.run)
+        thread.start()
+        try:
+            assert done.wait(10)
+        finally:
+            watcher.stop()
+            thread.join()
+
+    assert not state.isProcessed(failed)
+    assert not state.isProcessed(canceled)
+
+@pytest.mark.skipif(not hasattr(os, "O_CLOEXEC") or os.uname().sysname != "Linux", reason="inotify")
+def test_watcher_recreates_removed_output_folder(tmp_path, state):
+    hot = tmp_path / "hot"
+    out = tmp_path / "out" / "converted"
+    os.makedirs(hot)
+    results = []
+    done = threading.Event()
+
+    def runItem(n, abs_path, *args):
+        try:
+            StatCache().makedirs(str(out))      # Like the worker, cached per unit
+            write(out / (abs_path.stem + ".jxl"))
+        except OSError as e:
+            return {"n": n, "status": "completed", "exceptions": [["OSError", str(e), abs_path.name]]}
+        return {"n": n, "status": "completed", "exceptions": []}
+
+    def onResult(result):
+        results.append(result)
+        done.set()
+
+    watcher = Watcher([str(hot)], {"format": "JPEG XL"}, {}, 2, onResult, state=state, settle=0.1)
+    with patch("core.watcher.runItem", side_effect=runItem):
+        thread = threading.Thread(target=watcher.run)
+        thread.start()
+        try:
+            write(hot / "a.png")
+            assert done.wait(10)
+            done.clear()
+            shutil.rmtree(tmp_path / "out")     # Cleaned up downstream
+
+            write(hot / "b.png")
+            assert done.wait(10)
+        finally:
+            watcher.stop()
+            thread.join()
+
+    assert [r["exceptions"] for r in results] == [[], []]
+    assert (out / "b.jxl").is_file()
+    assert not dir_cache.isEnabled()
@@ -1,22 +1,25 @@
+import zipfile
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 from contextlib import ExitStack, contextmanager
 
 import pytest
-from PySide6.QtCore import QMutex
 from PySide6.QtTest import QSignalSpy
 
 from core.worker import Worker
 from core.proxy import Proxy
+from core.path_locks import PathLocks
+from core.fs_cache import dir_cache
+from core.archive_source import archive_source
 from core.exceptions import FileException, GenericException, CancellationException
+from data.job_table import Job
 
 @pytest.fixture
 def worker():
-    mutex = QMutex()
+    path_locks = PathLocks()
     w = Worker(
         0,
-        Path("/path/to/images/image.png"),
-        Path("/path/to/images"),
+        Job.fromPath(Path("/path/to/images/image.png"), Path("/path/to/images")),
         {
             "format": "PNG",
             "custom_output_dir": False,
@@ -70,7 +73,7 @@ def worker():
             },
         },
         4,
-        mutex,
+        path_locks,
     )
     w.proxy = MagicMock(spec=Proxy)
     w.scl_params = {}
@@ -100,19 +103,19 @@ def convert_patches(
         stack.enter_context(patch("core.worker.getDecoderArgs", return_value=getDecoderArgs_return_value))
         stack.enter_context(patch("core.metadata.getArgs", return_value=metadata_getArgs_return_value))
         stack.enter_context(patch("core.worker.getUniqueFilePath", side_effect=getUniqueFilePath_side_effect))
-        stack.enter_context(patch("core.worker.os.path.getsize", side_effect=getsize_side_effect))
-        stack.enter_context(patch("core.worker.os.remove"))
-        stack.enter_context(patch("core.worker.os.rename"))
+        stack.enter_context(patch("core.worker.StatCache.getsize", side_effect=getsize_side_effect))
+        stack.enter_context(patch("core.worker.StatCache.remove"))
+        stack.enter_context(patch("core.worker.StatCache.rename"))
         
         yield stack
 
 @pytest.fixture
 def finishConversion_patches():
     with (
-        patch("core.worker.os.remove") as mock_remove,
-        patch("core.worker.os.rename") as mock_rename,
-        patch("core.worker.os.path.getsize", return_value=300_000) as mock_getsize,
-        patch("core.worker.os.path.isfile", side_effect=[True, True, True]) as mock_isfile,
+        patch("core.worker.StatCache.remove") as mock_remove,
+        patch("core.worker.StatCache.rename") as mock_rename,
+        patch("core.worker.StatCache.getsize", return_value=300_000) as mock_getsize,
+        patch("core.worker.StatCache.isfile", side_effect=[True, True, True]) as mock_isfile,
         patch("core.worker.getUniqueFilePath", return_value="final/path/img.jpg") as mock_getUniqueFilePath,
     ):
         yield mock_remove, mock_rename, mock_getsize, mock_isfile, mock_getUniqueFilePath 
@@ -120,10 +123,10 @@ def finishConversion_patches():
 @pytest.fixture
 def postConversionRoutines_patches():
     with (
-        patch("core.worker.os.path.isfile", return_value=True) as mock_isfile,
+        patch("core.worker.StatCache.isfile", return_value=True) as mock_isfile,
         patch("core.worker.metadata.runExifTool", return_value=[]) as mock_runExifTool,
-        patch("core.worker.shutil.copystat") as mock_copystat,
-        patch("core.worker.os.remove") as mock_remove,
+        patch("core.worker.StatCache.copystat") as mock_copystat,
+        patch("core.worker.StatCache.remove") as mock_remove,
         patch("core.worker.send2trash") as mock_send2trash,
     ):
         yield mock_isfile, mock_runExifTool, mock_copystat, mock_remove, mock_send2trash
@@ -148,13 +151,13 @@ def smallestLossless_patches():
         return size_map.get(key, 0)
 
     with (
-        patch("core.worker.os.path.getsize", side_effect=getsize_side_effect) as mock_getsize,
+        patch("core.worker.StatCache.getsize", side_effect=getsize_side_effect) as mock_getsize,
         patch("core.worker.getUniqueFilePath", side_effect=getUniqueFilePath_side_effect) as mock_getUniqueFilePath,
         patch("core.worker.metadata.getArgs", return_value=[]) as mock_getArgs,
-        patch("core.worker.shutil.copy") as mock_copy,
+        patch("core.worker.StatCache.copy") as mock_copy,
         patch("core.worker.optimize") as mock_optimize,
         patch("core.worker.convert") as mock_convert,
-        patch("core.worker.os.remove") as mock_remove,
+        patch("core.worker.StatCache.remove") as mock_remove,
     ):
         yield mock_getsize, mock_getUniqueFilePath, mock_getArgs, mock_copy, mock_optimize, mock_convert, mock_remove
 
@@ -179,14 +182,97 @@ def test_run_started(mock_wasCanceled, worker):
     worker.run()
     assert spy_started.count() == 1
 
-@patch("core.worker.os.path.isfile", return_value=False)
+@patch("core.worker.task_status.wasCanceled", return_value=False)
+def test_run_journal_completed(mock_wasCanceled, worker):
+    worker.final_output = "final/path/img.jxl"
+    with (
+        patch.object(worker, "runChecks"),
+        patch.object(worker, "setupConversion"),
+        patch.object(worker, "convert"),
+        patch.object(worker, "finishConversion"),
+        patch.object(worker, "postConversionRoutines"),
+        patch("core.worker.job_journal") as mock_journal,
+    ):
+        worker.output = "final/path/img_abc.jxl"
+        worker.proxy.proxyExists = MagicMock(return_value=False)
+        worker.run()
+
+    mock_journal.markStarted.assert_called_once_with(worker.n, ["final/path/img_abc.jxl"])
+    mock_journal.markCompleted.assert_called_once_with(worker.n, "final/path/img.jxl")
+
+@patch("core.worker.task_status.wasCanceled", return_value=False)
+def test_run_journal_failed(mock_wasCanceled, worker):
+    with (
+        patch.object(worker, "runChecks", side_effect=FileException("C0", "File not found")),
+        patch("core.worker.job_journal") as mock_journal,
+    ):
+        worker.run()
+
+    mock_journal.markFailed.assert_called_once_with(worker.n)
+    mock_journal.markCompleted.assert_not_called()
+
+@patch("core.worker.task_status.wasCanceled", return_value=False)
+def test_run_measures_units(mock_wasCanceled, worker):
+    worker.measure_units = True
+    with (
+        patch("core.worker.getWorkUnits", return_value=12.0) as mock_getWorkUnits,
+        patch.object(worker, "runChecks", side_effect=FileException("C0", "File not found")),
+        patch("core.worker.job_journal"),
+    ):
+        worker.run()
+
+    mock_getWorkUnits.assert_called_once_with(worker.org_item_abs_path, worker.job.size)
+    assert worker.work_units == 12.0
+
+@patch("core.worker.task_status.wasCanceled", return_value=False)
+def test_run_measure_units_disabled(mock_wasCanceled, worker):
+    with (
+        patch("core.worker.getWorkUnits") as mock_getWorkUnits,
+        patch("core.worker.job_journal"),
+    ):
+        worker.run()
+
+    mock_getWorkUnits.assert_not_called()
+    assert worker.work_units == 0
+
+def test_openSource_not_member(worker):
+    with patch("core.worker.archive_source.acquire") as mock_acquire:
+        worker.openSource()
+    mock_acquire.assert_not_called()
+    assert worker.org_item_abs_path == "/path/to/images/image.png"
+
+def test_openSource_member(worker):
+    worker.member = True
+    with patch("core.worker.archive_source.acquire", return_value="/scratch/0/image.png"):
+        worker.openSource()
+    assert worker.org_item_abs_path == "/scratch/0/image.png"
+    assert worker.item_abs_path == "/scratch/0/image.png"
+
+def test_openSource_member_canceled(worker):
+    worker.member = True
+    with (
+        patch("core.worker.archive_source.acquire", return_value=None),
+        pytest.raises(CancellationException),
+    ):
+        worker.openSource()
+
+def test_openSource_member_read_error(worker):
+    worker.member = True
+    with (
+        patch("core.worker.archive_source.acquire", side_effect=OSError("CRC mismatch")),
+        pytest.raises(FileException) as exc,
+    ):
+        worker.openSource()
+    assert exc.value.id == "A0"
+
+@patch("core.worker.StatCache.isfile", return_value=False)
 def test_runChecks_file_not_found(mock_isfile, worker):
     with pytest.raises(FileException) as exc:
         worker.runChecks()
     
     assert "File not found" == exc.value.msg
 
-@patch("core.worker.os.path.isfile", return_value=True)
+@patch("core.worker.StatCache.isfile", return_value=True)
 @patch("core.worker.conflicts")
 def test_runChecks(mock_conflicts, mock_isfile, worker):
     worker.conflicts = MagicMock()
@@ -198,13 +284,13 @@ def test_runChecks(mock_conflicts, mock_isfile, worker):
 def setupConversion_patches():
     with (
         patch("core.worker.Proxy.isProxyNeeded", return_value=False) as mock_isProxyNeeded,
-        patch("core.worker.os.makedirs", side_effect=None) as mock_makedirs,
+        patch("core.worker.StatCache.makedirs", side_effect=None) as mock_makedirs,
         patch("core.worker.getUniqueFilePath", return_value=normalizePath("/output/dir/image.jpg")) as mock_getUniqueFilePath,
         patch("core.worker.getOutputDir", return_value="/output/dir/") as mock_getOutputDir,
         patch("core.worker.getExtensionJxl", return_value="jpg") as mock_getExtensionJxl,
-        patch("core.worker.os.path.isfile", side_effect=[True, True]) as mock_isfile,
-        patch("core.worker.os.path.getsize", return_value=300_000) as mock_getsize,
-        patch("core.worker.getFreeSpaceLeft", return_value=300_000_000_000) as mock_getFreeSpaceLeft,
+        patch("core.worker.StatCache.isfile", side_effect=[True, True]) as mock_isfile,
+        patch("core.worker.StatCache.getsize", return_value=300_000) as mock_getsize,
+        patch("core.worker.StatCache.getFreeSpace", return_value=300_000_000_000) as mock_getFreeSpaceLeft,
         patch("core.worker.getExtension", return_value="jxl") as mock_getExtension,
     ):
         yield (
@@ -328,6 +414,89 @@ def test_setupConversion_proxy_needed(setupConversion_patches, worker):
 
     assert worker.item_abs_path == "/tmp/path/image.png"
 
+def test_setupConversion_cache_hit(setupConversion_patches, worker):
+    worker.proxy.generate = MagicMock()
+    worker.proxy.isProxyNeeded = MagicMock(return_value=True)
+    with patch("core.worker.conversion_cache") as mock_cache:
+        mock_cache.isEnabled.return_value = True
+        mock_cache.isSupported.return_value = True
+        mock_cache.getKey.return_value = "key"
+        mock_cache.fetch.return_value = True
+
+        worker.setupConversion()
+
+    assert worker.cache_hit
+    mock_cache.fetch.assert_called_once_with("key", worker.output)
+    worker.proxy.generate.assert_not_called()
+
+def test_setupConversion_cache_miss(setupConversion_patches, worker):
+    with patch("core.worker.conversion_cache") as mock_cache:
+        mock_cache.isEnabled.return_value = True
+        mock_cache.isSupported.return_value = True
+        mock_cache.getKey.return_value = "key"
+        mock_cache.fetch.return_value = False
+
+        worker.setupConversion()
+
+    assert not worker.cache_hit
+    assert worker.cache_key == "key"
+
+def test_setupConversion_cache_read_error(setupConversion_patches, worker):
+    with patch("core.worker.conversion_cache") as mock_cache:
+        mock_cache.isEnabled.return_value = True
+        mock_cache.isSupported.return_value = True
+        mock_cache.getKey.side_effect = OSError
+
+        with pytest.raises(FileException) as exc:
+            worker.setupConversion()
+    assert exc.value.id == "S6"
+
+def test_setupConversion_duplicate_hit(setupConversion_patches, worker):
+    worker.proxy.generate = MagicMock()
+    worker.proxy.isProxyNeeded = MagicMock(return_value=True)
+    with patch("core.worker.duplicates") as mock_duplicates:
+        mock_duplicates.isEnabled.return_value = True
+        mock_duplicates.isSupported.return_value = True
+        mock_duplicates.register.return_value = True
+        mock_duplicates.fetch.return_value = True
+
+        worker.setupConversion()
+
+    assert worker.duplicate_hit
+    worker.proxy.generate.assert_not_called()
+
+def test_setupConversion_duplicate_canceled(setupConversion_patches, worker):
+    with (
+        patch("core.worker.duplicates") as mock_duplicates,
+        patch("core.worker.task_status.wasCanceled", return_value=True),
+    ):
+        mock_duplicates.isEnabled.return_value = True
+        mock_duplicates.isSupported.return_value = True
+        mock_duplicates.register.return_value = True
+        mock_duplicates.fetch.return_value = False
+
+        with pytest.raises(CancellationException):
+            worker.setupConversion()
+
+def test_setupConversion_input_hashed_once(setupConversion_patches, worker):
+    with (
+        patch("core.worker.hashFile", return_value="digest") as mock_hashFile,
+        patch("core.worker.duplicates") as mock_duplicates,
+        patch("core.worker.conversion_cache") as mock_cache,
+    ):
+        mock_duplicates.isEnabled.return_value = True
+        mock_duplicates.isSupported.return_value = True
+        mock_duplicates.register.side_effect = lambda n, path, get_digest: get_digest() and False
+        mock_cache.isEnabled.return_value = True
+        mock_cache.isSupported.return_value = True
+        mock_cache.getKey.side_effect = lambda src, ext, params, settings, get_digest: get_digest() + "config"
+        mock_cache.fetch.return_value = False
+
+        worker.setupConversion()
+
+    assert worker.cache_key == "digestconfig"
+    mock_hashFile.assert_called_once_with(worker.org_item_abs_path)
+
 def test_setupConversion_downscaling_no_key_error(setupConversion_patches, worker):
     worker.params["downscaling"]["enabled"] = True
     worker.setupConversion()
@@ -479,7 +648,7 @@ def test_convert_jpeg_xl_intelligent_effort_canceled(worker):
     with (
         convert_patches() as patches,
         patch("core.worker.task_status.wasCanceled", return_value=True) as mock_canceled,
-        patch("core.worker.os.remove") as mock_remove,
+        patch("core.worker.StatCache.remove") as mock_remove,
     ):
         worker.params["format"] = "JPEG XL"
         worker.params["intelligent_effort"] = True
@@ -496,8 +665,8 @@ def test_convert_jpeg_xl_intelligent_effort_e9_smaller(worker):
         getUniqueFilePath_side_effect=["path_e7", "path_e9"]
     ) as patches:
         mock_convert = patches.enter_context(patch("core.worker.convert"))
-        mock_remove = patches.enter_context(patch("core.worker.os.remove"))
-        mock_rename = patches.enter_context(patch("core.worker.os.rename"))
+        mock_remove = patches.enter_context(patch("core.worker.StatCache.remove"))
+        mock_rename = patches.enter_context(patch("core.worker.StatCache.rename"))
         worker.params["format"] = "JPEG XL"
         worker.params["intelligent_effort"] = True
         
@@ -515,8 +684,8 @@ def test_convert_jpeg_xl_intelligent_effort_e7_smaller(worker):
         getUniqueFilePath_side_effect=["path_e7", "path_e9"]
     ) as patches:
         mock_convert = patches.enter_context(patch("core.worker.convert"))
-        mock_remove = patches.enter_context(patch("core.worker.os.remove"))
-        mock_rename = patches.enter_context(patch("core.worker.os.rename"))
+        mock_remove = patches.enter_context(patch("core.worker.StatCache.remove"))
+        mock_rename = patches.enter_context(patch("core.worker.StatCache.rename"))
         worker.params["format"] = "JPEG XL"
         worker.params["intelligent_effort"] = True
         
@@ -528,6 +697,22 @@ def test_convert_jpeg_xl_intelligent_effort_e7_smaller(worker):
         mock_remove.assert_called_once_with("path_e9")
         mock_rename.assert_called_once_with("path_e7", worker.output)
 
+def test_convert_jpeg_xl_intelligent_effort_tmp_paths(worker):
+    with convert_patches(
+        getsize_side_effect=[300_000, 400_000],
+        getUniqueFilePath_side_effect=["path_e7", "path_e9"]
+    ) as patches:
+        patches.enter_context(patch("core.worker.convert"))
+        patches.enter_context(patch("core.worker.StatCache.remove"))
+        patches.enter_context(patch("core.worker.StatCache.rename"))
+        mock_journal = patches.enter_context(patch("core.worker.job_journal"))
+        worker.params["format"] = "JPEG XL"
+        worker.params["intelligent_effort"] = True
+
+        worker.convert()
+
+        assert mock_journal.markStarted.call_args[0][1][1:3] == ["path_e7", "path_e9"]
+
 def test_convert_regular(worker):
     with convert_patches() as patches:
         mock_convert = patches.enter_context(patch("core.worker.convert"))
@@ -593,6 +778,28 @@ def test_finishConversion_replace(finishConversion_patches, worker):
     mock_remove.assert_called_once_with("final/path/img.jpg")
     mock_rename.assert_called_once_with("temp/path/img.jpg", "final/path/img.jpg")
 
+def test_finishConversion_copy_if_larger_outside_lock(finishConversion_patches, worker):
+    _, _, mock_getsize, *_ = finishConversion_patches
+    mock_getsize.side_effect = lambda path: 100 if path == worker.org_item_abs_path else 200
+    worker.output = "temp/path/img.jpg"
+    worker.settings["copy_if_larger"] = True
+    worker.path_locks = MagicMock()
+    lock_held = []
+
+    def copy(src, dst):
+        lock_held.append(worker.path_locks.locked.return_value.__exit__.called)
+
+    with (
+        patch("core.worker.open") as mock_open,
+        patch("core.worker.StatCache.copy", side_effect=copy) as mock_copy,
+    ):
+        worker.finishConversion()
+
+    mock_open.assert_called_once_with("final/path/img.jpg", "xb")
+    mock_copy.assert_called_once_with(worker.org_item_abs_path, "final/path/img.jpg")
+    assert lock_held == [True]
+    assert "final/path/img.jpg" in worker.getTmpPaths()    # Partial copy if interrupted
+
 
 def test_postConversionRoutines_no_output(postConversionRoutines_patches, worker):
     mock_isfile, *_ = postConversionRoutines_patches
@@ -732,6 +939,14 @@ def test_smallestLossless_path_pool_filled(png, webp, jxl, smallestLossless_patc
 
     assert mock_getUniqueFilePath.call_count == sum([png, webp, jxl])
 
+def test_smallestLossless_tmp_paths(smallestLossless_patches, worker):
+    worker.params["smallest_format_pool"] = {"png": True, "webp": True, "jxl": True}
+    with patch("core.worker.job_journal") as mock_journal:
+        worker.smallestLossless()
+
+    tmp_paths = mock_journal.markStarted.call_args_list[0][0][1]
+    assert {"tmp/image.png", "tmp/image.webp", "tmp/image.jxl"} <= set(tmp_paths)
+
 def test_smallestLossless_path_pool_empty(smallestLossless_patches, worker):
     worker.params["smallest_format_pool"] = {}
     with pytest.raises(GenericException) as exc:
@@ -747,10 +962,22 @@ def test_smallestLossless_generate_files(smallestLossless_patches, worker):
     
     worker.smallestLossless()
 
-    assert mock_copy.called
+    assert mock_copy.called     # Nothing written by the mock
     assert mock_optimize.called
     assert mock_convert.call_count == 2
 
+def test_smallestLossless_png_written_by_oxipng(smallestLossless_patches, worker):
+    _, _, _, mock_copy, mock_optimize, *_ = smallestLossless_patches
+    worker.item_abs_path = "src/image.png"
+    worker.params["smallest_format_pool"] = {"png": True, "webp": False, "jxl": False}
+
+    with patch("core.worker.StatCache.isfile", return_value=True):
+        worker.smallestLossless()
+
+    assert mock_optimize.call_args[0][1] == "src/image.png"
+    assert mock_optimize.call_args[0][4] == "tmp/image.png"
+    mock_copy.assert_not_called()
+
 @pytest.mark.parametrize("jxl_lossless_jpeg", [True, False])
 def test_smallestLossless_jpg_to_jxl_lossless(jxl_lossless_jpeg, smallestLossless_patches, worker):
     _, _, _, _, _, mock_convert, *_ = smallestLossless_patches
@@ -884,4 +1111,63 @@ def test_reconstructJPEG(worker):
         "/tmp/output/image.jxl",
         ["--num_threads=4"],
         0
-    )
\ No newline at end of file
+    )
+def test_run_syscall_budget(worker, tmp_path):
+    """A plain conversion of one file: stat input, makedirs, disk_usage, stat output, rename."""
+    src = tmp_path / "image.png"
+    src.write_bytes(b"0" * 1000)
+    workers = [
+        Worker(n, Job.fromPath(src, tmp_path), {**worker.params, "format": "WebP"}, worker.settings, 1, PathLocks())
+        for n in range(2)
+    ]
+
+    def convert(encoder, src, dst, args, n):
+        Path(dst).write_bytes(b"0" * 500)
+
+    with (
+        patch("core.worker.convert", side_effect=convert),
+        patch("core.worker.task_status.wasCanceled", return_value=False),
+        patch("core.worker.job_journal"),
+    ):
+        dir_cache.start()
+        try:
+            for w in workers:
+                w.run()
+        finally:
+            dir_cache.stop()
+
+    assert (tmp_path / "image.webp").is_file()
+    assert workers[0].fs.getCallCount() <= 5
+    assert workers[0].fs.calls["stat"] <= 2
+    assert workers[1].fs.getCallCount() <= 3     # Output dir already created and measured
+
+def test_run_archive_member(worker, tmp_path):
+    archive = tmp_path / "photos.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("sub/image.png", b"0" * 1000)
+    member = Job.fromPath(tmp_path / "photos.zip" / "sub" / "image.png", archive)
+    converted = []
+
+    def convert(encoder, src, dst, args, n):
+        converted.append(Path(src).read_bytes())
+        Path(dst).write_bytes(b"0" * 500)
+
+    archive_source.start([(member.abs_path, member.anchor_path)])
+    try:
+        w = Worker(0, member, {**worker.params, "format": "WebP", "delete_original": True}, worker.settings, 1, PathLocks())
+        with (
+            patch("core.worker.convert", side_effect=convert),
+            patch("core.worker.task_status.wasCanceled", return_value=False),
+            patch("core.worker.job_journal"),
+            patch("core.worker.send2trash") as mock_send2trash,
+        ):
+            w.run()
+        scratch = Path(w.org_item_abs_path)
+    finally:
+        archive_source.stop()
+
+    assert converted == [b"0" * 1000]
+    assert (tmp_path / "photos" / "sub" / "image.webp").is_file()
+    assert archive.is_file()    # Never deleted
+    mock_send2trash.assert_not_called()
+    assert not scratch.exists()
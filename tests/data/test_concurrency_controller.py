@@ -0,0 +1,85 @@
+import pytest
+
+from data.concurrency_controller import ConcurrencyController, getWorkUnits
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def controller(clock):
+    controller = ConcurrencyController(clock)
+    controller.start(8)
+    return controller
+
+def runWindow(controller, clock, throughput):
+    """Completes a full window at the given MP/s. Returns True if the worker count changed."""
+    items = max(controller.WINDOW_MIN_ITEMS, controller.getWorkerCount() * 2)
+    duration = controller.WINDOW_MIN_TIME
+    changed = False
+    for _ in range(items):
+        clock.now += duration / items
+        changed = controller.addCompleted(throughput * duration / items)
+    return changed
+
+def test_start(controller):
+    assert controller.getWorkerCount() == 4
+    assert controller.getThreadsPerWorker() == 2
+
+def test_window_not_closed_early(controller, clock):
+    clock.now += 10
+    assert not controller.addCompleted(100)
+    assert controller.getWorkerCount() == 4
+
+def test_climbs_while_improving(controller, clock):
+    assert runWindow(controller, clock, 10)     # Probe
+    assert controller.getWorkerCount() == 5
+    runWindow(controller, clock, 12)
+    assert controller.getWorkerCount() == 6
+    assert controller.getThreadsPerWorker() == 1
+
+def test_backs_off_when_degraded(controller, clock):
+    runWindow(controller, clock, 10)
+    runWindow(controller, clock, 12)
+    runWindow(controller, clock, 6)             # 6 workers is worse
+    assert controller.getWorkerCount() == 4
+
+def test_holds_on_plateau(controller, clock):
+    runWindow(controller, clock, 10)
+    assert not runWindow(controller, clock, 10.2)
+    assert controller.getWorkerCount() == 5
+
+def test_turns_around_at_budget(clock):
+    controller = ConcurrencyController(clock)
+    controller.start(2)
+
+    runWindow(controller, clock, 10)
+    assert controller.getWorkerCount() == 2
+    runWindow(controller, clock, 12)
+    assert controller.getWorkerCount() == 1
+
+def test_never_below_one(clock):
+    controller = ConcurrencyController(clock)
+    controller.start(1)
+
+    for throughput in (10, 5, 2, 1):
+        runWindow(controller, clock, throughput)
+        assert controller.getWorkerCount() == 1
+
+def test_logs_decisions(controller, clock, caplog):
+    caplog.set_level("INFO")
+    runWindow(controller, clock, 10)
+    assert "[ConcurrencyController] 10.00 MP/s with 4 workers, probing -> 5 workers" in caplog.text
+
+def test_getWorkUnits_fallback(tmp_path):
+    path = tmp_path / "image.tiff"
+    path.write_bytes(b"\x00" * 2_000_000)
+    assert getWorkUnits(str(path)) == 2.0
+    assert getWorkUnits(str(tmp_path / "missing.tiff")) == 0
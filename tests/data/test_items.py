@@ -32,6 +32,18 @@ def test_parseData_invalid(items, caplog):
     items.parseData((Path("images/1/image.jpg"), "images/1"))
     assert caplog.records[1].message == "[Items] anchor_path is not a Path object (<class 'str'>)"
 
+def test_parseData_archive_member(items):
+    items.parseData((Path("delivery.zip/image.jpg"), Path("delivery.zip"), 1000, 5))
+    job = items.getJob(0)
+    assert (job.size, job.mtime_ns) == (1000, 5)
+
+def test_parseData_no_stat(items, tmp_path):
+    path = tmp_path / "image.jpg"
+    path.write_bytes(b"data")
+    items.parseData((path, tmp_path), stat=False)
+    assert items.getJob(0).size == -1
+    assert items.jobs.statSizes() == [4]
+
 def test_clear(items):
     assert items.items == []
     assert items.completed_item_count == 0
@@ -0,0 +1,103 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from PySide6.QtCore import QObject, Signal
+
+from data.job_feeder import JobFeeder
+
+class FakeSignals(QObject):
+    completed = Signal(int)
+    canceled = Signal(int)
+
+class FakeWorker:
+    def __init__(self, n):
+        self.n = n
+        self.signals = FakeSignals()
+
+@pytest.fixture
+def threadpool():
+    pool = MagicMock()
+    pool.maxThreadCount.return_value = 2
+    return pool
+
+@pytest.fixture
+def feeder(threadpool):
+    created = []
+    def createWorker(n):
+        worker = FakeWorker(n)
+        created.append(worker)
+        return worker
+
+    feeder = JobFeeder(threadpool, createWorker)
+    feeder.created = created
+    return feeder
+
+@patch("data.job_feeder.task_status.wasCanceled", return_value=False)
+def test_start_bounded(mock_wasCanceled, feeder, threadpool):
+    feeder.start(100)
+
+    assert feeder.getInFlightLimit() == 4
+    assert len(feeder.created) == 4
+    assert threadpool.start.call_count == 4
+    assert feeder.getInFlightCount() == 4
+
+@patch("data.job_feeder.task_status.wasCanceled", return_value=False)
+def test_start_fewer_jobs_than_limit(mock_wasCanceled, feeder, threadpool):
+    feeder.start(3)
+    assert len(feeder.created) == 3
+
+@patch("data.job_feeder.task_status.wasCanceled", return_value=False)
+def test_completed_feeds_next(mock_wasCanceled, feeder, threadpool):
+    feeder.start(6)
+    feeder.created[0].signals.completed.emit(0)
+
+    assert len(feeder.created) == 5
+    assert feeder.created[-1].n == 4
+    assert feeder.getInFlightCount() == 4
+
+@patch("data.job_feeder.task_status.wasCanceled", return_value=False)
+def test_all_jobs_done(mock_wasCanceled, feeder, threadpool):
+    feeder.start(5)
+    done = 0
+    while done < len(feeder.created):
+        feeder.created[done].signals.completed.emit(done)
+        done += 1
+
+    assert [w.n for w in feeder.created] == [0, 1, 2, 3, 4]
+    assert feeder.isFinished()
+
+def test_canceled_stops_feeding(feeder, threadpool):
+    with patch("data.job_feeder.task_status.wasCanceled", return_value=False):
+        feeder.start(10)
+    
+    with patch("data.job_feeder.task_status.wasCanceled", return_value=True):
+        feeder.created[0].signals.canceled.emit(0)
+
+    assert len(feeder.created) == 4
+    assert feeder.getInFlightCount() == 3
+
+
+@patch("data.job_feeder.task_status.wasCanceled", return_value=False)
+def test_finished_emitted_once(mock_wasCanceled, feeder, threadpool):
+    finished = []
+    feeder.finished.connect(lambda: finished.append(True))
+    feeder.start(5)
+    for i in range(5):
+        feeder.created[i].signals.completed.emit(i)
+
+    assert finished == [True]
+
+def test_finished_after_cancel_waits_for_in_flight(feeder, threadpool):
+    finished = []
+    feeder.finished.connect(lambda: finished.append(True))
+    with patch("data.job_feeder.task_status.wasCanceled", return_value=False):
+        feeder.start(10)
+
+    with patch("data.job_feeder.task_status.wasCanceled", return_value=True):
+        feeder.created[0].signals.canceled.emit(0)
+        feeder.created[1].signals.completed.emit(1)
+        feeder.created[2].signals.canceled.emit(2)
+        assert finished == []
+
+        feeder.created[3].signals.completed.emit(3)     # Last one still running after the cancel
+    assert finished == [True]
\ No newline at end of file
@@ -0,0 +1,62 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from data.job_table import Job, JobTable
+
+def test_job_fields():
+    job = Job.fromPath(Path("/images/photo.tar.JPG"), Path("/images"))
+    assert job.dir == str(Path("/images"))
+    assert job.file_name == "photo.tar.JPG"
+    assert job.name == "photo.tar"
+    assert job.ext == "JPG"
+    assert job.abs_path == str(Path("/images/photo.tar.JPG"))
+    assert job.size == -1
+
+def test_job_without_extension():
+    job = Job.fromPath("/images/photo", Path("/images"))
+    assert job.name == "photo"
+    assert job.ext == ""
+
+def test_job_slotted():
+    with pytest.raises(AttributeError):
+        Job.fromPath("/images/a.png", Path("/images")).extra = 1
+
+def test_stat(tmp_path):
+    (tmp_path / "a.png").write_bytes(b"1234")
+    job = Job.fromPath(tmp_path / "a.png", tmp_path, stat=True)
+    assert job.size == 4
+    assert job.mtime_ns == os.stat(tmp_path / "a.png").st_mtime_ns
+
+def test_stat_missing(tmp_path):
+    job = Job.fromPath(tmp_path / "missing.png", tmp_path, stat=True)
+    assert job.size == -1
+
+def test_table_interns_dirs_and_anchors():
+    table = JobTable()
+    table.add("/images/a.png", Path("/images"), stat=False)
+    table.add("/images/b.png", Path("/images"), stat=False)
+
+    assert len(table) == 2
+    assert table[0].dir is table[1].dir
+    assert table[0].anchor_path is table[1].anchor_path
+
+def test_getItems_and_sizes(tmp_path):
+    (tmp_path / "a.png").write_bytes(b"12")
+    table = JobTable()
+    table.add(tmp_path / "a.png", tmp_path)
+    table.add(tmp_path / "missing.png", tmp_path)
+
+    assert table.getItems() == [(str(tmp_path / "a.png"), tmp_path), (str(tmp_path / "missing.png"), tmp_path)]
+    assert table.getSizes() == [2, None]
+
+def test_statSizes(tmp_path):
+    (tmp_path / "a.png").write_bytes(b"12")
+    table = JobTable()
+    table.add(tmp_path / "a.png", tmp_path, stat=False)
+    table.add(tmp_path / "missing.png", tmp_path, stat=False)
+
+    assert table.getSizes() == [None, None]
+    assert table.statSizes() == [2, None]
+    assert table[0].mtime_ns == os.stat(tmp_path / "a.png").st_mtime_ns
@@ -57,4 +57,36 @@ def test_getAvailableThreads_index_error(thread_manager, caplog):
     (6, 5, []),
 ])
 def test__getBurstThreadPool(workers, cores, expected, thread_manager):
-    assert thread_manager._getBurstThreadPool(workers, cores) == expected
\ No newline at end of file
+    assert thread_manager._getBurstThreadPool(workers, cores) == expected
+
+def test_configure_profiled(thread_manager):
+    profile = MagicMock()
+    profile.getBestThreads.return_value = 4
+    thread_manager.profile = profile
+
+    thread_manager.configure("JPEG XL", 2, 16)
+
+    profile.getBestThreads.assert_called_once_with("JPEG XL", 2, 16)
+    assert thread_manager.burst_threadpool == []
+    assert thread_manager.getAvailableThreads(0) == 4
+    thread_manager.threadpool.setMaxThreadCount.assert_called_once_with(4)
+
+def test_configure_profiled_remainder(thread_manager):
+    profile = MagicMock()
+    profile.getBestThreads.return_value = 4
+    thread_manager.profile = profile
+
+    thread_manager.configure("JPEG XL", 100, 18)
+
+    thread_manager.threadpool.setMaxThreadCount.assert_called_once_with(4)
+    assert [thread_manager.getAvailableThreads(i) for i in range(6)] == [5, 5, 4, 4, 5, 5]
+
+def test_configure_profile_fallback(thread_manager):
+    profile = MagicMock()
+    profile.getBestThreads.return_value = None
+    thread_manager.profile = profile
+
+    thread_manager.configure("WebP", 5, 11)
+
+    assert thread_manager.burst_threadpool == [3, 2, 2, 2, 2]
+    thread_manager.threadpool.setMaxThreadCount.assert_called_once_with(11)
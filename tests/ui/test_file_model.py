@@ -0,0 +1,102 @@
+from unittest.mock import patch
+from pathlib import Path
+
+import pytest
+from PySide6.QtCore import Qt, QPersistentModelIndex
+
+from ui.file_model import FileModel
+
+def normalizePath(path: str) -> str:
+    return str(Path(path))
+
+def item(path: str, anchor: str = "/path"):
+    path = Path(path)
+    return (path.stem, path.suffix[1:], str(path), Path(anchor))
+
+@pytest.fixture
+def model():
+    model = FileModel()
+    model.appendItems([
+        item("/path/a/b.png"),
+        item("/path/a/c.JPG"),
+        item("/path/d/a.webp", "/other"),
+    ])
+    return model
+
+def test_rows(model):
+    assert model.rowCount() == 3
+    assert model.columnCount() == 3
+    assert model.index(1, 0).data() == "c"
+    assert model.index(1, 1).data() == "JPG"
+    assert model.index(1, 2).data() == normalizePath("/path/a/c.JPG")
+    assert model.index(2, 0).data(Qt.UserRole) == Path("/other")
+
+def test_shared_values_stored_once(model):
+    assert model.dirs.values == [normalizePath("/path/a"), normalizePath("/path/d")]
+    assert model.anchors.values == [Path("/path"), Path("/other")]
+    assert list(model.dir_ids) == [0, 0, 1]
+
+def test_no_extension():
+    model = FileModel()
+    model.appendItems([item("/path/README")])
+    assert model.getName(0) == "README"
+    assert model.getPath(0) == normalizePath("/path/README")
+
+def test_getItems(model):
+    assert model.getItems()[2] == (normalizePath("/path/d/a.webp"), Path("/other"))
+
+def test_duplicates_rejected(model):
+    model.appendItems([item("/path/a/b.png", "/new"), item("/path/a/e.png"), item("/path/a/e.png")])
+    assert model.rowCount() == 4
+    assert model.getItems()[0] == (normalizePath("/path/a/b.png"), Path("/path"))   # First one stays
+
+def test_contains(model):
+    assert model.contains(normalizePath("/path/a/b.png"))
+    assert not model.contains(normalizePath("/path/a/missing.png"))
+    assert not model.contains(normalizePath("/missing/b.png"))
+
+@pytest.mark.parametrize("column, order, expected", [
+    (0, Qt.AscendingOrder, ["a", "b", "c"]),
+    (0, Qt.DescendingOrder, ["c", "b", "a"]),
+    (1, Qt.DescendingOrder, ["a", "b", "c"]),     # webp, png, JPG
+])
+def test_sort(model, column, order, expected):
+    model.sort(column, order)
+    assert [model.getName(row) for row in range(model.rowCount())] == expected
+
+def test_sort_keeps_persistent_indexes(model):
+    index = QPersistentModelIndex(model.index(0, 0))    # b.png
+    model.sort(0, Qt.AscendingOrder)
+    assert index.row() == 1
+    assert index.data() == "b"
+
+def test_removeRowSet(model):
+    model.removeRowSet([2, 0])
+    assert model.getPaths() == [normalizePath("/path/a/c.JPG")]
+
+@patch("ui.file_model.REMOVE_RANGES_MAX", 1)
+def test_removeRowSet_scattered(model):
+    model.removeRowSet([0, 2])
+    assert model.getPaths() == [normalizePath("/path/a/c.JPG")]
+
+def test_removed_rows_leave_the_index(model):
+    model.removeRowSet([0])
+    assert not model.contains(normalizePath("/path/a/b.png"))
+    model.appendItems([item("/path/a/b.png")])
+    assert model.rowCount() == 3
+
+def test_clear(model):
+    model.clear()
+    assert model.rowCount() == 0
+    assert model.dirs.values == []
+    assert not model.contains(normalizePath("/path/a/b.png"))
+
+def test_getJobTable(model):
+    jobs = model.getJobTable()
+    assert len(jobs) == 3
+    assert jobs[1].name == "c"
+    assert jobs[1].ext == "JPG"
+    assert jobs[1].abs_path == normalizePath("/path/a/c.JPG")
+    assert jobs[2].anchor_path == Path("/other")
+    assert jobs[0].dir is jobs[1].dir
+    assert jobs[0].size == -1  # Not stat'ed on the GUI thread
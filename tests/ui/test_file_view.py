@@ -1,4 +1,6 @@
 from unittest.mock import patch, MagicMock
+import time
+import zipfile
 from pathlib import Path
 
 import pytest
@@ -25,9 +27,9 @@ def get_sample_items(count):
     for i in range(count):
         items.append(
             (
-                f"image_{count}",
+                f"image_{i}",
                 "png",
-                normalizePath(f"/path/images/image_{count}.png"),
+                normalizePath(f"/path/images/image_{i}.png"),
                 Path("/path/images/")
             )
         )
@@ -45,20 +47,19 @@ def get_sample_img_paths_qurls(count):
 
 def test_init(app):
     assert app.columnCount() == 3
-    header_item = app.headerItem()
-    assert header_item.text(0) == "File Name"
-    assert header_item.text(1) == "Ext."
-    assert header_item.text(2) == "Location"
+    assert app.model().headerData(0, Qt.Horizontal) == "File Name"
+    assert app.model().headerData(1, Qt.Horizontal) == "Ext."
+    assert app.model().headerData(2, Qt.Horizontal) == "Location"
 
 def test_addItems(app):
     sample_items = get_sample_items(2)
     app.addItems(sample_items)
 
-    assert app.topLevelItemCount() == 2
-    assert app.topLevelItem(0).text(0) == sample_items[0][0]
-    assert app.topLevelItem(0).text(1) == sample_items[0][1]
-    assert app.topLevelItem(0).text(2) == sample_items[0][2]
-    assert app.topLevelItem(0).data(0, Qt.UserRole) == sample_items[0][3]
+    assert app.itemCount() == 2
+    assert app.model().index(0, 0).data() == sample_items[0][0]
+    assert app.model().index(0, 1).data() == sample_items[0][1]
+    assert app.model().index(0, 2).data() == sample_items[0][2]
+    assert app.model().index(0, 0).data(Qt.UserRole) == sample_items[0][3]
 
 def test_addItems_remove_duplicates(app):
     sample_items = get_sample_items(1)
@@ -68,7 +69,7 @@ def test_addItems_remove_duplicates(app):
     app.addItems(sample_items)
     app.finishAddingItems()
 
-    assert app.topLevelItemCount() == 1
+    assert app.itemCount() == 1
 
 def test_getItems(app):
     sample_items = get_sample_items(2)
@@ -87,48 +88,48 @@ def test_disableSorting(app):
 
 def test_deleteSelected_one(app):
     app.addItems(get_sample_items(1))
-    app.setCurrentItem(app.topLevelItem(0))
+    app.setCurrentIndex(app.model().index(0, 0))
     app.deleteSelected()
 
-    assert app.topLevelItemCount() == 0
+    assert app.itemCount() == 0
 
 def test_deleteSelected_multiple_middle(app):
     sample_items = get_sample_items(3)
     app.addItems(sample_items)
 
-    app.topLevelItem(0).setSelected(True)
-    app.topLevelItem(2).setSelected(True)
+    app.selectRows(0, 0)
+    app.selectRows(2, 2)
     app.deleteSelected()
 
-    assert app.topLevelItemCount() == 1
-    assert app.topLevelItem(0).text(2) == sample_items[1][2]
+    assert app.itemCount() == 1
+    assert app.model().index(0, 2).data() == sample_items[1][2]
 
 def test_deleteSelected_all(app):
     app.addItems(get_sample_items(2))
 
-    app.topLevelItem(0).setSelected(True)
-    app.topLevelItem(1).setSelected(True)
+    app.selectRows(0, 0)
+    app.selectRows(1, 1)
     app.deleteSelected()
 
-    assert app.topLevelItemCount() == 0
+    assert app.itemCount() == 0
 
 def test_deleteSelected_first(app):
     app.addItems(get_sample_items(3))
 
-    app.topLevelItem(0).setSelected(True)
+    app.selectRows(0, 0)
     app.deleteSelected()
 
-    assert app.topLevelItemCount() == 2
-    assert app.currentItem() == app.topLevelItem(0)
+    assert app.itemCount() == 2
+    assert app.currentIndex().row() == 0
 
 def test_deleteSelected_last(app):
     app.addItems(get_sample_items(3))
 
-    app.topLevelItem(2).setSelected(True)
+    app.selectRows(2, 2)
     app.deleteSelected()
 
-    assert app.topLevelItemCount() == 2
-    assert app.currentItem() == app.topLevelItem(1)
+    assert app.itemCount() == 2
+    assert app.currentIndex().row() == 1
 
 @patch("ui.file_view.os.path.isdir", return_value=False)
 @patch("ui.file_view.os.path.isfile", return_value=True)
@@ -141,32 +142,33 @@ def test_drop_event_files(mock_isfile, mock_isdir, app):
 
     app.dropEvent(mock_event)
 
-    assert app.topLevelItemCount() == 2
-    assert app.topLevelItem(0).text(2) == normalizePath(sample_imgs[0].path())
+    assert app.itemCount() == 2
+    assert app.model().index(0, 2).data() == normalizePath(sample_imgs[0].path())
 
 @patch("ui.file_view.os.path.isdir", return_value=True)
 @patch("ui.file_view.os.path.isfile", return_value=False)
-@patch("ui.file_view.scanDir")
-def test_drop_event_folders(mock_scanDir, mock_isfile, mock_isdir, app):
+@patch("core.folder_scanner.scan_index.walk")
+def test_drop_event_folders(mock_walk, mock_isfile, mock_isdir, app, qtbot):
     sample_imgs = get_sample_img_paths(2)
-    mock_scanDir.return_value = sample_imgs
+    mock_walk.return_value = iter([[sample_imgs[0]], [sample_imgs[1]]])     # Consumed chunk by chunk
     mime_data = QMimeData()
     mime_data.setUrls([QUrl.fromLocalFile(get_sample_folder_paths(1)[0])])
     mock_event = MagicMock()
     mock_event.mimeData.return_value = mime_data
 
-    app.dropEvent(mock_event)
+    with qtbot.waitSignal(app.adding_finished):
+        app.dropEvent(mock_event)
 
-    assert app.topLevelItemCount() == 2
-    assert app.topLevelItem(0).text(2) == sample_imgs[0]
-    assert app.topLevelItem(1).text(2) == sample_imgs[1]
+    assert app.itemCount() == 2
+    assert app.model().index(0, 2).data() == sample_imgs[0]
+    assert app.model().index(1, 2).data() == sample_imgs[1]
 
 @patch("ui.file_view.os.path.isdir", side_effect=[False, True])
 @patch("ui.file_view.os.path.isfile", side_effect=[True, False])
-@patch("ui.file_view.scanDir")
-def test_drop_event_files_and_folders(mock_scanDir, mock_isfile, mock_isdir, app):
+@patch("core.folder_scanner.scan_index.walk")
+def test_drop_event_files_and_folders(mock_walk, mock_isfile, mock_isdir, app, qtbot):
     sample_imgs = get_sample_img_paths(3)
-    mock_scanDir.return_value = [sample_imgs[1], sample_imgs[2]]
+    mock_walk.return_value = iter([[sample_imgs[1], sample_imgs[2]]])
     mime_data = QMimeData()
     mime_data.setUrls([
         QUrl.fromLocalFile(sample_imgs[0]),
@@ -175,85 +177,220 @@ def test_drop_event_files_and_folders(mock_scanDir, mock_isfile, mock_isdir, app
     mock_event = MagicMock()
     mock_event.mimeData.return_value = mime_data
 
-    app.dropEvent(mock_event)
+    with qtbot.waitSignal(app.adding_finished):
+        app.dropEvent(mock_event)
+
+    assert app.itemCount() == 3
+    assert app.model().index(0, 2).data() == sample_imgs[0]
+    assert app.model().index(2, 2).data() == sample_imgs[2]
+
+@patch("ui.file_view.INSERT_BATCH", 2)
+@patch("core.folder_scanner.scan_index.walk")
+def test_add_folders_in_batches(mock_walk, app, qtbot):
+    sample_imgs = get_sample_img_paths(5)
+    mock_walk.return_value = iter([sample_imgs])
+    counts = []
+    app.adding_progress.connect(counts.append)
+
+    with qtbot.waitSignal(app.adding_finished):
+        app.addFolders([(normalizePath("/path/images"), Path("/path/images"))])
+        assert app.isAdding()
+
+    assert not app.isAdding()
+    assert counts == [5]
+    assert sorted(app.model().index(n, 2).data() for n in range(app.itemCount())) == sample_imgs
+
+@patch("core.folder_scanner.scan_index.walk")
+def test_cancel_adding(mock_walk, app, qtbot):
+    def chunks():
+        for n in range(1000):
+            time.sleep(0.01)
+            yield [normalizePath(f"/path/images/image_{n}.png")]
+    mock_walk.return_value = chunks()
+
+    with qtbot.waitSignal(app.adding_finished, timeout=5000):
+        app.addFolders([(normalizePath("/path/images"), Path("/path/images"))])
+        qtbot.waitSignal(app.adding_progress).wait()
+        app.cancelAdding()
+
+    assert app.itemCount() < 1000
+
+def test_addLists(app, qtbot, tmp_path):
+    manifest = tmp_path / "export.csv"
+    manifest.write_text("path,anchor\n/path/images/a/image_0.png,/path/images\n/path/images/b/image_1.png,/path/images\n/path/other/image_2.png\n/path/notes.txt\n")
+
+    with qtbot.waitSignal(app.adding_finished):
+        app.addLists([str(manifest)])
 
-    assert app.topLevelItemCount() == 3
-    assert app.topLevelItem(0).text(2) == sample_imgs[0]
-    assert app.topLevelItem(2).text(2) == sample_imgs[2]
+    assert app.getItems() == [
+        (normalizePath("/path/images/a/image_0.png"), Path(normalizePath("/path/images"))),
+        (normalizePath("/path/images/b/image_1.png"), Path(normalizePath("/path/images"))),
+        (normalizePath("/path/other/image_2.png"), Path(normalizePath("/path/other"))),
+    ]
+
+def test_addArchives(app, qtbot, tmp_path):
+    archive = tmp_path / "delivery.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("a/image_0.png", b"0")
+        zf.writestr("notes.txt", b"")
+
+    with qtbot.waitSignal(app.adding_finished):
+        app.addArchives([str(archive)])
+
+    assert app.getItems() == [(str(archive / "a" / "image_0.png"), archive)]
+
+def test_addItems_rejects_duplicates(app):
+    sample_items = get_sample_items(2)
+    app.addItems(sample_items)
+    app.addItems(sample_items[1:] + get_sample_items(3)[2:] + sample_items[:1])
+
+    assert app.itemCount() == 3
+    assert [path for path, _ in app.getItems()] == [item[2] for item in get_sample_items(3)]
+
+def test_readd_after_delete(app):
+    sample_items = get_sample_items(2)
+    app.addItems(sample_items)
+    app.selectRows(0, 0)
+    app.deleteSelected()
+    app.addItems(sample_items)
+
+    assert app.itemCount() == 2
+
+def test_readd_after_clear(app):
+    app.addItems(get_sample_items(2))
+    app.clear()
+    app.addItems(get_sample_items(2))
+
+    assert app.itemCount() == 2
 
 def test_move_down(app):
     app.addItems(get_sample_items(3))
 
     app.moveIndexDown()         # Nothing is selected at first
-    assert app.currentItem() == app.topLevelItem(0)
+    assert app.currentIndex().row() == 0
     app.moveIndexDown()
-    assert app.currentItem() == app.topLevelItem(1)
+    assert app.currentIndex().row() == 1
     app.moveIndexDown()
-    assert app.currentItem() == app.topLevelItem(2)
+    assert app.currentIndex().row() == 2
     app.moveIndexDown()
-    assert app.currentItem() == app.topLevelItem(2)
+    assert app.currentIndex().row() == 2
+
+@patch("ui.file_view.INSERT_BATCH", 2)
+@patch("core.folder_scanner.scan_index.walk")
+def test_add_folders_in_batches(mock_walk, app, qtbot):
+    sample_imgs = get_sample_img_paths(5)
+    mock_walk.return_value = iter([sample_imgs])
+    counts = []
+    app.adding_progress.connect(counts.append)
+
+    with qtbot.waitSignal(app.adding_finished):
+        app.addFolders([(normalizePath("/path/images"), Path("/path/images"))])
+        assert app.isAdding()
+
+    assert not app.isAdding()
+    assert counts == [5]
+    assert sorted(app.model().index(n, 2).data() for n in range(app.itemCount())) == sample_imgs
+
+@patch("core.folder_scanner.scan_index.walk")
+def test_cancel_adding(mock_walk, app, qtbot):
+    def chunks():
+        for n in range(1000):
+            time.sleep(0.01)
+            yield [normalizePath(f"/path/images/image_{n}.png")]
+    mock_walk.return_value = chunks()
+
+    with qtbot.waitSignal(app.adding_finished, timeout=5000):
+        app.addFolders([(normalizePath("/path/images"), Path("/path/images"))])
+        qtbot.waitSignal(app.adding_progress).wait()
+        app.cancelAdding()
+
+    assert app.itemCount() < 1000
+
+def test_addItems_rejects_duplicates(app):
+    sample_items = get_sample_items(2)
+    app.addItems(sample_items)
+    app.addItems(sample_items[1:] + get_sample_items(3)[2:] + sample_items[:1])
+
+    assert app.itemCount() == 3
+    assert [path for path, _ in app.getItems()] == [item[2] for item in get_sample_items(3)]
+
+def test_readd_after_delete(app):
+    sample_items = get_sample_items(2)
+    app.addItems(sample_items)
+    app.selectRows(0, 0)
+    app.deleteSelected()
+    app.addItems(sample_items)
+
+    assert app.itemCount() == 2
+
+def test_readd_after_clear(app):
+    app.addItems(get_sample_items(2))
+    app.clear()
+    app.addItems(get_sample_items(2))
+
+    assert app.itemCount() == 2
 
 def test_move_down(app):
     app.addItems(get_sample_items(3))
 
     app.moveIndexUp()
-    assert app.currentItem() == app.topLevelItem(0)
-    app.setCurrentItem(app.topLevelItem(2))
+    assert app.currentIndex().row() == 0
+    app.setCurrentIndex(app.model().index(2, 0))
     app.moveIndexUp()
-    assert app.currentItem() == app.topLevelItem(1)
+    assert app.currentIndex().row() == 1
     app.moveIndexUp()
-    assert app.currentItem() == app.topLevelItem(0)
+    assert app.currentIndex().row() == 0
     app.moveIndexUp()
-    assert app.currentItem() == app.topLevelItem(0)
+    assert app.currentIndex().row() == 0
 
 def test_move_top_top(app):
     app.addItems(get_sample_items(4))
 
-    app.setCurrentItem(app.topLevelItem(3))
+    app.setCurrentIndex(app.model().index(3, 0))
     app.moveIndexToTop()
-    assert app.currentItem() == app.topLevelItem(0)
+    assert app.currentIndex().row() == 0
 
 def test_move_top_bottom(app):
     app.addItems(get_sample_items(4))
 
-    app.setCurrentItem(app.topLevelItem(0))
+    app.setCurrentIndex(app.model().index(0, 0))
     app.moveIndexToBottom()
-    assert app.currentItem() == app.topLevelItem(3)
+    assert app.currentIndex().row() == 3
 
 def test_select_all(app):
     app.addItems(get_sample_items(4))
 
     app.selectAllItems()
-    for i in range(app.invisibleRootItem().childCount()):
-        assert app.topLevelItem(i).isSelected() == True
+    for i in range(app.itemCount()):
+        assert app.selectionModel().isRowSelected(i) == True
 
 def test_selectItemsBelow(app):
     app.addItems(get_sample_items(4))
 
-    app.setCurrentItem(app.topLevelItem(1))
+    app.setCurrentIndex(app.model().index(1, 0))
     app.selectItemsBelow()
-    assert app.topLevelItem(0).isSelected() == False
+    assert app.selectionModel().isRowSelected(0) == False
     for i in range(1, 3):
-        assert app.topLevelItem(i).isSelected() == True
+        assert app.selectionModel().isRowSelected(i) == True
 
 def test_selectItemsAbove(app):
     app.addItems(get_sample_items(4))
 
-    app.setCurrentItem(app.topLevelItem(2))
+    app.setCurrentIndex(app.model().index(2, 0))
     app.selectItemsAbove()
-    assert app.topLevelItem(3).isSelected() == False
+    assert app.selectionModel().isRowSelected(3) == False
     for i in range(2, 0, -1):
-        assert app.topLevelItem(i).isSelected() == True
+        assert app.selectionModel().isRowSelected(i) == True
 
 def test_shift_up(app):
     def assert_selected():
-        assert app.topLevelItem(0).isSelected() == True
-        assert app.topLevelItem(1).isSelected() == True
-        assert app.topLevelItem(2).isSelected() == False
+        assert app.selectionModel().isRowSelected(0) == True
+        assert app.selectionModel().isRowSelected(1) == True
+        assert app.selectionModel().isRowSelected(2) == False
 
     app.addItems(get_sample_items(3))
 
-    app.setCurrentItem(app.topLevelItem(1))
+    app.setCurrentIndex(app.model().index(1, 0))
     app.selectShiftUp()
     assert_selected()
     app.selectShiftUp()
@@ -261,12 +398,12 @@ def test_shift_up(app):
 
 def test_shift_down(app):
     def assert_selected():
-        assert app.topLevelItem(0).isSelected() == False
-        assert app.topLevelItem(1).isSelected() == True
-        assert app.topLevelItem(2).isSelected() == True
+        assert app.selectionModel().isRowSelected(0) == False
+        assert app.selectionModel().isRowSelected(1) == True
+        assert app.selectionModel().isRowSelected(2) == True
     app.addItems(get_sample_items(3))
 
-    app.setCurrentItem(app.topLevelItem(1))
+    app.setCurrentIndex(app.model().index(1, 0))
     app.selectShiftDown()
     assert_selected()
     app.selectShiftDown()
@@ -274,11 +411,11 @@ def test_shift_down(app):
 
 def test_shift_intersect(app):
     def assert_selected(item_0: bool, item_1: bool, item_2: bool):
-        assert app.topLevelItem(0).isSelected() == item_0
-        assert app.topLevelItem(1).isSelected() == item_1
-        assert app.topLevelItem(2).isSelected() == item_2
+        assert app.selectionModel().isRowSelected(0) == item_0
+        assert app.selectionModel().isRowSelected(1) == item_1
+        assert app.selectionModel().isRowSelected(2) == item_2
     app.addItems(get_sample_items(3))
-    app.setCurrentItem(app.topLevelItem(1))
+    app.setCurrentIndex(app.model().index(1, 0))
     app.selectShiftDown()
     app.selectShiftUp()
     assert_selected(False, True, False)
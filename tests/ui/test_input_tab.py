@@ -42,11 +42,21 @@ def test_addFiles(mock_selectedFiles, mock_exec, input_tab):
 
 @patch("ui.input_tab.QFileDialog.exec", return_value=True)
 @patch("ui.input_tab.QFileDialog.selectedFiles", return_value=[normalizePath("/path/to/folder")])
-@patch("ui.input_tab.scanDir", return_value=[normalizePath("/path/to/folder")])
-def test_addFolder(mock_scanDir, mock_selectedFiles, mock_exec, input_tab):
+@patch("ui.input_tab.os.path.isdir", return_value=True)
+def test_addFolder(mock_isdir, mock_selectedFiles, mock_exec, input_tab):
     input_tab.file_view = MagicMock(spec=FileView)
     input_tab.addFolder()
-    input_tab.file_view.addItems.assert_called_once()
+    input_tab.file_view.addFolders.assert_called_once_with([(normalizePath("/path/to/folder"), Path(normalizePath("/path/to/folder")))])
+
+@patch("ui.input_tab.QFileDialog.exec", return_value=True)
+@patch("ui.input_tab.QFileDialog.selectedFiles", return_value=[normalizePath("/path/to/missing")])
+@patch("ui.input_tab.os.path.isdir", return_value=False)
+def test_addFolder_missing(mock_isdir, mock_selectedFiles, mock_exec, input_tab):
+    input_tab.file_view = MagicMock(spec=FileView)
+    input_tab.notify = MagicMock()
+    input_tab.addFolder()
+    input_tab.file_view.addFolders.assert_not_called()
+    input_tab.notify.notify.assert_called_once()
 
 def test_clearInput(input_tab):
     input_tab.file_view = MagicMock(spec=FileView)
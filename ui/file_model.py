@@ -0,0 +1,210 @@
+import os
+import sys
+from array import array
+from pathlib import Path
+from typing import Any, Iterable, List, Tuple
+
+from PySide6.QtCore import (
+    Qt,
+    QAbstractTableModel,
+    QModelIndex,
+)
+
+from data.job_table import JobTable
+
+# Flat file list for FileView, stored by column instead of an object per row.
+#
+# Directories and anchors repeat across thousands of rows, so they're kept once in lookup tables
+# and rows only hold their ids. Extensions are interned, only the file names are stored per row.
+# A path index (file names per directory) rejects duplicates on insert.
+
+HEADERS = ("File Name", "Ext.", "Location")
+REMOVE_RANGES_MAX = 64  # Above that many separate ranges, removing rows resets the model instead
+
+class LookupTable:
+    """Stores each distinct value once, rows refer to it by id."""
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+
+    def add(self, value) -> int:
+        _id = self.ids.get(value)
+        if _id is None:
+            _id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return _id
+
+    def __getitem__(self, _id: int):
+        return self.values[_id]
+
+class FileModel(QAbstractTableModel):
+    """index(), parent() and flags() are left to Qt, views call them for every row."""
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._reset()
+
+    def _reset(self):
+        self.dirs = LookupTable()
+        self.anchors = LookupTable()
+        self.names = []             # File names with the extension
+        self.exts = []              # Interned
+        self.dir_ids = array("L")
+        self.anchor_ids = array("L")
+        self.dir_names = []         # dir_id -> set of file names in the list
+
+    # Rows
+    def getName(self, row: int) -> str:
+        """Without the extension."""
+        name, ext = self.names[row], self.exts[row]
+        return name[:-len(ext) - 1] if ext else name
+
+    def getExt(self, row: int) -> str:
+        return self.exts[row]
+
+    def getPath(self, row: int) -> str:
+        return os.path.join(self.dirs[self.dir_ids[row]], self.names[row])
+
+    def getAnchor(self, row: int) -> Path:
+        return self.anchors[self.anchor_ids[row]]
+
+    def getPaths(self) -> List[str]:
+        dirs, join = self.dirs.values, os.path.join
+        return [join(dirs[dir_id], name) for dir_id, name in zip(self.dir_ids, self.names)]
+
+    def getItems(self) -> List[Tuple[str, Path]]:
+        """[(absolute path, anchor path), ...]"""
+        anchors = self.anchors.values
+        return [(path, anchors[anchor_id]) for path, anchor_id in zip(self.getPaths(), self.anchor_ids)]
+
+    def getJobTable(self) -> JobTable:
+        """Rows are already split and validated. Files aren't stat'ed, see JobTable.statSizes()."""
+        table = JobTable()
+        dirs, anchors = self.dirs.values, self.anchors.values
+        for dir_id, name, anchor_id in zip(self.dir_ids, self.names, self.anchor_ids):
+            table.addSplit(dirs[dir_id], name, anchors[anchor_id], stat=False)
+        return table
+
+    def contains(self, abs_path: str) -> bool:
+        dir_path, name = os.path.split(abs_path)
+        dir_id = self.dirs.ids.get(dir_path)
+        return dir_id is not None and name in self.dir_names[dir_id]
+
+    def appendItems(self, items: Iterable[Tuple[str, str, str, Path]]):
+        """`items` as (name, extension, absolute path, anchor path), see FileView.addItems(). Paths already in the list are skipped."""
+        rows = []
+        for _, ext, abs_path, anchor_path in items:
+            dir_path, name = os.path.split(abs_path)
+            dir_id = self.dirs.add(dir_path)
+            if dir_id == len(self.dir_names):
+                self.dir_names.append(set())
+            if name in self.dir_names[dir_id]:
+                continue
+            self.dir_names[dir_id].add(name)
+            rows.append((name, sys.intern(ext), dir_id, self.anchors.add(anchor_path)))
+        if not rows:
+            return
+
+        first = len(self.names)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for name, ext, dir_id, anchor_id in rows:
+            self.names.append(name)
+            self.exts.append(ext)
+            self.dir_ids.append(dir_id)
+            self.anchor_ids.append(anchor_id)
+        self.endInsertRows()
+
+    def removeRowSet(self, rows: Iterable[int]):
+        """Remove rows by index, in any order."""
+        rows = sorted(set(rows))
+        if not rows:
+            return
+
+        for row in rows:
+            self.dir_names[self.dir_ids[row]].discard(self.names[row])
+
+        ranges = []     # [first, last], ascending
+        for row in rows:
+            if ranges and ranges[-1][1] == row - 1:
+                ranges[-1][1] = row
+            else:
+                ranges.append([row, row])
+
+        if len(ranges) > REMOVE_RANGES_MAX:     # Scattered rows, one pass instead of a shift per range
+            removed = set(rows)
+            keep = [row for row in range(len(self.names)) if row not in removed]
+            self.beginResetModel()
+            self._reorder(keep)
+            self.endResetModel()
+            return
+
+        for first, last in reversed(ranges):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.names[first:last + 1]
+            del self.exts[first:last + 1]
+            del self.dir_ids[first:last + 1]
+            del self.anchor_ids[first:last + 1]
+            self.endRemoveRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._reset()
+        self.endResetModel()
+
+    def _reorder(self, order: List[int]):
+        """Rows become [old rows in `order`]."""
+        self.names = [self.names[row] for row in order]
+        self.exts = [self.exts[row] for row in order]
+        self.dir_ids = array("L", (self.dir_ids[row] for row in order))
+        self.anchor_ids = array("L", (self.anchor_ids[row] for row in order))
+
+    # QAbstractTableModel
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.names)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def data(self, index, role=Qt.DisplayRole) -> Any:
+        if not index.isValid():
+            return None
+
+        row = index.row()
+        if role == Qt.DisplayRole:
+            match index.column():
+                case 0:
+                    return self.getName(row)
+                case 1:
+                    return self.getExt(row)
+                case 2:
+                    return self.getPath(row)
+        elif role == Qt.UserRole:
+            return self.getAnchor(row)
+        return None
+
+    def headerData(self, section: int, orientation, role=Qt.DisplayRole) -> Any:
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(HEADERS):
+            return HEADERS[section]
+        return None
+
+    def sort(self, column: int, order=Qt.AscendingOrder):
+        """Sorts a permutation of row indexes, then applies it to every column once."""
+        match column:
+            case 0:
+                key = self.getName
+            case 1:
+                key = self.getExt
+            case 2:
+                key = self.getPath
+            case _:
+                return
+
+        self.layoutAboutToBeChanged.emit()
+        rows = sorted(range(len(self.names)), key=key, reverse=order == Qt.DescendingOrder)
+        new_rows = array("L", [0]) * len(rows)
+        for new_row, old_row in enumerate(rows):
+            new_rows[old_row] = new_row
+        self._reorder(rows)
+
+        persistent = self.persistentIndexList()
+        self.changePersistentIndexList(persistent, [self.index(new_rows[index.row()], index.column()) for index in persistent])
+        self.layoutChanged.emit()
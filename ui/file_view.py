@@ -1,31 +1,52 @@
 import os
 from pathlib import Path
-import logging
+from collections import deque
 from typing import List, Tuple
 
 from PySide6.QtWidgets import(
-    QTreeWidget,
+    QTreeView,
     QAbstractItemView,
-    QTreeWidgetItem,
 )
 from PySide6.QtCore import(
     Qt,
+    Signal,
+    QTimer,
     QItemSelectionModel,
     QItemSelection,
+    QPersistentModelIndex,
 )
 
-from core.utils import scanDir
-from data.constants import ALLOWED_INPUT
+from core.folder_scanner import Runner as ScanRunner
+from .file_model import FileModel
+from data.constants import ALLOWED_INPUT, ALLOWED_MANIFESTS, ALLOWED_ARCHIVES
+
+INSERT_BATCH = 1000         # Rows inserted per tick while adding folders
+INSERT_INTERVAL_MS = 15     # Leaves time in between for the event loop
+
+class FileView(QTreeView):
+    adding_started = Signal()
+    adding_progress = Signal(int)   # Files found so far
+    adding_finished = Signal()
 
-class FileView(QTreeWidget):
     def __init__(self, parent):
         super(FileView, self).__init__(parent)
 
         self.setting_sorting_disabled = False
         self.shift_start = None
 
-        self.setColumnCount(3)
-        self.setHeaderLabels(("File Name", "Ext.", "Location"))
+        # Adding folders in the background
+        self.scanner = ScanRunner(self)
+        self.scanner.found.connect(self.onFound)
+        self.pending = deque()      # (paths, anchor path)
+        self.found_count = 0
+        self.adding = False
+        self.insert_timer = QTimer(self)
+        self.insert_timer.setInterval(INSERT_INTERVAL_MS)
+        self.insert_timer.timeout.connect(self.insertPending)
+
+        self.setModel(FileModel(self))
+        self.setRootIsDecorated(False)
+        self.setUniformRowHeights(True)     # Row heights aren't measured one by one
 
         self.setAcceptDrops(True)
         self.setDragDropMode(QAbstractItemView.InternalMove)    # Required for dropEvent to fire
@@ -47,19 +68,66 @@ class FileView(QTreeWidget):
                 item[2]: str - absolute path
                 item[3]: Path - directory the file was added from
         """
-        new_items = []
-        for name, ext, abs_path, anchor_path in items:
-            item = QTreeWidgetItem(
-                None,
-                (
-                    name,
-                    ext,
-                    abs_path,
-                )
-            )
-            item.setData(0, Qt.UserRole, anchor_path)
-            new_items.append(item)
-        self.invisibleRootItem().addChildren(new_items)
+        self.model().appendItems(items)
+
+    def addPaths(self, paths, anchor_path):
+        """Add absolute paths (str) that share `anchor_path`. Doesn't filter by extension."""
+        items = []
+        for path in paths:
+            name, ext = os.path.splitext(os.path.basename(path))
+            items.append((name, ext[1:], path, anchor_path))
+        self.addItems(items)
+
+    def addFolders(self, folders):
+        """Scan folders in the background and add their images in chunks.
+        Params:
+            folders - array of (absolute path, anchor path)
+        """
+        if not self.adding:
+            self.adding = True
+            self.found_count = 0
+            self.startAddingItems()
+            self.adding_started.emit()
+        self.scanner.run(folders)
+        self.insert_timer.start()
+
+    def addLists(self, lists):
+        """Import path lists (see core.manifest) in the background, same as folders."""
+        self.addFolders([(path, None) for path in lists])
+
+    def addArchives(self, archives):
+        """List the images inside of archives (see core.archive_source) in the background, same as folders."""
+        self.addFolders([(path, None) for path in archives])
+
+    def onFound(self, paths, anchor_path):
+        self.pending.append((paths, anchor_path))
+        self.found_count += len(paths)
+        self.adding_progress.emit(self.found_count)
+
+    def insertPending(self):
+        """Insert up to INSERT_BATCH rows, finish once the scan is done and nothing is left."""
+        budget = INSERT_BATCH
+        while self.pending and budget > 0:
+            paths, anchor_path = self.pending.popleft()
+            if len(paths) > budget:
+                self.pending.appendleft((paths[budget:], anchor_path))
+                paths = paths[:budget]
+            self.addPaths(paths, anchor_path)
+            budget -= len(paths)
+
+        if not self.pending and not self.scanner.isRunning():
+            self.insert_timer.stop()
+            self.adding = False
+            self.finishAddingItems()
+            self.adding_finished.emit()
+
+    def isAdding(self) -> bool:
+        return self.adding
+
+    def cancelAdding(self):
+        """Stop scanning, rows that were added stay."""
+        self.scanner.cancel()
+        self.pending.clear()
 
     def startAddingItems(self):
         """Run before adding items"""
@@ -68,36 +136,29 @@ class FileView(QTreeWidget):
     def finishAddingItems(self):
         """Run after all items have been added."""
         self.resizeToContent()
-        self.removeDuplicates()
         self.scrollToLastItem()
         if not self.setting_sorting_disabled:
             self.setSortingEnabled(True)
 
-    def removeDuplicates(self):
-        unique_items = set()
-
-        for n in range(self.invisibleRootItem().childCount() - 1, -1, -1):
-            item = self.invisibleRootItem().child(n)
-            path = item.text(2)
-            if path in unique_items:
-                self.takeTopLevelItem(n)
-            else:
-                unique_items.add(path)
-
     def disableSorting(self, disabled):
         self.setting_sorting_disabled = disabled
         self.setSortingEnabled(not disabled)
 
     def getItems(self):
-        items = []
-        for i in range(self.invisibleRootItem().childCount()):
-            items.append(
-                (
-                    self.invisibleRootItem().child(i).text(2),
-                    self.invisibleRootItem().child(i).data(0, Qt.UserRole),
-                )
-            )
-        return items
+        return self.model().getItems()
+
+    def getJobs(self):
+        return self.model().getJobTable()
+
+    def itemCount(self) -> int:
+        return self.model().rowCount()
+
+    def columnCount(self) -> int:
+        return self.model().columnCount()
+
+    def clear(self):
+        self.shift_start = None
+        self.model().clear()
 
     # Events
     def dragEnterEvent(self, event):
@@ -106,6 +167,12 @@ class FileView(QTreeWidget):
         else:
             event.ignore()
 
+    def dragMoveEvent(self, event):
+        if event.mimeData().hasUrls():  # The model doesn't take drops itself
+            event.accept()
+        else:
+            event.ignore()
+
     def dropEvent(self, event):
         if event.mimeData().hasUrls():
             event.accept()
@@ -113,50 +180,32 @@ class FileView(QTreeWidget):
             event.ignore()
             return
 
-        items = []
+        files = []
+        folders = []
         preserve_parent = len(event.mimeData().urls()) > 1
 
         for url in event.mimeData().urls():
             if url.isLocalFile():
                 path = str(url.toLocalFile())
                 if os.path.isdir(path):     # Directory
-                    try:
-                        files = scanDir(path)
-                    except FileNotFoundError as e:
-                        logging.error(f"[FileView - scanDir()] Directory not found. {e}")
-                        continue
-
-                    for file in files:
-                        file_path = Path(file)
-                        ext = file_path.suffix[1:]
-
-                        if ext.lower() in ALLOWED_INPUT:
-                            items.append(
-                                (
-                                    file_path.stem,
-                                    ext,
-                                    str(file_path),
-                                    Path(path).parent if preserve_parent else Path(path),
-                                )
-                            )
+                    folders.append((path, Path(path).parent if preserve_parent else Path(path)))
 
                 elif os.path.isfile(path):  # Single file
-                    file_path = Path(path)
-                    ext = file_path.suffix[1:]
-
-                    if ext.lower() in ALLOWED_INPUT:
-                        items.append(
-                            (
-                                file_path.stem,
-                                ext,
-                                str(file_path),
-                                Path(file_path).parent,
-                            )
-                        )
-
-        self.startAddingItems()
-        self.addItems(items)
-        self.finishAddingItems()
+                    ext = Path(path).suffix[1:].lower()
+                    if ext in ALLOWED_INPUT:
+                        files.append(path)
+                    elif ext in ALLOWED_MANIFESTS or ext in ALLOWED_ARCHIVES:   # Path list or archive
+                        folders.append((path, None))
+
+        if files:
+            self.startAddingItems()
+            for path in files:
+                self.addPaths([str(Path(path))], Path(path).parent)
+            if not self.adding:
+                self.finishAddingItems()
+
+        if folders:
+            self.addFolders(folders)
 
     def keyPressEvent(self, event):
         if event.key() == Qt.Key_Delete:
@@ -191,66 +240,45 @@ class FileView(QTreeWidget):
 
     # Navigation
     def selectAllItems(self):
-        if self.invisibleRootItem().childCount() > 0:
-            self.selectAll()
-    
+        if self.itemCount() > 0:
+            self.selectRows(0, self.itemCount() - 1)    # One range, QTreeView.selectAll() walks every row
+
+    def selectRows(self, first: int, last: int, command=QItemSelectionModel.Select):
+        selection = QItemSelection(self.model().index(min(first, last), 0), self.model().index(max(first, last), self.columnCount() - 1))
+        self.selectionModel().select(selection, command)
+
     def selectItemsBelow(self):
-        current_item = self.currentItem()
-        root = self.invisibleRootItem()
-        if current_item:
-            current_index = self.indexFromItem(current_item)
-            last_item = root.child(root.childCount() - 1)
-            last_index = self.indexFromItem(last_item)
-
-            top_left = self.model().index(current_index.row(), 0)
-            bottom_right = self.model().index(last_index.row(), self.columnCount() - 1)
-            selection = QItemSelection(top_left, bottom_right)
-
-            self.setCurrentIndex(last_index)
+        current_index = self.currentIndex()
+        if current_index.isValid():
             self.moveIndexToBottom()
-            self.selectionModel().select(selection, QItemSelectionModel.Select)
+            self.selectRows(current_index.row(), self.itemCount() - 1)
 
     def selectItemsAbove(self):
-        current_item = self.currentItem()
-        root = self.invisibleRootItem()
-        if current_item:
-            current_index = self.indexFromItem(current_item)
-            first_item = root.child(0)
-            first_index = self.indexFromItem(first_item)
-
-            top_left = self.model().index(first_index.row(), 0)
-            bottom_right = self.model().index(current_index.row(), self.columnCount() - 1)
-            selection = QItemSelection(top_left, bottom_right)
-
-            self.setCurrentIndex(first_index)
+        current_index = self.currentIndex()
+        if current_index.isValid():
             self.moveIndexToTop()
-            self.selectionModel().select(selection, QItemSelectionModel.Select)
+            self.selectRows(0, current_index.row())
 
     def selectShiftDown(self):
-        self.selectShift(self.itemBelow)
+        self.selectShift(1)
 
     def selectShiftUp(self):
-        self.selectShift(self.itemAbove)
+        self.selectShift(-1)
 
-    def selectShift(self, get_next_item):
-        current_item = self.currentItem()
+    def selectShift(self, step: int):
+        current_index = self.currentIndex()
+        if not current_index.isValid():
+            return
         if self.shift_start is None:
-            self.shift_start = current_item
-
-        next_item = get_next_item(current_item)
-        if next_item:
-            self.setCurrentItem(next_item)
-            current_item = next_item
-
-        self.setSelectionMode(QTreeWidget.MultiSelection)
-        self.clearSelection()
-        start_index = self.indexFromItem(self.shift_start)
-        end_index = self.indexFromItem(self.currentItem())
-        for i in range(min(start_index.row(), end_index.row()), max(start_index.row(), end_index.row()) + 1):
-            item = self.topLevelItem(i)
-            if item:
-                item.setSelected(True)
-        self.setSelectionMode(QTreeWidget.ExtendedSelection)
+            self.shift_start = QPersistentModelIndex(current_index)
+
+        next_index = self.model().index(current_index.row() + step, 0)
+        if next_index.isValid():
+            self.setCurrentIndex(next_index)
+            current_index = next_index
+
+        start_row = self.shift_start.row() if self.shift_start.isValid() else current_index.row()
+        self.selectRows(start_row, current_index.row(), QItemSelectionModel.ClearAndSelect)
 
     def moveIndexDown(self):
         cur_idx = self.currentIndex()
@@ -259,7 +287,7 @@ class FileView(QTreeWidget):
             new_idx = self.model().index(cur_idx.row() + 1, cur_idx.column())
             self.setCurrentIndex(new_idx)
         elif not cur_idx.isValid():
-            self.setCurrentIndex(self.indexFromItem(self.topLevelItem(0)))
+            self.setCurrentIndex(self.model().index(0, 0))
     
     def moveIndexUp(self):
         cur_idx = self.currentIndex()
@@ -268,7 +296,7 @@ class FileView(QTreeWidget):
             new_idx = self.model().index(cur_idx.row() - 1, cur_idx.column())
             self.setCurrentIndex(new_idx)
         elif not cur_idx.isValid():
-            self.setCurrentIndex(self.indexFromItem(self.topLevelItem(0)))
+            self.setCurrentIndex(self.model().index(0, 0))
 
     def moveIndexToTop(self):
         self.setCurrentIndex(self.model().index(0, 0))
@@ -277,39 +305,40 @@ class FileView(QTreeWidget):
         self.setCurrentIndex(self.model().index(self.model().rowCount() - 1, 0))
 
     def scrollToLastItem(self):
-        item_count = self.invisibleRootItem().childCount()
-        self.scrollToItem(self.invisibleRootItem().child(item_count - 1))
+        if self.itemCount() > 0:
+            self.scrollTo(self.model().index(self.itemCount() - 1, 0))
     
     def resizeToContent(self):
         for i in range(0, self.columnCount() - 1):  # The last one resizes with the window
             self.resizeColumnToContents(i)
     
     # Operations
-    def deleteSelected(self):
-        root = self.invisibleRootItem()
+    def getSelectedRows(self) -> List[int]:
+        """Read from selection ranges, without an index object per selected cell."""
+        rows = set()
+        for selection_range in self.selectionModel().selection():
+            rows.update(range(selection_range.top(), selection_range.bottom() + 1))
+        return sorted(rows)
 
-        # Get selected indexes
-        selected_indexes = self.selectionModel().selectedIndexes()
-        if not selected_indexes:
+    def deleteSelected(self):
+        selected_rows = self.getSelectedRows()[::-1]
+        if not selected_rows:
             return
 
         self.setUpdatesEnabled(False)
-        selected_rows = sorted(set(idx.row() for idx in selected_indexes), reverse=True)
         
         # Determine next row to select
         next_row = -1
-        if root.childCount() > 0:
-            if selected_rows[-1] < root.childCount() - 1:
-                next_row = selected_rows[-1]
-            elif selected_rows[0] > 0:
-                next_row = selected_rows[0] - 1
+        if selected_rows[-1] < self.itemCount() - 1:
+            next_row = selected_rows[-1]
+        elif selected_rows[0] > 0:
+            next_row = selected_rows[0] - 1
 
         # Remove selected items
-        for row in selected_rows:
-            self.takeTopLevelItem(row)
+        self.model().removeRowSet(selected_rows)
         
         # Select next item
-        if root.childCount() > 0:
+        if self.itemCount() > 0:
             self.setCurrentIndex(self.model().index(next_row, 0))
         
-        self.setUpdatesEnabled(True)
\ No newline at end of file
+        self.setUpdatesEnabled(True)
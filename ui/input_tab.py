@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 import logging
 from typing import List, Tuple
@@ -6,7 +7,8 @@ from PySide6.QtWidgets import(
     QWidget,
     QGridLayout,
     QPushButton,
-    QFileDialog
+    QFileDialog,
+    QLabel,
 )
 from PySide6.QtCore import(
     Signal,
@@ -18,12 +20,13 @@ from PySide6.QtGui import(
 )
 
 from .file_view import FileView
-from data.constants import ALLOWED_INPUT
-from core.utils import scanDir, listToFilter
+from data.constants import ALLOWED_INPUT, ALLOWED_MANIFESTS, ALLOWED_ARCHIVES
+from core.utils import listToFilter
 from .notifications import Notifications
 
 class InputTab(QWidget):
     convert = Signal()
+    resume = Signal()
 
     def __init__(self, settings):
         super(InputTab, self).__init__()
@@ -37,7 +40,7 @@ class InputTab(QWidget):
         self.select_all_sc = QShortcut(QKeySequence('Ctrl+A'), self)
         self.select_all_sc.activated.connect(self.file_view.selectAllItems)
         self.delete_all_sc = QShortcut(QKeySequence("Ctrl+Shift+X"), self)
-        self.delete_all_sc.activated.connect(self.file_view.clear)
+        self.delete_all_sc.activated.connect(self.clearInput)
 
         # UI
         input_l = QGridLayout()
@@ -59,16 +62,38 @@ class InputTab(QWidget):
         self.convert_btn.setText("Convert")
         self.convert_btn.clicked.connect(self.convert.emit)
 
+        self.resume_btn = QPushButton(self)
+        self.resume_btn.setText("Resume")
+        self.resume_btn.setToolTip("Resume the last batch that was interrupted")
+        self.resume_btn.clicked.connect(self.resume.emit)
+        self.resume_btn.setVisible(False)
+
+        self.adding_l = QLabel(self)
+        self.adding_l.setVisible(False)
+        self.cancel_adding_btn = QPushButton(self)
+        self.cancel_adding_btn.setText("Cancel")
+        self.cancel_adding_btn.clicked.connect(self.file_view.cancelAdding)
+        self.cancel_adding_btn.setVisible(False)
+
+        self.file_view.adding_started.connect(lambda: self.setAddingVisible(True))
+        self.file_view.adding_progress.connect(lambda count: self.adding_l.setText(f"Adding files... {count} found"))
+        self.file_view.adding_finished.connect(lambda: self.setAddingVisible(False))
+
         # Positions
         input_l.addWidget(add_files_btn,1,0)
         input_l.addWidget(add_folder_btn,1,1)
         input_l.addWidget(clear_list_btn,1,2)
         input_l.addWidget(self.convert_btn,1,3,1,2)
         input_l.addWidget(self.file_view,0,0,1,0)
+        input_l.addWidget(self.adding_l,2,0,1,4)
+        input_l.addWidget(self.cancel_adding_btn,2,4)
 
     # Items
     def getItems(self):
         return self.file_view.getItems()
+
+    def getJobs(self):
+        return self.file_view.getJobs()
     
     def _addItems(self, items: List[Tuple[Path, Path]]) -> None:
         """
@@ -104,9 +129,23 @@ class InputTab(QWidget):
         dlg = QFileDialog()
         dlg.setWindowTitle("Add Images")
         dlg.setFileMode(QFileDialog.ExistingFiles)
-        dlg.setNameFilter(listToFilter("Images", ALLOWED_INPUT))
+        dlg.setNameFilters([
+            listToFilter("Images", ALLOWED_INPUT),
+            listToFilter("Path Lists", ALLOWED_MANIFESTS),
+            listToFilter("Archives", ALLOWED_ARCHIVES),
+        ])
 
         if dlg.exec():
+            # Path lists are imported in the background
+            lists = [i for i in dlg.selectedFiles() if Path(i).suffix[1:].lower() in ALLOWED_MANIFESTS]
+            if lists:
+                self.file_view.addLists(lists)
+
+            # Archives are listed in the background
+            archives = [i for i in dlg.selectedFiles() if Path(i).suffix[1:].lower() in ALLOWED_ARCHIVES]
+            if archives:
+                self.file_view.addArchives(archives)
+
             # Add items
             file_paths = []
             for i in dlg.selectedFiles():
@@ -126,26 +165,32 @@ class InputTab(QWidget):
         if dlg.exec():
             selected_dir = dlg.selectedFiles()[0]
             
-            try:
-                file_paths = scanDir(selected_dir)
-            except FileNotFoundError:
+            if not os.path.isdir(selected_dir):
                 self.notify.notify("Error", "The directory was not found.")
                 return
 
-            # Add items
-            tmp = []
-            for i in file_paths:
-                tmp.append(
-                    (
-                        Path(i),
-                        Path(selected_dir),
-                    )
-                )
-            self._addItems(tmp)
+            self.file_view.addFolders([(selected_dir, Path(selected_dir))])
     
     # Misc.
     def clearInput(self):
+        self.file_view.cancelAdding()
         self.file_view.clear()
+
+    def setAddingVisible(self, visible: bool):
+        self.adding_l.setText("Adding files...")
+        self.adding_l.setVisible(visible)
+        self.cancel_adding_btn.setVisible(visible)
     
+    def setResumable(self, items_left: int):
+        """Show the resume button when the last batch has `items_left`."""
+        self.resume_btn.setText(f"Resume ({items_left} left)")
+        if items_left > 0:
+            self.layout().addWidget(self.convert_btn,1,3)
+            self.layout().addWidget(self.resume_btn,1,4)
+        else:
+            self.layout().removeWidget(self.resume_btn)
+            self.layout().addWidget(self.convert_btn,1,3,1,2)
+        self.resume_btn.setVisible(items_left > 0)
+
     def disableSorting(self, disabled):
         self.file_view.disableSorting(disabled)
\ No newline at end of file
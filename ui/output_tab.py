@@ -49,6 +49,7 @@ class OutputTab(QWidget):
         self.threads_sl.setTickInterval(1)
         self.threads_sl.valueChanged.connect(self.onThreadSlChange)
         self.threads_sb.valueChanged.connect(self.onThreadSbChange)
+        self.threads_auto_cb = self.wm.addWidget("threads_auto_cb", QCheckBox("Auto"))
         
         self.duplicates_cmb = self.wm.addWidget("duplicates_cmb", ComboBox())
         self.duplicates_cmb.addItems(("Rename", "Replace", "Skip"))
@@ -62,6 +63,7 @@ class OutputTab(QWidget):
         threads_hb.addWidget(QLabel("Threads"))
         threads_hb.addWidget(self.threads_sl)
         threads_hb.addWidget(self.threads_sb)
+        threads_hb.addWidget(self.threads_auto_cb)
 
         duplicates_hb = QHBoxLayout()
         duplicates_hb.addWidget(QLabel("Duplicates"))
@@ -95,6 +97,15 @@ class OutputTab(QWidget):
         self.choose_output_ct_le = self.wm.addWidget("choose_output_ct_le", QLineEdit(), "output_ct")
         self.choose_output_ct_btn = self.wm.addWidget("choose_output_ct_btn", QPushButton("..."), "output_ct")
         self.keep_dir_struct_cb = self.wm.addWidget("keep_dir_struct_cb", QCheckBox("Keep Folder Structure"))
+        self.archive_cb = self.wm.addWidget("archive_cb", QCheckBox("Pack into Archive"))
+        self.archive_format_cmb = self.wm.addWidget("archive_format_cmb", ComboBox(), "archive")
+        self.archive_format_cmb.addItems(("tar", "zip"))
+        self.archive_max_size_sb = self.wm.addWidget("archive_max_size_sb", SpinBox(), "archive")
+        self.archive_max_size_sb.setRange(0, 1024 ** 2)
+        self.archive_max_size_sb.setSingleStep(100)
+        self.archive_max_size_sb.setSuffix(" MiB")
+        self.archive_max_size_sb.setSpecialValueText("No Limit")
+        self.archive_cb.toggled.connect(self.onOutputToggled)
 
         self.choose_output_ct_btn.clicked.connect(self.chooseOutput)        
         self.choose_output_ct_rb.toggled.connect(self.onOutputToggled)
@@ -113,6 +124,11 @@ class OutputTab(QWidget):
         output_grp_lt.addWidget(self.choose_output_src_rb)
         output_grp_lt.addLayout(output_hb)
         output_grp_lt.addWidget(self.keep_dir_struct_cb)
+        archive_hb = QHBoxLayout()
+        archive_hb.addWidget(self.archive_cb)
+        for i in self.wm.getWidgetsByTag("archive"):
+            archive_hb.addWidget(i)
+        output_grp_lt.addLayout(archive_hb)
 
         # Format - widgets
         self.format_cmb = self.wm.addWidget("format_cmb", ComboBox())
@@ -261,9 +277,12 @@ class OutputTab(QWidget):
         """Sets tooltips at once at startup."""
         setToolTip(TOOLTIPS["duplicates"], self.duplicates_cmb)
         setToolTip(TOOLTIPS["threads"], self.threads_sl, self.threads_sb)
+        setToolTip(TOOLTIPS["threads_auto"], self.threads_auto_cb)
         setToolTip(TOOLTIPS["output_src"], self.choose_output_src_rb)
         setToolTip(TOOLTIPS["output_ct"], self.choose_output_ct_le, self.choose_output_ct_rb, self.choose_output_ct_btn)
         setToolTip(TOOLTIPS["keep_dir_struct"], self.keep_dir_struct_cb)
+        setToolTip(TOOLTIPS["archive"], self.archive_cb, self.archive_format_cmb)
+        setToolTip(TOOLTIPS["archive_max_size"], self.archive_max_size_sb)
         setToolTip(TOOLTIPS["delete_original"], self.delete_original_cb, self.delete_original_cmb)
         setToolTip(TOOLTIPS["clear_after_conv"], self.clear_after_conv_cb)
         setToolTip(TOOLTIPS["format"], self.format_cmb)
@@ -315,6 +334,9 @@ class OutputTab(QWidget):
             "custom_output_dir": self.choose_output_ct_rb.isChecked(),
             "custom_output_dir_path": self.choose_output_ct_le.text(),
             "keep_dir_struct": self.keep_dir_struct_cb.isChecked(),
+            "archive_output": self.archive_cb.isChecked() and self.choose_output_ct_rb.isChecked(),
+            "archive_format": self.archive_format_cmb.currentText(),
+            "archive_max_size": self.archive_max_size_sb.value(),
             "delete_original": self.delete_original_cb.isChecked(),
             "delete_original_mode": self.delete_original_cmb.currentText(),
             "smallest_format_pool": {
@@ -343,6 +365,9 @@ class OutputTab(QWidget):
     def getUsedThreadCount(self):
         return self.threads_sl.value()
 
+    def isAutoThreadsChecked(self):
+        return self.threads_auto_cb.isChecked()
+
     def smIsFormatPoolEmpty(self):
         empty = True
         for w in self.wm.getWidgetsByTag("format_pool"):
@@ -362,6 +387,8 @@ class OutputTab(QWidget):
         src_checked = self.choose_output_src_rb.isChecked()
         self.wm.setEnabledByTag("output_ct", not src_checked)
         self.keep_dir_struct_cb.setEnabled(not src_checked)
+        self.archive_cb.setEnabled(not src_checked)
+        self.wm.setEnabledByTag("archive", not src_checked and self.archive_cb.isChecked())
         
     def onFormatChange(self):
         self.saveFormatState()
@@ -470,12 +497,16 @@ class OutputTab(QWidget):
 
         self.choose_output_src_rb.setChecked(True)
         self.keep_dir_struct_cb.setChecked(False)
+        self.archive_cb.setChecked(False)
+        self.archive_format_cmb.setCurrentIndex(0)
+        self.archive_max_size_sb.setValue(0)
 
         self.delete_original_cb.setChecked(False)
         self.delete_original_cmb.setCurrentIndex(0)
         self.clear_after_conv_cb.setChecked(False)
         
         self.threads_sl.setValue(self.MAX_THREAD_COUNT - 1 if self.MAX_THREAD_COUNT > 0 else 1)  # -1 because the OS needs some CPU time as well
+        self.threads_auto_cb.setChecked(False)
         self.duplicates_cmb.setCurrentIndex(0)
         
         self.chroma_subsampling_jpegli_cmb.setCurrentIndex(0)
@@ -34,6 +34,10 @@ from data.logging_manager import LoggingManager
 from ui.notifications import Notifications
 from ui.utils import setToolTip
 from data.tooltips import TOOLTIPS
+import core.affinity as affinity
+import core.priority as priority
+from core.calibration import Runner as CalibrationRunner, ThreadProfile
+from core.conversion_cache import conversion_cache
 
 class Signals(QObject):
     custom_resampling = Signal(bool)
@@ -41,6 +45,7 @@ class Signals(QObject):
     enable_jxl_effort_10 = Signal(bool)
     enable_quality_prec_snap = Signal(bool)
     change_jpg_encoder = Signal(str)
+    thread_profile_changed = Signal()
 
 class SettingsTab(QWidget):
     def __init__(self):
@@ -50,6 +55,7 @@ class SettingsTab(QWidget):
         self.signals = Signals()
         self.logging_manager = LoggingManager()
         self.notifications = Notifications(self)
+        self.calibration = CalibrationRunner(ThreadProfile(), self)
 
         # Init UI
         self.setupUI()
@@ -67,6 +73,7 @@ class SettingsTab(QWidget):
         # Refresh states
         self.onCustomArgsToggled()
         self.onPlaySoundOnFinishVolumeToggled()
+        self.onConversionCacheToggled()
 
         # Apply Settings
         self.setDarkModeEnabled(self.dark_theme_cb.isChecked())
@@ -117,6 +124,19 @@ class SettingsTab(QWidget):
         self.multithreading_cmb = self.wm.addWidget("multithreading_cmb", QComboBox())
         self.multithreading_l = QLabel("Multithreading")
         self.multithreading_cmb.addItems(("Performance", "Low RAM"))
+        self.execution_class_l = QLabel("Process Priority")
+        self.execution_class_cmb = self.wm.addWidget("execution_class_cmb", QComboBox())
+        self.execution_class_cmb.addItems(priority.EXECUTION_CLASSES)
+        self.cpu_placement_cb = self.wm.addWidget("cpu_placement_cb", QCheckBox("Pin Encoders to CPU Cores (NUMA-Aware)"))
+        self.cpu_placement_cb.setEnabled(affinity.isSupported())
+        self.calibrate_threads_btn = QPushButton("Calibrate Thread Scaling")
+        self.conversion_cache_cb = self.wm.addWidget("conversion_cache_cb", QCheckBox("Cache Converted Images"))
+        self.conversion_cache_size_l = QLabel("Cache Size")
+        self.conversion_cache_size_sb = self.wm.addWidget("conversion_cache_size_sb", SpinBox())
+        self.conversion_cache_size_sb.setRange(1, 1000)
+        self.conversion_cache_size_sb.setSuffix(" GiB")
+        self.conversion_cache_clear_btn = QPushButton("Clear Cache")
+        self.deduplicate_cb = self.wm.addWidget("deduplicate_cb", QCheckBox("Convert Identical Images Once"))
 
         self.exiftool_l = QLabel("ExifTool Arguments")
         self.exiftool_wipe_l = QLabel("Wipe")
@@ -188,6 +208,15 @@ class SettingsTab(QWidget):
         self.settings_lt.addWidget(self.copy_if_larger_cb)
         self.multithreading_hb = self.createQHboxLayout(self.multithreading_l, self.multithreading_cmb)
         self.settings_lt.addLayout(self.multithreading_hb)
+        self.execution_class_hb = self.createQHboxLayout(self.execution_class_l, self.execution_class_cmb)
+        self.settings_lt.addLayout(self.execution_class_hb)
+        self.settings_lt.addWidget(self.cpu_placement_cb)
+        self.calibrate_threads_hb = self.createQHboxLayout(self.calibrate_threads_btn)
+        self.settings_lt.addLayout(self.calibrate_threads_hb)
+        self.settings_lt.addWidget(self.conversion_cache_cb)
+        self.conversion_cache_hb = self.createQHboxLayout(self.conversion_cache_size_l, self.conversion_cache_size_sb, self.conversion_cache_clear_btn)
+        self.settings_lt.addLayout(self.conversion_cache_hb)
+        self.settings_lt.addWidget(self.deduplicate_cb)
 
         ## Advanced
         self.settings_lt.addWidget(self.enable_jxl_effort_10)
@@ -215,6 +244,10 @@ class SettingsTab(QWidget):
 
         self.play_sound_on_finish_vol_hb.setAlignment(Qt.AlignLeft)
         self.multithreading_hb.setAlignment(Qt.AlignLeft)
+        self.execution_class_hb.setAlignment(Qt.AlignLeft)
+        self.calibrate_threads_hb.setAlignment(Qt.AlignLeft)
+        self.conversion_cache_hb.setAlignment(Qt.AlignLeft)
+        self.conversion_cache_size_sb.setMinimumWidth(150)
         self.play_sound_on_finish_vol_sb.setMinimumWidth(150)
 
         self.avifenc_args_l.setMinimumWidth(label_width)
@@ -237,6 +270,7 @@ class SettingsTab(QWidget):
 
         self.jpg_encoder_cmb.setMinimumWidth(150)
         self.multithreading_cmb.setMinimumWidth(150)
+        self.execution_class_cmb.setMinimumWidth(150)
 
     def setupSignals(self):
         self.dark_theme_cb.toggled.connect(self.setDarkModeEnabled)
@@ -250,6 +284,11 @@ class SettingsTab(QWidget):
         self.jpg_encoder_cmb.currentTextChanged.connect(self.signals.change_jpg_encoder)
 
         self.exiftool_reset_btn.clicked.connect(self.resetExifTool)
+        self.calibrate_threads_btn.clicked.connect(self.toggleCalibration)
+        self.conversion_cache_cb.toggled.connect(self.onConversionCacheToggled)
+        self.conversion_cache_clear_btn.clicked.connect(self.clearConversionCache)
+        self.calibration.progress.connect(lambda msg: logging.info(f"[Calibration] {msg}"))
+        self.calibration.finished.connect(self.onCalibrationFinished)
 
         self.start_logging_btn.clicked.connect(self.toggleLogging)
         self.open_log_dir_btn.clicked.connect(self.openLogsDir)
@@ -278,6 +317,11 @@ class SettingsTab(QWidget):
         setToolTip(TOOLTIPS["exiftool_args"], self.exiftool_wipe_te, self.exiftool_custom_te, self.exiftool_preserve_te, self.exiftool_unsafe_wipe_te)
         setToolTip(TOOLTIPS["encoder_args"], self.avifenc_args_te, self.cjpegli_args_te, self.cjxl_args_te, self.im_args_te)
         setToolTip(TOOLTIPS["multithreading"], self.multithreading_cmb)
+        setToolTip(TOOLTIPS["execution_class"], self.execution_class_cmb)
+        setToolTip(TOOLTIPS["cpu_placement"], self.cpu_placement_cb)
+        setToolTip(TOOLTIPS["calibrate_threads"], self.calibrate_threads_btn)
+        setToolTip(TOOLTIPS["conversion_cache"], self.conversion_cache_cb, self.conversion_cache_size_sb)
+        setToolTip(TOOLTIPS["deduplicate"], self.deduplicate_cb)
 
     def changeCategory(self, category):
         # Category buttons
@@ -301,6 +345,12 @@ class SettingsTab(QWidget):
                 "keep_if_larger_cb",
                 "copy_if_larger_cb",
                 "multithreading_l", "multithreading_cmb",
+                "execution_class_l", "execution_class_cmb",
+                "cpu_placement_cb",
+                "calibrate_threads_btn",
+                "conversion_cache_cb",
+                "conversion_cache_size_l", "conversion_cache_size_sb", "conversion_cache_clear_btn",
+                "deduplicate_cb",
             ],
             "Advanced": [
                 "no_exceptions_cb",
@@ -346,6 +396,36 @@ class SettingsTab(QWidget):
         self.play_sound_on_finish_vol_l.setEnabled(enabled)
         self.play_sound_on_finish_vol_sb.setEnabled(enabled)
 
+    def onConversionCacheToggled(self):
+        enabled = self.conversion_cache_cb.isChecked()
+        self.conversion_cache_size_l.setEnabled(enabled)
+        self.conversion_cache_size_sb.setEnabled(enabled)
+
+    def clearConversionCache(self):
+        conversion_cache.clear()
+        self.notifications.notify("Cache Cleared", "All cached images have been removed.")
+
+    def toggleCalibration(self):
+        if self.calibration.isRunning():
+            self.calibration.thread.requestInterruption()
+            self.calibrate_threads_btn.setEnabled(False)
+            return
+
+        self.calibration.run(os.cpu_count() or 1)
+        self.calibrate_threads_btn.setText("Cancel Calibration")
+
+    def onCalibrationFinished(self, results):
+        self.calibrate_threads_btn.setText("Calibrate Thread Scaling")
+        self.calibrate_threads_btn.setEnabled(True)
+
+        if not results:
+            self.notifications.notify("Calibration", "Calibration did not finish. No encoders were measured.")
+            return
+
+        self.signals.thread_profile_changed.emit()
+        summary = "\n".join(f"{encoder}: {max(r['speedup'].values()):.1f}x" for encoder, r in results.items())
+        self.notifications.notify("Calibration Finished", f"Maximum speedup per encoder:\n{summary}")
+
     def setDarkModeEnabled(self, enabled):
         setTheme("dark" if enabled else "light")
 
@@ -403,6 +483,11 @@ class SettingsTab(QWidget):
             "keep_if_larger": self.keep_if_larger_cb.isChecked(),
             "copy_if_larger": self.copy_if_larger_cb.isChecked(),
             "multithreading_mode": self.multithreading_cmb.currentText(),
+            "execution_class": self.execution_class_cmb.currentText(),
+            "conversion_cache": self.conversion_cache_cb.isChecked(),
+            "conversion_cache_size": self.conversion_cache_size_sb.value() * 1024 ** 3,
+            "deduplicate": self.deduplicate_cb.isChecked(),
+            "cpu_placement": self.cpu_placement_cb.isChecked() and affinity.isSupported(),
             "exiftool_args": {      # Mapped to values from modify_tab.metadata_cmb
                 "ExifTool - Wipe": self.exiftool_wipe_te.toPlainText(),
                 "ExifTool - Preserve": self.exiftool_preserve_te.toPlainText(),
@@ -435,6 +520,11 @@ class SettingsTab(QWidget):
         self.keep_if_larger_cb.setChecked(False)
         self.copy_if_larger_cb.setChecked(False)
         self.multithreading_cmb.setCurrentIndex(0)
+        self.execution_class_cmb.setCurrentIndex(0)
+        self.cpu_placement_cb.setChecked(False)
+        self.conversion_cache_cb.setChecked(False)
+        self.conversion_cache_size_sb.setValue(10)
+        self.deduplicate_cb.setChecked(True)
 
         self.resetExifTool()
 